@@ -591,6 +591,16 @@ export function AddExpense() {
         body: learningFormData,
       }).catch(err => console.error("AI Learning call failed:", err));
 
+      // Expenses are written straight to Supabase; tell the backend so it drops cached analytics.
+      // The dates written (old and new) let it keep results for untouched past months; [] clears them all.
+      // A group write passes its group so the payer's and split members' caches are dropped too.
+      const notifyExpensesChanged = (dates: string[], groupId?: string) =>
+        fetch(`${import.meta.env.VITE_API_URL}/api/expenses/changed`, {
+          method: 'POST',
+          headers: { 'Authorization': `Bearer ${session.access_token}`, 'Content-Type': 'application/json' },
+          body: JSON.stringify(groupId ? { dates, group_id: groupId } : { dates }),
+        }).catch(err => console.error("Expense change notification failed:", err));
+
       if (isEditMode && editingExpenseId) {
         // UPDATE MODE
         if (expenseType === 'personal') {
@@ -605,6 +615,7 @@ export function AddExpense() {
             .eq('id', editingExpenseId);
 
           if (updateError) throw updateError;
+          notifyExpensesChanged(passedExpense?.date ? [passedExpense.date, new Date(expenseDate).toISOString()] : []);
 
           toast.success('✅ Expense updated successfully!');
           setTimeout(() => navigate('/dashboard'), 1000);
@@ -626,6 +637,8 @@ export function AddExpense() {
             });
 
           if (expenseError) throw expenseError;
+          // awaited: the dashboard reads in-memory range totals right after navigating
+          await notifyExpensesChanged([new Date(expenseDate).toISOString()]);
           toast.success('Personal expense added!');
           navigate('/dashboard');
         } else {
@@ -674,6 +687,7 @@ export function AddExpense() {
           });
 
           if (rpcError) throw rpcError;
+          notifyExpensesChanged([new Date().toISOString()], selectedGroup);
           toast.success('Group expense added!');
           navigate('/groups/' + selectedGroup);
         }
@@ -139,7 +139,7 @@ export function Dashboard() {
   const [showDatePicker, setShowDatePicker] = useState(false);
   const [currentMonth, setCurrentMonth] = useState(new Date());
   const [dateRange, setDateRange] = useState<{ from: Date | undefined; to: Date | undefined }>({ from: undefined, to: undefined });
-  const [monthlyExpenses, setMonthlyExpenses] = useState<any[]>([]);
+  const [dailyTotals, setDailyTotals] = useState<Record<string, number>>({});
   const [sidebarExpenses, setSidebarExpenses] = useState<any[]>([]);
   const [sidebarTotal, setSidebarTotal] = useState<number>(0);
   const [isCalendarLoading, setIsCalendarLoading] = useState(false);
@@ -165,8 +165,8 @@ export function Dashboard() {
   const BUDGET_TABLE = 'budgets';
   const near80ShownRef = useRef(false);
 
-  // --- Helpers: refetch monthly expenses (used after delete)
-  const refetchMonthlyExpenses = async () => {
+  // --- Helpers: refetch per-day totals of the shown month (calendar + sparkline, also used after delete)
+  const refetchDailyTotals = async () => {
     if (!user) return;
     const start = format(startOfMonth(currentMonth), 'yyyy-MM-dd');
     const end = format(endOfMonth(currentMonth), 'yyyy-MM-dd');
@@ -174,17 +174,17 @@ export function Dashboard() {
       const { data: { session } } = await supabase.auth.getSession();
       if (!session?.access_token) return;
       const response = await fetch(
-        `${import.meta.env.VITE_API_URL}/api/expenses/range?start_date=${start}&end_date=${end}`,
+        `${import.meta.env.VITE_API_URL}/api/expenses/daily-totals?start_date=${start}&end_date=${end}`,
         { headers: { Authorization: `Bearer ${session.access_token}` } }
       );
       if (response.ok) {
         const data = await response.json();
-        // annotate is_group flag
-        const mapped = (data || []).map((e: any) => ({ ...e, is_group: detectIsGroupExpense(e) }));
-        setMonthlyExpenses(mapped || []);
+        const totals: Record<string, number> = {};
+        (data || []).forEach((d: any) => { totals[d.date] = Number(d.total) || 0; });
+        setDailyTotals(totals);
       }
     } catch (error) {
-      console.error("Error fetching monthly expenses:", error);
+      console.error("Error fetching daily totals:", error);
     }
   };
 
@@ -219,7 +219,16 @@ export function Dashboard() {
         return;
       }
       toast.success('Expense deleted');
-      await refetchMonthlyExpenses();
+      const { data: { session } } = await supabase.auth.getSession();
+      if (session?.access_token) {
+        // awaited so the range total refetched below already sees the change
+        await fetch(`${import.meta.env.VITE_API_URL}/api/expenses/changed`, {
+          method: 'POST',
+          headers: { Authorization: `Bearer ${session.access_token}`, 'Content-Type': 'application/json' },
+          body: JSON.stringify({ dates: expense.date ? [expense.date] : [] }),
+        }).catch(err => console.error('Expense change notification failed:', err));
+      }
+      await refetchDailyTotals();
       if (dateRange.from) setDateRange({ ...dateRange }); // trigger refetch for sidebar range
     } catch (err) {
       console.error('Failed to delete expense', err);
@@ -423,41 +432,49 @@ export function Dashboard() {
     fetchMonthlyTotals();
   }, [user, categoryPeriod]);
 
-  // monthly expenses for calendar + sparkline
+  // daily totals for calendar + sparkline
   useEffect(() => {
-    const fetchMonthlyData = async () => {
-      if (!user) return;
-      const start = format(startOfMonth(currentMonth), 'yyyy-MM-dd');
-      const end = format(endOfMonth(currentMonth), 'yyyy-MM-dd');
+    refetchDailyTotals();
+  }, [user, currentMonth, showDatePicker]);
+
+  // range total (summary card + sidebar header), computed server-side without downloading rows
+  useEffect(() => {
+    const fetchRangeTotal = async () => {
+      if (!user || !dateRange.from) {
+        setSidebarTotal(0);
+        setFilteredExpenses(0);
+        return;
+      }
+      const startStr = format(dateRange.from, 'yyyy-MM-dd');
+      const endStr = dateRange.to ? format(dateRange.to, 'yyyy-MM-dd') : startStr;
       try {
         const { data: { session } } = await supabase.auth.getSession();
         if (!session?.access_token) return;
         const response = await fetch(
-          `${import.meta.env.VITE_API_URL}/api/expenses/range?start_date=${start}&end_date=${end}`,
+          `${import.meta.env.VITE_API_URL}/api/expenses/range/total?start_date=${startStr}&end_date=${endStr}`,
           { headers: { Authorization: `Bearer ${session.access_token}` } }
         );
         if (response.ok) {
           const data = await response.json();
-          // ensure monthly expenses are annotated with is_group flag
-          const mapped = (data || []).map((e: any) => ({ ...e, is_group: detectIsGroupExpense(e) }));
-          setMonthlyExpenses(mapped || []);
+          const total = Number(data?.total) || 0;
+          setSidebarTotal(total);
+          setFilteredExpenses(total);
         }
       } catch (error) {
-        console.error("Error fetching monthly expenses:", error);
+        console.error("Error fetching range total:", error);
       }
     };
-    fetchMonthlyData();
-  }, [user, currentMonth, showDatePicker]);
+    fetchRangeTotal();
+  }, [user, dateRange]);
 
-  // range sidebar
+  // range sidebar list, only needed while the picker is open
   useEffect(() => {
     const fetchRangeData = async () => {
       if (!user || !dateRange.from) {
         setSidebarExpenses([]);
-        setSidebarTotal(0);
-        setFilteredExpenses(0);
         return;
       }
+      if (!showDatePicker) return;
       setIsCalendarLoading(true);
       const startStr = format(dateRange.from, 'yyyy-MM-dd');
       const endStr = dateRange.to ? format(dateRange.to, 'yyyy-MM-dd') : startStr;
@@ -475,9 +492,6 @@ export function Dashboard() {
           // annotate each expense with is_group flag so UI can rely on it
           const annotated = (data || []).map((item: any) => ({ ...item, is_group: detectIsGroupExpense(item) }));
           setSidebarExpenses(annotated || []);
-          const total = (annotated || []).reduce((sum: number, item: any) => sum + (Number(item.amount) || 0), 0);
-          setSidebarTotal(total);
-          setFilteredExpenses(total);
         }
       } catch (error) {
         console.error("Error fetching range expenses:", error);
@@ -486,7 +500,7 @@ export function Dashboard() {
       }
     };
     fetchRangeData();
-  }, [user, dateRange]);
+  }, [user, dateRange, showDatePicker]);
 
   // calendar helpers
   const handleDateSelect = (date: Date) => {
@@ -529,10 +543,8 @@ export function Dashboard() {
       const isCurrentMonth = currentDate.getMonth() === month;
       const isFuture = currentDate > today;
       const dateStr = format(currentDate, 'yyyy-MM-dd');
-      // monthlyExpenses are annotated already
-      const dayExpenses = monthlyExpenses.filter(exp => exp.date && String(exp.date).startsWith(dateStr));
-      const hasExpenses = dayExpenses.length > 0;
-      const dailyTotal = dayExpenses.reduce((sum, exp) => sum + (Number(exp.amount) || 0), 0);
+      const hasExpenses = dateStr in dailyTotals;
+      const dailyTotal = dailyTotals[dateStr] || 0;
 
       const isStartDate = dateRange.from && format(currentDate, 'yyyy-MM-dd') === format(dateRange.from, 'yyyy-MM-dd');
       const isEndDate = dateRange.to && format(currentDate, 'yyyy-MM-dd') === format(dateRange.to, 'yyyy-MM-dd');
@@ -587,13 +599,11 @@ export function Dashboard() {
     const days = eachDayOfInterval({ start, end });
     const map: { [k: string]: number } = {};
     days.forEach(d => (map[format(d, 'yyyy-MM-dd')] = 0));
-    monthlyExpenses.forEach(e => {
-      if (!e.date) return;
-      const dateKey = String(e.date).slice(0, 10);
-      if (map[dateKey] !== undefined) map[dateKey] += Number(e.amount || 0);
+    Object.entries(dailyTotals).forEach(([dateKey, total]) => {
+      if (map[dateKey] !== undefined) map[dateKey] += total;
     });
     return days.map(d => ({ date: format(d, 'dd MMM'), value: map[format(d, 'yyyy-MM-dd')] || 0 }));
-  }, [monthlyExpenses, currentMonth]);
+  }, [dailyTotals, currentMonth]);
 
   useEffect(() => {
     if (!near80ShownRef.current && budgetValue && budgetValue > 0) {
@@ -28,14 +28,14 @@ export function DateRangeExportModal({ open, onOpenChange }: DateRangeExportModa
   const [endDate, setEndDate] = useState<Date | null>(null);
 
   // Data States
-  const [monthlyExpenses, setMonthlyExpenses] = useState<Expense[]>([]);
+  const [dailyTotals, setDailyTotals] = useState<Record<string, number>>({});
   const [rangeExpenses, setRangeExpenses] = useState<Expense[]>([]);
   const [isLoadingMonth, setIsLoadingMonth] = useState(false);
   const [isLoadingRange, setIsLoadingRange] = useState(false);
 
   const monthNames = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December'];
 
-  // --- 1. Fetch Data for the Entire Calendar Month (For Daily Totals) ---
+  // --- 1. Fetch Daily Totals for the Entire Calendar Month ---
   useEffect(() => {
     if (!open || !user) return;
 
@@ -56,13 +56,15 @@ export function DateRangeExportModal({ open, onOpenChange }: DateRangeExportModa
         const endStr = format(lastDay, 'yyyy-MM-dd');
 
         const response = await fetch(
-          `${import.meta.env.VITE_API_URL}/api/expenses/range?start_date=${startStr}&end_date=${endStr}`,
+          `${import.meta.env.VITE_API_URL}/api/expenses/daily-totals?start_date=${startStr}&end_date=${endStr}`,
           { headers: { 'Authorization': `Bearer ${session.access_token}` } }
         );
 
         if (response.ok) {
           const data = await response.json();
-          setMonthlyExpenses(data);
+          const totals: Record<string, number> = {};
+          (data || []).forEach((d: any) => { totals[d.date] = Number(d.total) || 0; });
+          setDailyTotals(totals);
         }
       } catch (error) {
         console.error("Error fetching monthly data", error);
@@ -145,17 +147,10 @@ export function DateRangeExportModal({ open, onOpenChange }: DateRangeExportModa
     }
   };
 
-  // Helper to get daily total from the monthly dataset
+  // Helper to get daily total from the monthly totals
   const getDailyTotal = (day: number) => {
     const currentDate = new Date(currentMonth.getFullYear(), currentMonth.getMonth(), day);
-    const dateStr = format(currentDate, 'yyyy-MM-dd');
-    
-    const dailyItems = monthlyExpenses.filter(exp => {
-        if(!exp.date) return false;
-        return exp.date.startsWith(dateStr);
-    });
-
-    return dailyItems.reduce((sum, item) => sum + item.amount, 0);
+    return dailyTotals[format(currentDate, 'yyyy-MM-dd')] || 0;
   };
 
   const formatDateLabel = (date: Date | null): string => {
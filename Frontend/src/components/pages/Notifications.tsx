@@ -52,6 +52,7 @@ export function Notifications() {
       case 'settlement': 
       case 'settlement_received': return 'Payment Received'; 
       case 'expense': return 'New Expense';
+      case 'group': return 'Group Update';
       default: return 'Notification';
     }
   };
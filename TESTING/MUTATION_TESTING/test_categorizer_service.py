@@ -297,6 +297,36 @@ class TestCategorizerServiceComprehensive(unittest.TestCase):
         
         self.mock_supabase.table.return_value.insert.assert_called_once()
 
+    def test_learn_new_rule_normalizes_description(self):
+        mock_check_response = MockSupabaseResponse(data=[])
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = mock_check_response
+
+        self.categorizer.learn_new_rule('user_1', 'Dinner with team at Olive Garden 12/3', 'Food')
+
+        call_args = self.mock_supabase.table.return_value.insert.call_args[0][0]
+        self.assertEqual(call_args['keywords'], ['olive garden'])
+
+    def test_learn_new_rule_skips_keyword_covered_by_existing(self):
+        mock_check_response = MockSupabaseResponse(data=[{'keywords': ['pizza']}])
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = mock_check_response
+
+        self.categorizer.learn_new_rule('user_1', 'Pizza Hut', 'Food')
+
+        self.mock_supabase.table.return_value.update.assert_not_called()
+
+    def test_compact_user_rules_reports_counts(self):
+        rows = [
+            {'user_id': 'user_1', 'category_name': 'Food', 'keywords': ['pizza', 'pizza hut 12/3', 'lunch at olive garden']},
+            {'user_id': 'user_1', 'category_name': 'Transport', 'keywords': ['uber']},
+        ]
+        query = self.mock_supabase.table.return_value.select.return_value.eq.return_value
+        query.order.return_value.order.return_value.range.return_value.execute.return_value = MockSupabaseResponse(data=rows)
+
+        stats = self.categorizer.compact_user_rules('user_1')
+
+        self.assertEqual(stats, {'rows': 2, 'rows_updated': 1, 'keywords_before': 4, 'keywords_after': 3})
+        self.mock_supabase.table.return_value.update.assert_called_once_with({'keywords': ['pizza', 'olive garden']})
+
     def test_parse_bill_image_success(self):
         self.mock_gemini.generate_content.return_value.text = '{"vendor_name": "Restaurant", "total": 25.50}'
         
@@ -354,6 +384,37 @@ class TestCategorizerServiceComprehensive(unittest.TestCase):
         result = self.categorizer.parse_bill_image(b'image_data', '')
         self.assertEqual(result['vendor_name'], 'Test')
 
+    def test_parse_bill_upload_sends_undecodable_upload_as_raw_bytes(self):
+        from io import BytesIO
+        from werkzeug.datastructures import FileStorage
+        from app.services.upload_pipeline import receive_upload
+
+        self.mock_gemini.generate_content.return_value.text = '{"total": 9.5}'
+        upload = receive_upload(FileStorage(BytesIO(b'raw_bill'), filename='bill.jpg', content_type='image/jpeg'))
+
+        result = self.categorizer.parse_bill_upload(upload)
+
+        self.assertEqual(result, {'total': 9.5})
+        content = self.mock_gemini.generate_content.call_args[0][0]
+        self.assertEqual(content[1], {'mime_type': 'image/jpeg', 'data': b'raw_bill'})
+
+    def test_parse_bill_text_uses_local_parser(self):
+        parsed, source = self.categorizer.parse_bill_text("Cafe\nDate: 2024-03-01\nTotal 12.50")
+
+        self.assertEqual(source, 'local')
+        self.assertEqual(parsed['total'], 12.5)
+        self.mock_gemini.generate_content.assert_not_called()
+
+    def test_parse_bill_text_falls_back_to_ai_when_fields_missing(self):
+        self.mock_gemini.generate_content.return_value.text = '{"total": 4.0, "issue_date": "2024-03-01"}'
+
+        parsed, source = self.categorizer.parse_bill_text("Coffee 4.00")
+
+        self.assertEqual(source, 'ai')
+        self.assertEqual(parsed['total'], 4.0)
+        content = self.mock_gemini.generate_content.call_args[0][0]
+        self.assertIn('Coffee 4.00', content[1])
+
     def test_find_category_with_user_rules(self):
         with patch.object(self.categorizer, '_get_user_rules', return_value={
             'Food': ['pizza', 'burger'],
@@ -364,6 +425,13 @@ class TestCategorizerServiceComprehensive(unittest.TestCase):
             self.assertEqual(result['category'], 'Food')
             self.assertEqual(result['source'], 'user_dictionary')
 
+    def test_find_category_rules_match_whole_words(self):
+        with patch.object(self.categorizer, '_get_user_rules', return_value={'Housing': ['rent']}):
+            self.mock_gemini.generate_content.return_value.text = '{"category": "Education"}'
+
+            self.assertEqual(self.categorizer.find_category('user_1', 'Rent for March')['category'], 'Housing')
+            self.assertEqual(self.categorizer.find_category('user_1', 'Parent teacher meeting')['source'], 'ai')
+
     def test_find_category_no_user_rules(self):
         with patch.object(self.categorizer, '_get_user_rules', return_value={}):
             self.mock_gemini.generate_content.return_value.text = '{"category": "Food"}'
@@ -373,6 +441,42 @@ class TestCategorizerServiceComprehensive(unittest.TestCase):
             self.assertEqual(result['category'], 'Food')
             self.assertEqual(result['source'], 'ai')
 
+    def test_find_category_matches_misspelled_merchant(self):
+        with patch.object(self.categorizer, '_get_user_rules', return_value={'Food': ['starbucks']}):
+            result = self.categorizer.find_category('user_1', 'starbuks')
+
+            self.assertEqual(result, {'category': 'Food', 'source': 'user_dictionary'})
+            self.mock_gemini.generate_content.assert_not_called()
+
+    def test_find_category_prefers_merchant_rule_over_word_rule(self):
+        rules = {'Food': ['apple', 'cola'], 'Entertainment': ['apple services'], 'Transportation': ['ola cabs']}
+        with patch.object(self.categorizer, '_get_user_rules', return_value=rules):
+            self.assertEqual(self.categorizer.find_category('user_1', 'Apple Music subscription')['category'], 'Entertainment')
+            self.assertEqual(self.categorizer.find_category('user_1', 'apple 1kg')['category'], 'Food')
+            self.assertEqual(self.categorizer.find_category('user_1', 'Coca cola 2L')['category'], 'Food')
+            self.mock_gemini.generate_content.assert_not_called()
+
+    def test_find_category_reuses_ai_answer_for_merchant_variants(self):
+        with patch.object(self.categorizer, '_get_user_rules', return_value={}), \
+             patch.object(self.categorizer, 'learn_new_rule'):
+            self.mock_gemini.generate_content.return_value.text = '{"category": "Coffee"}'
+
+            first = self.categorizer.find_category('user_1', 'Starbucks #1234')
+            second = self.categorizer.find_category('user_1', 'STARBUCKS COFFEE')
+
+            self.assertEqual(first['source'], 'ai')
+            self.assertEqual(second, {'category': 'Coffee', 'source': 'ai_cache'})
+            self.mock_gemini.generate_content.assert_called_once()
+
+    def test_learn_new_rule_stores_canonical_merchant(self):
+        mock_check_response = MockSupabaseResponse(data=[])
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = mock_check_response
+
+        self.categorizer.learn_new_rule('user_1', 'STARBUCKS COFFEE #1234', 'Coffee')
+
+        call_args = self.mock_supabase.table.return_value.insert.call_args[0][0]
+        self.assertEqual(call_args['keywords'], ['starbucks'])
+
     def test_find_category_gemini_error(self):
         with patch.object(self.categorizer, '_get_user_rules', return_value={}):
             self.mock_gemini.generate_content.side_effect = Exception("Gemini error")
@@ -494,5 +598,41 @@ class TestCategorizerServiceComprehensive(unittest.TestCase):
             self.assertEqual(result['category'], 'Other')
             self.assertEqual(result['source'], 'default')
 
+
+class TestCategorizeRoute(unittest.TestCase):
+
+    def setUp(self):
+        from flask import Flask
+        from app.routes import categorizer_routes
+        app = Flask(__name__)
+        app.register_blueprint(categorizer_routes.cat_bp, url_prefix='/api')
+        self.client = app.test_client()
+        self.auth_patcher = patch('app.auth.decorators.supabase')
+        self.auth_patcher.start().auth.get_user.return_value = MagicMock(user=MagicMock(id='user_1', email=None))
+        self.categorizer_patcher = patch('app.routes.categorizer_routes.categorizer')
+        self.categorizer_patcher.start()
+        self.index_patcher = patch('app.routes.categorizer_routes.suggestion_index')
+        self.mock_index = self.index_patcher.start()
+        self.headers = {'Authorization': 'Bearer token'}
+
+    def tearDown(self):
+        self.auth_patcher.stop()
+        self.categorizer_patcher.stop()
+        self.index_patcher.stop()
+
+    def test_learning_records_the_amount_for_suggestions(self):
+        response = self.client.post('/api/categorize', headers=self.headers,
+                                    data={'description': 'Gym membership', 'category': 'Health', 'amount': '49.99'})
+
+        self.assertEqual(response.status_code, 200)
+        self.mock_index.record.assert_called_once_with('user_1', 'Gym membership', 'Health', 49.99)
+
+    def test_missing_or_bad_amount_is_recorded_as_unknown(self):
+        for amount in ('', 'abc', 'nan', 'inf'):
+            self.client.post('/api/categorize', headers=self.headers,
+                             data={'description': 'Gym', 'category': 'Health', 'amount': amount})
+            self.assertIsNone(self.mock_index.record.call_args.args[3])
+
+
 if __name__ == '__main__':
     unittest.main()
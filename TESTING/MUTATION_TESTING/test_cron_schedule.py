@@ -0,0 +1,60 @@
+import unittest
+from datetime import datetime, timezone
+
+from app.services.cron_schedule import parse_schedule, CronError
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class TestCronSchedule(unittest.TestCase):
+
+    def runs(self, expression, start, count=3):
+        schedule = parse_schedule(expression)
+        moment, found = start, []
+        for _ in range(count):
+            moment = schedule.next_after(moment)
+            found.append(moment)
+        return found
+
+    def test_aliases(self):
+        self.assertEqual(self.runs('@monthly', utc(2026, 1, 31, 10, 30), 2), [utc(2026, 2, 1), utc(2026, 3, 1)])
+        self.assertEqual(self.runs('@weekly', utc(2026, 1, 1), 1), [utc(2026, 1, 4)])
+        self.assertEqual(self.runs('@yearly', utc(2026, 1, 1), 1), [utc(2027, 1, 1)])
+
+    def test_next_is_strictly_after(self):
+        self.assertEqual(parse_schedule('0 9 * * *').next_after(utc(2026, 3, 2, 9, 0)), utc(2026, 3, 3, 9, 0))
+        self.assertEqual(parse_schedule('0 9 * * *').next_after(utc(2026, 3, 2, 8, 59, 59)), utc(2026, 3, 2, 9, 0))
+
+    def test_steps_ranges_lists_and_names(self):
+        self.assertEqual(self.runs('*/20 * * * *', utc(2026, 1, 1, 10, 5)), [utc(2026, 1, 1, 10, 20), utc(2026, 1, 1, 10, 40), utc(2026, 1, 1, 11, 0)])
+        # 2026-01-31 is a Saturday.
+        self.assertEqual(self.runs('30 8 * * mon-fri', utc(2026, 1, 31), 2), [utc(2026, 2, 2, 8, 30), utc(2026, 2, 3, 8, 30)])
+        self.assertEqual(self.runs('0 12 1,15 jan,jul *', utc(2026, 1, 10)), [utc(2026, 1, 15, 12), utc(2026, 7, 1, 12), utc(2026, 7, 15, 12)])
+
+    def test_day_fields_match_either_when_both_restricted(self):
+        # The 13th, or any Friday.
+        self.assertEqual(self.runs('0 0 13 * fri', utc(2026, 2, 1)), [utc(2026, 2, 6), utc(2026, 2, 13), utc(2026, 2, 20)])
+
+    def test_sunday_is_zero_or_seven(self):
+        self.assertEqual(parse_schedule('0 0 * * 7').next_after(utc(2026, 1, 1)), utc(2026, 1, 4))
+
+    def test_short_months_are_skipped(self):
+        self.assertEqual(self.runs('0 0 31 * *', utc(2026, 1, 31, 1), 2), [utc(2026, 3, 31), utc(2026, 5, 31)])
+        self.assertEqual(parse_schedule('0 0 29 2 *').next_after(utc(2026, 1, 1)), utc(2028, 2, 29))
+
+    def test_naive_datetimes_are_utc(self):
+        self.assertEqual(parse_schedule('@daily').next_after(datetime(2026, 1, 1, 5)), utc(2026, 1, 2))
+
+    def test_invalid_expressions(self):
+        for expression in ['', None, '* * *', '60 * * * *', '* 24 * * *', '*/0 * * * *', '5-1 * * * *', 'x * * * *', '0 0 30 2 *', ['@daily']]:
+            with self.assertRaises(CronError, msg=expression):
+                parse_schedule(expression)
+
+    def test_expressions_are_shared(self):
+        self.assertIs(parse_schedule('0  9 * * *'), parse_schedule('0 9 * * *'))
+
+
+if __name__ == '__main__':
+    unittest.main()
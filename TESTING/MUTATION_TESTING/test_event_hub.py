@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch
+import gc
+import json
+import threading
+import tracemalloc
+
+from app.services.event_hub import EventHub, CLOSE, RESYNC_MESSAGE, publish_to_user
+
+
+def _data(message):
+    return json.loads(message.split('data: ', 1)[1])
+
+
+class TestEventHub(unittest.TestCase):
+
+    def setUp(self):
+        self.hub = EventHub()
+
+    def test_fan_out_to_user_and_group_topics(self):
+        alice = self.hub.subscribe('alice', ['user:alice', 'group:g1'])
+        alice_tab = self.hub.subscribe('alice', ['user:alice', 'group:g1'])
+        bob = self.hub.subscribe('bob', ['user:bob', 'group:g1'])
+
+        self.assertEqual(self.hub.publish('group:g1', 'balances_changed', {'group_id': 'g1'}), 3)
+        self.assertEqual(self.hub.publish('user:bob', 'notification', {'message': 'hi'}), 1)
+        self.assertEqual(self.hub.publish('group:nobody', 'x', {}), 0)
+
+        message = self.hub.next_message(alice, timeout=0.1)
+        self.assertTrue(message.startswith('event: balances_changed\n'))
+        self.assertEqual(_data(message), {'group_id': 'g1'})
+        self.assertIsNotNone(self.hub.next_message(alice_tab, timeout=0.1))
+        self.assertEqual(_data(self.hub.next_message(bob, timeout=0.1)), {'group_id': 'g1'})
+        self.assertEqual(_data(self.hub.next_message(bob, timeout=0.1)), {'message': 'hi'})
+
+    def test_timeout_means_heartbeat(self):
+        subscriber = self.hub.subscribe('alice', ['user:alice'])
+        self.assertIsNone(self.hub.next_message(subscriber, timeout=0.01))
+
+    def test_blocked_reader_wakes_on_publish(self):
+        subscriber = self.hub.subscribe('alice', ['user:alice'])
+        received = []
+        reader = threading.Thread(target=lambda: received.append(self.hub.next_message(subscriber, timeout=2)))
+        reader.start()
+        self.hub.publish('user:alice', 'notification', {'n': 1})
+        reader.join(timeout=2)
+
+        self.assertEqual(_data(received[0]), {'n': 1})
+
+    @patch('app.services.event_hub.Config')
+    def test_slow_subscriber_gets_resync_instead_of_unbounded_queue(self, mock_config):
+        mock_config.EVENT_HUB_MAX_PENDING = 3
+        mock_config.EVENT_HUB_MAX_STREAMS_PER_USER = 5
+        subscriber = self.hub.subscribe('alice', ['user:alice'])
+
+        for i in range(50):
+            self.hub.publish('user:alice', 'notification', {'n': i})
+        self.assertLessEqual(subscriber.queue.qsize(), 4)
+
+        messages = [self.hub.next_message(subscriber, timeout=0.01) for _ in range(4)]
+        self.assertEqual(messages[3], RESYNC_MESSAGE)
+        self.assertIsNone(self.hub.next_message(subscriber, timeout=0.01))
+
+        # Back to normal delivery once the client has caught up.
+        self.assertEqual(self.hub.publish('user:alice', 'notification', {'n': 99}), 1)
+        self.assertEqual(_data(self.hub.next_message(subscriber, timeout=0.01)), {'n': 99})
+
+    @patch('app.services.event_hub.Config')
+    def test_oldest_stream_is_closed_past_per_user_limit(self, mock_config):
+        mock_config.EVENT_HUB_MAX_STREAMS_PER_USER = 2
+        mock_config.EVENT_HUB_MAX_PENDING = 100
+        first = self.hub.subscribe('alice', ['user:alice'])
+        self.hub.subscribe('alice', ['user:alice'])
+        self.hub.subscribe('alice', ['user:alice'])
+
+        self.assertIs(self.hub.next_message(first, timeout=0.01), CLOSE)
+        self.assertEqual(self.hub.publish('user:alice', 'notification', {}), 2)
+
+    def test_attach_detach_and_unsubscribe(self):
+        subscriber = self.hub.subscribe('alice', ['user:alice'])
+
+        self.hub.attach('alice', 'group:g2')
+        self.assertEqual(self.hub.publish('group:g2', 'members_changed', {}), 1)
+        self.hub.detach('alice', 'group:g2')
+        self.assertEqual(self.hub.publish('group:g2', 'members_changed', {}), 0)
+
+        self.hub.unsubscribe(subscriber)
+        self.assertEqual(self.hub.stats(), {'users': 0, 'streams': 0, 'topics': 0})
+
+    def test_thousands_of_idle_subscribers_stay_small(self):
+        count = 5000
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        subscribers = [self.hub.subscribe(f'user_{i}', [f'user:user_{i}', f'group:g{i % 500}']) for i in range(count)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+        per_subscriber = allocated / count
+        print(f"{count} idle subscribers: {allocated / 1024:.0f} KiB ({per_subscriber:.0f} bytes each)")
+
+        self.assertEqual(self.hub.stats()['streams'], count)
+        self.assertLess(per_subscriber, 2048)
+
+        # Fan-out to one busy group only touches that group's subscribers.
+        self.assertEqual(self.hub.publish('group:g7', 'balances_changed', {}), count // 500)
+        for subscriber in subscribers:
+            self.hub.unsubscribe(subscriber)
+        self.assertEqual(self.hub.stats()['topics'], 0)
+
+    def test_publish_helper_swallows_errors(self):
+        with patch('app.services.event_hub.event_hub.publish', side_effect=RuntimeError('boom')):
+            self.assertEqual(publish_to_user('alice', 'notification', {}), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
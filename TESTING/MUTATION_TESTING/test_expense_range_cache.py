@@ -0,0 +1,150 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import types
+from datetime import date
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.expense_range_cache import ExpenseRangeCache, gaps, merge, remove_day
+
+
+def d(day, month=3):
+    return date(2026, month, day)
+
+
+class TestIntervals(unittest.TestCase):
+
+    def test_gaps(self):
+        intervals = [(d(3), d(5)), (d(10), d(12))]
+
+        self.assertEqual(gaps(intervals, d(1), d(15)), [(d(1), d(2)), (d(6), d(9)), (d(13), d(15))])
+        self.assertEqual(gaps(intervals, d(4), d(11)), [(d(6), d(9))])
+        self.assertEqual(gaps(intervals, d(10), d(12)), [])
+        self.assertEqual(gaps([], d(1), d(2)), [(d(1), d(2))])
+
+    def test_merge_joins_overlapping_and_adjacent(self):
+        intervals = [(d(1), d(3)), (d(10), d(12))]
+
+        self.assertEqual(merge(intervals, d(4), d(9)), [(d(1), d(12))])
+        self.assertEqual(merge(intervals, d(5), d(6)), [(d(1), d(3)), (d(5), d(6)), (d(10), d(12))])
+        self.assertEqual(merge(intervals, d(2), d(11)), [(d(1), d(12))])
+
+    def test_remove_day(self):
+        self.assertEqual(remove_day([(d(1), d(5))], d(3)), [(d(1), d(2)), (d(4), d(5))])
+        self.assertEqual(remove_day([(d(1), d(5))], d(1)), [(d(2), d(5))])
+        self.assertEqual(remove_day([(d(1), d(1))], d(1)), [])
+
+
+class TestExpenseRangeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = {
+            d(1): [{'id': 1, 'date': '2026-03-01T09:00:00+00:00'}],
+            d(5): [{'id': 3, 'date': '2026-03-05T18:00:00+00:00'}, {'id': 2, 'date': '2026-03-05T08:00:00+00:00'}],
+            d(20): [{'id': 4, 'date': '2026-03-20T12:00:00+00:00'}],
+        }
+        self.fetch = MagicMock(side_effect=self._fetch)
+        self.config_patcher = patch('app.services.expense_range_cache.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.RANGE_CACHE_TTL_SECONDS = 600
+        self.mock_config.RANGE_CACHE_MAX_ROWS_PER_USER = 100
+        self.cache = ExpenseRangeCache(max_users=10)
+
+    def tearDown(self):
+        self.config_patcher.stop()
+
+    def _fetch(self, first, last):
+        rows = []
+        for day in sorted(self.rows, reverse=True):
+            if first <= day <= last:
+                rows.extend(self.rows[day])
+        return rows
+
+    def ids(self, rows):
+        return [row['id'] for row in rows]
+
+    def test_sub_range_is_served_from_cache(self):
+        self.assertEqual(self.ids(self.cache.get('u1', d(1), d(31), self.fetch)), [4, 3, 2, 1])
+
+        self.assertEqual(self.ids(self.cache.get('u1', d(2), d(10), self.fetch)), [3, 2])
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_only_gaps_are_fetched(self):
+        self.cache.get('u1', d(1), d(5), self.fetch)
+        self.cache.get('u1', d(10), d(15), self.fetch)
+
+        rows = self.cache.get('u1', d(1), d(20), self.fetch)
+
+        self.assertEqual(self.ids(rows), [4, 3, 2, 1])
+        self.assertEqual([c.args for c in self.fetch.call_args_list[2:]], [(d(6), d(9)), (d(16), d(20))])
+        self.assertEqual(self.cache.users['u1']['intervals'], [(d(1), d(20))])
+
+    def test_dated_write_refetches_that_day(self):
+        self.cache.get('u1', d(1), d(31), self.fetch)
+        self.rows[d(5)] = [{'id': 9, 'date': '2026-03-05T10:00:00Z'}]
+
+        self.cache.invalidate('u1', [d(5)])
+        rows = self.cache.get('u1', d(1), d(31), self.fetch)
+
+        self.assertEqual(self.ids(rows), [4, 9, 1])
+        self.assertEqual(self.fetch.call_args.args, (d(5), d(5)))
+
+    def test_undated_write_drops_the_user(self):
+        self.cache.get('u1', d(1), d(31), self.fetch)
+
+        self.cache.invalidate('u1')
+        self.cache.get('u1', d(1), d(31), self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_users_are_separate(self):
+        self.cache.get('u1', d(1), d(31), self.fetch)
+        self.cache.get('u2', d(1), d(31), self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_fetch_that_raced_a_write_is_not_stored(self):
+        def racing_fetch(first, last):
+            self.cache.invalidate('u1', [d(5)])
+            return self._fetch(first, last)
+        self.fetch.side_effect = racing_fetch
+
+        rows = self.cache.get('u1', d(1), d(31), self.fetch)
+
+        self.assertEqual(self.ids(rows), [4, 3, 2, 1])
+        self.assertEqual(self.cache.users['u1']['intervals'], [])
+
+    def test_overlapping_concurrent_fetches_store_rows_once(self):
+        entry_fetch = self.fetch.side_effect
+        def concurrent_fetch(first, last):
+            # Another request stores the same days while this one is fetching.
+            self.fetch.side_effect = entry_fetch
+            self.cache.get('u1', first, last, self.fetch)
+            return entry_fetch(first, last)
+        self.fetch.side_effect = concurrent_fetch
+
+        rows = self.cache.get('u1', d(1), d(31), self.fetch)
+
+        self.assertEqual(self.ids(rows), [4, 3, 2, 1])
+        self.assertEqual(self.cache.users['u1']['rows'], 4)
+
+    def test_users_over_the_row_limit_are_not_kept(self):
+        self.mock_config.RANGE_CACHE_MAX_ROWS_PER_USER = 3
+
+        self.assertEqual(len(self.cache.get('u1', d(1), d(31), self.fetch)), 4)
+        self.assertNotIn('u1', self.cache.users)
+
+    def test_expired_user_is_refetched(self):
+        self.cache.get('u1', d(1), d(31), self.fetch)
+        self.mock_config.RANGE_CACHE_TTL_SECONDS = 0
+
+        self.cache.get('u1', d(1), d(31), self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ Targets: get_group_expenses, get_monthly_donut_data.
 """
 import unittest
 from unittest.mock import MagicMock, patch, Mock
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import sys
 import types
 
@@ -15,7 +15,12 @@ fake_extensions.supabase = MagicMock()
 fake_extensions.gemini_model = None
 sys.modules["app.extensions"] = fake_extensions
 
-from app.services.expense_service import get_group_expenses, get_monthly_donut_data
+from app.services.expense_service import (
+    get_group_expenses, get_monthly_donut_data, get_current_month_total, get_daily_totals, notify_expenses_changed,
+    get_range_total, get_expenses_by_date_range
+)
+from app.services.period_cache import ClosedPeriodCache
+from app.services.expense_range_cache import ExpenseRangeCache
 
 class MockSupabaseResponse:
     def __init__(self, data, error=None):
@@ -27,9 +32,12 @@ class TestExpenseServiceComprehensiveMerged(unittest.TestCase):
     def setUp(self):
         self.supabase_patcher = patch('app.services.expense_service.supabase')
         self.mock_supabase = self.supabase_patcher.start()
+        self.period_cache_patcher = patch('app.services.expense_service.period_cache', ClosedPeriodCache(cache_dir='', max_users=10, max_entries_per_user=10))
+        self.period_cache_patcher.start()
 
     def tearDown(self):
         self.supabase_patcher.stop()
+        self.period_cache_patcher.stop()
 
     def test_get_group_expenses_not_member(self):
         """Mutation Target: Kills mutation that removes authorization check."""
@@ -580,5 +588,293 @@ class TestExpenseServiceComprehensiveMerged(unittest.TestCase):
         self.assertEqual(data[2]['category'], 'Transport')
         self.assertEqual(data[2]['total'], 5.0)
 
+
+class TestSpendingRollupReads(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.expense_service.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.rollups_patcher = patch('app.services.expense_service.spending_rollups')
+        self.mock_rollups = self.rollups_patcher.start()
+        from app.services.spending_rollups import to_day
+        self.mock_rollups.to_day.side_effect = to_day
+        self.config_patcher = patch('app.services.expense_service.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.SPENDING_ROLLUPS = True
+        self.period_cache = ClosedPeriodCache(cache_dir='', max_users=10, max_entries_per_user=10)
+        self.period_cache_patcher = patch('app.services.expense_service.period_cache', self.period_cache)
+        self.period_cache_patcher.start()
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.rollups_patcher.stop()
+        self.config_patcher.stop()
+        self.period_cache_patcher.stop()
+
+    def test_donut_reads_rollups_for_the_month(self):
+        self.mock_rollups.category_totals.return_value = {
+            'Food': {'total': 30.004, 'count': 3}, 'Rent': {'total': 900, 'count': 1}
+        }
+
+        data, status = get_monthly_donut_data('u1', 'current')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data, [{'category': 'Rent', 'total': 900}, {'category': 'Food', 'total': 30.0}])
+        user_id, start, end = self.mock_rollups.category_totals.call_args.args
+        self.assertEqual((start.day, end.month), (1, start.month))
+        self.mock_supabase.table.assert_not_called()
+
+    def test_current_month_total_from_rollups(self):
+        self.mock_rollups.total_since.return_value = 123.456
+
+        data, status = get_current_month_total('u1')
+
+        self.assertEqual((data, status), ({'total': 123.46}, 200))
+        self.assertEqual(self.mock_rollups.total_since.call_args.args[1].day, 1)
+
+    def test_current_month_total_without_rollups(self):
+        self.mock_config.SPENDING_ROLLUPS = False
+        (self.mock_supabase.table.return_value.select.return_value.eq.return_value
+         .gte.return_value.execute.return_value) = MockSupabaseResponse(data=[{'amount': 10}, {'amount': '2.5'}])
+
+        self.assertEqual(get_current_month_total('u1'), ({'total': 12.5}, 200))
+
+    def test_daily_totals_from_rollups(self):
+        from datetime import date
+        self.mock_rollups.daily_totals.return_value = {
+            date(2026, 3, 4): {'total': 8, 'count': 1}, date(2026, 3, 2): {'total': 42.5, 'count': 3}
+        }
+
+        data, status = get_daily_totals('u1', '2026-03-01', '2026-03-31T23:59:59')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data, [{'date': '2026-03-02', 'total': 42.5, 'count': 3}, {'date': '2026-03-04', 'total': 8, 'count': 1}])
+
+    def test_daily_totals_without_rollups_sums_rows(self):
+        self.mock_config.SPENDING_ROLLUPS = False
+        (self.mock_supabase.table.return_value.select.return_value.eq.return_value
+         .gte.return_value.lte.return_value.execute.return_value) = MockSupabaseResponse(data=[
+            {'amount': 5, 'category': 'Food', 'date': '2026-03-02T09:00:00Z'},
+            {'amount': 7, 'category': 'Food', 'date': '2026-03-02T18:00:00Z'},
+        ])
+
+        data, status = get_daily_totals('u1', '2026-03-01', '2026-03-31')
+
+        self.assertEqual((data, status), ([{'date': '2026-03-02', 'total': 12.0, 'count': 2}], 200))
+
+    def test_daily_totals_rejects_bad_dates(self):
+        self.assertEqual(get_daily_totals('u1', 'yesterday', '2026-03-31')[1], 400)
+        self.assertEqual(get_daily_totals('u1', '2026-03-31', '2026-03-01')[1], 400)
+
+    def test_previous_month_donut_is_cached_until_a_backdated_write(self):
+        self.mock_rollups.category_totals.return_value = {'Food': {'total': 30, 'count': 3}}
+
+        first, _ = get_monthly_donut_data('u1', 'previous')
+        second, _ = get_monthly_donut_data('u1', 'previous')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.mock_rollups.category_totals.call_count, 1)
+
+        _, start, end = self.mock_rollups.category_totals.call_args.args
+        notify_expenses_changed('u1', [end.isoformat() + 'T10:00:00Z'])
+        get_monthly_donut_data('u1', 'previous')
+        self.assertEqual(self.mock_rollups.category_totals.call_count, 2)
+
+    def test_current_month_donut_is_not_cached(self):
+        self.mock_rollups.category_totals.return_value = {}
+
+        get_monthly_donut_data('u1', 'current')
+        get_monthly_donut_data('u1', 'current')
+
+        self.assertEqual(self.mock_rollups.category_totals.call_count, 2)
+
+    def test_write_dated_in_another_month_keeps_the_cache(self):
+        self.mock_rollups.category_totals.return_value = {'Food': {'total': 30, 'count': 3}}
+        get_monthly_donut_data('u1', 'previous')
+        _, start, _ = self.mock_rollups.category_totals.call_args.args
+
+        notify_expenses_changed('u1', [(start - timedelta(days=1)).isoformat()])
+        get_monthly_donut_data('u1', 'previous')
+        self.assertEqual(self.mock_rollups.category_totals.call_count, 1)
+
+        notify_expenses_changed('u1', ['not a date'])
+        get_monthly_donut_data('u1', 'previous')
+        self.assertEqual(self.mock_rollups.category_totals.call_count, 2)
+
+class TestRangeTotal(unittest.TestCase):
+
+    def setUp(self):
+        self.index_patcher = patch('app.services.expense_service.range_index')
+        self.mock_index = self.index_patcher.start()
+
+    def tearDown(self):
+        self.index_patcher.stop()
+
+    def test_total_with_category_breakdown(self):
+        self.mock_index.totals.return_value = {
+            'Food': {'total': 20.104, 'count': 3},
+            'Rent': {'total': 900.0, 'count': 1},
+        }
+
+        result, status = get_range_total('u1', '2026-02-01T00:00:00', '2026-02-28T23:59:59')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(result['total'], 920.1)
+        self.assertEqual(result['count'], 4)
+        self.assertEqual([c['category'] for c in result['categories']], ['Rent', 'Food'])
+        self.mock_index.totals.assert_called_once_with('u1', datetime(2026, 2, 1).date(), datetime(2026, 2, 28).date())
+
+    def test_bad_ranges(self):
+        self.assertEqual(get_range_total('u1', 'soon', '2026-02-28')[1], 400)
+        self.assertEqual(get_range_total('u1', '2026-03-01', '2026-02-28')[1], 400)
+        self.mock_index.totals.assert_not_called()
+
+    def test_writes_mark_their_days(self):
+        notify_expenses_changed('u1', ['2026-02-03T10:00:00Z'])
+
+        self.mock_index.invalidate.assert_called_once_with('u1', [datetime(2026, 2, 3).date()])
+
+    @patch('app.services.expense_service.supabase')
+    def test_group_writes_mark_every_members_days(self, mock_supabase):
+        members = mock_supabase.table.return_value.select.return_value.eq.return_value.execute
+        members.return_value = MockSupabaseResponse(data=[{'user_id': 'u1'}, {'user_id': 'u2'}, {'user_id': 'u3'}])
+
+        result, status = notify_expenses_changed('u1', ['2026-02-03T10:00:00Z'], 'g1')
+
+        self.assertEqual(status, 200)
+        self.assertEqual([c.args for c in self.mock_index.invalidate.call_args_list],
+                         [(member, [datetime(2026, 2, 3).date()]) for member in ('u1', 'u2', 'u3')])
+
+    @patch('app.services.expense_service.supabase')
+    def test_group_writes_need_membership(self, mock_supabase):
+        members = mock_supabase.table.return_value.select.return_value.eq.return_value.execute
+        members.return_value = MockSupabaseResponse(data=[{'user_id': 'u2'}])
+
+        result, status = notify_expenses_changed('u1', ['2026-02-03T10:00:00Z'], 'g1')
+
+        self.assertEqual(status, 403)
+        self.mock_index.invalidate.assert_not_called()
+
+
+class TestExpensesByDateRange(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.expense_service.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.cache_patcher = patch('app.services.expense_service.expense_range_cache', ExpenseRangeCache(max_users=10))
+        self.cache_patcher.start()
+        self.query = self.mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.lt.return_value
+        self.pages = self.query.order.return_value.order.return_value.range
+        self.pages.return_value.execute.return_value = MagicMock(error=None, data=[
+            {'id': 'e2', 'description': 'Taxi', 'amount': '12.5', 'category': 'Travel', 'date': '2026-03-05T18:00:00+00:00', 'group_id': 'g1'},
+            {'id': 'e1', 'description': 'Lunch', 'amount': 8, 'category': 'Food', 'date': '2026-03-05T12:00:00+00:00', 'group_id': None},
+        ])
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.cache_patcher.stop()
+
+    def test_rows_are_mapped_newest_first(self):
+        expenses, status = get_expenses_by_date_range('u1', '2026-03-01T00:00:00', '2026-03-31T23:59:59')
+
+        self.assertEqual(status, 200)
+        self.assertEqual([e['id'] for e in expenses], ['e2', 'e1'])
+        self.assertEqual(expenses[0]['type'], 'group')
+        self.assertEqual(expenses[1], {'id': 'e1', 'title': 'Lunch', 'amount': 8.0, 'category': 'Food', 'date': '2026-03-05T12:00:00+00:00', 'type': 'personal'})
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.gte.assert_called_once_with('date', '2026-03-01')
+        self.query.order.return_value.order.return_value.range.assert_called_once_with(0, 999)
+
+    def test_bounds_in_other_formats_hit_the_cache(self):
+        get_expenses_by_date_range('u1', '2026-03-01', '2026-03-31')
+
+        expenses, _ = get_expenses_by_date_range('u1', '2026-03-05T00:00:00', '2026-03-05T23:59:59')
+
+        self.assertEqual(len(expenses), 2)
+        self.assertEqual(self.pages.call_count, 1)
+
+    def test_bad_bounds(self):
+        self.assertEqual(get_expenses_by_date_range('u1', 'yesterday', '2026-03-31')[1], 400)
+        self.mock_supabase.table.assert_not_called()
+
+    def test_query_error(self):
+        self.pages.return_value.execute.return_value = MagicMock(error='boom', data=None)
+
+        response, status = get_expenses_by_date_range('u1', '2026-03-01', '2026-03-31')
+
+        self.assertEqual(status, 500)
+        self.assertEqual(response, {'error': 'boom'})
+
+
+class TestExpensesByDateRangeFilters(unittest.TestCase):
+    """Filters are checked on the real PostgREST query string; only execute() is replaced."""
+
+    def setUp(self):
+        from postgrest import SyncPostgrestClient
+        client = SyncPostgrestClient('http://postgrest.test')
+        self.supabase_patcher = patch('app.services.expense_service.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.mock_supabase.table.side_effect = client.table
+        self.cache_patcher = patch('app.services.expense_service.expense_range_cache')
+        self.mock_cache = self.cache_patcher.start()
+        self.queries = []
+        self.data = [{'id': 'e1', 'amount': '40', 'group_id': 'g1'}]
+        def execute(builder):
+            self.queries.append(list(builder.request.params.multi_items()))
+            return MagicMock(error=None, data=self.data)
+        self.execute_patcher = patch('postgrest._sync.request_builder.SyncSelectRequestBuilder.execute', autospec=True, side_effect=execute)
+        self.execute_patcher.start()
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.cache_patcher.stop()
+        self.execute_patcher.stop()
+
+    def param(self, key, query=0):
+        return [value for k, value in self.queries[query] if k == key]
+
+    def test_filters_are_pushed_into_the_query(self):
+        expenses, status = get_expenses_by_date_range('u1', '2026-03-01', '2026-03-31', {
+            'category': 'Food, Travel', 'type': 'group', 'min_amount': '10', 'max_amount': '99.5',
+            'sort': '-amount', 'limit': '20', 'fields': 'amount,id,type',
+        })
+
+        self.assertEqual(status, 200)
+        self.assertEqual(expenses, [{'id': 'e1', 'amount': 40.0, 'type': 'group'}])
+        self.assertEqual(self.param('select'), ['id,amount,group_id'])
+        self.assertEqual(self.param('category'), ['in.(Food,Travel)'])
+        self.assertEqual(self.param('group_id'), ['not.is.null'])
+        self.assertEqual(self.param('amount'), ['gte.10.0', 'lte.99.5'])
+        self.assertEqual(self.param('order'), ['amount.desc,id.asc'])
+        self.assertEqual(self.param('limit'), ['20'])
+        self.assertEqual(len(self.queries), 1)
+        self.mock_cache.get.assert_not_called()
+
+    def test_personal_only(self):
+        get_expenses_by_date_range('u1', '2026-03-01', '2026-03-31', {'type': 'personal'})
+
+        self.assertEqual(self.param('group_id'), ['is.null'])
+        self.assertEqual(self.param('order'), ['date.desc,id.asc'])
+        self.assertEqual(self.param('select'), ['id,description,amount,category,date,group_id'])
+
+    def test_plain_listing_uses_the_cache(self):
+        self.mock_cache.get.return_value = []
+
+        self.assertEqual(get_expenses_by_date_range('u1', '2026-03-01', '2026-03-31', {}), ([], 200))
+        self.assertEqual(self.queries, [])
+
+    def test_invalid_options(self):
+        for params in (
+            {'type': 'shared'},
+            {'min_amount': 'ten'},
+            {'min_amount': '50', 'max_amount': '10'},
+            {'limit': '0'},
+            {'limit': '100000'},
+            {'sort': 'payer'},
+            {'fields': 'id,receipt_url'},
+        ):
+            self.assertEqual(get_expenses_by_date_range('u1', '2026-03-01', '2026-03-31', params)[1], 400, params)
+        self.assertEqual(self.queries, [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -17,10 +17,16 @@ from app.services.group_service import (
     get_group_detail,
     delete_group,
     add_group_member,
+    add_group_members_bulk,
+    create_invite_link,
+    join_group_with_link,
+    revoke_invite_link,
     get_group_balances,
     settle_group_balance
 )
 from app.services.expense_service import get_group_expenses
+from app.services.user_directory import email_resolver
+from app.services.invite_links import InviteLinkError
 
 class MockSupabaseResponse:
     def __init__(self, data=None, error=None, count=0):
@@ -706,6 +712,57 @@ class TestGroupServiceComprehensiveMerged(unittest.TestCase):
         # Should succeed
         self.assertNotEqual(status, 403)
 
+    @patch('app.services.group_service.publish_to_group')
+    @patch('app.services.group_service.log_group_notification')
+    def test_delete_group_notifies_former_members_in_one_call(self, mock_group_notify, mock_publish):
+        table_mock = self.mock_supabase.table
+        (table_mock.return_value.select.return_value
+         .eq.return_value.maybe_single.return_value.execute.return_value) = MockSupabaseResponse(
+            data={'id': 'g1', 'created_by': 'user_1', 'name': 'Trip'}
+        )
+        (table_mock.return_value.select.return_value
+         .eq.return_value.execute.return_value) = MockSupabaseResponse(data=[])
+        delete_mock = MagicMock()
+        # Every delete returns its rows; only the group_members ones carry user_id.
+        delete_mock.eq.return_value.execute.return_value = MockSupabaseResponse(
+            data=[{'group_id': 'g1', 'user_id': 'user_1'}, {'group_id': 'g1', 'user_id': 'user_2'}, {'id': 'g1'}]
+        )
+        table_mock.return_value.delete.return_value = delete_mock
+
+        result, status = delete_group('g1', 'user_1')
+
+        self.assertEqual(status, 200)
+        mock_group_notify.assert_called_once_with('g1', 'user_1', '"Trip" was deleted', member_ids=['user_1', 'user_2'])
+
+    @patch('app.services.group_service.publish_to_group')
+    @patch('app.services.group_service.notify_expenses_changed')
+    def test_delete_group_clears_payers_expense_caches(self, mock_notify, mock_publish):
+        table_mock = self.mock_supabase.table
+        (table_mock.return_value.select.return_value
+         .eq.return_value.maybe_single.return_value.execute.return_value) = MockSupabaseResponse(
+            data={'id': 'g1', 'created_by': 'user_1'}
+        )
+        (table_mock.return_value.select.return_value
+         .eq.return_value.execute.return_value) = MockSupabaseResponse(data=[
+            {'id': 'exp_1', 'payer_id': 'user_1', 'date': '2026-02-03T10:00:00Z'},
+            {'id': 'exp_2', 'payer_id': 'user_2', 'date': '2026-02-04T10:00:00Z'},
+            {'id': 'exp_3', 'payer_id': 'user_1', 'date': '2026-03-01T10:00:00Z'},
+            {'id': 'exp_4', 'payer_id': 'user_3', 'date': None},
+        ])
+        delete_mock = MagicMock()
+        delete_mock.eq.return_value.execute.return_value = MockSupabaseResponse(data=[{'id': 'g1'}])
+        delete_mock.in_.return_value.execute.return_value = MockSupabaseResponse(data=[])
+        table_mock.return_value.delete.return_value = delete_mock
+
+        result, status = delete_group('group_1', 'user_1')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(sorted(c.args for c in mock_notify.call_args_list), [
+            ('user_1', ['2026-02-03T10:00:00Z', '2026-03-01T10:00:00Z']),
+            ('user_2', ['2026-02-04T10:00:00Z']),
+            ('user_3', None),
+        ])
+
     # ==========================================
     # Tests for get_group_balances (from additional)
     # ==========================================
@@ -3384,9 +3441,14 @@ class TestAddGroupMemberComprehensiveMerged(unittest.TestCase):
     def setUp(self):
         self.supabase_patcher = patch('app.services.group_service.supabase')
         self.mock_supabase = self.supabase_patcher.start()
+        # The email lookup goes through the resolver; give it the same client and an empty cache.
+        self.directory_patcher = patch('app.services.user_directory.supabase', self.mock_supabase)
+        self.directory_patcher.start()
+        email_resolver.clear()
 
     def tearDown(self):
         self.supabase_patcher.stop()
+        self.directory_patcher.stop()
 
     # ==========================================
     # User Validation Tests (from both files)
@@ -4052,8 +4114,8 @@ class TestAddGroupMemberComprehensiveMerged(unittest.TestCase):
         self.assertEqual(status, 500)
         self.assertIn('Failed to create invitation', result['error'])
 
-    def test_notification_creation_fails(self):
-        """Test when notification creation fails."""
+    def test_notification_failure_does_not_roll_back_invitation(self):
+        """A failed notification must not undo the invitation it belongs to."""
         group_members_table = MagicMock()
         users_table = MagicMock()
         group_invitations_table = MagicMock()
@@ -4097,26 +4159,19 @@ class TestAddGroupMemberComprehensiveMerged(unittest.TestCase):
         invitation_result.data = [{'id': 'inv_1'}]
         group_invitations_table.insert.return_value.execute.return_value = invitation_result
 
-        # Mock the notification creation (fails - no data)
-        notification_result = MagicMock()
-        notification_result.data = None
-        notifications_table.insert.return_value.execute.return_value = notification_result
-
-        # Mock the delete for rollback
-        group_invitations_table.delete.return_value.eq.return_value.execute.return_value = MagicMock()
-
         # Create test user
         test_user = MagicMock()
         test_user.id = 'user_1'
         test_user.user_metadata = {'full_name': 'A'}
         test_user.email = 'a@b.com'
 
-        # Call the function
-        result, status = add_group_member('grp_1', test_user, {'email': 'other@example.com'})
-        
-        # Verify the results
-        self.assertEqual(status, 500)
-        self.assertIn('Failed to send notification', result['error'])
+        # Notification enqueue fails
+        with patch('app.services.group_service.create_raw_notification', return_value=False):
+            result, status = add_group_member('grp_1', test_user, {'email': 'other@example.com'})
+
+        self.assertEqual(status, 201)
+        group_invitations_table.delete.assert_not_called()
+        notifications_table.insert.assert_not_called()
 
     def test_successful_invitation(self):
         """Test successful invitation creation."""
@@ -4244,17 +4299,259 @@ class TestAddGroupMemberComprehensiveMerged(unittest.TestCase):
         user.user_metadata = {'full_name': 'Test User'}
         user.email = 'test@example.com'
 
-        result, status = add_group_member('grp_1', user, {'email': 'other@example.com'})
+        with patch('app.services.group_service.create_raw_notification') as mock_notify:
+            result, status = add_group_member('grp_1', user, {'email': 'other@example.com'})
 
         self.assertEqual(status, 201)
-        # Verify notification was created with group name
-        call_args = notifications_table.insert.call_args
-        self.assertIsNotNone(call_args)
+        # Verify notification was queued with group name
+        payload = mock_notify.call_args[0][0]
+        self.assertEqual(payload['data']['group_name'], 'Vacation Trip')
+        self.assertEqual(payload['data']['invitation_id'], 'inv_1')
 
 if __name__ == '__main__':
     unittest.main()
 # settle_group_balance tests start here
 
+class TestAddGroupMembersBulk(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.group_service.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.resolver_patcher = patch('app.services.group_service.email_resolver')
+        self.mock_resolver = self.resolver_patcher.start()
+        self.notify_patcher = patch('app.services.group_service.create_raw_notifications_bulk')
+        self.mock_notify = self.notify_patcher.start()
+
+        self.group_members = MagicMock()
+        self.invitations = MagicMock()
+        tables = {'group_members': self.group_members, 'group_invitations': self.invitations}
+        self.mock_supabase.table.side_effect = lambda name: tables[name]
+
+        self.group_members.select.return_value.eq.return_value.eq.return_value.maybe_single.return_value.execute.return_value = \
+            MagicMock(data={'groups': {'id': 'grp_1', 'name': 'Trip'}})
+        self.group_members.select.return_value.eq.return_value.in_.return_value.execute.return_value = \
+            MagicMock(data=[{'user_id': 'user_3'}])
+        self.invitations.select.return_value.eq.return_value.eq.return_value.in_.return_value.execute.return_value = \
+            MagicMock(data=[{'invited_user_id': 'user_4'}])
+        self.invitations.insert.return_value.execute.return_value = MagicMock(data=[
+            {'id': 'inv_2', 'invited_user_id': 'user_2'},
+            {'id': 'inv_5', 'invited_user_id': 'user_5'},
+        ])
+        self.mock_resolver.resolve_many.return_value = ({
+            'two@example.com': 'user_2',
+            'three@example.com': 'user_3',
+            'four@example.com': 'user_4',
+            'five@example.com': 'user_5',
+            'me@example.com': 'user_1',
+            'nobody@example.com': None,
+        }, {'broken@example.com': 'Error looking up user information'})
+
+        self.user = MagicMock(id='user_1', user_metadata={'full_name': 'Alice'}, email='me@example.com')
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.resolver_patcher.stop()
+        self.notify_patcher.stop()
+
+    def test_per_email_results_with_batched_queries(self):
+        emails = ['Two@example.com', 'three@example.com', 'four@example.com', 'five@example.com',
+                  'me@example.com', 'nobody@example.com', 'broken@example.com', 'not-an-email', 'two@example.com']
+
+        result, status = add_group_members_bulk('grp_1', self.user, {'emails': emails})
+
+        self.assertEqual(status, 201)
+        statuses = {r['email']: r['status'] for r in result['results']}
+        self.assertEqual(statuses, {
+            'two@example.com': 'invited',
+            'three@example.com': 'already_member',
+            'four@example.com': 'already_invited',
+            'five@example.com': 'invited',
+            'me@example.com': 'self',
+            'nobody@example.com': 'not_found',
+            'broken@example.com': 'error',
+            'not-an-email': 'invalid',
+        })
+        self.assertEqual(result['invited'], 2)
+
+        self.mock_resolver.resolve_many.assert_called_once()
+        self.invitations.insert.assert_called_once()
+        inserted = self.invitations.insert.call_args.args[0]
+        self.assertEqual([row['invited_user_id'] for row in inserted], ['user_2', 'user_5'])
+
+        payloads = self.mock_notify.call_args.args[0]
+        self.assertEqual([(p['user_id'], p['data']['invitation_id']) for p in payloads], [('user_2', 'inv_2'), ('user_5', 'inv_5')])
+        self.assertIn('"Trip"', payloads[0]['message'])
+
+    def test_failed_batch_insert_falls_back_to_one_row_at_a_time(self):
+        def insert(rows):
+            query = MagicMock()
+            if len(rows) > 1:
+                query.execute.side_effect = Exception('duplicate key value violates unique constraint')
+            elif rows[0]['invited_user_id'] == 'user_2':
+                query.execute.side_effect = Exception('duplicate key value violates unique constraint "group_invitations_pending_key"')
+            else:
+                query.execute.return_value = MagicMock(data=[{'id': 'inv_5', 'invited_user_id': 'user_5'}])
+            return query
+        self.invitations.insert.side_effect = insert
+
+        result, status = add_group_members_bulk('grp_1', self.user, {'emails': ['two@example.com', 'five@example.com']})
+
+        self.assertEqual(status, 201)
+        statuses = {r['email']: r['status'] for r in result['results']}
+        self.assertEqual(statuses, {'two@example.com': 'already_invited', 'five@example.com': 'invited'})
+        self.assertEqual(self.invitations.insert.call_count, 3)
+        payloads = self.mock_notify.call_args.args[0]
+        self.assertEqual([p['user_id'] for p in payloads], ['user_5'])
+
+    def test_name_hints_are_passed_to_the_resolver(self):
+        add_group_members_bulk('grp_1', self.user, {'members': [{'email': 'five@example.com', 'name': ' Eve '}]})
+
+        self.assertEqual(self.mock_resolver.resolve_many.call_args.args[1], {'five@example.com': 'Eve'})
+
+    def test_nothing_to_invite_writes_nothing(self):
+        result, status = add_group_members_bulk('grp_1', self.user, {'emails': ['three@example.com', 'nobody@example.com']})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(result['invited'], 0)
+        self.invitations.insert.assert_not_called()
+        self.mock_notify.assert_not_called()
+
+    def test_validation(self):
+        self.assertEqual(add_group_members_bulk('grp_1', None, {'emails': ['a@b.c']})[1], 401)
+        self.assertEqual(add_group_members_bulk('grp_1', self.user, {'emails': []})[1], 400)
+        self.assertEqual(add_group_members_bulk('grp_1', self.user, None)[1], 400)
+        with patch('app.services.group_service.Config') as mock_config:
+            mock_config.GROUP_BULK_INVITE_MAX = 2
+            self.assertEqual(add_group_members_bulk('grp_1', self.user, {'emails': ['a@b.c', 'd@e.f', 'g@h.i']})[1], 400)
+
+    def test_not_a_member_of_the_group(self):
+        self.group_members.select.return_value.eq.return_value.eq.return_value.maybe_single.return_value.execute.return_value = \
+            MagicMock(data=None)
+
+        self.assertEqual(add_group_members_bulk('grp_1', self.user, {'emails': ['two@example.com']})[1], 404)
+        self.mock_resolver.resolve_many.assert_not_called()
+
+
+class TestGroupInviteLinks(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.group_service.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.config_patcher = patch('app.services.invite_links.Config')
+        self.config_patcher.start().INVITE_LINK_SECRET = 'test-secret'
+        self.uses_patcher = patch('app.services.group_service.invite_link_uses')
+        self.mock_uses = self.uses_patcher.start()
+        self.group_config_patcher = patch('app.services.group_service.Config')
+        self.group_config = self.group_config_patcher.start()
+        self.group_config.INVITE_LINK_DEFAULT_HOURS = 168
+        self.group_config.INVITE_LINK_MAX_HOURS = 720
+        self.group_config.INVITE_LINK_DEFAULT_USES = 50
+        self.group_config.INVITE_LINK_MAX_USES = 1000
+        self.group_config.INVITE_LINK_BASE_URL = 'http://localhost:3000'
+        self.group_config.GROUP_MEMBERS_UNIQUE_INDEX = True
+        self.publish_patcher = patch('app.services.group_service.publish_to_group')
+        self.mock_publish = self.publish_patcher.start()
+        self.members = self.mock_supabase.table.return_value
+        self.members.select.return_value.eq.return_value.eq.return_value.maybe_single.return_value.execute.return_value = \
+            MagicMock(data={'groups': {'id': 'grp_1', 'name': 'Book club'}})
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.config_patcher.stop()
+        self.uses_patcher.stop()
+        self.group_config_patcher.stop()
+        self.publish_patcher.stop()
+
+    def _link(self, **data):
+        result, status = create_invite_link('grp_1', 'user_1', data)
+        self.assertEqual(status, 201)
+        return result
+
+    def test_create_link(self):
+        result = self._link(max_uses=3, expires_in_hours=2)
+
+        self.assertEqual(result['max_uses'], 3)
+        self.assertEqual(result['group'], {'id': 'grp_1', 'name': 'Book club'})
+        self.assertTrue(result['url'].endswith('/join/' + result['token']))
+        claims = self.mock_uses.register.call_args.args[0]
+        self.assertEqual((claims['g'], claims['max']), ('grp_1', 3))
+
+    def test_create_link_requires_membership(self):
+        self.members.select.return_value.eq.return_value.eq.return_value.maybe_single.return_value.execute.return_value = \
+            MagicMock(data=None)
+
+        self.assertEqual(create_invite_link('grp_1', 'user_9', {})[1], 404)
+
+    def test_create_link_validates_limits(self):
+        self.assertEqual(create_invite_link('grp_1', 'user_1', {'max_uses': 0})[1], 400)
+        self.assertEqual(create_invite_link('grp_1', 'user_1', {'max_uses': 10 ** 6})[1], 400)
+        self.assertEqual(create_invite_link('grp_1', 'user_1', {'expires_in_hours': 'soon'})[1], 400)
+        self.assertEqual(create_invite_link('grp_1', 'user_1', {'expires_in_hours': -5})[1], 400)
+
+    def test_join_is_a_single_insert(self):
+        token = self._link()['token']
+        self.mock_supabase.reset_mock()
+
+        result, status = join_group_with_link(token, 'user_2')
+
+        self.assertEqual(status, 201)
+        self.assertEqual(result['group'], {'id': 'grp_1', 'name': 'Book club'})
+        self.assertEqual(self.mock_supabase.table.call_count, 1)
+        self.members.insert.assert_called_once_with({'group_id': 'grp_1', 'user_id': 'user_2'})
+        self.members.select.assert_not_called()
+        self.mock_publish.assert_called_once()
+
+    def test_existing_member_does_not_use_up_the_link(self):
+        token = self._link(max_uses=1)['token']
+        self.members.insert.return_value.execute.side_effect = Exception('duplicate key value violates unique constraint')
+
+        self.assertEqual(join_group_with_link(token, 'user_1')[1], 200)
+        self.mock_uses.release.assert_called_once()
+
+        self.members.insert.return_value.execute.side_effect = None
+        self.assertEqual(join_group_with_link(token, 'user_2')[1], 201)
+        self.mock_uses.claim.side_effect = InviteLinkError('This invite link has reached its member limit', status=410)
+        self.assertEqual(join_group_with_link(token, 'user_3')[1], 410)
+
+    def test_membership_is_checked_until_the_unique_index_is_confirmed(self):
+        self.group_config.GROUP_MEMBERS_UNIQUE_INDEX = False
+        token = self._link()['token']
+        self.members.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[{'user_id': 'user_1'}])
+
+        result, status = join_group_with_link(token, 'user_1')
+
+        self.assertEqual(status, 200)
+        self.members.insert.assert_not_called()
+        self.mock_uses.claim.assert_not_called()
+
+        self.members.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+        self.assertEqual(join_group_with_link(token, 'user_2')[1], 201)
+        self.members.insert.assert_called_once_with({'group_id': 'grp_1', 'user_id': 'user_2'})
+
+    def test_revoked_link(self):
+        token = self._link()['token']
+        self.mock_uses.claim.side_effect = InviteLinkError('This invite link has been revoked', status=410)
+
+        self.assertEqual(join_group_with_link(token, 'user_2')[1], 410)
+        self.members.insert.assert_not_called()
+
+    def test_revoke_link(self):
+        token = self._link()['token']
+        self.mock_uses.revoke.return_value = True
+
+        self.assertEqual(revoke_invite_link('grp_1', 'user_1', token)[1], 200)
+        self.assertEqual(self.mock_uses.revoke.call_args.args[0]['g'], 'grp_1')
+        self.assertEqual(revoke_invite_link('grp_2', 'user_1', token)[1], 404)
+
+        self.members.select.return_value.eq.return_value.eq.return_value.maybe_single.return_value.execute.return_value = \
+            MagicMock(data=None)
+        self.assertEqual(revoke_invite_link('grp_1', 'user_9', token)[1], 404)
+
+    def test_invalid_token(self):
+        self.assertEqual(join_group_with_link('not-a-token', 'user_2')[1], 400)
+        self.members.insert.assert_not_called()
+
+
 class TestSettleGroupBalanceComprehensiveMerged(unittest.TestCase):
 
     def setUp(self):
@@ -4265,9 +4562,13 @@ class TestSettleGroupBalanceComprehensiveMerged(unittest.TestCase):
         self.log_patcher = patch('app.services.group_service.log_notification')
         self.log_patcher.start()
 
+        self.clear_patcher = patch('app.services.group_service.clear_group_notifications')
+        self.mock_clear = self.clear_patcher.start()
+
     def tearDown(self):
         self.supabase_patcher.stop()
         self.log_patcher.stop()
+        self.clear_patcher.stop()
 
     # ==========================================
     # Input Validation Tests (from both files)
@@ -4790,7 +5091,9 @@ class TestSettleGroupBalanceComprehensiveMerged(unittest.TestCase):
         
         self.assertEqual(status, 201)
 
-        notif_delete.delete.assert_called_once()
+        # The cleanup is queued on the notification outbox rather than run inline.
+        notif_delete.delete.assert_not_called()
+        self.mock_clear.assert_called_once_with('user_1', 'grp_1', ['expense_owed', 'reminder', 'settlement_request'])
 
     def test_settle_group_balance_same_from_and_to(self):
         """Test settling between same user."""
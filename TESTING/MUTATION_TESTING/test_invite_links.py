@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import time
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.invite_links import (
+    sign_invite, verify_invite, InviteLinkUses, InviteLinkError, _b64decode, _b64encode
+)
+
+
+class TestInviteLinks(unittest.TestCase):
+
+    def setUp(self):
+        self.config_patcher = patch('app.services.invite_links.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.INVITE_LINK_SECRET = 'test-secret'
+
+    def tearDown(self):
+        self.config_patcher.stop()
+
+    def test_round_trip(self):
+        expires_at = time.time() + 3600
+        token = sign_invite('grp_1', expires_at, 25, created_by='user_1', group_name='Book club')
+
+        claims = verify_invite(token)
+
+        self.assertEqual((claims['g'], claims['max'], claims['name'], claims['by']), ('grp_1', 25, 'Book club', 'user_1'))
+        self.assertEqual(claims['exp'], int(expires_at))
+        self.assertNotIn('=', token)
+
+    def test_links_with_same_claims_are_distinct(self):
+        expires_at = time.time() + 3600
+        self.assertNotEqual(sign_invite('grp_1', expires_at, 5), sign_invite('grp_1', expires_at, 5))
+
+    def test_tampered_claims_are_rejected(self):
+        token = sign_invite('grp_1', time.time() + 3600, 5)
+        body, signature = token.split('.')
+        forged = _b64encode(_b64decode(body).replace(b'"max":5', b'"max":500'))
+
+        with self.assertRaises(InviteLinkError) as ctx:
+            verify_invite(f"{forged}.{signature}")
+        self.assertEqual(ctx.exception.status, 400)
+
+    def test_other_secret_is_rejected(self):
+        token = sign_invite('grp_1', time.time() + 3600, 5)
+        self.mock_config.INVITE_LINK_SECRET = 'rotated'
+
+        with self.assertRaises(InviteLinkError):
+            verify_invite(token)
+
+    def test_garbage_is_rejected(self):
+        for token in ['', 'abc', 'abc.def', None, '!!!.???']:
+            with self.assertRaises(InviteLinkError):
+                verify_invite(token)
+
+    def test_expired(self):
+        token = sign_invite('grp_1', time.time() - 1, 5)
+
+        with self.assertRaises(InviteLinkError) as ctx:
+            verify_invite(token)
+        self.assertEqual(ctx.exception.status, 410)
+
+    def test_missing_secret(self):
+        self.mock_config.INVITE_LINK_SECRET = None
+
+        with self.assertRaises(InviteLinkError) as ctx:
+            sign_invite('grp_1', time.time() + 60, 5)
+        self.assertEqual(ctx.exception.status, 503)
+
+
+class TestInviteLinkUses(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.invite_links.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.uses = InviteLinkUses()
+        self.claims = {'n': 'abc', 'g': 'grp_1', 'max': 2, 'exp': 1767225600}
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+
+    def test_register_records_the_link(self):
+        self.uses.register(self.claims, created_by='user_1')
+
+        self.mock_supabase.table.assert_called_with('invite_links')
+        row = self.mock_supabase.table.return_value.insert.call_args.args[0]
+        self.assertEqual((row['nonce'], row['group_id'], row['max_uses'], row['created_by']), ('abc', 'grp_1', 2, 'user_1'))
+        self.assertEqual(row['expires_at'], '2026-01-01T00:00:00+00:00')
+
+    def test_claim_takes_a_use_in_the_database(self):
+        self.mock_supabase.rpc.return_value.execute.return_value = MagicMock(data='ok')
+
+        self.uses.claim(self.claims)
+
+        self.mock_supabase.rpc.assert_called_once_with('claim_invite_link', {'p_nonce': 'abc'})
+
+    def test_refused_claims(self):
+        for outcome, status in [('exhausted', 410), ('revoked', 410), ('expired', 410), ('not_found', 400), (None, 400)]:
+            self.mock_supabase.rpc.return_value.execute.return_value = MagicMock(data=outcome)
+            with self.assertRaises(InviteLinkError) as ctx:
+                self.uses.claim(self.claims)
+            self.assertEqual(ctx.exception.status, status, outcome)
+
+    def test_release_and_revoke(self):
+        self.uses.release(self.claims)
+        self.mock_supabase.rpc.assert_called_once_with('release_invite_link', {'p_nonce': 'abc'})
+
+        update = self.mock_supabase.table.return_value.update
+        update.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[{'nonce': 'abc'}])
+        self.assertTrue(self.uses.revoke(self.claims))
+        self.assertIn('revoked_at', update.call_args.args[0])
+        update.return_value.eq.assert_called_with('nonce', 'abc')
+        update.return_value.eq.return_value.eq.assert_called_with('group_id', 'grp_1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from app.services.merchant_canonicalizer import MerchantIndex, merchant_index
+
+
+class TestMerchantCanonicalizer(unittest.TestCase):
+
+    def test_exact_aliases(self):
+        self.assertEqual(merchant_index.canonicalize('Starbucks #1234'), 'starbucks')
+        self.assertEqual(merchant_index.canonicalize('STARBUCKS COFFEE'), 'starbucks')
+        self.assertEqual(merchant_index.canonicalize('amzn mktp'), 'amazon')
+        self.assertEqual(merchant_index.canonicalize('Groceries at D-Mart'), 'dmart')
+
+    def test_longest_phrase_wins(self):
+        self.assertEqual(merchant_index.canonicalize('uber eats order'), 'uber eats')
+        self.assertEqual(merchant_index.canonicalize('Uber to airport'), 'uber')
+
+    def test_misspellings(self):
+        self.assertEqual(merchant_index.canonicalize('starbuks'), 'starbucks')
+        self.assertEqual(merchant_index.canonicalize('netflx subscription'), 'netflix')
+        self.assertEqual(merchant_index.canonicalize('swigy'), 'swiggy')
+        self.assertEqual(merchant_index.canonicalize('big bazar'), 'big bazaar')
+
+    def test_ordinary_words_are_not_merchants(self):
+        self.assertIsNone(merchant_index.canonicalize('dinner with friends'))
+        self.assertIsNone(merchant_index.canonicalize('costs of travel'))
+        self.assertIsNone(merchant_index.canonicalize('apples and bananas'))
+        self.assertIsNone(merchant_index.canonicalize(''))
+
+    def test_brands_that_are_ordinary_words(self):
+        self.assertIsNone(merchant_index.canonicalize('Coca cola 2L'))
+        self.assertIsNone(merchant_index.canonicalize('apple 1kg'))
+        self.assertIsNone(merchant_index.canonicalize('shell fish curry'))
+        self.assertIsNone(merchant_index.canonicalize('target practice'))
+        self.assertIsNone(merchant_index.canonicalize('subway ticket'))
+        self.assertEqual(merchant_index.canonicalize('Apple Music subscription'), 'apple services')
+        self.assertEqual(merchant_index.canonicalize('Ola cabs to office'), 'ola cabs')
+
+    def test_blinkit_is_not_zomato(self):
+        self.assertEqual(merchant_index.canonicalize('Blinkit groceries'), 'blinkit')
+
+    def test_custom_aliases(self):
+        index = MerchantIndex({'olive garden': ['olivegarden']})
+        index.add_alias('og restaurant', 'olive garden')
+
+        self.assertEqual(index.canonicalize('OliveGarden 22'), 'olive garden')
+        self.assertEqual(index.canonicalize('og restaurant'), 'olive garden')
+        self.assertEqual(index.canonicalize('olive gardn'), 'olive garden')
+
+
+if __name__ == '__main__':
+    unittest.main()
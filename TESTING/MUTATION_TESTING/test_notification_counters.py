@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.notification_counters import UnreadCounters
+
+
+class TestUnreadCounters(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.notification_counters.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.count_query = self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value
+        self.count_query.execute.return_value = MagicMock(count=4)
+        self.counters = UnreadCounters(max_users=100)
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+
+    def test_seeded_once_then_served_from_memory(self):
+        self.assertEqual(self.counters.get('user_1'), 4)
+        self.assertEqual(self.counters.get('user_1'), 4)
+        self.assertEqual(self.count_query.execute.call_count, 1)
+        self.mock_supabase.table.return_value.select.assert_called_with('id', count='exact', head=True)
+
+    def test_inserts_deletes_and_reads_adjust_count(self):
+        self.counters.get('user_1')
+
+        self.counters.record_inserted([{'user_id': 'user_1'}, {'user_id': 'user_1', 'read': True}, {'user_id': 'user_2'}])
+        self.assertEqual(self.counters.get('user_1'), 5)
+
+        self.counters.record_deleted([{'user_id': 'user_1', 'read': False}, {'user_id': 'user_1', 'read': True}])
+        self.assertEqual(self.counters.get('user_1'), 4)
+
+        self.counters.adjust('user_1', -10)
+        self.assertEqual(self.counters.get('user_1'), 0)
+
+    def test_unseeded_users_are_not_tracked(self):
+        self.counters.record_inserted([{'user_id': 'user_2'}])
+        self.assertNotIn('user_2', self.counters.counts)
+
+    @patch('app.services.notification_counters.Config')
+    def test_counts_are_bounded(self, mock_config):
+        mock_config.NOTIFICATION_COUNTER_MAX_USERS = 2
+        mock_config.NOTIFICATION_COUNTER_RECONCILE_SECONDS = 60
+        counters = UnreadCounters()
+        for user_id in ['user_1', 'user_2', 'user_3']:
+            counters.get(user_id)
+
+        self.assertEqual(sorted(counters.counts), ['user_2', 'user_3'])
+        self.assertEqual(counters.get('user_1'), 4)
+        self.assertEqual(self.count_query.execute.call_count, 4)
+
+    @patch('app.services.notification_counters.Config')
+    def test_stale_count_is_reconciled_in_background(self, mock_config):
+        mock_config.NOTIFICATION_COUNTER_RECONCILE_SECONDS = 60
+        self.counters.get('user_1')
+        self.counters.refreshed_at['user_1'] -= 120
+        self.count_query.execute.return_value = MagicMock(count=9)
+
+        with patch('app.services.notification_counters.threading.Thread') as mock_thread:
+            self.assertEqual(self.counters.get('user_1'), 4)
+            mock_thread.assert_called_once()
+            self.counters._reconcile(*mock_thread.call_args.kwargs['args'])
+
+        self.assertEqual(self.counters.get('user_1'), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,335 @@
+import unittest
+from unittest.mock import MagicMock, patch, call
+import sys
+import time
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.notification_outbox import NotificationOutbox
+
+
+class TestNotificationOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.notification_outbox.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.sleep_patcher = patch('app.services.notification_outbox.time.sleep')
+        self.sleep_patcher.start()
+        self.outbox = NotificationOutbox()
+        # Tests drive flush() themselves.
+        self.outbox._ensure_dispatcher = MagicMock()
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.sleep_patcher.stop()
+
+    def test_inserts_are_batched(self):
+        for i in range(3):
+            self.outbox.enqueue_insert({'user_id': f'user_{i}', 'message': 'hi'})
+        self.mock_supabase.table.assert_not_called()
+
+        self.outbox.flush()
+
+        self.mock_supabase.table.return_value.insert.assert_called_once_with([
+            {'user_id': 'user_0', 'message': 'hi'},
+            {'user_id': 'user_1', 'message': 'hi'},
+            {'user_id': 'user_2', 'message': 'hi'},
+        ])
+        self.assertEqual(len(self.outbox.pending), 0)
+
+    @patch('app.services.notification_outbox.Config')
+    def test_batches_respect_batch_size(self, mock_config):
+        mock_config.NOTIFICATION_OUTBOX_BATCH_SIZE = 2
+        mock_config.NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 1
+        mock_config.NOTIFICATION_OUTBOX_RETRY_DELAY = 0
+        for i in range(5):
+            self.outbox.enqueue_insert({'user_id': f'user_{i}'})
+
+        self.outbox.flush()
+
+        sizes = [len(c.args[0]) for c in self.mock_supabase.table.return_value.insert.call_args_list]
+        self.assertEqual(sizes, [2, 2, 1])
+
+    def test_deletes_differing_by_user_are_merged(self):
+        for user_id in ['user_1', 'user_2', 'user_1']:
+            self.outbox.enqueue_delete(eq={'user_id': user_id, 'data->>group_id': 'grp_1'}, in_={'type': ['reminder']})
+        self.outbox.enqueue_delete(eq={'user_id': 'user_3', 'data->>group_id': 'grp_2'}, in_={'type': ['reminder']})
+
+        self.outbox.flush()
+
+        delete = self.mock_supabase.table.return_value.delete
+        self.assertEqual(delete.call_count, 2)
+        first = delete.return_value.eq.return_value.in_.return_value
+        first.in_.assert_any_call('user_id', ['user_1', 'user_2'])
+        first.eq.assert_any_call('user_id', 'user_3')
+
+    def test_order_between_inserts_and_deletes_is_kept(self):
+        table = self.mock_supabase.table.return_value
+        self.outbox.enqueue_insert({'user_id': 'user_1'})
+        self.outbox.enqueue_delete(eq={'user_id': 'user_1', 'type': 'reminder'})
+        self.outbox.enqueue_insert({'user_id': 'user_2'})
+
+        self.outbox.flush()
+
+        kinds = [name for name, args, kwargs in table.mock_calls if name in ('insert', 'delete')]
+        self.assertEqual(kinds, ['insert', 'delete', 'insert'])
+
+    def test_failed_insert_is_retried(self):
+        execute = self.mock_supabase.table.return_value.insert.return_value.execute
+        execute.side_effect = [Exception('timeout'), Exception('timeout'), MagicMock()]
+        self.outbox.enqueue_insert({'user_id': 'user_1'})
+
+        self.outbox.flush()
+
+        self.assertEqual(execute.call_count, 3)
+
+    def test_poison_row_does_not_drop_the_batch(self):
+        insert = self.mock_supabase.table.return_value.insert
+
+        def insert_side_effect(rows):
+            query = MagicMock()
+            if any(row.get('bad') for row in rows):
+                query.execute.side_effect = Exception('violates constraint')
+            return query
+
+        insert.side_effect = insert_side_effect
+        self.outbox.enqueue_insert({'user_id': 'user_1'})
+        self.outbox.enqueue_insert({'user_id': 'user_2', 'bad': True})
+        self.outbox.enqueue_insert({'user_id': 'user_3'})
+
+        self.outbox.flush()
+
+        self.assertIn(call([{'user_id': 'user_1'}]), insert.call_args_list)
+        self.assertIn(call([{'user_id': 'user_3'}]), insert.call_args_list)
+
+    @patch('app.services.notification_outbox.Config')
+    def test_enqueue_inserts_keeps_entries_adjacent(self, mock_config):
+        mock_config.NOTIFICATION_OUTBOX_BATCH_SIZE = 100
+        mock_config.NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 1
+        mock_config.NOTIFICATION_DIGEST_SECONDS = 0
+        self.outbox.enqueue_delete(eq={'user_id': 'user_0'})
+        self.outbox.enqueue_inserts([({'user_id': f'user_{i}'}, None) for i in range(3)])
+
+        self.outbox.flush()
+
+        self.mock_supabase.table.return_value.insert.assert_called_once_with(
+            [{'user_id': 'user_0'}, {'user_id': 'user_1'}, {'user_id': 'user_2'}])
+
+    @patch('app.services.notification_outbox.Config')
+    def test_insert_now_chunks_and_reports_rows(self, mock_config):
+        mock_config.NOTIFICATION_OUTBOX_BATCH_SIZE = 2
+        mock_config.NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 1
+        mock_config.NOTIFICATION_OUTBOX_RETRY_DELAY = 0
+        insert = self.mock_supabase.table.return_value.insert
+
+        def insert_side_effect(rows):
+            query = MagicMock()
+            if any(row.get('bad') for row in rows):
+                query.execute.side_effect = Exception('violates constraint')
+            else:
+                query.execute.return_value = MagicMock(data=[dict(row, id=f"n_{row['user_id']}") for row in rows])
+            return query
+
+        insert.side_effect = insert_side_effect
+        payloads = [{'user_id': 'user_1'}, {'user_id': 'user_2'}, {'user_id': 'user_3', 'bad': True}]
+
+        rows = self.outbox.insert_now(payloads)
+
+        self.assertEqual([len(c.args[0]) for c in insert.call_args_list[:2]], [2, 1])
+        self.assertEqual([row and row['id'] for row in rows], ['n_user_1', 'n_user_2', None])
+
+    def test_dispatcher_thread_drains_queue(self):
+        outbox = NotificationOutbox()
+        with patch('app.services.notification_outbox.Config') as mock_config:
+            mock_config.NOTIFICATION_OUTBOX_BATCH_SIZE = 100
+            mock_config.NOTIFICATION_OUTBOX_FLUSH_INTERVAL = 0.01
+            mock_config.NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 1
+            mock_config.NOTIFICATION_OUTBOX_RETRY_DELAY = 0
+
+            outbox.enqueue_insert({'user_id': 'user_1'})
+            deadline = time.time() + 2
+            while outbox.pending and time.time() < deadline:
+                time.sleep(0.01)
+            outbox.flush()
+
+            self.assertEqual(len(outbox.pending), 0)
+            self.mock_supabase.table.return_value.insert.assert_called_with([{'user_id': 'user_1'}])
+
+
+
+def _reminder(user_id, message, group_id='grp_1'):
+    return {'user_id': user_id, 'type': 'reminder', 'message': message, 'read': False,
+            'data': {'group_id': group_id, 'count': 1}}
+
+
+class TestNotificationCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.notification_outbox.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.config_patcher = patch('app.services.notification_outbox.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.NOTIFICATION_OUTBOX_BATCH_SIZE = 100
+        self.mock_config.NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 1
+        self.mock_config.NOTIFICATION_OUTBOX_RETRY_DELAY = 0
+        self.mock_config.NOTIFICATION_COALESCE_WINDOW_SECONDS = 600
+        self.mock_config.NOTIFICATION_DIGEST_SECONDS = 0
+        self.mock_config.NOTIFICATION_OUTBOX_MAX_DELAY_SECONDS = 3600
+        self.table = self.mock_supabase.table.return_value
+        self.table.insert.return_value.execute.return_value = MagicMock(data=[{'id': 'row_1', 'user_id': 'user_1'}])
+        self.outbox = NotificationOutbox()
+        self.outbox._ensure_dispatcher = MagicMock()
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.config_patcher.stop()
+
+    def test_same_key_in_one_batch_becomes_one_row(self):
+        key = ('user_1', 'reminder', 'grp_1')
+        for i in range(4):
+            self.outbox.enqueue_insert(_reminder('user_1', f'reminder {i}'), coalesce_key=key)
+
+        self.outbox.flush()
+
+        rows = self.table.insert.call_args[0][0]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['message'], 'reminder 3')
+        self.assertEqual(rows[0]['data']['count'], 4)
+
+    def test_later_events_update_the_written_row(self):
+        key = ('user_1', 'reminder', 'grp_1')
+        self.outbox.enqueue_insert(_reminder('user_1', 'first'), coalesce_key=key)
+        self.outbox.flush()
+        self.outbox.enqueue_insert(_reminder('user_1', 'second'), coalesce_key=key)
+        self.outbox.enqueue_insert(_reminder('user_1', 'third'), coalesce_key=key)
+        self.outbox.flush()
+
+        self.assertEqual(self.table.insert.call_count, 1)
+        self.table.upsert.assert_not_called()
+        self.table.update.assert_called_once()
+        fields = self.table.update.call_args[0][0]
+        self.table.update.return_value.eq.assert_called_once_with('id', 'row_1')
+        self.assertNotIn('id', fields)
+        self.assertEqual(fields['message'], 'third')
+        self.assertEqual(fields['data']['count'], 3)
+        self.assertFalse(fields['read'])
+        self.assertIn('created_at', fields)
+
+    @patch('app.services.notification_outbox.unread_counters')
+    def test_update_of_a_read_row_counts_it_unread_again(self, mock_counters):
+        key = ('user_1', 'reminder', 'grp_1')
+        self.outbox.enqueue_insert(_reminder('user_1', 'first'), coalesce_key=key)
+        self.outbox.flush()
+        self.table.select.return_value.in_.return_value.eq.return_value.execute.return_value = MagicMock(data=[{'id': 'row_1'}])
+
+        self.outbox.enqueue_insert(_reminder('user_1', 'second'), coalesce_key=key)
+        self.outbox.flush()
+
+        self.table.select.return_value.in_.assert_called_once_with('id', ['row_1'])
+        mock_counters.adjust.assert_called_once_with('user_1', 1)
+
+    @patch('app.services.notification_outbox.unread_counters')
+    def test_unread_row_update_leaves_the_counter(self, mock_counters):
+        key = ('user_1', 'reminder', 'grp_1')
+        self.outbox.enqueue_insert(_reminder('user_1', 'first'), coalesce_key=key)
+        self.outbox.flush()
+        self.table.select.return_value.in_.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+
+        self.outbox.enqueue_insert(_reminder('user_1', 'second'), coalesce_key=key)
+        self.outbox.flush()
+
+        mock_counters.adjust.assert_not_called()
+
+    def test_deleted_row_is_not_resurrected(self):
+        key = ('user_1', 'reminder', 'grp_1')
+        self.outbox.enqueue_insert(_reminder('user_1', 'first'), coalesce_key=key)
+        self.outbox.flush()
+        self.table.update.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+        self.table.insert.return_value.execute.return_value = MagicMock(data=[{'id': 'row_2', 'user_id': 'user_1'}])
+
+        self.outbox.enqueue_insert(_reminder('user_1', 'second'), coalesce_key=key)
+        self.outbox.flush()
+
+        self.assertEqual(self.table.insert.call_count, 2)
+        inserted = self.table.insert.call_args[0][0]
+        self.assertEqual(inserted[0]['message'], 'second')
+        self.assertNotIn('id', inserted[0])
+        self.assertEqual(self.outbox.windows[key]['id'], 'row_2')
+
+    def test_other_groups_and_uncoalesced_types_are_separate(self):
+        self.table.insert.return_value.execute.return_value = MagicMock(data=None)
+        self.outbox.enqueue_insert(_reminder('user_1', 'a', 'grp_1'), coalesce_key=('user_1', 'reminder', 'grp_1'))
+        self.outbox.enqueue_insert(_reminder('user_1', 'b', 'grp_2'), coalesce_key=('user_1', 'reminder', 'grp_2'))
+        self.outbox.enqueue_insert({'user_id': 'user_1', 'type': 'settlement'})
+        self.outbox.enqueue_insert({'user_id': 'user_1', 'type': 'settlement'})
+
+        self.outbox.flush()
+
+        self.assertEqual(len(self.table.insert.call_args[0][0]), 4)
+
+    def test_window_expires(self):
+        key = ('user_1', 'reminder', 'grp_1')
+        self.outbox.enqueue_insert(_reminder('user_1', 'first'), coalesce_key=key)
+        self.outbox.flush()
+        self.outbox.windows[key]['expires'] = time.time() - 1
+
+        self.outbox.enqueue_insert(_reminder('user_1', 'second'), coalesce_key=key)
+        self.outbox.flush()
+
+        self.assertEqual(self.table.insert.call_count, 2)
+        self.table.upsert.assert_not_called()
+
+    def test_delete_for_user_closes_their_windows(self):
+        key = ('user_1', 'reminder', 'grp_1')
+        self.outbox.enqueue_insert(_reminder('user_1', 'first'), coalesce_key=key)
+        self.outbox.flush()
+        self.outbox.enqueue_delete(eq={'user_id': 'user_1', 'data->>group_id': 'grp_1'}, in_={'type': ['reminder']})
+        self.outbox.enqueue_insert(_reminder('user_1', 'after settling'), coalesce_key=key)
+        self.outbox.flush()
+
+        self.assertEqual(self.table.insert.call_count, 2)
+        self.table.upsert.assert_not_called()
+
+    def test_digest_mode_holds_until_due(self):
+        self.mock_config.NOTIFICATION_DIGEST_SECONDS = 60
+        key = ('user_1', 'reminder', 'grp_1')
+        for i in range(3):
+            self.outbox.enqueue_insert(_reminder('user_1', f'reminder {i}'), coalesce_key=key)
+
+        self.outbox._release_held()
+        self.outbox.flush()
+        self.table.insert.assert_not_called()
+
+        self.outbox.held[key]['due'] = time.time() - 1
+        self.outbox._release_held()
+        self.outbox.flush()
+
+        rows = self.table.insert.call_args[0][0]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['data']['count'], 3)
+        self.assertEqual(rows[0]['message'], 'reminder 2')
+
+    def test_digest_hold_is_capped_by_max_delay(self):
+        self.mock_config.NOTIFICATION_DIGEST_SECONDS = 3600
+        self.mock_config.NOTIFICATION_OUTBOX_MAX_DELAY_SECONDS = 60
+        key = ('user_1', 'reminder', 'grp_1')
+
+        self.outbox.enqueue_insert(_reminder('user_1', 'held'), coalesce_key=key)
+
+        self.assertLessEqual(self.outbox.held[key]['due'], time.time() + 60)
+
+    def test_flush_at_exit_releases_held_digests(self):
+        self.mock_config.NOTIFICATION_DIGEST_SECONDS = 3600
+        self.outbox.enqueue_insert(_reminder('user_1', 'pending'), coalesce_key=('user_1', 'reminder', 'grp_1'))
+
+        self.outbox.flush(release_held=True)
+
+        self.table.insert.assert_called_once()
+        self.assertEqual(self.outbox.held, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
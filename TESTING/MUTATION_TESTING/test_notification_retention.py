@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.notification_retention import prune_notifications, table_size
+
+
+class TestNotificationRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.notification_retention.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.mock_supabase.rpc.return_value.execute.return_value = MagicMock(data=[{'total_bytes': 1000}])
+        self.select = self.mock_supabase.table.return_value.select.return_value.or_.return_value.order.return_value.limit.return_value
+        self.delete = self.mock_supabase.table.return_value.delete.return_value.in_
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+
+    def test_deletes_in_bounded_batches_until_empty(self):
+        self.select.execute.side_effect = [
+            MagicMock(data=[{'id': 1}, {'id': 2}]),
+            MagicMock(data=[{'id': 3}, {'id': 4}]),
+            MagicMock(data=[{'id': 5}]),
+        ]
+
+        stats = prune_notifications(batch_size=2, max_batches=10, pause=0)
+
+        self.assertEqual(stats['deleted'], 5)
+        self.assertEqual(stats['batches'], 3)
+        self.assertEqual([c.args for c in self.delete.call_args_list], [('id', [1, 2]), ('id', [3, 4]), ('id', [5])])
+        self.mock_supabase.table.return_value.select.return_value.or_.return_value.order.return_value.limit.assert_called_with(2)
+
+    def test_stops_at_max_batches(self):
+        self.select.execute.return_value = MagicMock(data=[{'id': 1}, {'id': 2}])
+
+        stats = prune_notifications(batch_size=2, max_batches=3, pause=0)
+
+        self.assertEqual(stats['batches'], 3)
+        self.assertEqual(self.delete.call_count, 3)
+
+    def test_filter_targets_old_read_and_stale_rows(self):
+        self.select.execute.return_value = MagicMock(data=[])
+
+        stats = prune_notifications(read_days=30, stale_days=180, pause=0)
+
+        condition = self.mock_supabase.table.return_value.select.return_value.or_.call_args[0][0]
+        self.assertTrue(condition.startswith('and(read.is.true,actionable.not.is.true,created_at.lt."'))
+        self.assertIn('),and(actionable.not.is.true,created_at.lt."', condition)
+        self.assertEqual(stats['deleted'], 0)
+        self.delete.assert_not_called()
+
+    @patch('app.services.notification_retention.unread_counters')
+    def test_deleted_unread_rows_leave_the_counters(self, mock_counters):
+        self.select.execute.side_effect = [MagicMock(data=[{'id': 1}, {'id': 2}])]
+        deleted = [{'id': 1, 'user_id': 'user_1', 'read': False}, {'id': 2, 'user_id': 'user_1', 'read': True}]
+        self.delete.return_value.execute.return_value = MagicMock(data=deleted)
+
+        prune_notifications(batch_size=10, pause=0)
+
+        mock_counters.record_deleted.assert_called_once_with(deleted)
+
+    def test_reports_size_before_and_after(self):
+        self.mock_supabase.rpc.return_value.execute.side_effect = [
+            MagicMock(data=[{'total_bytes': 5000}]),
+            MagicMock(data=[{'total_bytes': 3000}]),
+        ]
+        self.select.execute.side_effect = [MagicMock(data=[{'id': 1}])]
+
+        stats = prune_notifications(batch_size=10, pause=0)
+
+        self.assertEqual(stats['size_before'], {'total_bytes': 5000})
+        self.assertEqual(stats['size_after'], {'total_bytes': 3000})
+        self.mock_supabase.rpc.assert_called_with('notifications_table_stats')
+
+    def test_table_size_falls_back_to_count(self):
+        self.mock_supabase.rpc.return_value.execute.side_effect = Exception('function does not exist')
+        self.mock_supabase.table.return_value.select.return_value.execute.return_value = MagicMock(count=42)
+
+        self.assertEqual(table_size(), {'rows': 42})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,13 +9,20 @@ fake_extensions = types.ModuleType("app.extensions")
 fake_extensions.supabase = MagicMock()
 sys.modules["app.extensions"] = fake_extensions
 
+from app.services.notification_outbox import notification_outbox
 from app.services.notification_service import (
     log_notification,
+    log_notifications_bulk,
+    log_group_notification,
     get_notifications,
     mark_as_read,
     create_notification,
     create_raw_notification,
-    delete_invitation_notification
+    delete_invitation_notification,
+    get_notifications_page,
+    mark_notifications_read,
+    get_unread_count,
+    _encode_cursor
 )
 
 class TestNotificationService(unittest.TestCase):
@@ -29,6 +36,7 @@ class TestNotificationService(unittest.TestCase):
             mock_table.return_value = insert_query
             
             result = log_notification('user_1', 'user_2', 'expense_added', 'New expense', 'grp_1')
+            notification_outbox.flush()
             
             self.assertTrue(result)
             mock_table.return_value.insert.assert_called()
@@ -42,6 +50,7 @@ class TestNotificationService(unittest.TestCase):
             mock_table.return_value = insert_query
             
             result = log_notification('user_1', 'user_2', 'expense_added', 'New expense', 'grp_1', related_expense_id='exp_123')
+            notification_outbox.flush()
             
             self.assertTrue(result)
             call_args = mock_table.return_value.insert.call_args
@@ -131,6 +140,7 @@ class TestNotificationService(unittest.TestCase):
             mock_table.return_value = insert_query
             
             result = create_notification('user_1', 'Test message', 'http://example.com')
+            notification_outbox.flush()
             
             self.assertTrue(result)
             mock_table.return_value.insert.assert_called()
@@ -144,6 +154,7 @@ class TestNotificationService(unittest.TestCase):
             mock_table.return_value = insert_query
             
             create_notification('user_1', 'Message', '/group/123')
+            notification_outbox.flush()
             
             call_args = mock_table.return_value.insert.call_args
             self.assertIn('/group/123', str(call_args))
@@ -163,9 +174,10 @@ class TestNotificationService(unittest.TestCase):
             }
             
             result = create_raw_notification(payload)
+            notification_outbox.flush()
             
             self.assertTrue(result)
-            mock_table.return_value.insert.assert_called_with(payload)
+            mock_table.return_value.insert.assert_called_with([payload])
 
     def test_delete_invitation_notification_success(self):
         """Mutation Target: Kills mutations in invitation notification deletion."""
@@ -176,6 +188,7 @@ class TestNotificationService(unittest.TestCase):
             mock_table.return_value = delete_query
             
             result = delete_invitation_notification('inv_123', 'user_1')
+            notification_outbox.flush()
             
             self.assertTrue(result)
             mock_table.return_value.delete.assert_called()
@@ -189,18 +202,219 @@ class TestNotificationService(unittest.TestCase):
             mock_table.return_value = delete_query
             
             delete_invitation_notification('inv_456', 'user_2')
+            notification_outbox.flush()
             
-            # Verify delete was called
+            # Verify delete was called with the invitation filters
             delete_query.delete.assert_called()
+            filters = str(delete_query.delete.return_value.mock_calls)
+            self.assertIn('inv_456', filters)
+            self.assertIn('user_2', filters)
 
-    def test_log_notification_handles_exception(self):
+    @patch('app.services.notification_service.Config')
+    def test_promoted_columns_are_dual_written_and_filtered(self, mock_config):
+        mock_config.NOTIFICATIONS_PROMOTED_COLUMNS = True
+        mock_config.NOTIFICATION_COALESCE_TYPES = set()
+        with patch('app.services.notification_service.notification_outbox') as mock_outbox:
+            log_notification('user_1', 'user_2', 'settlement', 'Paid', 'grp_1')
+            create_raw_notification({'user_id': 'user_1', 'data': {'group_id': 'grp_1', 'invitation_id': 'inv_1'}})
+            delete_invitation_notification('inv_1', 'user_1')
+
+        logged = mock_outbox.enqueue_inserts.call_args_list[0].args[0][0][0]
+        raw = mock_outbox.enqueue_inserts.call_args_list[1].args[0][0][0]
+        self.assertEqual(logged['group_id'], 'grp_1')
+        self.assertEqual(logged['data']['group_id'], 'grp_1')
+        self.assertEqual((raw['group_id'], raw['invitation_id']), ('grp_1', 'inv_1'))
+        self.assertIn('invitation_id', mock_outbox.enqueue_delete.call_args.kwargs['eq'])
+
+    def test_json_path_filters_until_migrated(self):
+        with patch('app.services.notification_service.notification_outbox') as mock_outbox:
+            log_notification('user_1', 'user_2', 'settlement', 'Paid', 'grp_1')
+            delete_invitation_notification('inv_1', 'user_1')
+
+        self.assertNotIn('group_id', mock_outbox.enqueue_inserts.call_args.args[0][0][0])
+        self.assertIn('data->>invitation_id', mock_outbox.enqueue_delete.call_args.kwargs['eq'])
+
+    def test_log_notification_coalesces_configured_types(self):
+        with patch('app.services.notification_service.notification_outbox') as mock_outbox:
+            log_notification('user_1', 'user_2', 'reminder', 'Pay up', 'grp_1')
+            log_notification('user_1', 'user_2', 'settlement', 'Paid', 'grp_1')
+
+        (reminder, reminder_key), = mock_outbox.enqueue_inserts.call_args_list[0].args[0]
+        (_, settlement_key), = mock_outbox.enqueue_inserts.call_args_list[1].args[0]
+        self.assertEqual(reminder_key, ('user_1', 'reminder', 'grp_1'))
+        self.assertEqual(reminder['data']['count'], 1)
+        self.assertIsNone(settlement_key)
+
+    @patch('app.services.notification_outbox.time.sleep')
+    def test_log_notification_handles_exception(self, mock_sleep):
         """Mutation Target: Kills mutations in error handling."""
         with patch('app.services.notification_service.supabase.table') as mock_table:
             mock_table.return_value.insert.return_value.execute.side_effect = Exception("DB Error")
             
             result = log_notification('user_1', 'user_2', 'test', 'msg', 'grp_1')
+            notification_outbox.flush()
             
-            self.assertFalse(result)
+            # The caller is not blocked by the failure; the dispatcher retries, then drops it.
+            self.assertTrue(result)
+            self.assertGreater(mock_table.return_value.insert.return_value.execute.call_count, 1)
+            self.assertEqual(len(notification_outbox.pending), 0)
+
+class TestBulkNotifications(unittest.TestCase):
+
+    def setUp(self):
+        self.outbox_patcher = patch('app.services.notification_service.notification_outbox')
+        self.mock_outbox = self.outbox_patcher.start()
+
+    def tearDown(self):
+        self.outbox_patcher.stop()
+
+    def test_all_recipients_are_queued_in_one_call(self):
+        statuses = log_notifications_bulk(['user_1', 'user_2', 'user_3'], 'user_9', 'group_deleted', 'Gone', 'grp_1')
+
+        self.assertEqual(statuses, {'user_1': 'queued', 'user_2': 'queued', 'user_3': 'queued'})
+        self.mock_outbox.enqueue_inserts.assert_called_once()
+        entries = self.mock_outbox.enqueue_inserts.call_args.args[0]
+        self.assertEqual([payload['user_id'] for payload, _ in entries], ['user_1', 'user_2', 'user_3'])
+        self.assertTrue(all(payload['message'] == 'Gone' for payload, _ in entries))
+
+    def test_actor_is_skipped_and_duplicates_dropped(self):
+        statuses = log_notifications_bulk(['user_1', 'user_9', 'user_1'], 'user_9', 'group_deleted', 'Gone', 'grp_1',
+                                          exclude_actor=True)
+
+        self.assertEqual(statuses, {'user_1': 'queued', 'user_9': 'skipped'})
+        self.assertEqual(len(self.mock_outbox.enqueue_inserts.call_args.args[0]), 1)
+
+    def test_wait_reports_sent_and_failed(self):
+        self.mock_outbox.insert_now.return_value = [{'id': 'n1'}, None]
+
+        statuses = log_notifications_bulk(['user_1', 'user_2'], 'user_9', 'expense_added', 'New expense', 'grp_1', wait=True)
+
+        self.assertEqual(statuses, {'user_1': 'sent', 'user_2': 'failed'})
+        self.mock_outbox.enqueue_inserts.assert_not_called()
+
+    def test_enqueue_error_marks_everyone_failed(self):
+        self.mock_outbox.enqueue_inserts.side_effect = RuntimeError('boom')
+
+        self.assertEqual(log_notifications_bulk(['user_1', 'user_2'], 'user_9', 'x', 'm', 'grp_1'),
+                         {'user_1': 'failed', 'user_2': 'failed'})
+        self.assertFalse(log_notification('user_1', 'user_9', 'x', 'm', 'grp_1'))
+
+    @patch('app.services.notification_service.supabase')
+    def test_group_notification_reaches_every_other_member_in_one_write(self, mock_supabase):
+        members = mock_supabase.table.return_value.select.return_value.eq.return_value.execute
+        members.return_value = MagicMock(data=[{'user_id': u} for u in ('user_1', 'user_2', 'user_3', 'user_9')])
+
+        statuses = log_group_notification('grp_1', 'user_9', 'Alice settled up with Bob', skip=['user_2'])
+
+        self.assertEqual(statuses, {'user_1': 'queued', 'user_3': 'queued', 'user_9': 'skipped'})
+        self.mock_outbox.enqueue_inserts.assert_called_once()
+        entries = self.mock_outbox.enqueue_inserts.call_args.args[0]
+        self.assertEqual([(p['user_id'], p['type'], p['data']['group_id']) for p, _ in entries],
+                         [('user_1', 'group', 'grp_1'), ('user_3', 'group', 'grp_1')])
+        mock_supabase.table.return_value.select.return_value.eq.assert_called_once_with('group_id', 'grp_1')
+
+    @patch('app.services.notification_service.supabase')
+    def test_group_notification_uses_given_members(self, mock_supabase):
+        log_group_notification('grp_1', 'user_9', 'Gone', member_ids=['user_1', 'user_9'])
+
+        mock_supabase.table.assert_not_called()
+        self.assertEqual([p['user_id'] for p, _ in self.mock_outbox.enqueue_inserts.call_args.args[0]], ['user_1'])
+
+
+class TestNotificationsPage(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.notification_service.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.query = MagicMock()
+        for method in ('select', 'eq', 'in_', 'or_', 'order', 'limit', 'update'):
+            getattr(self.query, method).return_value = self.query
+        self.mock_supabase.table.return_value = self.query
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+
+    def _rows(self, count):
+        return [{'id': f'n{i}', 'created_at': f'2024-01-{30 - i:02d}T10:00:00+00:00'} for i in range(count)]
+
+    def test_first_page_has_next_cursor(self):
+        self.query.execute.return_value = MagicMock(data=self._rows(3))
+
+        result, status = get_notifications_page('user_1', limit=2)
+
+        self.assertEqual(status, 200)
+        self.assertEqual([n['id'] for n in result['notifications']], ['n0', 'n1'])
+        self.assertEqual(result['next_cursor'], _encode_cursor({'id': 'n1', 'created_at': '2024-01-29T10:00:00+00:00'}))
+        self.query.limit.assert_called_with(3)
+        self.query.or_.assert_not_called()
+
+    def test_last_page_has_no_cursor(self):
+        self.query.execute.return_value = MagicMock(data=self._rows(2))
+
+        result, status = get_notifications_page('user_1', limit=2)
+
+        self.assertIsNone(result['next_cursor'])
+
+    def test_cursor_becomes_keyset_filter(self):
+        self.query.execute.return_value = MagicMock(data=[])
+        cursor = _encode_cursor({'id': 'n1', 'created_at': '2024-01-29T10:00:00+00:00'})
+
+        get_notifications_page('user_1', cursor=cursor, types=['reminder', 'settlement'], unread_only=True)
+
+        self.query.or_.assert_called_once_with(
+            'created_at.lt."2024-01-29T10:00:00+00:00",'
+            'and(created_at.eq."2024-01-29T10:00:00+00:00",id.lt."n1")'
+        )
+        self.query.in_.assert_called_with('type', ['reminder', 'settlement'])
+        self.query.eq.assert_any_call('read', False)
+
+    def test_invalid_cursor(self):
+        result, status = get_notifications_page('user_1', cursor='not-a-cursor')
+        self.assertEqual(status, 400)
+
+    def test_limit_is_clamped(self):
+        self.query.execute.return_value = MagicMock(data=[])
+        get_notifications_page('user_1', limit=10000)
+        self.query.limit.assert_called_with(101)
+
+    @patch('app.services.notification_service.unread_counters')
+    def test_mark_selected_read_is_one_update(self, mock_counters):
+        self.query.execute.return_value = MagicMock(data=[{'id': 'n1'}, {'id': 'n2'}])
+
+        result, status = mark_notifications_read('user_1', notification_ids=['n1', 'n2', 'n3'])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(result['updated'], 2)
+        self.query.update.assert_called_once_with({'read': True})
+        self.query.in_.assert_called_once_with('id', ['n1', 'n2', 'n3'])
+        self.query.execute.assert_called_once()
+        mock_counters.adjust.assert_called_once_with('user_1', -2)
+
+    @patch('app.services.notification_service.unread_counters')
+    def test_mark_all_read(self, mock_counters):
+        self.query.execute.return_value = MagicMock(data=[{'id': 'n1'}])
+
+        result, status = mark_notifications_read('user_1', mark_all=True)
+
+        self.assertEqual(status, 200)
+        self.query.in_.assert_not_called()
+        self.query.eq.assert_any_call('user_id', 'user_1')
+
+    def test_mark_read_requires_ids_or_all(self):
+        result, status = mark_notifications_read('user_1')
+        self.assertEqual(status, 400)
+
+    def test_mark_read_rejects_malformed_ids(self):
+        for ids in ['n1', {'id': 'n1'}, [['n1']], [None], [True], 42]:
+            result, status = mark_notifications_read('user_1', notification_ids=ids)
+            self.assertEqual(status, 400, ids)
+        self.query.execute.assert_not_called()
+
+    @patch('app.services.notification_service.unread_counters')
+    def test_unread_count(self, mock_counters):
+        mock_counters.get.return_value = 7
+        self.assertEqual(get_unread_count('user_1'), ({'unread': 7}, 200))
+
 
 if __name__ == '__main__':
     unittest.main()
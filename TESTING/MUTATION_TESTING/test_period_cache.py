@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from app.services.period_cache import ClosedPeriodCache
+
+TODAY = date(2026, 3, 15)
+FEB = (date(2026, 2, 1), date(2026, 2, 28))
+JAN = (date(2026, 1, 1), date(2026, 1, 31))
+
+
+class TestClosedPeriodCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.today_patcher = patch('app.services.period_cache._today', return_value=TODAY)
+        self.today_patcher.start()
+        self.cache = ClosedPeriodCache(cache_dir=self.cache_dir, max_users=10, max_entries_per_user=3)
+
+    def tearDown(self):
+        self.today_patcher.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_closed_periods_are_kept(self):
+        self.assertTrue(self.cache.put('u1', 'donut', *FEB, [{'category': 'Food', 'total': 10}]))
+
+        self.assertEqual(self.cache.get('u1', 'donut', *FEB), [{'category': 'Food', 'total': 10}])
+        self.assertIsNone(self.cache.get('u1', 'daily', *FEB))
+        self.assertIsNone(self.cache.get('u2', 'donut', *FEB))
+
+    def test_open_periods_are_not_stored(self):
+        self.assertFalse(self.cache.put('u1', 'donut', date(2026, 3, 1), date(2026, 3, 31), []))
+        self.assertFalse(self.cache.put('u1', 'daily', date(2026, 3, 1), TODAY, []))
+
+        self.assertIsNone(self.cache.get('u1', 'donut', date(2026, 3, 1), date(2026, 3, 31)))
+
+    def test_backdated_write_invalidates_only_its_period(self):
+        self.cache.put('u1', 'donut', *FEB, 'feb')
+        self.cache.put('u1', 'daily', *FEB, 'feb daily')
+        self.cache.put('u1', 'donut', *JAN, 'jan')
+
+        self.cache.invalidate('u1', [date(2026, 2, 10), TODAY])
+
+        self.assertIsNone(self.cache.get('u1', 'donut', *FEB))
+        self.assertIsNone(self.cache.get('u1', 'daily', *FEB))
+        self.assertEqual(self.cache.get('u1', 'donut', *JAN), 'jan')
+
+    def test_unknown_dates_invalidate_everything(self):
+        self.cache.put('u1', 'donut', *FEB, 'feb')
+        self.cache.put('u1', 'donut', *JAN, 'jan')
+
+        self.cache.invalidate('u1')
+
+        self.assertIsNone(self.cache.get('u1', 'donut', *JAN))
+        self.assertFalse(os.listdir(self.cache_dir))
+
+    def test_put_after_invalidation_is_discarded(self):
+        generation = self.cache.generation('u1')
+        self.cache.invalidate('u1', [date(2026, 2, 10)])
+
+        self.assertFalse(self.cache.put('u1', 'donut', *FEB, 'computed before the write', generation))
+        self.assertIsNone(self.cache.get('u1', 'donut', *FEB))
+
+    def test_entries_survive_a_restart(self):
+        self.cache.put('u1', 'donut', *FEB, 'feb')
+
+        restarted = ClosedPeriodCache(cache_dir=self.cache_dir, max_users=10, max_entries_per_user=3)
+
+        self.assertEqual(restarted.get('u1', 'donut', *FEB), 'feb')
+
+    def test_other_workers_see_invalidations(self):
+        other_worker = ClosedPeriodCache(cache_dir=self.cache_dir, max_users=10, max_entries_per_user=3)
+        self.cache.put('u1', 'donut', *FEB, 'feb')
+        self.assertEqual(other_worker.get('u1', 'donut', *FEB), 'feb')
+
+        self.cache.invalidate('u1', [date(2026, 2, 3)])
+
+        self.assertIsNone(other_worker.get('u1', 'donut', *FEB))
+
+    def test_oldest_periods_are_dropped_past_the_limit(self):
+        for month in range(1, 5):
+            start = date(2025, month, 1)
+            self.cache.put('u1', 'donut', start, start.replace(day=28), month)
+
+        self.assertIsNone(self.cache.get('u1', 'donut', date(2025, 1, 1), date(2025, 1, 28)))
+        self.assertEqual(self.cache.get('u1', 'donut', date(2025, 4, 1), date(2025, 4, 28)), 4)
+
+    def test_memory_only(self):
+        cache = ClosedPeriodCache(cache_dir='', max_users=10, max_entries_per_user=3)
+        cache.put('u1', 'donut', *FEB, 'feb')
+
+        self.assertEqual(cache.get('u1', 'donut', *FEB), 'feb')
+        cache.invalidate('u1', [date(2026, 2, 1)])
+        self.assertIsNone(cache.get('u1', 'donut', *FEB))
+
+
+if __name__ == '__main__':
+    unittest.main()
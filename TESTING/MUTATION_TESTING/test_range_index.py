@@ -0,0 +1,207 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import random
+import sys
+import time
+import types
+from datetime import date, timedelta
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.range_index import Fenwick, RangeIndex, _day_cells, _runs
+
+TODAY = date(2026, 3, 15)
+
+
+class TestFenwick(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        values = [rng.randint(0, 5000) for _ in range(500)]
+        tree = Fenwick(values)
+        for _ in range(200):
+            index = rng.randrange(len(values))
+            delta = rng.randint(-100, 100)
+            values[index] += delta
+            tree.add(index, delta)
+            first = rng.randrange(len(values))
+            last = rng.randrange(first, len(values))
+            self.assertEqual(tree.range_sum(first, last), sum(values[first:last + 1]))
+
+    def test_prefix_edges(self):
+        tree = Fenwick([1, 2, 3])
+        self.assertEqual(tree.prefix(-1), 0)
+        self.assertEqual(tree.prefix(10), 6)
+
+    def test_runs(self):
+        days = [date(2026, 1, 3), date(2026, 1, 1), date(2026, 1, 2), date(2026, 2, 1)]
+        self.assertEqual(_runs(days), [(date(2026, 1, 1), date(2026, 1, 3)), (date(2026, 2, 1), date(2026, 2, 1))])
+
+
+class TestRangeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.cells = {
+            (date(2026, 1, 10), 'Food'): [1050, 2],
+            (date(2026, 2, 3), 'Food'): [2000, 1],
+            (date(2026, 2, 3), 'Rent'): [90000, 1],
+            (date(2026, 3, 1), 'Travel'): [499, 1],
+        }
+        self.cells_patcher = patch('app.services.range_index._day_cells', side_effect=self._cells)
+        self.mock_cells = self.cells_patcher.start()
+        self.today_patcher = patch('app.services.range_index._today', return_value=TODAY)
+        self.today_patcher.start()
+        self.config_patcher = patch('app.services.range_index.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.RANGE_INDEX_REBUILD_SECONDS = 3600
+        self.mock_config.RANGE_INDEX_HEADROOM_DAYS = 30
+        self.index = RangeIndex(max_users=10)
+
+    def tearDown(self):
+        self.cells_patcher.stop()
+        self.today_patcher.stop()
+        self.config_patcher.stop()
+
+    def _cells(self, user_id, start=None, end=None):
+        return {
+            key: value for key, value in self.cells.items()
+            if (start is None or key[0] >= start) and (end is None or key[0] <= end)
+        }
+
+    def test_totals_per_category(self):
+        totals = self.index.totals('u1', date(2026, 2, 1), date(2026, 3, 1))
+
+        self.assertEqual(totals, {'Food': {'total': 20.0, 'count': 1}, 'Rent': {'total': 900.0, 'count': 1}, 'Travel': {'total': 4.99, 'count': 1}})
+
+    def test_ranges_outside_history(self):
+        self.assertEqual(self.index.totals('u1', date(2020, 1, 1), date(2026, 1, 10)), {'Food': {'total': 10.5, 'count': 2}})
+        self.assertEqual(self.index.totals('u1', date(2030, 1, 1), date(2030, 2, 1)), {})
+
+    def test_built_once_per_user(self):
+        self.index.totals('u1', date(2026, 1, 1), date(2026, 1, 31))
+        self.index.totals('u1', date(2026, 2, 1), date(2026, 2, 28))
+
+        self.assertEqual(self.mock_cells.call_count, 1)
+
+    def test_dated_write_rereads_only_that_day(self):
+        self.index.totals('u1', date(2026, 1, 1), date(2026, 3, 31))
+        self.cells[(date(2026, 2, 3), 'Food')] = [500, 1]
+        self.cells[(date(2026, 2, 3), 'Gifts')] = [1000, 1]
+        del self.cells[(date(2026, 2, 3), 'Rent')]
+
+        self.index.invalidate('u1', [date(2026, 2, 3)])
+        totals = self.index.totals('u1', date(2026, 2, 1), date(2026, 2, 28))
+
+        self.assertEqual(totals, {'Food': {'total': 5.0, 'count': 1}, 'Gifts': {'total': 10.0, 'count': 1}})
+        self.assertEqual(self.mock_cells.call_args.args, ('u1', date(2026, 2, 3), date(2026, 2, 3)))
+        self.assertEqual(self.mock_cells.call_count, 2)
+
+    def test_write_before_history_rebuilds(self):
+        self.index.totals('u1', date(2026, 1, 1), date(2026, 3, 31))
+        self.cells[(date(2025, 6, 1), 'Food')] = [100, 1]
+
+        self.index.invalidate('u1', [date(2025, 6, 1)])
+        totals = self.index.totals('u1', date(2025, 1, 1), date(2025, 12, 31))
+
+        self.assertEqual(totals, {'Food': {'total': 1.0, 'count': 1}})
+        self.assertEqual(self.mock_cells.call_args.args, ('u1',))
+
+    def test_undated_write_rebuilds(self):
+        self.index.totals('u1', date(2026, 1, 1), date(2026, 3, 31))
+        self.cells[(date(2026, 1, 11), 'Food')] = [100, 1]
+
+        self.index.invalidate('u1')
+
+        self.assertEqual(self.index.totals('u1', date(2026, 1, 11), date(2026, 1, 11)), {'Food': {'total': 1.0, 'count': 1}})
+        self.assertEqual(self.mock_cells.call_count, 2)
+
+    def test_build_that_raced_a_write_is_not_kept(self):
+        def racing_cells(user_id, start=None, end=None):
+            self.index.invalidate(user_id, [date(2026, 1, 10)])
+            return self._cells(user_id, start, end)
+        self.mock_cells.side_effect = racing_cells
+
+        self.index.totals('u1', date(2026, 1, 1), date(2026, 1, 31))
+        self.mock_cells.side_effect = self._cells
+        self.index.totals('u1', date(2026, 1, 1), date(2026, 1, 31))
+
+        self.assertEqual(self.mock_cells.call_count, 2)
+
+    def test_old_index_is_rebuilt(self):
+        self.index.totals('u1', date(2026, 1, 1), date(2026, 3, 31))
+        self.mock_config.RANGE_INDEX_REBUILD_SECONDS = 0
+
+        self.index.totals('u1', date(2026, 1, 1), date(2026, 3, 31))
+
+        self.assertEqual(self.mock_cells.call_count, 2)
+
+    def test_range_total_is_fast_on_a_long_history(self):
+        rng = random.Random(3)
+        start = TODAY - timedelta(days=3650)
+        self.cells = {
+            (start + timedelta(days=rng.randrange(3650)), rng.choice(['Food', 'Rent', 'Travel', 'Bills', 'Fun'])): [rng.randint(100, 10000), 1]
+            for _ in range(20000)
+        }
+        self.index.totals('u1', start, TODAY)
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            first = start + timedelta(days=rng.randrange(3650))
+            self.index.totals('u1', first, first + timedelta(days=rng.randrange(400)))
+        elapsed = time.perf_counter() - started
+
+        first, last = date(2020, 1, 1), date(2022, 6, 30)
+        expected = sum(cents for (day, _), (cents, _) in self.cells.items() if first <= day <= last)
+        totals = self.index.totals('u1', first, last)
+        self.assertAlmostEqual(sum(t['total'] for t in totals.values()), expected / 100, places=2)
+        self.assertLess(elapsed, 1.0)
+
+
+class TestDayCells(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.range_index.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.config_patcher = patch('app.services.range_index.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.RANGE_INDEX_PAGE_SIZE = 2
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.config_patcher.stop()
+
+    def test_reads_day_rollups_page_by_page(self):
+        self.mock_config.SPENDING_ROLLUPS = True
+        query = self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value
+        pages = query.order.return_value.order.return_value.range
+        pages.return_value.execute.side_effect = [
+            MagicMock(data=[{'bucket': '2026-02-03', 'category': 'Food', 'total': '20.10', 'count': 2},
+                            {'bucket': '2026-02-03', 'category': 'Rent', 'total': 900, 'count': 1}]),
+            MagicMock(data=[{'bucket': '2026-02-04', 'category': 'Food', 'total': 1, 'count': 1}]),
+        ]
+
+        cells = _day_cells('u1')
+
+        self.assertEqual(cells[(date(2026, 2, 3), 'Food')], [2010, 2])
+        self.assertEqual(len(cells), 3)
+        self.assertEqual([c.args for c in pages.call_args_list], [(0, 1), (2, 3)])
+
+    def test_falls_back_to_expenses(self):
+        self.mock_config.SPENDING_ROLLUPS = False
+        self.mock_config.RANGE_INDEX_PAGE_SIZE = 1000
+        query = self.mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.lt.return_value
+        query.order.return_value.order.return_value.range.return_value.execute.return_value = MagicMock(data=[
+            {'amount': 5, 'date': '2026-02-03T10:00:00+00:00', 'category': ' '},
+            {'amount': '2.5', 'date': '2026-02-03T23:00:00+00:00', 'category': None},
+        ])
+
+        cells = _day_cells('u1', date(2026, 2, 3), date(2026, 2, 3))
+
+        self.assertEqual(dict(cells), {(date(2026, 2, 3), 'Uncategorized'): [750, 2]})
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.lt.assert_called_once_with('date', '2026-02-04')
+
+
+if __name__ == '__main__':
+    unittest.main()
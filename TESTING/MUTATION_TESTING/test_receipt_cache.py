@@ -0,0 +1,164 @@
+import unittest
+from unittest.mock import patch
+import io
+import os
+import shutil
+import tempfile
+from PIL import Image
+
+from app.services.receipt_cache import ReceiptParseCache, perceptual_hash, image_fingerprint
+
+
+def _receipt_jpeg(quality=90, shade=0, size=(400, 600), spacing=30):
+    image = Image.new('L', size, 255)
+    for y in range(40, size[1] - 40, spacing):
+        for x in range(40, 360):
+            image.putpixel((x, y), shade)
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+class TestReceiptParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ReceiptParseCache(cache_dir=self.cache_dir, memory_entries=4, disk_entries=3, max_distance=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_miss_then_exact_hit(self):
+        image = _receipt_jpeg()
+        parsed, sha, phash = self.cache.get('user_1', image)
+        self.assertIsNone(parsed)
+
+        self.cache.put('user_1', sha, phash, {'total': 12.5})
+
+        parsed, _, _ = self.cache.get('user_1', image)
+        self.assertEqual(parsed, {'total': 12.5})
+
+    def test_near_duplicate_is_only_a_hint(self):
+        original = _receipt_jpeg(quality=90)
+        recompressed = _receipt_jpeg(quality=60)
+        self.assertNotEqual(original, recompressed)
+
+        _, sha, phash = self.cache.get('user_1', original)
+        self.cache.put('user_1', sha, phash, {'total': 3.0})
+
+        parsed, _, fingerprint = self.cache.get('user_1', recompressed)
+        self.assertIsNone(parsed)
+        self.assertEqual(self.cache.near_duplicate('user_1', fingerprint), {'total': 3.0})
+
+    def test_different_receipts_with_the_same_layout_are_not_served(self):
+        first = _receipt_jpeg(spacing=30)
+        second = _receipt_jpeg(spacing=32, shade=40)
+        _, sha, phash = self.cache.get('user_1', first)
+        self.cache.put('user_1', sha, phash, {'total': 3.0})
+
+        parsed, _, _ = self.cache.get('user_1', second)
+
+        self.assertIsNone(parsed)
+
+    def test_near_duplicate_needs_the_same_dimensions(self):
+        _, sha, phash = self.cache.get('user_1', _receipt_jpeg())
+        self.cache.put('user_1', sha, phash, {'total': 3.0})
+
+        _, _, fingerprint = self.cache.get('user_1', _receipt_jpeg(size=(400, 640)))
+
+        self.assertEqual(fingerprint['size'], [400, 640])
+        self.assertIsNone(self.cache.near_duplicate('user_1', fingerprint))
+
+    def test_entries_are_scoped_per_user(self):
+        image = _receipt_jpeg()
+        _, sha, phash = self.cache.get('user_1', image)
+        self.cache.put('user_1', sha, phash, {'total': 1.0})
+
+        parsed, _, _ = self.cache.get('user_2', image)
+        self.assertIsNone(parsed)
+
+    def test_survives_restart_from_disk(self):
+        image = _receipt_jpeg()
+        _, sha, phash = self.cache.get('user_1', image)
+        self.cache.put('user_1', sha, phash, {'total': 7.0})
+
+        fresh = ReceiptParseCache(cache_dir=self.cache_dir, memory_entries=4, disk_entries=3)
+        parsed, _, _ = fresh.get('user_1', image)
+        self.assertEqual(parsed, {'total': 7.0})
+
+    def test_corrupt_file_does_not_stop_the_index_loading(self):
+        for i in range(2):
+            self.cache.put('user_1', f'sha_{i}', {'phash': i, 'size': [10, 10]}, {'n': i})
+        corrupt = os.path.join(self.cache_dir, 'truncated.json')
+        with open(corrupt, 'w') as f:
+            f.write('{"user_id": "user_1", "sha"')
+
+        fresh = ReceiptParseCache(cache_dir=self.cache_dir, memory_entries=4, disk_entries=3)
+        fresh._load_disk_index()
+
+        self.assertEqual(sorted(fresh.phash_index), [('user_1', 'sha_0'), ('user_1', 'sha_1')])
+        self.assertFalse(os.path.exists(corrupt))
+
+    def test_disk_is_bounded(self):
+        for i in range(6):
+            self.cache.put('user_1', f'sha_{i}', None, {'n': i})
+
+        files = [name for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+        self.assertEqual(len(files), 3)
+
+    def test_writes_evict_from_the_index_without_listing_the_directory(self):
+        self.cache.put('user_1', 'sha_0', None, {'n': 0})
+
+        with patch('app.services.receipt_cache.os.listdir', wraps=os.listdir) as mock_listdir:
+            for i in range(1, 6):
+                self.cache.put('user_1', f'sha_{i}', None, {'n': i})
+
+        mock_listdir.assert_not_called()
+        self.assertEqual(list(self.cache.phash_index), [('user_1', 'sha_3'), ('user_1', 'sha_4'), ('user_1', 'sha_5')])
+        self.assertIsNone(self.cache._read_disk('user_1', 'sha_2'))
+        self.assertEqual(self.cache._read_disk('user_1', 'sha_3'), {'n': 3})
+
+    def test_periodic_sweep_trims_files_from_other_workers(self):
+        other_worker = ReceiptParseCache(cache_dir=self.cache_dir, memory_entries=4, disk_entries=3)
+        self.cache.put('user_1', 'mine', None, {})
+        for i in range(3):
+            other_worker.put('user_2', f'theirs_{i}', None, {})
+
+        with patch('app.services.receipt_cache.DISK_SWEEP_WRITES', 1):
+            self.cache.put('user_1', 'mine_again', None, {})
+
+        files = [name for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+        self.assertEqual(len(files), 3)
+
+    def test_construction_does_not_read_config(self):
+        # Any setting read would raise AttributeError on this stand-in.
+        with patch('app.services.receipt_cache.Config', new=object()):
+            ReceiptParseCache()
+
+    def test_oversized_images_are_not_decoded(self):
+        with patch('app.services.receipt_cache.Config') as mock_config:
+            mock_config.RECEIPT_MAX_PIXELS = 1000
+            self.assertIsNone(image_fingerprint(_receipt_jpeg()))
+            mock_config.RECEIPT_MAX_PIXELS = 400 * 600
+            self.assertIsNotNone(image_fingerprint(_receipt_jpeg()))
+
+    def test_fingerprint_runs_on_the_preprocessing_pool(self):
+        image = _receipt_jpeg()
+        with patch('app.services.receipt_cache.run_in_pool', return_value=None) as mock_pool:
+            self.cache.get('user_1', image)
+
+        mock_pool.assert_called_once_with(image_fingerprint, image)
+
+    def test_undecodable_bytes_only_use_exact_match(self):
+        self.assertIsNone(perceptual_hash(b'not an image'))
+        parsed, sha, phash = self.cache.get('user_1', b'not an image')
+        self.assertIsNone(parsed)
+        self.assertIsNone(phash)
+
+        self.cache.put('user_1', sha, phash, {'total': 2.0})
+        parsed, _, _ = self.cache.get('user_1', b'not an image')
+        self.assertEqual(parsed, {'total': 2.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import io
+from PIL import Image
+
+from app.services.receipt_preprocessor import preprocess_receipt_image, preprocess_in_pool
+
+
+def _jpeg_bytes(size, orientation=None):
+    image = Image.effect_noise(size, 60).convert('RGB')
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(buffer, format='JPEG', quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+class TestReceiptPreprocessor(unittest.TestCase):
+
+    def test_downscales_and_converts_to_grayscale(self):
+        original = _jpeg_bytes((3000, 2000))
+
+        processed, mime_type = preprocess_receipt_image(original, 'image/jpeg')
+
+        self.assertEqual(mime_type, 'image/jpeg')
+        self.assertLess(len(processed), len(original))
+        image = Image.open(io.BytesIO(processed))
+        self.assertLessEqual(max(image.size), 1600)
+        self.assertEqual(image.mode, 'L')
+
+    def test_applies_exif_orientation(self):
+        # Orientation 6 means the camera was rotated 90 degrees.
+        original = _jpeg_bytes((2400, 1200), orientation=6)
+
+        processed, _ = preprocess_receipt_image(original, 'image/jpeg')
+
+        width, height = Image.open(io.BytesIO(processed)).size
+        self.assertGreater(height, width)
+
+    def test_undecodable_bytes_are_returned_unchanged(self):
+        self.assertEqual(preprocess_receipt_image(b'image_data', 'image/jpeg'), (b'image_data', 'image/jpeg'))
+
+    def test_non_image_mime_type_is_untouched(self):
+        self.assertEqual(preprocess_receipt_image(b'%PDF-1.4', 'application/pdf'), (b'%PDF-1.4', 'application/pdf'))
+
+    def test_small_image_kept_when_not_smaller(self):
+        buffer = io.BytesIO()
+        Image.new('L', (10, 10), 255).save(buffer, format='PNG')
+        original = buffer.getvalue()
+
+        processed, mime_type = preprocess_receipt_image(original, 'image/png')
+
+        self.assertEqual((processed, mime_type), (original, 'image/png'))
+
+    def test_pool_returns_processed_image(self):
+        original = _jpeg_bytes((2000, 2000))
+
+        processed, mime_type = preprocess_in_pool(original, 'image/jpeg')
+
+        self.assertLess(len(processed), len(original))
+        self.assertEqual(mime_type, 'image/jpeg')
+
+
+if __name__ == '__main__':
+    unittest.main()
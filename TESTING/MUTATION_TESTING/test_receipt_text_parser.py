@@ -0,0 +1,152 @@
+import unittest
+import io
+
+from app.services.receipt_text_parser import parse_receipt_text, has_required_fields, extract_pdf_text
+
+CAFE_RECEIPT = """Blue Tokai Coffee Roasters
+12, MG Road, Bengaluru
+Date: 14/03/2024  Time 10:42
+Invoice #A-1023
+2 x Cappuccino   360.00
+Croissant ........ 180.00
+Cold Brew 1 @ 250.00 250.00
+Sub Total 790.00
+CGST 2.5% 19.75
+SGST 2.5% 19.75
+Grand Total ₹829.50
+Paid via UPI
+"""
+
+EMAIL_RECEIPT = """Thanks for your order from Uber Eats!
+March 5, 2024
+Pad Thai $14.99
+Spring Rolls $6.50
+Subtotal $21.49
+Tax $1.88
+Tip $3.00
+Total $26.37
+Visa ending 4242
+"""
+
+INVOICE = """ACME Internet Services
+Invoice Date: 2024-02-01
+Due Date: 2024-02-15
+Monthly broadband plan 49.99
+VAT 10.00
+Amount Due EUR 59.99
+"""
+
+GROCERY_RECEIPT = """Fresh Mart
+Date: 2024-03-01
+Bread 5.00
+Milk 7.00
+Total items: 2
+Subtotal 12.00
+Total Tax 1.35
+Total 13.35
+"""
+
+
+def _text_pdf(lines):
+    """Builds a minimal one-page PDF with a real text layer."""
+    text_ops = ' '.join(f"({line}) Tj 0 -14 Td" for line in lines)
+    stream = f"BT /F1 10 Tf 20 800 Td {text_ops} ET".encode('latin-1')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode())
+    out.seek(0)
+    return out
+
+
+class TestReceiptTextParser(unittest.TestCase):
+
+    def test_parses_store_receipt(self):
+        parsed = parse_receipt_text(CAFE_RECEIPT)
+
+        self.assertEqual(parsed['vendor_name'], 'Blue Tokai Coffee Roasters')
+        self.assertEqual(parsed['issue_date'], '2024-03-14')
+        self.assertEqual(parsed['subtotal'], 790.0)
+        self.assertEqual(parsed['tax'], 39.5)
+        self.assertEqual(parsed['total'], 829.5)
+        self.assertEqual(parsed['currency'], 'INR')
+        self.assertEqual(parsed['payment_method'], 'UPI')
+        self.assertEqual(parsed['address'], '12, MG Road, Bengaluru')
+        self.assertEqual(parsed['line_items'][0], {'name': 'Cappuccino', 'quantity': 2.0, 'unit_price': 180.0, 'line_total': 360.0})
+        self.assertEqual(len(parsed['line_items']), 3)
+
+    def test_parses_email_receipt(self):
+        parsed = parse_receipt_text(EMAIL_RECEIPT)
+
+        self.assertEqual(parsed['vendor_name'], 'Uber Eats')
+        self.assertEqual(parsed['issue_date'], '2024-03-05')
+        self.assertEqual((parsed['subtotal'], parsed['tax'], parsed['tip'], parsed['total']), (21.49, 1.88, 3.0, 26.37))
+        self.assertEqual(parsed['currency'], 'USD')
+        self.assertEqual(parsed['payment_method'], 'Visa')
+        self.assertEqual([item['name'] for item in parsed['line_items']], ['Pad Thai', 'Spring Rolls'])
+
+    def test_parses_invoice_due_date(self):
+        parsed = parse_receipt_text(INVOICE)
+
+        self.assertEqual(parsed['issue_date'], '2024-02-01')
+        self.assertEqual(parsed['due_date'], '2024-02-15')
+        self.assertEqual(parsed['total'], 59.99)
+        self.assertEqual(parsed['currency'], 'EUR')
+
+    def test_item_count_is_not_the_total(self):
+        parsed = parse_receipt_text(GROCERY_RECEIPT)
+
+        self.assertEqual((parsed['subtotal'], parsed['tax'], parsed['total']), (12.0, 1.35, 13.35))
+        self.assertEqual([item['name'] for item in parsed['line_items']], ['Bread', 'Milk'])
+
+    def test_total_tax_is_tax(self):
+        parsed = parse_receipt_text("Total 13.35\nTotal Tax 1.35\n")
+
+        self.assertEqual((parsed['tax'], parsed['total']), (1.35, 13.35))
+
+    def test_total_with_count_and_inclusive_tax(self):
+        parsed = parse_receipt_text("Total (3 items) 829.50\n")
+        self.assertEqual(parsed['total'], 829.5)
+
+        parsed = parse_receipt_text("Total incl. GST 829.50\n")
+        self.assertEqual((parsed['tax'], parsed['total']), (None, 829.5))
+
+    def test_returns_full_schema(self):
+        parsed = parse_receipt_text('hello')
+        self.assertEqual(set(parsed), {
+            'vendor_name', 'issue_date', 'due_date', 'subtotal', 'tax', 'tip', 'total', 'currency',
+            'payment_method', 'address', 'category_guess', 'notes', 'line_items'
+        })
+
+    def test_required_fields(self):
+        self.assertTrue(has_required_fields(parse_receipt_text(CAFE_RECEIPT)))
+        self.assertFalse(has_required_fields(parse_receipt_text('Coffee 3.50')))
+
+    def test_extracts_pdf_text_layer(self):
+        pdf = _text_pdf(['ACME Internet Services', 'Invoice Date: 2024-02-01', 'Amount Due EUR 59.99'])
+
+        text = extract_pdf_text(pdf)
+
+        self.assertIn('Amount Due EUR 59.99', text)
+        self.assertEqual(parse_receipt_text(text)['total'], 59.99)
+
+    def test_pdf_without_text_layer_returns_none(self):
+        self.assertIsNone(extract_pdf_text(io.BytesIO(b'not a pdf')))
+
+
+if __name__ == '__main__':
+    unittest.main()
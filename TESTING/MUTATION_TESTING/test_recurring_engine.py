@@ -0,0 +1,208 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import time
+import types
+from datetime import datetime, timedelta, timezone
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.recurring_engine import RecurringEngine
+
+
+NOW = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def rule(rule_id, schedule='0 9 * * *', user_id='user_1', **extra):
+    row = {
+        'id': rule_id, 'user_id': user_id, 'title': f'Rule {rule_id}', 'amount': 10.0,
+        'category': 'bills', 'schedule': schedule, 'starts_at': '2026-03-01T00:00:00+00:00',
+        'last_run_at': None, 'active': True,
+    }
+    row.update(extra)
+    return row
+
+
+class TestRecurringEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.recurring_engine.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.mock_supabase.rpc.return_value.execute.return_value = MagicMock(data={'inserted': 1})
+        self.config_patcher = patch('app.services.recurring_engine.Config')
+        mock_config = self.config_patcher.start()
+        mock_config.RECURRING_CATCHUP_DAYS = 31
+        mock_config.RECURRING_MAX_PER_TICK = 5000
+        mock_config.RECURRING_INSERT_BATCH_SIZE = 2
+        mock_config.RECURRING_LOAD_PAGE_SIZE = 2
+        mock_config.RECURRING_RELOAD_SECONDS = 300
+        mock_config.RECURRING_UPCOMING_DAYS = 30
+        self.cache_patcher = patch('app.services.recurring_engine.response_cache')
+        self.mock_cache = self.cache_patcher.start()
+        self.period_cache_patcher = patch('app.services.recurring_engine.period_cache')
+        self.mock_period_cache = self.period_cache_patcher.start()
+        self.range_cache_patcher = patch('app.services.recurring_engine.expense_range_cache')
+        self.mock_range_cache = self.range_cache_patcher.start()
+        self.engine = RecurringEngine()
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.config_patcher.stop()
+        self.cache_patcher.stop()
+        self.period_cache_patcher.stop()
+        self.range_cache_patcher.stop()
+
+    def test_first_run_is_after_last_run(self):
+        self.engine.schedule(rule('r1', last_run_at='2026-03-10T09:00:00+00:00'), now=NOW)
+
+        self.assertEqual(self.engine.next_run('r1'), '2026-03-11T09:00:00+00:00')
+
+    def test_missed_runs_are_caught_up_within_window(self):
+        self.engine.schedule(rule('r1', last_run_at='2026-03-08T09:00:00+00:00'), now=NOW)
+
+        due = self.engine.pop_due(NOW)
+
+        self.assertEqual([occurs_at.day for _, occurs_at in due], [9, 10])
+        self.assertEqual(self.engine.next_run('r1'), '2026-03-11T09:00:00+00:00')
+        self.assertEqual(self.engine.pop_due(NOW), [])
+
+    def test_runs_older_than_catchup_window_are_skipped(self):
+        self.engine.schedule(rule('r1', schedule='@daily', starts_at='2025-01-01T00:00:00+00:00'), now=NOW)
+
+        self.assertEqual(len(self.engine.pop_due(NOW)), 31)
+
+    def test_ends_at_and_inactive(self):
+        self.engine.schedule(rule('r1', ends_at='2026-03-09T12:00:00+00:00'), now=NOW)
+        self.engine.schedule(rule('r2', active=False), now=NOW)
+
+        self.assertEqual(len(self.engine.pop_due(NOW)), 9)
+        self.assertIsNone(self.engine.next_run('r1'))
+        self.assertNotIn('r2', self.engine.rules)
+
+    def test_rescheduling_replaces_the_pending_run(self):
+        self.engine.schedule(rule('r1', last_run_at='2026-03-10T09:00:00+00:00'), now=NOW)
+        self.engine.schedule(rule('r1', schedule='0 10 * * *', last_run_at='2026-03-10T09:00:00+00:00'), now=NOW)
+
+        due = self.engine.pop_due(NOW)
+
+        self.assertEqual([occurs_at.hour for _, occurs_at in due], [10])
+        self.engine.unschedule('r1')
+        self.assertEqual(self.engine.pop_due(NOW + timedelta(days=5)), [])
+
+    def test_materializes_in_batches_and_invalidates_caches(self):
+        for i in range(3):
+            self.engine.schedule(rule(f'r{i}', user_id=f'user_{i}', last_run_at='2026-03-09T09:00:00+00:00'), now=NOW)
+
+        created = self.engine.run_due(NOW)
+
+        self.assertEqual(self.mock_supabase.rpc.call_count, 2)
+        name, params = self.mock_supabase.rpc.call_args_list[0].args
+        self.assertEqual(name, 'materialize_recurring_expenses')
+        self.assertEqual(params['p_occurrences'][0], {
+            'recurring_expense_id': 'r0', 'user_id': 'user_0', 'description': 'Rule r0',
+            'amount': 10.0, 'category': 'bills', 'occurs_at': '2026-03-10T09:00:00+00:00',
+        })
+        self.assertEqual(created, 2)
+        self.assertEqual(self.mock_cache.invalidate_user.call_count, 3)
+        self.mock_period_cache.invalidate.assert_any_call('user_0', {NOW.date()})
+        self.mock_range_cache.invalidate.assert_any_call('user_0', {NOW.date()})
+
+    def test_runs_of_rules_paused_elsewhere_are_not_written(self):
+        # Stands in for the RPC's live CTE, which re-checks each rule in the database.
+        stored = {
+            'r1': rule('r1', active=False),
+            'r2': rule('r2', ends_at='2026-03-09T00:00:00+00:00'),
+            'r3': rule('r3'),
+        }
+        def materialize(name, params):
+            live = [
+                o for o in params['p_occurrences']
+                if o['recurring_expense_id'] in stored
+                and stored[o['recurring_expense_id']]['active']
+                and stored[o['recurring_expense_id']]['user_id'] == o['user_id']
+                and (stored[o['recurring_expense_id']].get('ends_at') is None
+                     or o['occurs_at'] <= stored[o['recurring_expense_id']]['ends_at'])
+            ]
+            return MagicMock(execute=MagicMock(return_value=MagicMock(data={'inserted': len(live)})))
+        self.mock_supabase.rpc.side_effect = materialize
+        # This worker still holds all three rules as active and open-ended.
+        for rule_id in stored:
+            self.engine.schedule(rule(rule_id, last_run_at='2026-03-09T09:00:00+00:00'), now=NOW)
+
+        self.assertEqual(self.engine.run_due(NOW), 1)
+
+    def test_failed_batch_is_retried_next_tick(self):
+        self.engine.schedule(rule('r1', last_run_at='2026-03-08T09:00:00+00:00'), now=NOW)
+        self.mock_supabase.rpc.return_value.execute.side_effect = [Exception('timeout'), MagicMock(data={'inserted': 2})]
+
+        self.engine.run_due(NOW)
+        self.assertEqual(self.engine.next_run('r1'), '2026-03-09T09:00:00+00:00')
+
+        self.engine.run_due(NOW)
+        occurrences = self.mock_supabase.rpc.call_args.args[1]['p_occurrences']
+        self.assertEqual([o['occurs_at'][:10] for o in occurrences], ['2026-03-09', '2026-03-10'])
+        self.assertEqual(self.engine.next_run('r1'), '2026-03-11T09:00:00+00:00')
+
+    def test_load_pages_through_active_rules(self):
+        pages = self.mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.range
+        pages.return_value.execute.side_effect = [
+            MagicMock(data=[rule('r1'), rule('r2')]),
+            MagicMock(data=[rule('r3', user_id='user_2')]),
+        ]
+        self.engine.schedule(rule('stale'), now=NOW)
+
+        self.assertEqual(self.engine.load(NOW), 3)
+
+        self.assertEqual([c.args for c in pages.call_args_list], [(0, 1), (2, 3)])
+        self.assertEqual(set(self.engine.rules), {'r1', 'r2', 'r3'})
+        self.assertEqual(self.engine.by_user['user_1'], {'r1', 'r2'})
+
+    def test_sync_user_replaces_only_that_user(self):
+        self.engine.schedule(rule('r1'), now=NOW)
+        self.engine.schedule(rule('r2', user_id='user_2'), now=NOW)
+
+        self.engine.sync_user('user_1', [rule('r3')], now=NOW)
+
+        self.assertEqual(set(self.engine.rules), {'r2', 'r3'})
+
+    def test_upcoming_merges_rules_in_time_order(self):
+        self.engine.schedule(rule('r1', schedule='0 9 * * *', last_run_at='2026-03-10T09:00:00+00:00'), now=NOW)
+        self.engine.schedule(rule('r2', schedule='0 18 * * *', last_run_at='2026-03-09T18:00:00+00:00'), now=NOW)
+        self.engine.schedule(rule('r3', user_id='user_2'), now=NOW)
+
+        upcoming = self.engine.upcoming('user_1', limit=4, until=NOW + timedelta(days=30))
+
+        self.assertEqual(
+            [(o['recurring_expense_id'], o['occurs_at'][5:13]) for o in upcoming],
+            [('r2', '03-10T18'), ('r1', '03-11T09'), ('r2', '03-11T18'), ('r1', '03-12T09')]
+        )
+
+    def test_hundred_thousand_rules(self):
+        schedules = ['@daily', '0 9 * * mon-fri', '30 7 1 * *', '*/15 * * * *', '0 0 * * 0', '0 12 1,15 * *']
+        started = time.process_time()
+        for i in range(100_000):
+            self.engine.schedule(rule(i, schedule=schedules[i % len(schedules)], user_id=f'user_{i % 5000}',
+                                      last_run_at='2026-03-10T12:00:00+00:00'), now=NOW)
+        schedule_cpu = time.process_time() - started
+
+        started = time.process_time()
+        for _ in range(10_000):
+            self.engine.pop_due(NOW)
+        idle_cpu = time.process_time() - started
+
+        started = time.process_time()
+        due = self.engine.pop_due(NOW + timedelta(minutes=15), limit=100_000)
+        due_cpu = time.process_time() - started
+        print(f'100k rules: schedule {schedule_cpu:.2f}s, 10k idle ticks {idle_cpu:.3f}s, {len(due)} due runs {due_cpu:.2f}s CPU')
+
+        self.assertEqual(len(self.engine.next_runs), 100_000)
+        self.assertEqual(len(due), 100_000 // len(schedules) + 1)
+        self.assertLess(schedule_cpu, 10)
+        self.assertLess(idle_cpu, 0.5)
+        self.assertLess(due_cpu, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from flask import Flask
+from app.services import recurring_service
+from app.routes import recurring_routes
+
+
+def row(**extra):
+    data = {
+        'id': 'rule_1', 'user_id': 'user_1', 'title': 'Rent', 'amount': 950, 'category': 'bills',
+        'schedule': '0 9 1 * *', 'starts_at': '2026-03-01T00:00:00+00:00', 'ends_at': None,
+        'last_run_at': None, 'active': True,
+    }
+    data.update(extra)
+    return data
+
+
+class TestRecurringService(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.recurring_service.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.engine_patcher = patch('app.services.recurring_service.recurring_engine')
+        self.mock_engine = self.engine_patcher.start()
+        self.mock_engine.next_run.return_value = '2026-04-01T09:00:00+00:00'
+        self.config_patcher = patch('app.services.recurring_service.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.RECURRING_MAX_RULES_PER_USER = 100
+        self.table = self.mock_supabase.table.return_value
+        self.table.select.return_value.eq.return_value.execute.return_value = MagicMock(count=0)
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.engine_patcher.stop()
+        self.config_patcher.stop()
+
+    def test_list_syncs_engine_and_returns_upcoming(self):
+        self.table.select.return_value.eq.return_value.order.return_value.execute.return_value = MagicMock(data=[row()])
+        self.mock_engine.upcoming.return_value = [{'recurring_expense_id': 'rule_1', 'occurs_at': '2026-04-01T09:00:00+00:00'}]
+
+        response, status = recurring_service.list_recurring_expenses('user_1')
+
+        self.assertEqual(status, 200)
+        self.mock_engine.sync_user.assert_called_once_with('user_1', [row()])
+        self.assertEqual(response['recurring'][0]['amount'], 950.0)
+        self.assertEqual(response['recurring'][0]['next_run_at'], '2026-04-01T09:00:00+00:00')
+        self.assertEqual(len(response['upcoming']), 1)
+
+    def test_create_validates_and_schedules(self):
+        self.table.insert.return_value.execute.return_value = MagicMock(data=[row()])
+
+        response, status = recurring_service.create_recurring_expense('user_1', {
+            'title': ' Rent ', 'amount': '950', 'category': 'bills', 'schedule': '0  9 1 * *'
+        })
+
+        self.assertEqual(status, 201)
+        inserted = self.table.insert.call_args.args[0]
+        self.assertEqual((inserted['title'], inserted['amount'], inserted['schedule'], inserted['user_id']), ('Rent', 950.0, '0 9 1 * *', 'user_1'))
+        self.assertIn('starts_at', inserted)
+        self.mock_engine.schedule.assert_called_once_with(row())
+        self.assertEqual(response['recurring']['id'], 'rule_1')
+
+    def test_create_rejects_bad_input(self):
+        cases = [
+            {'amount': 5, 'schedule': '@daily'},
+            {'title': 'Gym', 'amount': -5, 'schedule': '@daily'},
+            {'title': 'Gym', 'amount': 'lots', 'schedule': '@daily'},
+            {'title': 'Gym', 'amount': 5, 'schedule': 'every day'},
+            {'title': 'Gym', 'amount': 5, 'schedule': '@daily', 'ends_at': 'soon'},
+        ]
+        for data in cases:
+            response, status = recurring_service.create_recurring_expense('user_1', data)
+            self.assertEqual(status, 400, data)
+        self.table.insert.assert_not_called()
+
+    def test_create_enforces_rule_limit(self):
+        self.table.select.return_value.eq.return_value.execute.return_value = MagicMock(count=100)
+
+        response, status = recurring_service.create_recurring_expense('user_1', {'title': 'Gym', 'amount': 5, 'schedule': '@daily'})
+
+        self.assertEqual(status, 400)
+        self.table.insert.assert_not_called()
+
+    def test_update_reschedules(self):
+        self.table.update.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[row(schedule='0 9 15 * *')])
+
+        response, status = recurring_service.update_recurring_expense('user_1', 'rule_1', {'schedule': '0 9 15 * *'})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.table.update.call_args.args[0]['schedule'], '0 9 15 * *')
+        self.mock_engine.schedule.assert_called_once()
+
+    def test_update_and_delete_of_someone_elses_rule(self):
+        self.table.update.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+        self.table.delete.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+
+        self.assertEqual(recurring_service.update_recurring_expense('user_2', 'rule_1', {'active': False})[1], 404)
+        self.assertEqual(recurring_service.delete_recurring_expense('user_2', 'rule_1')[1], 404)
+        self.mock_engine.unschedule.assert_not_called()
+
+    def test_delete_unschedules(self):
+        self.table.delete.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[row()])
+
+        response, status = recurring_service.delete_recurring_expense('user_1', 'rule_1')
+
+        self.assertEqual(status, 200)
+        self.mock_engine.unschedule.assert_called_once_with('rule_1')
+
+
+
+class TestRecurringRoutes(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(recurring_routes.rec_bp, url_prefix='/api')
+        self.client = app.test_client()
+        self.auth_patcher = patch('app.auth.decorators.supabase')
+        self.auth_patcher.start().auth.get_user.return_value = MagicMock(user=MagicMock(id='user_1', email=None))
+        self.config_patcher = patch('app.routes.recurring_routes.Config')
+        self.mock_config = self.config_patcher.start()
+        self.service_patcher = patch('app.routes.recurring_routes.recurring_service')
+        self.mock_service = self.service_patcher.start()
+        self.proxy_patcher = patch('app.routes.recurring_routes.recurring_expenses_proxy', return_value=({'recurring': [{'id': 'r1'}]}, 200))
+        self.mock_proxy = self.proxy_patcher.start()
+        self.headers = {'Authorization': 'Bearer token'}
+
+    def tearDown(self):
+        self.auth_patcher.stop()
+        self.config_patcher.stop()
+        self.service_patcher.stop()
+        self.proxy_patcher.stop()
+
+    def test_disabled_engine_keeps_the_edge_function_list(self):
+        self.mock_config.RECURRING_TICK_SECONDS = 0
+
+        response = self.client.get('/api/recurring-expenses', headers=self.headers)
+
+        self.assertEqual(response.get_json(), {'recurring': [{'id': 'r1'}]})
+        self.mock_service.list_recurring_expenses.assert_not_called()
+        self.assertEqual(self.client.post('/api/recurring-expenses', json={}, headers=self.headers).status_code, 503)
+        self.assertEqual(self.client.delete('/api/recurring-expenses/r1', headers=self.headers).status_code, 503)
+        self.mock_service.create_recurring_expense.assert_not_called()
+
+    def test_enabled_engine_serves_rules(self):
+        self.mock_config.RECURRING_TICK_SECONDS = 30
+        self.mock_service.list_recurring_expenses.return_value = ({'recurring': [], 'upcoming': []}, 200)
+
+        response = self.client.get('/api/recurring-expenses', headers=self.headers)
+
+        self.assertEqual(response.get_json(), {'recurring': [], 'upcoming': []})
+        self.mock_proxy.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
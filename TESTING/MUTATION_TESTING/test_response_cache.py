@@ -0,0 +1,109 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import threading
+import time
+
+from app.services.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.config_patcher = patch('app.services.response_cache.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.RESPONSE_CACHE_TTL_SECONDS = 60
+        self.mock_config.RESPONSE_CACHE_STALE_SECONDS = 600
+        self.mock_config.RESPONSE_CACHE_MAX_ENTRIES = 100
+        self.cache = ResponseCache()
+        self.fetch = MagicMock(return_value=(200, {'Content-Type': 'application/json'}, b'{"total": 1}'))
+        self.key = ('token_digest', '/api/supabase/proxy/analytics/spending?', 'gzip')
+
+    def tearDown(self):
+        self.config_patcher.stop()
+
+    def _age(self, key, seconds):
+        self.cache.entries[key]['fetched_at'] -= seconds
+
+    def _wait_for_refresh(self):
+        deadline = time.time() + 2
+        while self.cache.refreshing and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_miss_then_hit(self):
+        self.assertEqual(self.cache.get('user_1', self.key, self.fetch)[3], 'miss')
+        status, headers, body, state = self.cache.get('user_1', self.key, self.fetch)
+
+        self.assertEqual((status, body, state), (200, b'{"total": 1}', 'hit'))
+        self.fetch.assert_called_once()
+
+    def test_stale_entry_is_served_while_refreshed_in_background(self):
+        self.cache.get('user_1', self.key, self.fetch)
+        self._age(self.key, 120)
+        release = threading.Event()
+
+        def slow_fetch():
+            release.wait(2)
+            return 200, {}, b'{"total": 2}'
+
+        status, headers, body, state = self.cache.get('user_1', self.key, slow_fetch)
+        self.assertEqual((body, state), (b'{"total": 1}', 'stale'))
+        # Only one refresh per key at a time.
+        self.assertEqual(self.cache.get('user_1', self.key, slow_fetch)[3], 'stale')
+        release.set()
+        self._wait_for_refresh()
+
+        self.assertEqual(self.cache.get('user_1', self.key, self.fetch)[2:], (b'{"total": 2}', 'hit'))
+
+    def test_too_old_is_fetched_in_the_request(self):
+        self.cache.get('user_1', self.key, self.fetch)
+        self._age(self.key, 1000)
+
+        self.assertEqual(self.cache.get('user_1', self.key, self.fetch)[3], 'miss')
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_errors_are_not_cached(self):
+        self.fetch.return_value = (401, {}, b'unauthorized')
+
+        self.cache.get('user_1', self.key, self.fetch)
+        self.cache.get('user_1', self.key, self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_failed_refresh_drops_the_entry(self):
+        self.cache.get('user_1', self.key, self.fetch)
+        self._age(self.key, 120)
+
+        self.cache.get('user_1', self.key, lambda: (401, {}, b'expired'))
+        self._wait_for_refresh()
+
+        self.assertNotIn(self.key, self.cache.entries)
+
+    def test_invalidate_user_only_drops_their_entries(self):
+        other_key = ('other_token', '/api/recurring-expenses', 'gzip')
+        self.cache.get('user_1', self.key, self.fetch)
+        self.cache.get('user_2', other_key, self.fetch)
+
+        self.cache.invalidate_user('user_1')
+
+        self.assertEqual(self.cache.get('user_1', self.key, self.fetch)[3], 'miss')
+        self.assertEqual(self.cache.get('user_2', other_key, self.fetch)[3], 'hit')
+
+    def test_refresh_racing_an_invalidation_is_discarded(self):
+        self.cache.get('user_1', self.key, self.fetch)
+        self._age(self.key, 120)
+        release = threading.Event()
+
+        def slow_fetch():
+            release.wait(2)
+            return 200, {}, b'{"total": "before the write"}'
+
+        self.cache.get('user_1', self.key, slow_fetch)
+        self.cache.invalidate_user('user_1')
+        release.set()
+        self._wait_for_refresh()
+
+        self.assertNotIn(self.key, self.cache.entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
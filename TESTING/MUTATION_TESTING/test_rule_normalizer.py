@@ -0,0 +1,54 @@
+import unittest
+
+from app.services.rule_normalizer import normalize_keyword, compact_keywords, keyword_matches
+
+
+class TestRuleNormalizer(unittest.TestCase):
+
+    def test_normalize_extracts_merchant_after_marker(self):
+        self.assertEqual(normalize_keyword('dinner with team at olive garden 12/3'), 'olive garden')
+
+    def test_normalize_strips_store_number(self):
+        self.assertEqual(normalize_keyword('Starbucks #1234'), 'starbucks')
+
+    def test_normalize_strips_amounts_and_dates(self):
+        self.assertEqual(normalize_keyword('Paid $45.50 for groceries at Walmart on 3rd March'), 'walmart')
+        self.assertEqual(normalize_keyword('electricity bill 2024-01-05'), 'electricity')
+        self.assertEqual(normalize_keyword('rs 200 auto'), 'auto')
+
+    def test_normalize_lowercases_single_word(self):
+        self.assertEqual(normalize_keyword('PIZZA'), 'pizza')
+
+    def test_normalize_empty_description(self):
+        self.assertEqual(normalize_keyword(''), '')
+
+    def test_normalize_only_noise_falls_back_to_description(self):
+        self.assertEqual(normalize_keyword('12/3'), '12/3')
+
+    def test_normalize_caps_keyword_length(self):
+        self.assertEqual(normalize_keyword('big blue house furniture outlet'), 'big blue house')
+
+    def test_compact_merges_duplicates(self):
+        self.assertEqual(compact_keywords(['uber 12.50', 'Uber', 'uber']), ['uber'])
+
+    def test_compact_drops_keywords_covered_by_shorter_ones(self):
+        self.assertEqual(compact_keywords(['pizza hut', 'pizza', 'olive garden']), ['pizza', 'olive garden'])
+
+    def test_compact_keeps_keywords_that_only_contain_another_as_text(self):
+        self.assertEqual(compact_keywords(['rent', 'parent', 'current bill']), ['rent', 'parent', 'current'])
+
+    def test_keyword_matches_whole_words_only(self):
+        self.assertTrue(keyword_matches('rent', 'Rent for March'))
+        self.assertTrue(keyword_matches('pizza hut', 'pizza  hut #12'))
+        self.assertTrue(keyword_matches("domino's", "dinner at domino's"))
+        self.assertFalse(keyword_matches('rent', 'parent teacher meeting'))
+        self.assertFalse(keyword_matches('pizza hut', 'pizza huts'))
+        self.assertFalse(keyword_matches('', 'anything'))
+
+    def test_compact_skips_empty_and_none(self):
+        self.assertEqual(compact_keywords(['', 'taxi']), ['taxi'])
+        self.assertEqual(compact_keywords(None), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
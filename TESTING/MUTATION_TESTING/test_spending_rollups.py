@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import types
+from datetime import date, datetime, timezone
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.spending_rollups import (
+    cover, to_day, bucket_start, category_totals, daily_totals, total_since, backfill_rollups
+)
+
+
+class TestRollupBuckets(unittest.TestCase):
+
+    def test_to_day(self):
+        self.assertEqual(to_day('2026-03-05'), date(2026, 3, 5))
+        self.assertEqual(to_day('2026-03-05T23:30:00-02:00'), date(2026, 3, 6))
+        self.assertEqual(to_day('2026-03-05T10:00:00Z'), date(2026, 3, 5))
+        self.assertEqual(to_day(datetime(2026, 3, 5, 1, tzinfo=timezone.utc)), date(2026, 3, 5))
+        with self.assertRaises(ValueError):
+            to_day('March 5th')
+
+    def test_bucket_start(self):
+        # 2026-03-05 is a Thursday.
+        self.assertEqual(bucket_start(date(2026, 3, 5), 'week'), date(2026, 3, 2))
+        self.assertEqual(bucket_start(date(2026, 3, 5), 'month'), date(2026, 3, 1))
+        self.assertEqual(bucket_start(date(2026, 3, 5), 'day'), date(2026, 3, 5))
+
+    def test_cover_whole_month(self):
+        self.assertEqual(cover(date(2026, 2, 1), date(2026, 2, 28)), ([date(2026, 2, 1)], []))
+
+    def test_cover_partial_edges(self):
+        months, days = cover(date(2026, 1, 20), date(2026, 4, 10))
+
+        self.assertEqual(months, [date(2026, 2, 1), date(2026, 3, 1)])
+        self.assertEqual(days, [(date(2026, 1, 20), date(2026, 1, 31)), (date(2026, 4, 1), date(2026, 4, 10))])
+
+    def test_cover_inside_one_month(self):
+        self.assertEqual(cover(date(2026, 3, 3), date(2026, 3, 9)), ([], [(date(2026, 3, 3), date(2026, 3, 9))]))
+        self.assertEqual(cover(date(2026, 3, 9), date(2026, 3, 3)), ([], []))
+
+    def test_cover_across_year_end(self):
+        self.assertEqual(cover(date(2025, 12, 1), date(2026, 1, 31)), ([date(2025, 12, 1), date(2026, 1, 1)], []))
+
+
+class TestRollupReads(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.spending_rollups.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.query = self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.gte.return_value.lte.return_value
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+
+    def test_category_totals_reads_months_then_edge_days(self):
+        self.query.execute.side_effect = [
+            MagicMock(data=[{'bucket': '2026-02-01', 'category': 'Food', 'total': '100.50', 'count': 4}]),
+            MagicMock(data=[{'bucket': '2026-01-31', 'category': 'Food', 'total': 10, 'count': 1}]),
+            MagicMock(data=[{'bucket': '2026-03-01', 'category': 'Rent', 'total': 900, 'count': 1}]),
+        ]
+
+        totals = category_totals('user_1', date(2026, 1, 31), date(2026, 3, 1))
+
+        self.assertEqual(totals, {'Food': {'total': 110.5, 'count': 5}, 'Rent': {'total': 900.0, 'count': 1}})
+        granularities = [c.args[1] for c in self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.call_args_list]
+        self.assertEqual(granularities, ['month', 'day', 'day'])
+
+    def test_daily_totals_sum_categories(self):
+        self.query.execute.return_value = MagicMock(data=[
+            {'bucket': '2026-03-02', 'category': 'Food', 'total': 12, 'count': 2},
+            {'bucket': '2026-03-02', 'category': 'Travel', 'total': 30, 'count': 1},
+            {'bucket': '2026-03-04', 'category': 'Food', 'total': 8, 'count': 1},
+        ])
+
+        totals = daily_totals('user_1', date(2026, 3, 1), date(2026, 3, 31))
+
+        self.assertEqual(totals[date(2026, 3, 2)], {'total': 42.0, 'count': 3})
+        self.assertEqual(len(totals), 2)
+
+    def test_total_since(self):
+        gte = self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.gte
+        gte.return_value.execute.return_value = MagicMock(data=[{'total': '40.25'}, {'total': 10}])
+
+        self.assertEqual(total_since('user_1', date(2026, 3, 1)), 50.25)
+        gte.assert_called_once_with('bucket', '2026-03-01')
+
+
+class TestRollupBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.spending_rollups.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.mock_supabase.rpc.return_value.execute.return_value = MagicMock(data=7)
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+
+    def test_backfills_given_users_in_batches(self):
+        stats = backfill_rollups(user_ids=['a', 'b', 'c'], batch_size=2, pause=0)
+
+        self.assertEqual(stats, {'users': 3, 'rows': 14, 'calls': 2})
+        self.assertEqual(self.mock_supabase.rpc.call_args_list[1].args, ('backfill_spending_rollups', {'p_user_ids': ['c']}))
+
+    def test_backfills_every_user_page_by_page(self):
+        pages = self.mock_supabase.table.return_value.select.return_value.order.return_value.range
+        pages.return_value.execute.side_effect = [
+            MagicMock(data=[{'id': 'a'}, {'id': 'b'}]),
+            MagicMock(data=[{'id': 'c'}]),
+        ]
+
+        stats = backfill_rollups(batch_size=2, pause=0)
+
+        self.assertEqual(stats['users'], 3)
+        self.assertEqual([c.args for c in pages.call_args_list], [(0, 1), (2, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from flask import Flask
+from app.auth.stream_tickets import issue_ticket, verify_ticket, StreamTicketError
+from app.routes import notification_routes
+from app.services.event_hub import EventHub
+
+
+class TestStreamTickets(unittest.TestCase):
+
+    def setUp(self):
+        self.config_patcher = patch('app.auth.stream_tickets.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.SSE_TICKET_SECRET = 'test-secret'
+        self.mock_config.SSE_TICKET_TTL_SECONDS = 60
+
+    def tearDown(self):
+        self.config_patcher.stop()
+
+    def test_round_trip(self):
+        self.assertEqual(verify_ticket(issue_ticket('user-1')), 'user-1')
+
+    def test_expired_ticket(self):
+        ticket = issue_ticket('user-1', now=1000)
+
+        with self.assertRaises(StreamTicketError):
+            verify_ticket(ticket, now=1061)
+
+    def test_tampered_ticket(self):
+        user_id, expires_at, signature = issue_ticket('user-1').rsplit(':', 2)
+
+        for ticket in [f"user-2:{expires_at}:{signature}", f"{user_id}:{int(expires_at) + 600}:{signature}", 'garbage', None]:
+            with self.assertRaises(StreamTicketError):
+                verify_ticket(ticket)
+
+    def test_requires_a_secret(self):
+        self.mock_config.SSE_TICKET_SECRET = None
+
+        with self.assertRaises(StreamTicketError) as ctx:
+            issue_ticket('user-1')
+        self.assertEqual(ctx.exception.status, 503)
+
+
+class TestStreamRoute(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(notification_routes.notif_bp, url_prefix='/api/notifications')
+        self.client = app.test_client()
+        self.config_patcher = patch('app.routes.notification_routes.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.SSE_ENABLED = True
+        self.mock_config.SSE_MAX_STREAM_SECONDS = 0.2
+        self.mock_config.SSE_HEARTBEAT_SECONDS = 0.05
+        self.ticket_config_patcher = patch('app.auth.stream_tickets.Config')
+        ticket_config = self.ticket_config_patcher.start()
+        ticket_config.SSE_TICKET_SECRET = 'test-secret'
+        ticket_config.SSE_TICKET_TTL_SECONDS = 60
+        self.hub_patcher = patch('app.routes.notification_routes.event_hub', EventHub())
+        self.hub = self.hub_patcher.start()
+        self.topics_patcher = patch('app.routes.notification_routes.notification_service.get_stream_topics',
+                                    return_value=['user:user-1'])
+        self.topics_patcher.start()
+
+    def tearDown(self):
+        self.config_patcher.stop()
+        self.ticket_config_patcher.stop()
+        self.hub_patcher.stop()
+        self.topics_patcher.stop()
+
+    def test_stream_with_ticket_ends_after_max_duration(self):
+        response = self.client.get(f"/api/notifications/stream?ticket={issue_ticket('user-1')}")
+
+        body = response.get_data(as_text=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('event: ready', body)
+        self.assertIn(': heartbeat', body)
+        self.assertEqual(self.hub.stats()['streams'], 0)
+
+    def test_jwt_in_query_string_is_rejected(self):
+        response = self.client.get('/api/notifications/stream?access_token=some.jwt.value')
+
+        self.assertEqual(response.status_code, 401)
+        fake_extensions.supabase.auth.get_user.assert_not_called()
+
+    def test_disabled_stream(self):
+        self.mock_config.SSE_ENABLED = False
+
+        response = self.client.get(f"/api/notifications/stream?ticket={issue_ticket('user-1')}")
+
+        self.assertEqual(response.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
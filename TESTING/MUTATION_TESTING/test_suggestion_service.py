@@ -0,0 +1,173 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import time
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+fake_extensions.gemini_model = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.suggestion_service import DescriptionTrie, SuggestionIndex, get_suggestions
+
+
+class MockSupabaseResponse:
+    def __init__(self, data=None, error=None):
+        self.data = data
+        self.error = error
+
+
+def _expenses_query(mock_supabase):
+    return mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.limit.return_value
+
+
+class TestDescriptionTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = DescriptionTrie()
+        self.trie.add('Olive Garden dinner', 'Food', 40.0)
+        self.trie.add('olive garden  dinner', 'Food', 60.0)
+        self.trie.add('Olive Garden dinner', 'Entertainment', 50.0)
+        self.trie.add('Oil change', 'Transport', 30.0)
+        self.trie.add('Office supplies', 'Shopping', 12.5)
+
+    def test_prefix_match_with_category_and_typical_amount(self):
+        suggestions = self.trie.suggest('oli')
+
+        self.assertEqual(len(suggestions), 1)
+        self.assertEqual(suggestions[0]['description'], 'Olive Garden dinner')
+        self.assertEqual(suggestions[0]['category'], 'Food')
+        self.assertEqual(suggestions[0]['typical_amount'], 50.0)
+        self.assertEqual(suggestions[0]['count'], 3)
+
+    def test_frequent_descriptions_rank_first(self):
+        descriptions = [s['description'] for s in self.trie.suggest('o')]
+        self.assertEqual(descriptions[0], 'Olive Garden dinner')
+        self.assertEqual(set(descriptions), {'Olive Garden dinner', 'Oil change', 'Office supplies'})
+
+    def test_matches_word_starts(self):
+        self.assertEqual(self.trie.suggest('GARD')[0]['description'], 'Olive Garden dinner')
+        self.assertEqual(self.trie.suggest('supp')[0]['description'], 'Office supplies')
+
+    def test_no_match_and_limit(self):
+        self.assertEqual(self.trie.suggest('xyz'), [])
+        self.assertEqual(len(self.trie.suggest('o', limit=2)), 2)
+
+    def test_top_k_is_bounded(self):
+        trie = DescriptionTrie(top_k=3)
+        for i in range(10):
+            trie.add(f'coffee {i}', 'Food', 5.0)
+        trie.add('coffee 7', 'Food', 5.0)
+
+        suggestions = trie.suggest('coffee')
+        self.assertEqual(len(suggestions), 3)
+        self.assertEqual(suggestions[0]['description'], 'coffee 7')
+
+    def test_indexing_depth_and_words_are_bounded(self):
+        trie = DescriptionTrie(max_depth=4, max_words=2)
+        trie.add('monthly electricity bill payment', 'Bills', 80.0)
+
+        self.assertEqual(trie.node_count, 1 + 4 + 4)
+        self.assertEqual(trie.suggest('electric')[0]['description'], 'monthly electricity bill payment')
+        self.assertEqual(trie.suggest('elec')[0]['category'], 'Bills')
+        self.assertEqual(trie.suggest('electrons'), [])
+        self.assertEqual(trie.suggest('bill'), [])
+
+
+class TestSuggestionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.suggestion_service.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        _expenses_query(self.mock_supabase).execute.return_value = MockSupabaseResponse(data=[
+            {'description': 'Uber to work', 'amount': '12.00', 'category': 'Transport'},
+            {'description': 'Uber to work', 'amount': 14, 'category': 'Transport'},
+            {'description': 'Payment to Bob', 'amount': 20, 'category': 'Settlement'},
+            {'description': 'Udemy course', 'amount': None, 'category': 'Education'},
+        ])
+        self.index = SuggestionIndex(max_bytes=128 * 1024 * 1024)
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+
+    def test_builds_once_then_serves_from_memory(self):
+        first = self.index.get_trie('user-1').suggest('u')
+        second = self.index.get_trie('user-1').suggest('u')
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]['typical_amount'], 13.0)
+        self.assertEqual(self.mock_supabase.table.call_count, 1)
+        self.mock_supabase.table.return_value.select.return_value.eq.assert_called_with('payer_id', 'user-1')
+
+    def test_settlements_are_skipped(self):
+        self.assertEqual(self.index.get_trie('user-1').suggest('pay'), [])
+
+    def test_record_updates_built_trie(self):
+        self.index.record('user-1', 'Gym membership', 'Health')
+        self.assertEqual(self.mock_supabase.table.call_count, 0)
+
+        self.index.get_trie('user-1')
+        self.index.record('user-1', 'Gym membership', 'Health')
+        self.assertEqual(self.index.get_trie('user-1').suggest('gym')[0]['category'], 'Health')
+
+    def test_cache_is_bounded_by_memory(self):
+        self.index = SuggestionIndex(max_bytes=2 * self.index.get_trie('user-1').approx_bytes())
+        self.index.get_trie('user-1')
+        self.index.get_trie('user-2')
+        self.index.get_trie('user-3')
+
+        self.assertEqual(list(self.index.tries.keys()), ['user-2', 'user-3'])
+
+    def test_write_marks_trie_stale(self):
+        trie = self.index.get_trie('user-1')
+        self.index.invalidate('user-1')
+
+        with patch('app.services.suggestion_service.threading.Thread') as mock_thread:
+            self.assertIs(self.index.get_trie('user-1'), trie)
+            mock_thread.assert_called_once()
+
+    @patch('app.services.suggestion_service.Config')
+    def test_stale_trie_is_served_while_refreshing(self, mock_config):
+        mock_config.SUGGEST_REFRESH_SECONDS = 0
+        mock_config.SUGGEST_MAX_DESCRIPTIONS = 2000
+        mock_config.SUGGEST_MAX_PREFIX_CHARS = 12
+        mock_config.SUGGEST_MAX_INDEXED_WORDS = 4
+        trie = self.index.get_trie('user-1')
+        trie.built_at -= 1
+
+        with patch('app.services.suggestion_service.threading.Thread') as mock_thread:
+            self.assertIs(self.index.get_trie('user-1'), trie)
+            self.assertIs(self.index.get_trie('user-1'), trie)
+            mock_thread.assert_called_once()
+
+    def test_get_suggestions_hot_path_latency(self):
+        rows = [{'description': f'merchant {i} purchase', 'amount': i, 'category': 'Shopping'} for i in range(2000)]
+        _expenses_query(self.mock_supabase).execute.return_value = MockSupabaseResponse(data=rows)
+
+        with patch('app.services.suggestion_service.suggestion_index', self.index):
+            get_suggestions('user-2', 'mer')
+            timings = []
+            for i in range(500):
+                started = time.perf_counter()
+                data, status = get_suggestions('user-2', f'merchant {i % 20}')
+                timings.append(time.perf_counter() - started)
+
+        self.assertEqual(status, 200)
+        self.assertTrue(data['suggestions'])
+        self.assertEqual(self.mock_supabase.table.call_count, 1)
+        timings.sort()
+        self.assertLess(timings[int(len(timings) * 0.99)], 0.010)
+
+    def test_get_suggestions_empty_query_and_error(self):
+        self.assertEqual(get_suggestions('user-1', '   '), ({'suggestions': []}, 200))
+
+        _expenses_query(self.mock_supabase).execute.side_effect = Exception('db down')
+        with patch('app.services.suggestion_service.suggestion_index', self.index):
+            data, status = get_suggestions('user-3', 'uber')
+        self.assertEqual(status, 500)
+        self.assertIn('error', data)
+
+
+if __name__ == '__main__':
+    unittest.main()
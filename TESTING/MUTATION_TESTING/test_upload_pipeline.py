@@ -0,0 +1,45 @@
+import unittest
+import hashlib
+import io
+from tempfile import SpooledTemporaryFile
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import EnvironBuilder
+
+from app.services.upload_pipeline import (
+    UploadRequest,
+    UploadTooLarge,
+    receive_upload,
+)
+
+
+class TestUploadPipeline(unittest.TestCase):
+
+    def test_receive_upload_hashes_and_sizes_in_one_pass(self):
+        data = b'x' * 200_000
+        upload = receive_upload(FileStorage(io.BytesIO(data), filename='r.jpg', content_type='image/jpeg'), chunk_size=4096)
+
+        self.assertEqual(upload.size, len(data))
+        self.assertEqual(upload.sha256, hashlib.sha256(data).hexdigest())
+        self.assertEqual(upload.mime_type, 'image/jpeg')
+        self.assertEqual(upload.read_all(), data)
+
+    def test_receive_upload_rejects_oversized_file(self):
+        storage = FileStorage(io.BytesIO(b'x' * 5000), filename='r.jpg', content_type='image/jpeg')
+
+        with self.assertRaises(UploadTooLarge):
+            receive_upload(storage, max_bytes=4096, chunk_size=1024)
+
+    def test_receive_upload_defaults_mime_type(self):
+        upload = receive_upload(FileStorage(io.BytesIO(b'abc'), filename='r'))
+        self.assertEqual(upload.mime_type, 'image/jpeg')
+
+    def test_upload_request_spools_file_parts(self):
+        builder = EnvironBuilder(method='POST', data={'image': (io.BytesIO(b'y' * 1024), 'r.jpg', 'image/jpeg')})
+        request = UploadRequest(builder.get_environ())
+
+        stream = request.files['image'].stream
+        self.assertIsInstance(stream, SpooledTemporaryFile)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import requests
+
+from app.services.upstream_proxy import UpstreamProxy, UpstreamError, stream_response
+
+
+class TestUpstreamProxy(unittest.TestCase):
+
+    def setUp(self):
+        self.config_patcher = patch('app.services.upstream_proxy.Config')
+        mock_config = self.config_patcher.start()
+        mock_config.PROXY_CONNECT_TIMEOUT = 3
+        mock_config.PROXY_READ_TIMEOUT = 30
+        mock_config.PROXY_POOL_SIZE = 4
+        mock_config.PROXY_CHUNK_SIZE = 2
+        self.proxy = UpstreamProxy()
+        self.session = MagicMock()
+        self.proxy.session = self.session
+
+    def tearDown(self):
+        self.config_patcher.stop()
+
+    def test_requests_share_one_session_with_timeouts(self):
+        self.session.request.return_value = MagicMock(status_code=200)
+
+        self.proxy.request('proxy/analytics', 'GET', 'https://edge/analytics', params={'m': '3'})
+        self.proxy.request('proxy/analytics', 'GET', 'https://edge/analytics')
+
+        self.assertEqual(self.session.request.call_count, 2)
+        kwargs = self.session.request.call_args.kwargs
+        self.assertEqual(kwargs['timeout'], (3, 30))
+        self.assertTrue(kwargs['stream'])
+
+    def test_session_is_created_once_with_pool(self):
+        proxy = UpstreamProxy()
+        first = proxy._get_session()
+
+        self.assertIs(proxy._get_session(), first)
+        self.assertEqual(first.get_adapter('https://edge')._pool_maxsize, 4)
+
+    def test_timeout_and_connection_errors(self):
+        self.session.request.side_effect = requests.exceptions.ReadTimeout('slow')
+        with self.assertRaises(UpstreamError) as ctx:
+            self.proxy.request('proxy/slow', 'GET', 'https://edge/slow')
+        self.assertEqual(ctx.exception.status, 504)
+
+        self.session.request.side_effect = requests.exceptions.ConnectionError('refused')
+        with self.assertRaises(UpstreamError) as ctx:
+            self.proxy.request('proxy/slow', 'GET', 'https://edge/slow')
+        self.assertEqual(ctx.exception.status, 502)
+
+        self.assertEqual(self.proxy.stats()['proxy/slow']['errors'], 2)
+
+    def test_latency_stats_per_upstream(self):
+        for seconds in [0.010, 0.020, 0.030, 0.040]:
+            self.proxy._record('proxy/analytics', seconds)
+        self.proxy._record('recurring', 0.5, error=True)
+
+        stats = self.proxy.stats()
+        self.assertEqual(stats['proxy/analytics']['count'], 4)
+        self.assertEqual(stats['proxy/analytics']['p50_ms'], 30.0)
+        self.assertEqual(stats['proxy/analytics']['max_ms'], 40.0)
+        self.assertEqual(stats['recurring']['errors'], 1)
+
+    def test_upstream_names_are_bounded(self):
+        with patch('app.services.upstream_proxy.MAX_UPSTREAMS', 2):
+            for name in ['a', 'b', 'c', 'd']:
+                self.proxy._record(name, 0.01)
+
+        self.assertEqual(set(self.proxy.stats()), {'a', 'b', 'other'})
+        self.assertEqual(self.proxy.stats()['other']['count'], 2)
+
+    def test_stream_response_passes_raw_bytes_and_headers(self):
+        upstream = MagicMock(status_code=200)
+        upstream.headers = {'Content-Type': 'application/json', 'Content-Encoding': 'gzip', 'Set-Cookie': 'x=1'}
+        upstream.raw.stream.return_value = iter([b'\x1f\x8b', b'ab'])
+
+        response = stream_response(upstream)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual(b''.join(response.response), b'\x1f\x8bab')
+        upstream.raw.stream.assert_called_once_with(2, decode_content=False)
+        upstream.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
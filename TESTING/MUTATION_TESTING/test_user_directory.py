@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from app.services.user_directory import EmailResolver, EmailLookupError
+
+
+class TestEmailResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase_patcher = patch('app.services.user_directory.supabase')
+        self.mock_supabase = self.supabase_patcher.start()
+        self.config_patcher = patch('app.services.user_directory.Config')
+        mock_config = self.config_patcher.start()
+        mock_config.EMAIL_RESOLVER_MAX_ENTRIES = 100
+        mock_config.EMAIL_RESOLVER_TTL_SECONDS = 3600
+        mock_config.EMAIL_RESOLVER_NEGATIVE_TTL_SECONDS = 60
+        self.users = self.mock_supabase.table.return_value
+        self.rpc_execute = self.mock_supabase.rpc.return_value.execute
+        self.resolver = EmailResolver()
+
+    def tearDown(self):
+        self.supabase_patcher.stop()
+        self.config_patcher.stop()
+
+    def _single_lookup(self, data):
+        self.users.select.return_value.eq.return_value.maybe_single.return_value.execute.return_value = MagicMock(data=data)
+
+    def test_hit_is_cached(self):
+        self._single_lookup({'id': 'user_2', 'email': 'jane@example.com'})
+
+        self.assertEqual(self.resolver.resolve('Jane@Example.com'), 'user_2')
+        self.assertEqual(self.resolver.resolve('jane@example.com '), 'user_2')
+
+        self.assertEqual(self.mock_supabase.table.call_count, 1)
+        self.mock_supabase.rpc.assert_not_called()
+
+    def test_unknown_email_is_negatively_cached(self):
+        self._single_lookup(None)
+        self.rpc_execute.return_value = MagicMock(data=[])
+
+        self.assertIsNone(self.resolver.resolve('typo@example.com'))
+        self.assertIsNone(self.resolver.resolve('typo@example.com'))
+
+        self.assertEqual(self.mock_supabase.rpc.call_count, 1)
+
+    def test_negative_entry_dropped_after_signup(self):
+        self._single_lookup(None)
+        self.rpc_execute.return_value = MagicMock(data=[])
+        self.assertIsNone(self.resolver.resolve('new@example.com'))
+
+        self.resolver.forget_missing('new@example.com')
+        self._single_lookup({'id': 'user_9', 'email': 'new@example.com'})
+
+        self.assertEqual(self.resolver.resolve('new@example.com'), 'user_9')
+
+    def test_auth_only_user_gets_a_profile(self):
+        self._single_lookup(None)
+        self.rpc_execute.return_value = MagicMock(data=[{'id': 'user_3', 'raw_user_meta_data': {}}])
+        self.users.upsert.return_value.execute.return_value = MagicMock(error=None)
+
+        self.assertEqual(self.resolver.resolve('bob@example.com', name_hint='Bob'), 'user_3')
+
+        self.users.upsert.assert_called_once_with([{'id': 'user_3', 'email': 'bob@example.com', 'name': 'Bob'}])
+
+    def test_lookup_errors_are_not_cached(self):
+        self._single_lookup(None)
+        self.rpc_execute.side_effect = Exception('timeout')
+
+        with self.assertRaises(EmailLookupError):
+            self.resolver.resolve('bob@example.com')
+        with self.assertRaises(EmailLookupError):
+            self.resolver.resolve('bob@example.com')
+        self.assertEqual(self.rpc_execute.call_count, 2)
+
+    def test_batch_is_one_profile_query_and_one_upsert(self):
+        self.users.select.return_value.in_.return_value.execute.return_value = MagicMock(data=[
+            {'id': 'user_1', 'email': 'a@example.com'},
+        ])
+
+        def rpc_side_effect(name, params):
+            response = MagicMock()
+            email = params['user_email']
+            response.execute.return_value = MagicMock(
+                data=[{'id': f"auth_{email[0]}", 'raw_user_meta_data': {'full_name': email[0].upper()}}] if email.startswith('b') else [])
+            return response
+
+        self.mock_supabase.rpc.side_effect = rpc_side_effect
+        self.users.upsert.return_value.execute.return_value = MagicMock(error=None)
+
+        resolved, errors = self.resolver.resolve_many(['a@example.com', 'B@example.com', 'c@example.com', 'a@example.com'])
+
+        self.assertEqual(resolved, {'a@example.com': 'user_1', 'b@example.com': 'auth_b', 'c@example.com': None})
+        self.assertEqual(errors, {})
+        self.users.select.return_value.in_.assert_called_once_with('email', ['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertEqual(self.mock_supabase.rpc.call_count, 2)
+        self.users.upsert.assert_called_once()
+
+        # Everything is cached now, including the miss.
+        self.resolver.resolve_many(['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertEqual(self.mock_supabase.rpc.call_count, 2)
+        self.users.select.return_value.in_.assert_called_once()
+
+    def test_invalidate(self):
+        self._single_lookup({'id': 'user_2', 'email': 'jane@example.com'})
+        self.resolver.resolve('jane@example.com')
+
+        self.resolver.invalidate('jane@example.com')
+        self.resolver.resolve('jane@example.com')
+
+        self.assertEqual(self.mock_supabase.table.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
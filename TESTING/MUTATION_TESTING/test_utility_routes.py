@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import types
+
+fake_extensions = types.ModuleType("app.extensions")
+fake_extensions.supabase = MagicMock()
+sys.modules["app.extensions"] = fake_extensions
+
+from flask import Flask
+from app.routes import utility_routes
+
+
+class TestUpstreamMetricsAuth(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(utility_routes.util_bp, url_prefix='/api')
+        self.client = app.test_client()
+        self.config_patcher = patch('app.auth.decorators.Config')
+        self.mock_config = self.config_patcher.start()
+        self.mock_config.ADMIN_TOKEN = 'ops-secret'
+        self.stats_patcher = patch('app.routes.utility_routes.upstream_proxy.stats', return_value={'proxy/x': {'requests': 1}})
+        self.stats_patcher.start()
+
+    def tearDown(self):
+        self.config_patcher.stop()
+        self.stats_patcher.stop()
+
+    def test_requires_the_admin_token(self):
+        self.assertEqual(self.client.get('/api/health/upstreams').status_code, 401)
+        self.assertEqual(self.client.get('/api/health/upstreams', headers={'X-Admin-Token': 'wrong'}).status_code, 401)
+
+        response = self.client.get('/api/health/upstreams', headers={'X-Admin-Token': 'ops-secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'upstreams': {'proxy/x': {'requests': 1}}})
+
+    def test_hidden_without_a_configured_token(self):
+        self.mock_config.ADMIN_TOKEN = None
+
+        self.assertEqual(self.client.get('/api/health/upstreams', headers={'X-Admin-Token': ''}).status_code, 404)
+
+    def test_plain_health_check_stays_open(self):
+        self.assertEqual(self.client.get('/api/health').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
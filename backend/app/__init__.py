@@ -1,10 +1,21 @@
 # app/__init__.py
-from flask import Flask, request
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 from .config import Config
+from .services.upload_pipeline import UploadRequest
 
 def create_app():
     app = Flask(__name__)
+
+    # --- Upload limits ---
+    # File parts are spooled to disk past UPLOAD_SPOOL_THRESHOLD; whole requests
+    # larger than the receipt limit (plus form overhead) are rejected up front.
+    app.request_class = UploadRequest
+    app.config['MAX_CONTENT_LENGTH'] = Config.MAX_RECEIPT_UPLOAD_BYTES + 64 * 1024
+
+    @app.errorhandler(413)
+    def request_too_large(e):
+        return jsonify({'error': 'Upload too large', 'details': f'Maximum upload size is {Config.MAX_RECEIPT_UPLOAD_BYTES // (1024 * 1024)} MB.'}), 413
     
     # --- CORS Configuration ---
     CORS(
@@ -38,6 +49,8 @@ def create_app():
     from .routes import invitation_routes
     from .routes import ai_routes
     from .routes import user_routes 
+    from .routes import notification_routes
+    from .routes import recurring_routes
     
     app.register_blueprint(invitation_routes.inv_bp, url_prefix='/api/invitations')
     app.register_blueprint(utility_routes.util_bp, url_prefix='/api')
@@ -46,5 +59,17 @@ def create_app():
     app.register_blueprint(expense_routes.exp_bp, url_prefix='/api')
     app.register_blueprint(ai_routes.ai_bp, url_prefix='/api/ai')
     app.register_blueprint(user_routes.user_bp, url_prefix='/api')
+    app.register_blueprint(notification_routes.notif_bp, url_prefix='/api/notifications')
+    app.register_blueprint(recurring_routes.rec_bp, url_prefix='/api')
+
+    # --- Background jobs ---
+    if Config.NOTIFICATION_RETENTION_INTERVAL_SECONDS > 0:
+        from .services.scheduler import run_periodically
+        from .services.notification_retention import prune_notifications
+        run_periodically('notification-retention', Config.NOTIFICATION_RETENTION_INTERVAL_SECONDS, prune_notifications)
+    if Config.RECURRING_TICK_SECONDS > 0:
+        from .services.scheduler import run_periodically
+        from .services.recurring_engine import recurring_engine
+        run_periodically('recurring-expenses', Config.RECURRING_TICK_SECONDS, recurring_engine.tick, initial_delay=0)
     
     return app
@@ -1,6 +1,30 @@
+import hmac
 from functools import wraps
+from types import SimpleNamespace
 from flask import request, jsonify, g
 from app.extensions import supabase
+from app.config import Config
+from app.services.user_directory import email_resolver
+from app.auth.stream_tickets import verify_ticket, StreamTicketError
+
+def _authenticate(jwt):
+    """Resolves the token to g.user; returns an error response tuple, or None on success."""
+    if not jwt:
+        return jsonify({'error': 'Missing or invalid authorization token', 'details': 'Empty token.'}), 401
+
+    try:
+        user_response = supabase.auth.get_user(jwt)
+        
+        if not user_response or not hasattr(user_response, 'user') or not user_response.user:
+            return jsonify({'error': 'Invalid user token', 'details': 'Token is invalid or expired.'}), 401
+        g.user = user_response.user
+        # A new signup may have been cached as "no such user" by an earlier invite.
+        email_resolver.forget_missing(getattr(g.user, 'email', None))
+        
+    except Exception as e:
+        return jsonify({'error': 'Authentication error', 'details': str(e)}), 401
+
+    return None
 
 def auth_required(f):
     @wraps(f)
@@ -10,20 +34,54 @@ def auth_required(f):
         if not auth_header or not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Missing or invalid authorization token', 'details': 'No Bearer token found.'}), 401
         
-        jwt = auth_header.split(' ')[1]
-        if not jwt:
-            return jsonify({'error': 'Missing or invalid authorization token', 'details': 'Empty token.'}), 401
-
-        try:
-            user_response = supabase.auth.get_user(jwt)
-            
-            if not user_response or not hasattr(user_response, 'user') or not user_response.user:
-                return jsonify({'error': 'Invalid user token', 'details': 'Token is invalid or expired.'}), 401
-            g.user = user_response.user
-            
-        except Exception as e:
-            return jsonify({'error': 'Authentication error', 'details': str(e)}), 401
+        error = _authenticate(auth_header.split(' ')[1])
+        if error:
+            return error
         
         return f(*args, **kwargs)
     
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def stream_auth_required(f):
+    """
+    Like auth_required, but also accepts a ticket query parameter from
+    POST /api/notifications/stream-ticket, since the browser EventSource API
+    cannot set headers. The JWT itself is never accepted in the URL.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        if auth_header and auth_header.startswith('Bearer '):
+            error = _authenticate(auth_header.split(' ')[1])
+            if error:
+                return error
+            return f(*args, **kwargs)
+
+        try:
+            g.user = SimpleNamespace(id=verify_ticket(request.args.get('ticket')))
+        except StreamTicketError as e:
+            return jsonify({'error': 'Missing or invalid stream ticket', 'details': str(e)}), e.status
+
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+def admin_token_required(f):
+    """
+    For operational endpoints: requires the ADMIN_TOKEN in an X-Admin-Token
+    header. While ADMIN_TOKEN is unset the endpoint answers 404, as if it
+    did not exist.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = Config.ADMIN_TOKEN
+        if not expected:
+            return jsonify({'error': 'Not found'}), 404
+
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8')):
+            return jsonify({'error': 'Missing or invalid admin token'}), 401
+
+        return f(*args, **kwargs)
+
+    return decorated_function
@@ -0,0 +1,46 @@
+import base64
+import hashlib
+import hmac
+import time
+from app.config import Config
+
+
+class StreamTicketError(Exception):
+    """The ticket is malformed, forged or expired, or tickets are not configured. status is the HTTP status."""
+
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.status = status
+
+
+def _signature(body):
+    secret = Config.SSE_TICKET_SECRET
+    if not secret:
+        raise StreamTicketError('Event stream tickets are not configured', status=503)
+    return hmac.new(secret.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).digest()
+
+
+def issue_ticket(user_id, now=None):
+    """
+    A short-lived token that lets the browser's EventSource (which cannot
+    set headers) open the stream without putting the user's JWT in the URL,
+    where it would end up in access logs and browser history.
+    """
+    body = f"{user_id}:{int((now or time.time()) + Config.SSE_TICKET_TTL_SECONDS)}"
+    signature = base64.urlsafe_b64encode(_signature(body)).rstrip(b'=').decode('ascii')
+    return f"{body}:{signature}"
+
+
+def verify_ticket(ticket, now=None):
+    """Returns the user id the ticket was issued to."""
+    try:
+        user_id, expires_at, signature = ticket.rsplit(':', 2)
+        expires_at = int(expires_at)
+        signature = base64.urlsafe_b64decode(signature + '=' * (-len(signature) % 4))
+    except (AttributeError, ValueError):
+        raise StreamTicketError('Invalid stream ticket')
+    if not hmac.compare_digest(signature, _signature(f"{user_id}:{expires_at}")):
+        raise StreamTicketError('Invalid stream ticket')
+    if expires_at < (now or time.time()):
+        raise StreamTicketError('Stream ticket has expired')
+    return user_id
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +10,158 @@ class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+    # Receipt image preprocessing (before upload to Gemini)
+    RECEIPT_MAX_DIMENSION = int(os.getenv("RECEIPT_MAX_DIMENSION", "1600"))
+    RECEIPT_IMAGE_QUALITY = int(os.getenv("RECEIPT_IMAGE_QUALITY", "75"))
+    RECEIPT_OUTPUT_FORMAT = os.getenv("RECEIPT_OUTPUT_FORMAT", "JPEG").upper()
+    RECEIPT_GRAYSCALE = os.getenv("RECEIPT_GRAYSCALE", "true").lower() == "true"
+    RECEIPT_PREPROCESS_WORKERS = int(os.getenv("RECEIPT_PREPROCESS_WORKERS", "2"))
+    RECEIPT_PREPROCESS_TIMEOUT = float(os.getenv("RECEIPT_PREPROCESS_TIMEOUT", "10"))
+    RECEIPT_MAX_PIXELS = int(os.getenv("RECEIPT_MAX_PIXELS", str(50_000_000)))
+
+    # Local parser for text receipts / text-layer PDFs
+    RECEIPT_DATE_DAY_FIRST = os.getenv("RECEIPT_DATE_DAY_FIRST", "true").lower() == "true"
+    RECEIPT_PDF_MAX_PAGES = int(os.getenv("RECEIPT_PDF_MAX_PAGES", "5"))
+
+    # Uploads: hard size limit, in-memory threshold before spooling to disk, read chunk size
+    MAX_RECEIPT_UPLOAD_BYTES = int(os.getenv("MAX_RECEIPT_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+    UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(256 * 1024)))
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+    # Parsed receipt cache (exact SHA-256 match; a close perceptual hash only flags a possible duplicate)
+    RECEIPT_CACHE_DIR = os.getenv("RECEIPT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "coincious-receipt-cache"))
+    RECEIPT_CACHE_MEMORY_ENTRIES = int(os.getenv("RECEIPT_CACHE_MEMORY_ENTRIES", "256"))
+    RECEIPT_CACHE_DISK_ENTRIES = int(os.getenv("RECEIPT_CACHE_DISK_ENTRIES", "2000"))
+    RECEIPT_CACHE_PHASH_DISTANCE = int(os.getenv("RECEIPT_CACHE_PHASH_DISTANCE", "4"))
+
+    # Description typeahead: per-user tries kept in memory, rebuilt in the background when stale
+    SUGGEST_CACHE_MAX_BYTES = int(os.getenv("SUGGEST_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+    SUGGEST_MAX_PREFIX_CHARS = int(os.getenv("SUGGEST_MAX_PREFIX_CHARS", "12"))
+    SUGGEST_MAX_INDEXED_WORDS = int(os.getenv("SUGGEST_MAX_INDEXED_WORDS", "4"))
+    SUGGEST_MAX_DESCRIPTIONS = int(os.getenv("SUGGEST_MAX_DESCRIPTIONS", "2000"))
+    SUGGEST_REFRESH_SECONDS = int(os.getenv("SUGGEST_REFRESH_SECONDS", "600"))
+
+    # Notification outbox: writes are queued and dispatched in batches by a background thread
+    NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", "100"))
+    NOTIFICATION_OUTBOX_FLUSH_INTERVAL = float(os.getenv("NOTIFICATION_OUTBOX_FLUSH_INTERVAL", "0.5"))
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", "5"))
+    NOTIFICATION_OUTBOX_RETRY_DELAY = float(os.getenv("NOTIFICATION_OUTBOX_RETRY_DELAY", "0.5"))
+    # The queue is in memory: the longest a write may wait (digests included), i.e. what a hard kill can lose
+    NOTIFICATION_OUTBOX_MAX_DELAY_SECONDS = int(os.getenv("NOTIFICATION_OUTBOX_MAX_DELAY_SECONDS", "60"))
+    # Types merged into one row per (user, group) within the window; a digest interval > 0 holds them back instead
+    NOTIFICATION_COALESCE_TYPES = set(filter(None, os.getenv("NOTIFICATION_COALESCE_TYPES", "expense_owed,reminder,settlement_request").split(",")))
+    NOTIFICATION_COALESCE_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_COALESCE_WINDOW_SECONDS", "600"))
+    NOTIFICATION_DIGEST_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_SECONDS", "0"))
+
+    # Notifications API: page size bounds and how long an in-memory unread count is trusted
+    NOTIFICATIONS_PAGE_SIZE = int(os.getenv("NOTIFICATIONS_PAGE_SIZE", "20"))
+    NOTIFICATIONS_MAX_PAGE_SIZE = int(os.getenv("NOTIFICATIONS_MAX_PAGE_SIZE", "100"))
+    NOTIFICATION_COUNTER_RECONCILE_SECONDS = int(os.getenv("NOTIFICATION_COUNTER_RECONCILE_SECONDS", "300"))
+    NOTIFICATION_COUNTER_MAX_USERS = int(os.getenv("NOTIFICATION_COUNTER_MAX_USERS", "10000"))
+
+    # Set once migrations/001 has run: write and filter on notifications.group_id / invitation_id columns
+    NOTIFICATIONS_PROMOTED_COLUMNS = os.getenv("NOTIFICATIONS_PROMOTED_COLUMNS", "false").lower() == "true"
+
+    # Invitee email -> user id cache; "no such user" answers expire much sooner
+    EMAIL_RESOLVER_MAX_ENTRIES = int(os.getenv("EMAIL_RESOLVER_MAX_ENTRIES", "10000"))
+    EMAIL_RESOLVER_TTL_SECONDS = int(os.getenv("EMAIL_RESOLVER_TTL_SECONDS", "3600"))
+    EMAIL_RESOLVER_NEGATIVE_TTL_SECONDS = int(os.getenv("EMAIL_RESOLVER_NEGATIVE_TTL_SECONDS", "60"))
+
+    # Upper bound on emails per /groups/<id>/add-members request
+    GROUP_BULK_INVITE_MAX = int(os.getenv("GROUP_BULK_INVITE_MAX", "100"))
+
+    # Shareable join links (use counts and revocation need migrations/006): a dedicated HMAC
+    # secret, required for links to be issued, plus lifetime and use limits
+    INVITE_LINK_SECRET = os.getenv("INVITE_LINK_SECRET")
+    INVITE_LINK_BASE_URL = os.getenv("INVITE_LINK_BASE_URL", os.getenv("FRONTEND_URL", "http://localhost:3000"))
+    INVITE_LINK_DEFAULT_HOURS = int(os.getenv("INVITE_LINK_DEFAULT_HOURS", "168"))
+    INVITE_LINK_MAX_HOURS = int(os.getenv("INVITE_LINK_MAX_HOURS", "720"))
+    INVITE_LINK_DEFAULT_USES = int(os.getenv("INVITE_LINK_DEFAULT_USES", "50"))
+    INVITE_LINK_MAX_USES = int(os.getenv("INVITE_LINK_MAX_USES", "1000"))
+
+    # Set once migrations/003 has run: a repeated join through an invite link is then rejected by the
+    # unique index instead of being checked with a membership query first
+    GROUP_MEMBERS_UNIQUE_INDEX = os.getenv("GROUP_MEMBERS_UNIQUE_INDEX", "false").lower() == "true"
+
+    # Answer invitations with the respond_to_invitation RPC (migrations/002) instead of one call per step
+    INVITATION_RESPONSE_RPC = os.getenv("INVITATION_RESPONSE_RPC", "false").lower() == "true"
+
+    # Notification retention: read rows are kept READ_DAYS, anything else STALE_DAYS; 0 interval disables the job
+    NOTIFICATION_RETENTION_INTERVAL_SECONDS = int(os.getenv("NOTIFICATION_RETENTION_INTERVAL_SECONDS", "3600"))
+    NOTIFICATION_RETENTION_READ_DAYS = int(os.getenv("NOTIFICATION_RETENTION_READ_DAYS", "30"))
+    NOTIFICATION_RETENTION_STALE_DAYS = int(os.getenv("NOTIFICATION_RETENTION_STALE_DAYS", "180"))
+    NOTIFICATION_RETENTION_BATCH_SIZE = int(os.getenv("NOTIFICATION_RETENTION_BATCH_SIZE", "500"))
+    NOTIFICATION_RETENTION_MAX_BATCHES = int(os.getenv("NOTIFICATION_RETENTION_MAX_BATCHES", "20"))
+    NOTIFICATION_RETENTION_PAUSE_SECONDS = float(os.getenv("NOTIFICATION_RETENTION_PAUSE_SECONDS", "0.2"))
+
+    # Server-sent events: heartbeat interval, per-stream queue cap and open streams per user.
+    # Each open stream holds a worker thread, so the stream is off unless SSE_ENABLED is set
+    # and the server runs threaded workers (see the Procfile); streams end after
+    # SSE_MAX_STREAM_SECONDS and the browser reconnects. The stream is opened with a
+    # short-lived ticket signed with SSE_TICKET_SECRET instead of the JWT in the URL.
+    SSE_ENABLED = os.getenv("SSE_ENABLED", "false").lower() == "true"
+    SSE_MAX_STREAM_SECONDS = float(os.getenv("SSE_MAX_STREAM_SECONDS", "300"))
+    SSE_TICKET_SECRET = os.getenv("SSE_TICKET_SECRET")
+    SSE_TICKET_TTL_SECONDS = int(os.getenv("SSE_TICKET_TTL_SECONDS", "60"))
+    SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    EVENT_HUB_MAX_PENDING = int(os.getenv("EVENT_HUB_MAX_PENDING", "100"))
+    EVENT_HUB_MAX_STREAMS_PER_USER = int(os.getenv("EVENT_HUB_MAX_STREAMS_PER_USER", "5"))
+
+    # Shared secret for operational endpoints such as /api/health/upstreams (sent as X-Admin-Token); unset hides them
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+    # Edge-function proxy: pooled keep-alive session, timeouts and pass-through chunk size
+    PROXY_CONNECT_TIMEOUT = float(os.getenv("PROXY_CONNECT_TIMEOUT", "3.05"))
+    PROXY_READ_TIMEOUT = float(os.getenv("PROXY_READ_TIMEOUT", "30"))
+    PROXY_POOL_SIZE = int(os.getenv("PROXY_POOL_SIZE", "20"))
+    PROXY_CHUNK_SIZE = int(os.getenv("PROXY_CHUNK_SIZE", str(16 * 1024)))
+
+    # Read totals from spending_rollups (migrations/005); set once the backfill has run
+    SPENDING_ROLLUPS = os.getenv("SPENDING_ROLLUPS", "false").lower() == "true"
+    SPENDING_ROLLUP_BACKFILL_BATCH_SIZE = int(os.getenv("SPENDING_ROLLUP_BACKFILL_BATCH_SIZE", "100"))
+    SPENDING_ROLLUP_BACKFILL_PAUSE_SECONDS = float(os.getenv("SPENDING_ROLLUP_BACKFILL_PAUSE_SECONDS", "0.2"))
+
+    # Closed-period analytics: kept with no TTL, one JSON file per user under PERIOD_CACHE_DIR ('' = memory only)
+    PERIOD_CACHE_DIR = os.getenv("PERIOD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "coincious-period-cache"))
+    PERIOD_CACHE_MAX_USERS = int(os.getenv("PERIOD_CACHE_MAX_USERS", "5000"))
+    PERIOD_CACHE_MAX_ENTRIES_PER_USER = int(os.getenv("PERIOD_CACHE_MAX_ENTRIES_PER_USER", "120"))
+    PERIOD_CACHE_DISK_USERS = int(os.getenv("PERIOD_CACHE_DISK_USERS", "20000"))
+
+    # Range totals: per-user Fenwick trees over daily spending, kept in each worker's memory and rebuilt after REBUILD
+    # seconds. A write is reported to one worker only, so REBUILD bounds how stale the other workers' totals can be.
+    RANGE_INDEX_MAX_USERS = int(os.getenv("RANGE_INDEX_MAX_USERS", "1000"))
+    RANGE_INDEX_REBUILD_SECONDS = int(os.getenv("RANGE_INDEX_REBUILD_SECONDS", "300"))
+    RANGE_INDEX_PAGE_SIZE = int(os.getenv("RANGE_INDEX_PAGE_SIZE", "1000"))
+    RANGE_INDEX_HEADROOM_DAYS = int(os.getenv("RANGE_INDEX_HEADROOM_DAYS", "366"))
+
+    # /expenses/range rows: fetched day intervals cached per user, gaps fetched PAGE_SIZE rows at a time
+    RANGE_CACHE_MAX_USERS = int(os.getenv("RANGE_CACHE_MAX_USERS", "1000"))
+    RANGE_CACHE_TTL_SECONDS = int(os.getenv("RANGE_CACHE_TTL_SECONDS", "600"))
+    RANGE_CACHE_MAX_ROWS_PER_USER = int(os.getenv("RANGE_CACHE_MAX_ROWS_PER_USER", "5000"))
+    RANGE_CACHE_PAGE_SIZE = int(os.getenv("RANGE_CACHE_PAGE_SIZE", "1000"))
+    # Largest limit= a filtered /expenses/range request may ask for
+    RANGE_QUERY_MAX_LIMIT = int(os.getenv("RANGE_QUERY_MAX_LIMIT", "1000"))
+
+    # Recurring expenses: rules are scheduled in memory and due runs written every TICK seconds.
+    # Needs migrations/004; while TICK is 0 (the default) /api/recurring-expenses proxies to the edge function.
+    RECURRING_TICK_SECONDS = int(os.getenv("RECURRING_TICK_SECONDS", "0"))
+    RECURRING_EXPENSES_FUNCTION_URL = os.getenv(
+        "RECURRING_EXPENSES_FUNCTION_URL",
+        "https://xmuallpfxwgapaxawrwk.supabase.co/functions/v1/recurring-personal-expenses"
+    )
+    RECURRING_RELOAD_SECONDS = int(os.getenv("RECURRING_RELOAD_SECONDS", "300"))
+    RECURRING_LOAD_PAGE_SIZE = int(os.getenv("RECURRING_LOAD_PAGE_SIZE", "1000"))
+    RECURRING_INSERT_BATCH_SIZE = int(os.getenv("RECURRING_INSERT_BATCH_SIZE", "500"))
+    RECURRING_MAX_PER_TICK = int(os.getenv("RECURRING_MAX_PER_TICK", "5000"))
+    RECURRING_CATCHUP_DAYS = int(os.getenv("RECURRING_CATCHUP_DAYS", "31"))
+    RECURRING_UPCOMING_DAYS = int(os.getenv("RECURRING_UPCOMING_DAYS", "30"))
+    RECURRING_MAX_RULES_PER_USER = int(os.getenv("RECURRING_MAX_RULES_PER_USER", "100"))
+
+    # Per-user cache of proxied GETs: fresh for TTL, then served stale while refreshed in the background
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+    RESPONSE_CACHE_STALE_SECONDS = int(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "600"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+
     # CORS configuration
     CORS_ORIGINS = [
         "http://localhost:3000",
@@ -1,10 +1,22 @@
 from flask import Blueprint, request, jsonify, g
 from app.auth.decorators import auth_required
 from app.services.categorizer_service import categorizer
+from app.services.receipt_cache import receipt_cache
+from app.services.suggestion_service import get_suggestions, suggestion_index
+from app.services.upload_pipeline import receive_upload, UploadTooLarge
 import json
+import math
 
 cat_bp = Blueprint('categorizer_api', __name__)
 
+def _form_amount(form_data):
+    """The posted amount as a float, or None when it is missing or not a finite number."""
+    try:
+        amount = float(form_data.get('amount', ''))
+    except ValueError:
+        return None
+    return amount if math.isfinite(amount) else None
+
 @cat_bp.route('/categorize', methods=['POST'])
 @auth_required
 def api_categorize():
@@ -20,30 +32,66 @@ def api_categorize():
     
     if manual_category:
         categorizer.learn_new_rule(user.id, description, manual_category)
+        suggestion_index.record(user.id, description, manual_category, _form_amount(form_data))
         return jsonify({'status': 'learning_successful', 'learned': {description: manual_category}})
     else:
         result = categorizer.find_category(user.id, description)
         return jsonify(result)
 
 
+@cat_bp.route('/categorize/suggest', methods=['GET'])
+@auth_required
+def api_categorize_suggest():
+    try:
+        limit = int(request.args.get('limit', 5))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer.'}), 400
+
+    data, status = get_suggestions(g.user.id, request.args.get('q', ''), max(limit, 1))
+    return jsonify(data), status
+
+
 @cat_bp.route('/parse-bill', methods=['POST'])
 @auth_required
 def api_parse_bill():
 
-    if 'image' not in request.files:
-        return jsonify({'error': 'No image file provided. Use form-data with key "image".'}), 400
-
-    image_file = request.files['image']
-    if image_file.filename == '':
-        return jsonify({'error': 'Empty filename for uploaded image.'}), 400
+    pasted_text = request.form.get('text', '').strip()
+    if 'image' not in request.files and not pasted_text:
+        return jsonify({'error': 'No image file provided. Use form-data with key "image" (or "text" for a pasted receipt).'}), 400
 
     try:
-        image_bytes = image_file.read()
-        mime_type = image_file.mimetype or 'image/jpeg'
+        if 'image' not in request.files:
+            cached, sha, phash = receipt_cache.get(g.user.id, pasted_text.encode('utf-8'))
+            if cached is not None:
+                return jsonify({'parsed': cached, 'cached': True})
+
+            parsed, source = categorizer.parse_bill_text(pasted_text)
+            receipt_cache.put(g.user.id, sha, phash, parsed)
+            return jsonify({'parsed': parsed, 'source': source})
+
+        image_file = request.files['image']
+        if image_file.filename == '':
+            return jsonify({'error': 'Empty filename for uploaded image.'}), 400
+
+        upload = receive_upload(image_file)
+
+        cached, sha, phash = receipt_cache.get(g.user.id, upload.open(), sha=upload.sha256)
+        if cached is not None:
+            return jsonify({'parsed': cached, 'cached': True})
+        # A similar-looking photo may be another receipt from the same till, so it is parsed anyway.
+        possible_duplicate = receipt_cache.near_duplicate(g.user.id, phash) is not None
 
-        parsed = categorizer.parse_bill_image(image_bytes, mime_type)
+        if upload.mime_type == 'application/pdf':
+            parsed, source = categorizer.parse_bill_pdf(upload)
+        elif upload.mime_type.startswith('text/'):
+            parsed, source = categorizer.parse_bill_text(upload.read_all().decode('utf-8', errors='replace'))
+        else:
+            parsed, source = categorizer.parse_bill_upload(upload), 'ai'
+        receipt_cache.put(g.user.id, sha, phash, parsed)
         
-        return jsonify({'parsed': parsed})
+        return jsonify({'parsed': parsed, 'source': source, 'possible_duplicate': possible_duplicate})
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
     except json.JSONDecodeError:
         return jsonify({'error': 'Model returned non-JSON or invalid JSON response.'}), 502
     except RuntimeError as e:
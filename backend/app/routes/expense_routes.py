@@ -1,8 +1,6 @@
 from flask import Blueprint, request, jsonify, g
 from app.auth.decorators import auth_required
 from app.services import expense_service
-from datetime import datetime
-from app.extensions import supabase
 
 exp_bp = Blueprint('expense_api', __name__)
 
@@ -27,6 +25,13 @@ def api_expense_monthly_donut():
     response, status_code = expense_service.get_monthly_donut_data(user_id, period)
     return jsonify(response), status_code
 
+@exp_bp.route('/expenses/changed', methods=['POST'])
+@auth_required
+def expenses_changed():
+    data = request.get_json(silent=True) or {}
+    response, status_code = expense_service.notify_expenses_changed(g.user.id, data.get('dates'), data.get('group_id'))
+    return jsonify(response), status_code
+
 @exp_bp.route('/expenses/range', methods=['GET'])
 @auth_required
 def get_expenses_range():
@@ -37,28 +42,35 @@ def get_expenses_range():
     if not start_date or not end_date:
         return jsonify({'error': 'start_date and end_date are required'}), 400
 
-    # Call the service function we just created
-    response, status_code = expense_service.get_expenses_by_date_range(user_id, start_date, end_date)
+    params = {key: request.args[key] for key in expense_service.RANGE_QUERY_PARAMS if request.args.get(key)}
+    response, status_code = expense_service.get_expenses_by_date_range(user_id, start_date, end_date, params)
     
     return jsonify(response), status_code
 
-@exp_bp.route('/current-month-total', methods=['GET'])
+@exp_bp.route('/expenses/range/total', methods=['GET'])
 @auth_required
-def get_current_month_total():
-    try:
-        user_id = g.user.id
-        today = datetime.today()
-        start_of_month = today.replace(day=1).strftime('%Y-%m-%d')
-        response = supabase.table('expenses')\
-            .select('amount')\
-            .eq('payer_id', user_id)\
-            .gte('date', start_of_month)\
-            .execute()
-        expenses = response.data
-        total_amount = sum(float(item['amount']) for item in expenses)
+def get_expenses_range_total():
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if not start_date or not end_date:
+        return jsonify({'error': 'start_date and end_date are required'}), 400
 
-        return jsonify({'total': total_amount}), 200
+    response, status_code = expense_service.get_range_total(g.user.id, start_date, end_date)
+    return jsonify(response), status_code
 
-    except Exception as e:
-        print(f"Error calculating monthly total: {e}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+@exp_bp.route('/expenses/daily-totals', methods=['GET'])
+@auth_required
+def get_daily_totals():
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if not start_date or not end_date:
+        return jsonify({'error': 'start_date and end_date are required'}), 400
+
+    response, status_code = expense_service.get_daily_totals(g.user.id, start_date, end_date)
+    return jsonify(response), status_code
+
+@exp_bp.route('/current-month-total', methods=['GET'])
+@auth_required
+def get_current_month_total():
+    response, status_code = expense_service.get_current_month_total(g.user.id)
+    return jsonify(response), status_code
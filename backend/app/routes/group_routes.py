@@ -48,6 +48,35 @@ def add_group_member(group_id):
     response, status_code = group_service.add_group_member(group_id, requesting_user, data)
     return jsonify(response), status_code
 
+@group_bp.route('/<group_id>/add-members', methods=['POST'])
+@auth_required
+def add_group_members(group_id):
+    requesting_user = g.user
+    data = request.get_json()
+    response, status_code = group_service.add_group_members_bulk(group_id, requesting_user, data)
+    return jsonify(response), status_code
+
+@group_bp.route('/<group_id>/invite-links', methods=['POST'])
+@auth_required
+def create_invite_link(group_id):
+    user_id = g.user.id
+    data = request.get_json(silent=True)
+    response, status_code = group_service.create_invite_link(group_id, user_id, data)
+    return jsonify(response), status_code
+
+@group_bp.route('/<group_id>/invite-links/<token>', methods=['DELETE'])
+@auth_required
+def revoke_invite_link(group_id, token):
+    response, status_code = group_service.revoke_invite_link(group_id, g.user.id, token)
+    return jsonify(response), status_code
+
+@group_bp.route('/join/<token>', methods=['POST'])
+@auth_required
+def join_group(token):
+    user_id = g.user.id
+    response, status_code = group_service.join_group_with_link(token, user_id)
+    return jsonify(response), status_code
+
 @group_bp.route('/<group_id>/balances', methods=['GET'])
 @auth_required
 def get_group_balances(group_id):
@@ -0,0 +1,115 @@
+from flask import Blueprint, Response, request, jsonify, g
+import time
+from app.auth.decorators import auth_required, stream_auth_required
+from app.auth.stream_tickets import issue_ticket, StreamTicketError
+from app.config import Config
+from app.services import notification_service
+from app.services.event_hub import event_hub, format_event, CLOSE
+
+notif_bp = Blueprint('notification_api', __name__)
+
+@notif_bp.route('/', methods=['GET'], strict_slashes=False)
+@auth_required
+def get_notifications():
+    """
+    Lists notifications newest first. Query params: limit, cursor (from the
+    previous page's next_cursor), type (repeatable or comma-separated) and
+    unread=true.
+    """
+    try:
+        limit = int(request.args.get('limit', 0)) or None
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer.'}), 400
+
+    types = [t for value in request.args.getlist('type') for t in value.split(',') if t]
+    unread_only = request.args.get('unread', '').lower() in ('1', 'true', 'yes')
+
+    response, status = notification_service.get_notifications_page(
+        g.user.id,
+        limit=limit,
+        cursor=request.args.get('cursor'),
+        types=types,
+        unread_only=unread_only
+    )
+    return jsonify(response), status
+
+@notif_bp.route('/unread-count', methods=['GET'])
+@auth_required
+def get_unread_count():
+    response, status = notification_service.get_unread_count(g.user.id)
+    return jsonify(response), status
+
+@notif_bp.route('/mark-read', methods=['POST'])
+@auth_required
+def mark_read():
+    """Body: {"ids": [...]} to mark specific notifications, or {"all": true}."""
+    data = request.get_json(silent=True) or {}
+    response, status = notification_service.mark_notifications_read(
+        g.user.id,
+        notification_ids=data.get('ids'),
+        mark_all=bool(data.get('all'))
+    )
+    return jsonify(response), status
+
+@notif_bp.route('/<notification_id>/read', methods=['POST'])
+@auth_required
+def mark_one_read(notification_id):
+    response, status = notification_service.mark_notifications_read(g.user.id, notification_ids=[notification_id])
+    if status == 200 and not response.get('updated'):
+        return jsonify({'error': 'Notification not found or already read'}), 404
+    return jsonify(response), status
+
+@notif_bp.route('/stream-ticket', methods=['POST'])
+@auth_required
+def stream_ticket():
+    """A short-lived ticket for opening the event stream: GET /stream?ticket=..."""
+    if not Config.SSE_ENABLED:
+        return jsonify({'error': 'Event stream is disabled'}), 503
+    try:
+        return jsonify({'ticket': issue_ticket(g.user.id), 'expires_in': Config.SSE_TICKET_TTL_SECONDS}), 200
+    except StreamTicketError as e:
+        return jsonify({'error': str(e)}), e.status
+
+@notif_bp.route('/stream', methods=['GET'])
+@stream_auth_required
+def stream():
+    """
+    Server-sent events for new notifications and changes to the user's
+    groups. A comment line is sent every SSE_HEARTBEAT_SECONDS so proxies
+    keep the connection open and dead clients are noticed. The stream ends
+    after SSE_MAX_STREAM_SECONDS so it does not hold a worker thread
+    forever; the browser reconnects after the retry delay.
+
+    Events are published through this process's event hub only, so the
+    server must run one worker process (with threads) for every stream to
+    see every event.
+    """
+    if not Config.SSE_ENABLED:
+        return jsonify({'error': 'Event stream is disabled'}), 503
+    user_id = g.user.id
+    try:
+        topics = notification_service.get_stream_topics(user_id)
+    except Exception as e:
+        print(f"Error opening event stream: {e}")
+        return jsonify({'error': 'Failed to open event stream'}), 500
+
+    def events():
+        subscriber = event_hub.subscribe(user_id, topics)
+        try:
+            yield 'retry: 5000\n' + format_event('ready', {'topics': len(topics)})
+            ends_at = time.monotonic() + Config.SSE_MAX_STREAM_SECONDS
+            while True:
+                remaining = ends_at - time.monotonic()
+                if remaining <= 0:
+                    return
+                message = event_hub.next_message(subscriber, min(Config.SSE_HEARTBEAT_SECONDS, remaining))
+                if message is CLOSE:
+                    return
+                yield message if message is not None else ': heartbeat\n\n'
+        finally:
+            event_hub.unsubscribe(subscriber)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
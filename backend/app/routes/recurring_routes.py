@@ -0,0 +1,50 @@
+from flask import Blueprint, request, jsonify, g
+from app.auth.decorators import auth_required
+from app.config import Config
+from app.services import recurring_service
+from app.routes.utility_routes import recurring_expenses_proxy
+
+rec_bp = Blueprint('recurring_api', __name__)
+
+def _engine_disabled():
+    """The 503 answer for rule writes while RECURRING_TICK_SECONDS is 0, or None."""
+    if Config.RECURRING_TICK_SECONDS > 0:
+        return None
+    return jsonify({'error': 'Recurring expense rules are not enabled'}), 503
+
+@rec_bp.route('/recurring-expenses', methods=['GET'])
+@auth_required
+def list_recurring_expenses():
+    if Config.RECURRING_TICK_SECONDS <= 0:
+        return recurring_expenses_proxy()
+    response, status = recurring_service.list_recurring_expenses(g.user.id)
+    return jsonify(response), status
+
+@rec_bp.route('/recurring-expenses', methods=['POST'])
+@auth_required
+def create_recurring_expense():
+    disabled = _engine_disabled()
+    if disabled:
+        return disabled
+    data = request.get_json(silent=True) or {}
+    response, status = recurring_service.create_recurring_expense(g.user.id, data)
+    return jsonify(response), status
+
+@rec_bp.route('/recurring-expenses/<rule_id>', methods=['PUT'])
+@auth_required
+def update_recurring_expense(rule_id):
+    disabled = _engine_disabled()
+    if disabled:
+        return disabled
+    data = request.get_json(silent=True) or {}
+    response, status = recurring_service.update_recurring_expense(g.user.id, rule_id, data)
+    return jsonify(response), status
+
+@rec_bp.route('/recurring-expenses/<rule_id>', methods=['DELETE'])
+@auth_required
+def delete_recurring_expense(rule_id):
+    disabled = _engine_disabled()
+    if disabled:
+        return disabled
+    response, status = recurring_service.delete_recurring_expense(g.user.id, rule_id)
+    return jsonify(response), status
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, g
 from app.auth.decorators import auth_required
 from app.extensions import supabase 
+from app.services.user_directory import email_resolver
 import traceback
 
 
@@ -16,6 +17,7 @@ def delete_user_account():
         
         admin_auth = supabase.auth.admin
         admin_auth.delete_user(user_id)
+        email_resolver.invalidate(g.user.email)
         
         print(f"--- SUCCESSFULLY DELETED USER: {user_id} ---")
         return jsonify({"message": "User account permanently deleted"}), 200
@@ -1,16 +1,61 @@
 # app/routes/utility_routes.py
-from flask import Blueprint, request, jsonify
-import requests
-import os
+from flask import Blueprint, request, jsonify, g
+import base64
+import hashlib
+import json
 from app.config import Config
-from app.auth.decorators import auth_required
+from app.auth.decorators import admin_token_required
+from app.services.upstream_proxy import upstream_proxy, stream_response, read_response, bytes_response, UpstreamError
+from app.services.response_cache import response_cache
 
 util_bp = Blueprint('utility_api', __name__)
 
+def _upstream_headers(auth_header):
+    return {
+        'Authorization': auth_header,
+        'Content-Type': request.headers.get('Content-Type', 'application/json'),
+        # The body is passed through still encoded, so ask only for what the client accepts.
+        'Accept-Encoding': request.headers.get('Accept-Encoding', 'identity')
+    }
+
+def _token_identity(auth_header):
+    """
+    (user id, token digest) for the bearer token, or (None, None) if it is not
+    a JWT. The user id is read without verifying the token: it only indexes
+    entries for invalidation. Cached responses are keyed by the token digest,
+    so they are only ever served to the token that fetched them.
+    """
+    try:
+        token = auth_header.split(' ', 1)[1]
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return str(claims['sub']), hashlib.sha256(token.encode('utf-8')).hexdigest()
+    except Exception:
+        return None, None
+
+def _cached_get(upstream, url, auth_header, user_id, token_key):
+    """Serves a GET through the per-user response cache."""
+    encoding = 'gzip' if 'gzip' in request.headers.get('Accept-Encoding', '') else 'identity'
+    headers = _upstream_headers(auth_header)
+    headers['Accept-Encoding'] = encoding
+    params = request.args.to_dict(flat=False)
+
+    def fetch():
+        return read_response(upstream_proxy.request(upstream, 'GET', url, headers=headers, params=params))
+
+    key = (token_key, request.full_path, encoding)
+    status, response_headers, body, state = response_cache.get(user_id, key, fetch)
+    return bytes_response(status, response_headers, body, cache_state=state)
+
 @util_bp.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'ok', 'message': 'Backend is running'})
 
+@util_bp.route('/health/upstreams', methods=['GET'])
+@admin_token_required
+def upstream_metrics():
+    return jsonify({'upstreams': upstream_proxy.stats()})
+
 @util_bp.route('/supabase/proxy/<path:subpath>', methods=['GET', 'POST'])
 def supabase_proxy(subpath):
     auth_header = request.headers.get('Authorization')
@@ -22,57 +67,58 @@ def supabase_proxy(subpath):
 
     url = f"{supabase_url.rstrip('/')}/functions/v1/make-server-7f88878c/{subpath}"
     
-    headers = {
-        'Authorization': auth_header,
-        'Content-Type': 'application/json'
-    }
-    
+    upstream = f"proxy/{subpath.split('/')[0]}"
+    user_id, token_key = _token_identity(auth_header)
+
     try:
-        if request.method == 'GET':
-            response = requests.get(url, headers=headers, params=request.args)
-        else:
-            response = requests.post(url, headers=headers, json=request.get_json())
-        
-        if 'application/json' in response.headers.get('Content-Type', ''):
-            return jsonify(response.json()), response.status_code
-        else:
-            return response.text, response.status_code
+        if request.method == 'GET' and token_key:
+            return _cached_get(upstream, url, auth_header, user_id, token_key)
+
+        response = upstream_proxy.request(
+            upstream,
+            request.method,
+            url,
+            headers=_upstream_headers(auth_header),
+            params=request.args if request.method == 'GET' else None,
+            data=request.get_data() if request.method == 'POST' else None
+        )
+        if request.method == 'POST' and user_id:
+            # Edge-function writes can change what the cached analytics show.
+            response_cache.invalidate_user(user_id)
+        return stream_response(response)
             
+    except UpstreamError as e:
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
-@util_bp.route('/recurring-expenses', methods=['GET'])
-@auth_required
-def get_recurring_expenses():
+
+def recurring_expenses_proxy():
+    """
+    GET /api/recurring-expenses through the recurring-personal-expenses edge
+    function, used while the in-process recurring engine is disabled.
+    """
     try:
-        
         auth_header = request.headers.get('Authorization')
         if not auth_header:
             return jsonify({"error": "Missing auth header"}), 401
 
-        
-        FUNCTION_URL = 'https://xmuallpfxwgapaxawrwk.supabase.co/functions/v1/recurring-personal-expenses'
-
-        
-        headers = {
-            'Authorization': auth_header,
-            'Content-Type': 'application/json'
-        }
-
-        
-        response = requests.get(FUNCTION_URL, headers=headers)
-
-        
-        response.raise_for_status() 
+        _, token_key = _token_identity(auth_header)
+        if token_key:
+            return _cached_get('recurring-personal-expenses', Config.RECURRING_EXPENSES_FUNCTION_URL, auth_header, g.user.id, token_key)
 
-        
-        return response.json(), 200
+        response = upstream_proxy.request(
+            'recurring-personal-expenses',
+            'GET',
+            Config.RECURRING_EXPENSES_FUNCTION_URL,
+            headers=_upstream_headers(auth_header)
+        )
+        if response.status_code >= 400:
+            print(f"Supabase Function Error: {response.status_code}")
+        return stream_response(response)
 
-    except requests.exceptions.HTTPError as http_err:
-       
-        print(f"Supabase Function Error: {http_err.response.text}")
-        return http_err.response.text, http_err.response.status_code
+    except UpstreamError as e:
+        print(f"Error in /api/recurring-expenses proxy: {e}")
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
-        
-        print(f"Error in /api/recurring-expenses proxy: {e}") 
+        print(f"Error in /api/recurring-expenses proxy: {e}")
         return jsonify({"error": "Internal server error"}), 500
@@ -1,12 +1,23 @@
 import json
 import base64
 import os
+from cachetools import TTLCache
 from app.extensions import supabase, gemini_model
+from app.services.rule_normalizer import normalize_keyword, compact_keywords, keyword_matches
+from app.services.merchant_canonicalizer import merchant_index
+from app.services.receipt_preprocessor import preprocess_in_pool
+from app.services.receipt_text_parser import parse_receipt_text, extract_pdf_text, has_required_fields
 
 class ExpenseCategorizer:
     def __init__(self):
         self.supabase = supabase
         self.model = gemini_model
+        # AI answers keyed by (user, canonical merchant or normalized keyword),
+        # so spelling variants of one merchant cost a single Gemini call.
+        self.ai_category_cache = TTLCache(maxsize=2000, ttl=3600)
+
+    def _merchant_key(self, description):
+        return merchant_index.canonicalize(description) or normalize_keyword(description)
 
     def _get_user_rules(self, user_id):
         """Fetches all learned rules for a specific user from the Supabase database."""
@@ -25,15 +36,16 @@ class ExpenseCategorizer:
     def learn_new_rule(self, user_id, description, category):
         """Saves a new learned keyword for a specific user to the Supabase database."""
         print(f"Learning rule for user {user_id}: '{description}' -> '{category}'")
-        keyword = description.lower()
+        keyword = self._merchant_key(description)
         
         try:
             response = self.supabase.table('user_categories').select('keywords').eq('user_id', user_id).eq('category_name', category).execute()
             
             if response and hasattr(response, 'data') and response.data:
-                existing_keywords = response.data[0]['keywords']
-                if keyword not in existing_keywords:
-                    new_keywords = existing_keywords + [keyword]
+                existing_keywords = response.data[0]['keywords'] or []
+                already_covered = keyword in existing_keywords or any(keyword_matches(key, keyword) for key in existing_keywords)
+                if not already_covered:
+                    new_keywords = compact_keywords(existing_keywords + [keyword])
                     self.supabase.table('user_categories').update({'keywords': new_keywords}).eq('user_id', user_id).eq('category_name', category).execute()
                     print(f"Updated keywords for category '{category}'")
             else:
@@ -47,12 +59,106 @@ class ExpenseCategorizer:
         except Exception as e:
             print(f"Error saving new rule to Supabase: {e}")
 
+    def compact_user_rules(self, user_id=None):
+        """
+        Re-normalizes and de-duplicates stored keywords. Compacts one user's
+        rules, or every row in user_categories when user_id is None.
+        Returns before/after keyword counts.
+        """
+        page_size = 500
+        stats = {'rows': 0, 'rows_updated': 0, 'keywords_before': 0, 'keywords_after': 0}
+        offset = 0
+
+        while True:
+            query = self.supabase.table('user_categories').select('user_id', 'category_name', 'keywords')
+            if user_id is not None:
+                query = query.eq('user_id', user_id)
+            response = query.order('user_id').order('category_name').range(offset, offset + page_size - 1).execute()
+            rows = response.data if response and hasattr(response, 'data') and response.data else []
+
+            for row in rows:
+                keywords = row.get('keywords') or []
+                compacted = compact_keywords(keywords)
+                stats['rows'] += 1
+                stats['keywords_before'] += len(keywords)
+                stats['keywords_after'] += len(compacted)
+
+                if compacted != keywords:
+                    self.supabase.table('user_categories') \
+                        .update({'keywords': compacted}) \
+                        .eq('user_id', row['user_id']) \
+                        .eq('category_name', row['category_name']) \
+                        .execute()
+                    stats['rows_updated'] += 1
+
+            if len(rows) < page_size:
+                break
+            offset += page_size
+
+        print(f"Compacted user rules: {stats}")
+        return stats
+
     def parse_bill_image(self, image_bytes, mime_type):
         if not self.model:
             raise RuntimeError("Gemini model not configured")
 
+        image_bytes, mime_type = preprocess_in_pool(image_bytes, mime_type)
         base64_image = base64.b64encode(image_bytes).decode('utf-8')
+        return self._parse_bill_with_model({"mime_type": mime_type, "data": base64_image})
+
+    def parse_bill_upload(self, upload):
+        """
+        Same as parse_bill_image, but for a SpooledUpload: the image is
+        decoded and downscaled straight from the spooled file. The Gemini SDK
+        (google-generativeai 0.3) only takes inline data, so the downscaled
+        image, or the original when it cannot be decoded, is held in memory
+        as raw bytes for the call; no base64 copy is made (the SDK decodes
+        base64 strings back into bytes anyway).
+        """
+        if not self.model:
+            raise RuntimeError("Gemini model not configured")
 
+        processed, mime_type = preprocess_in_pool(upload.open(), upload.mime_type)
+        if not isinstance(processed, bytes):
+            processed = upload.read_all()
+        return self._parse_bill_with_model({"mime_type": mime_type, "data": processed})
+
+    def parse_bill_text(self, text):
+        """
+        Parses a digital receipt (pasted e-mail text) with the local rule
+        engine, and only asks Gemini when required fields are missing.
+        Returns (parsed, source).
+        """
+        parsed = parse_receipt_text(text)
+        if has_required_fields(parsed) or not self.model:
+            return parsed, 'local'
+
+        print("Local receipt parser missed required fields. Asking AI...")
+        return self._parse_bill_with_model(f"Receipt text:\n{text}"), 'ai'
+
+    def parse_bill_pdf(self, upload):
+        """
+        Parses a PDF bill from its text layer when it has one; scanned PDFs or
+        incomplete local results are sent to Gemini as a PDF document.
+        Returns (parsed, source).
+        """
+        text = extract_pdf_text(upload.open())
+        parsed = None
+        if text:
+            parsed = parse_receipt_text(text)
+            if has_required_fields(parsed):
+                return parsed, 'local'
+
+        if not self.model:
+            if parsed:
+                return parsed, 'local'
+            raise RuntimeError("Gemini model not configured")
+
+        print("PDF bill has no usable text layer. Asking AI...")
+        # Inline raw bytes: the SDK has no way to send a file from disk.
+        return self._parse_bill_with_model({"mime_type": "application/pdf", "data": upload.read_all()}), 'ai'
+
+    def _parse_bill_with_model(self, document_part):
         system_prompt = (
             "You are a precise receipt/bill parser. Extract fields and return STRICT JSON only. "
             "Fields: vendor_name, issue_date, due_date, subtotal, tax, tip, total, currency, "
@@ -63,10 +169,7 @@ class ExpenseCategorizer:
 
         content = [
             system_prompt,
-            {
-                "mime_type": mime_type,
-                "data": base64_image
-            },
+            document_part,
             (
                 "Respond ONLY with JSON in this schema: {\n"
                 "  \"vendor_name\": string|null,\n"
@@ -94,14 +197,29 @@ class ExpenseCategorizer:
     def find_category(self, user_id, description):
         """Main categorization logic: User's DB -> GenAI Fallback -> Learn."""
         lower_desc = description.lower()
+        merchant = merchant_index.canonicalize(description)
+        # Rules match whole words, so appending the canonical merchant lets
+        # "starbuks" or "STARBUCKS #1234" hit a rule learned as "starbucks".
+        match_text = f"{lower_desc} {merchant}" if merchant else lower_desc
         
         user_rules = self._get_user_rules(user_id)
+        # A rule learned for the merchant itself beats a word rule, so a Food
+        # rule for "apple" cannot claim "Apple Music subscription".
+        if merchant:
+            for category, keywords in user_rules.items():
+                if merchant in (keywords or []):
+                    return {"category": category, "source": "user_dictionary"}
         for category, keywords in user_rules.items():
-            if any(key in lower_desc for key in keywords):
+            if any(keyword_matches(key, match_text) for key in keywords or []):
                 return {"category": category, "source": "user_dictionary"}
 
         if not self.model:
             return {"category": "Other", "source": "no_ai_fallback"}
+
+        cache_key = (user_id, merchant or normalize_keyword(description))
+        cached_category = self.ai_category_cache.get(cache_key)
+        if cached_category:
+            return {"category": cached_category, "source": "ai_cache"}
             
         print(f"'{description}' not in user rules. Asking AI...")
         prompt = self._build_ai_prompt(description, list(user_rules.keys()))
@@ -114,6 +232,7 @@ class ExpenseCategorizer:
             ai_category = ai_result.get("category")
 
             if ai_category and ai_category != "Other":
+                self.ai_category_cache[cache_key] = ai_category
                 self.learn_new_rule(user_id, description, ai_category)
                 return {"category": ai_category, "source": "ai"}
 
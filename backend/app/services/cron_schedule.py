@@ -0,0 +1,152 @@
+import calendar
+from bisect import bisect_left
+from datetime import timedelta, timezone
+from functools import lru_cache
+
+ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+MONTH_NAMES = {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+DAY_NAMES = {'sun': 0, 'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5, 'sat': 6}
+
+# (name, low, high, names) for minute, hour, day of month, month, day of week.
+FIELDS = (
+    ('minute', 0, 59, {}),
+    ('hour', 0, 23, {}),
+    ('day of month', 1, 31, {}),
+    ('month', 1, 12, MONTH_NAMES),
+    ('day of week', 0, 7, DAY_NAMES),
+)
+
+# next_after() gives up after this many years without a match.
+SEARCH_YEARS = 8
+
+
+class CronError(ValueError):
+    """The schedule expression is malformed or can never fire."""
+
+
+def _parse_value(text, low, high, names, field):
+    value = names.get(text.lower()) if names else None
+    if value is None:
+        if not text.isdigit():
+            raise CronError(f"Invalid {field} value '{text}'")
+        value = int(text)
+    if not low <= value <= high:
+        raise CronError(f"{field} value {value} is outside {low}-{high}")
+    return value
+
+
+def _parse_field(text, field, low, high, names):
+    """Returns (sorted allowed values, True if the field is '*')."""
+    values = set()
+    for item in text.split(','):
+        part, _, step_text = item.partition('/')
+        step = 1
+        if step_text:
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(f"Invalid step '{step_text}' in {field}")
+            step = int(step_text)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start = _parse_value(start_text, low, high, names, field)
+            end = _parse_value(end_text, low, high, names, field)
+            if start > end:
+                raise CronError(f"Invalid range '{part}' in {field}")
+        else:
+            start = _parse_value(part, low, high, names, field)
+            end = high if step_text else start
+        values.update(range(start, end + 1, step))
+    return sorted(values), text == '*'
+
+
+class CronSchedule:
+    """
+    A five-field cron expression (minute hour day-of-month month day-of-week),
+    evaluated in UTC. Supports '*', lists, ranges, steps, month and weekday
+    names, and the @daily/@weekly/@monthly/@yearly/@hourly aliases. As in
+    cron, when both day fields are restricted a day matching either fires.
+    """
+
+    def __init__(self, expression):
+        self.expression = ' '.join(expression.split())
+        fields = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise CronError('A schedule needs five fields: minute hour day-of-month month day-of-week')
+
+        parsed = [_parse_field(text, *spec) for text, spec in zip(fields, FIELDS)]
+        (self.minutes, _), (self.hours, _), (self.days, self.any_day), (self.months, _), (weekdays, self.any_weekday) = parsed
+        # 7 is Sunday too.
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self.day_set = frozenset(self.days)
+
+        if self.any_weekday and not self.any_day:
+            longest = max(calendar.monthrange(2000, month)[1] for month in self.months)
+            if self.days[0] > longest:
+                raise CronError(f"Schedule '{self.expression}' never fires")
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.day_set
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day and self.any_weekday:
+            return True
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """The first time strictly after moment (aware, or naive UTC) the schedule fires, or None."""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        t = moment.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        last_year = t.year + SEARCH_YEARS
+
+        while t.year <= last_year:
+            if t.month not in self.months:
+                i = bisect_left(self.months, t.month)
+                if i < len(self.months):
+                    t = t.replace(month=self.months[i], day=1, hour=0, minute=0)
+                else:
+                    t = t.replace(year=t.year + 1, month=self.months[0], day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if t.hour not in self.hours:
+                i = bisect_left(self.hours, t.hour)
+                if i < len(self.hours):
+                    t = t.replace(hour=self.hours[i], minute=0)
+                else:
+                    t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            i = bisect_left(self.minutes, t.minute)
+            if i < len(self.minutes):
+                return t.replace(minute=self.minutes[i])
+            t = t.replace(minute=0) + timedelta(hours=1)
+        return None
+
+    def __repr__(self):
+        return f"CronSchedule('{self.expression}')"
+
+
+@lru_cache(maxsize=1024)
+def _cached_schedule(expression):
+    return CronSchedule(expression)
+
+
+def parse_schedule(expression):
+    """Parses a cron expression, sharing one CronSchedule per distinct expression. Raises CronError."""
+    if not isinstance(expression, str) or not expression.strip():
+        raise CronError('Schedule is required')
+    return _cached_schedule(' '.join(expression.split()))
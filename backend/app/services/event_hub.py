@@ -0,0 +1,172 @@
+import json
+import queue
+import threading
+from app.config import Config
+
+# Returned by next_message when the subscriber has been displaced and the stream should end.
+CLOSE = object()
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+RESYNC_MESSAGE = format_event('resync', {'reason': 'too many pending events; refetch state'})
+
+
+class Subscriber:
+    __slots__ = ('user_id', 'topics', 'queue', 'pending', 'overflowed', 'closed')
+
+    def __init__(self, user_id, topics):
+        self.user_id = user_id
+        self.topics = set(topics)
+        self.queue = queue.SimpleQueue()
+        self.pending = 0
+        self.overflowed = False
+        self.closed = False
+
+
+class EventHub:
+    """
+    In-process pub/sub for the server-sent events stream. Each open stream
+    is a Subscriber on its user topic ("user:<id>") and one topic per group
+    ("group:<id>"). Events are formatted once per publish and fanned out to
+    per-subscriber queues. A slow subscriber's queue is capped at
+    EVENT_HUB_MAX_PENDING: past that, its events are dropped and it gets one
+    'resync' event telling the client to refetch.
+
+    The hub is per process: an event published in one worker process never
+    reaches a stream held by another, so the stream needs a single worker
+    process serving requests on threads.
+    """
+
+    def __init__(self):
+        self.topics = {}
+        self.by_user = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id, topics):
+        user_id = str(user_id)
+        subscriber = Subscriber(user_id, topics)
+        displaced = []
+        with self.lock:
+            streams = self.by_user.setdefault(user_id, [])
+            streams.append(subscriber)
+            # Cap open streams per user (e.g. many tabs); the oldest ones are closed.
+            while len(streams) > Config.EVENT_HUB_MAX_STREAMS_PER_USER:
+                displaced.append(streams.pop(0))
+            for topic in subscriber.topics:
+                self.topics.setdefault(topic, set()).add(subscriber)
+        for old in displaced:
+            self._close(old)
+        return subscriber
+
+    def _close(self, subscriber):
+        self.unsubscribe(subscriber)
+        subscriber.closed = True
+        subscriber.queue.put(CLOSE)
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            for topic in subscriber.topics:
+                subscribers = self.topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self.topics[topic]
+            streams = self.by_user.get(subscriber.user_id)
+            if streams and subscriber in streams:
+                streams.remove(subscriber)
+                if not streams:
+                    del self.by_user[subscriber.user_id]
+
+    def attach(self, user_id, topic):
+        """Adds a topic to every open stream of a user, e.g. after they join a group."""
+        with self.lock:
+            for subscriber in self.by_user.get(str(user_id), ()):
+                subscriber.topics.add(topic)
+                self.topics.setdefault(topic, set()).add(subscriber)
+
+    def detach(self, user_id, topic):
+        with self.lock:
+            for subscriber in self.by_user.get(str(user_id), ()):
+                subscriber.topics.discard(topic)
+                subscribers = self.topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self.topics[topic]
+
+    def publish(self, topic, event, data):
+        """Returns the number of subscribers the event was queued for."""
+        with self.lock:
+            subscribers = list(self.topics.get(topic, ()))
+            if not subscribers:
+                return 0
+            message = format_event(event, data)
+            delivered = 0
+            for subscriber in subscribers:
+                if subscriber.overflowed:
+                    continue
+                if subscriber.pending >= Config.EVENT_HUB_MAX_PENDING:
+                    subscriber.overflowed = True
+                    subscriber.queue.put(RESYNC_MESSAGE)
+                    continue
+                subscriber.pending += 1
+                subscriber.queue.put(message)
+                delivered += 1
+        return delivered
+
+    def next_message(self, subscriber, timeout):
+        """
+        Blocks up to timeout seconds for the subscriber's next event. Returns
+        the formatted message, None on timeout (time for a heartbeat), or
+        CLOSE if the stream has been displaced.
+        """
+        try:
+            message = subscriber.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if message is CLOSE:
+            return CLOSE
+        with self.lock:
+            if message is RESYNC_MESSAGE:
+                # Everything still queued predates the resync; drop it.
+                while True:
+                    try:
+                        if subscriber.queue.get_nowait() is CLOSE:
+                            return CLOSE
+                    except queue.Empty:
+                        break
+                subscriber.pending = 0
+                subscriber.overflowed = False
+            else:
+                subscriber.pending -= 1
+        return message
+
+    def stats(self):
+        with self.lock:
+            return {
+                'users': len(self.by_user),
+                'streams': sum(len(streams) for streams in self.by_user.values()),
+                'topics': len(self.topics),
+            }
+
+
+event_hub = EventHub()
+
+
+def publish_to_user(user_id, event, data):
+    try:
+        return event_hub.publish(f"user:{user_id}", event, data)
+    except Exception as e:
+        print(f"Error publishing {event} to user {user_id}: {e}")
+        return 0
+
+
+def publish_to_group(group_id, event, data):
+    try:
+        return event_hub.publish(f"group:{group_id}", event, data)
+    except Exception as e:
+        print(f"Error publishing {event} to group {group_id}: {e}")
+        return 0
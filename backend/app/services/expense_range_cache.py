@@ -0,0 +1,147 @@
+import threading
+import time
+from datetime import timedelta
+from cachetools import LRUCache
+from app.config import Config
+from app.services.spending_rollups import to_day
+
+ONE_DAY = timedelta(days=1)
+
+
+def gaps(intervals, start, end):
+    """The parts of the inclusive day range [start, end] that the sorted, disjoint intervals do not cover."""
+    missing = []
+    cursor = start
+    for first, last in intervals:
+        if last < cursor:
+            continue
+        if first > end:
+            break
+        if first > cursor:
+            missing.append((cursor, first - ONE_DAY))
+        cursor = max(cursor, last + ONE_DAY)
+        if cursor > end:
+            return missing
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+def merge(intervals, first, last):
+    """Adds [first, last] to the sorted, disjoint intervals, joining any it overlaps or touches."""
+    merged = []
+    for a, b in intervals:
+        if b + ONE_DAY < first or a > last + ONE_DAY:
+            merged.append((a, b))
+        else:
+            first, last = min(first, a), max(last, b)
+    merged.append((first, last))
+    merged.sort()
+    return merged
+
+
+def remove_day(intervals, day):
+    """The intervals with day cut out of them."""
+    result = []
+    for first, last in intervals:
+        if not first <= day <= last:
+            result.append((first, last))
+            continue
+        if first < day:
+            result.append((first, day - ONE_DAY))
+        if day < last:
+            result.append((day + ONE_DAY, last))
+    return result
+
+
+class ExpenseRangeCache:
+    """
+    Per-user cache of the rows behind /expenses/range, keyed by UTC day.
+
+    Each user has the sorted, disjoint day intervals fetched so far and
+    their rows grouped by day. A request is answered from the cache where
+    it is covered; only the missing gaps are fetched, and they are merged
+    into the intervals (adjacent ones join). A write punches its days out
+    of the intervals, so they alone are fetched again; a write with unknown
+    dates, or a user over RANGE_CACHE_MAX_ROWS_PER_USER rows, drops the
+    user. Users are also forgotten RANGE_CACHE_TTL_SECONDS after their
+    first fetch, in case a write went unreported.
+    """
+
+    def __init__(self, max_users=None):
+        self.max_users = max_users
+        self.users = None
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def _users(self):
+        # Sized on first use so that importing this module does not read Config.
+        if self.users is None:
+            self.users = LRUCache(maxsize=self.max_users or Config.RANGE_CACHE_MAX_USERS)
+        return self.users
+
+    def _entry(self, user_id):
+        """The user's cached intervals and rows. Caller holds the lock."""
+        users = self._users()
+        entry = users.get(user_id)
+        if entry is None or time.monotonic() - entry['created'] >= Config.RANGE_CACHE_TTL_SECONDS:
+            entry = users[user_id] = {'intervals': [], 'days': {}, 'rows': 0, 'created': time.monotonic()}
+        return entry
+
+    def get(self, user_id, start, end, fetch):
+        """
+        Rows for the inclusive UTC day range [start, end], newest day first.
+        fetch(first, last) returns the rows of an uncached day range in the
+        order they should be listed within a day.
+        """
+        user_id = str(user_id)
+        with self.lock:
+            missing = gaps(self._entry(user_id)['intervals'], start, end)
+            generation = self.generations.get(user_id, 0)
+
+        fetched = [(first, last, fetch(first, last)) for first, last in missing]
+
+        with self.lock:
+            entry = self._users().get(user_id)
+            if entry is None or self.generations.get(user_id, 0) != generation:
+                # A write landed while fetching; what is cached may be missing it.
+                raced = True
+            else:
+                raced = False
+                for first, last, rows in fetched:
+                    # A concurrent request may have stored part of this gap already.
+                    for a, b in gaps(entry['intervals'], first, last):
+                        for row in rows:
+                            day = to_day(row['date'])
+                            if a <= day <= b:
+                                entry['days'].setdefault(day, []).append(row)
+                                entry['rows'] += 1
+                        entry['intervals'] = merge(entry['intervals'], a, b)
+                result = []
+                day = end
+                while day >= start:
+                    result.extend(entry['days'].get(day, ()))
+                    day -= ONE_DAY
+                if entry['rows'] > Config.RANGE_CACHE_MAX_ROWS_PER_USER:
+                    del self._users()[user_id]
+        if raced:
+            return fetch(start, end)
+        return result
+
+    def invalidate(self, user_id, days=None):
+        """Forgets days (dates) of the user's rows, or all of them if days is None."""
+        user_id = str(user_id)
+        with self.lock:
+            self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            if days is None:
+                self._users().pop(user_id, None)
+                return
+            entry = self._users().get(user_id)
+            if entry is None:
+                return
+            for day in days:
+                entry['intervals'] = remove_day(entry['intervals'], day)
+                entry['rows'] -= len(entry['days'].pop(day, ()))
+
+
+expense_range_cache = ExpenseRangeCache()
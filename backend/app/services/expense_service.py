@@ -3,6 +3,13 @@ import traceback
 import calendar
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
+from app.config import Config
+from app.services.response_cache import response_cache
+from app.services import spending_rollups
+from app.services.period_cache import period_cache
+from app.services.range_index import range_index
+from app.services.expense_range_cache import expense_range_cache
+from app.services.suggestion_service import suggestion_index
 
 def get_group_expenses(group_id, user_id):
     try:
@@ -66,6 +73,39 @@ def get_group_expenses(group_id, user_id):
 
 EXP_TABLE = "expenses"
 
+def notify_expenses_changed(user_id, dates=None, group_id=None):
+    """
+    Called after a user's expenses were written outside the backend (the
+    frontend writes to Supabase directly). Drops the cached responses, and
+    the closed-period results containing one of dates (the old and new dates
+    of the written expenses); all of them if dates are missing or unreadable.
+    A group expense can be paid by, and split with, other members, so with
+    group_id the caches of every member of the group are dropped; user_id
+    must be one of them.
+    """
+    user_ids = [str(user_id)]
+    if group_id:
+        try:
+            members = supabase.table("group_members").select("user_id").eq("group_id", group_id).execute().data or []
+        except Exception as e:
+            print(f"Error reading members of group {group_id}: {e}")
+            return {'error': 'Internal server error'}, 500
+        user_ids = [str(m['user_id']) for m in members]
+        if str(user_id) not in user_ids:
+            return {'error': 'You are not a member of this group'}, 403
+
+    try:
+        days = [spending_rollups.to_day(value) for value in dates] if dates else None
+    except (TypeError, ValueError):
+        days = None
+    for member_id in user_ids:
+        response_cache.invalidate_user(member_id)
+        period_cache.invalidate(member_id, days)
+        range_index.invalidate(member_id, days)
+        expense_range_cache.invalidate(member_id, days)
+        suggestion_index.invalidate(member_id)
+    return {'message': 'Expense caches cleared'}, 200
+
 def _month_window(year: int, month: int):
     """Returns the UTC start and end datetime for the given month."""
     start = datetime(year, month, 1, 0, 0, 0, tzinfo=timezone.utc)
@@ -96,43 +136,164 @@ def _fetch_expenses(supabase_client, user_id, start, end):
         })
     return results
 
+def _summary(sums):
+    return [{"category": k, "total": round(v, 2)} for k, v in sorted(sums.items(), key=lambda kv: kv[1], reverse=True)]
+
 def _sum_by_category(rows):
     sums = defaultdict(float)
     for r in rows:
         sums[r["category"]] += r["amount"]
-    return [{"category": k, "total": round(v, 2)} for k, v in sorted(sums.items(), key=lambda kv: kv[1], reverse=True)]
+    return _summary(sums)
 
-def get_expenses_by_date_range(user_id, start_date, end_date):
+def _day_range(start_date, end_date):
+    """(start, end, None) as UTC days, or (None, None, error response) when they are unusable."""
     try:
-        # Query expenses for the user within the specific date range
-        # We order by date descending to show newest first in the list
-        response = (
+        start, end = spending_rollups.to_day(start_date), spending_rollups.to_day(end_date)
+    except ValueError:
+        return None, None, ({"error": "start_date and end_date must be ISO 8601 dates"}, 400)
+    if start > end:
+        return None, None, ({"error": "start_date must not be after end_date"}, 400)
+    return start, end, None
+
+# /expenses/range output fields and the expenses columns each one is built from
+RANGE_FIELDS = {
+    "id": "id",
+    "title": "description",
+    "amount": "amount",
+    "category": "category",
+    "date": "date",
+    "type": "group_id",
+}
+RANGE_SORTS = {"date": "date", "amount": "amount", "category": "category", "title": "description"}
+RANGE_QUERY_PARAMS = ("category", "type", "min_amount", "max_amount", "sort", "limit", "fields")
+
+def _range_options(params):
+    """
+    Validated filters for /expenses/range from its query parameters, or None
+    when there are none (the cached listing). Returns (options, error response).
+    """
+    if not params:
+        return None, None
+    options = {
+        "categories": [c.strip() for c in (params.get("category") or "").split(",") if c.strip()],
+        "type": params.get("type"),
+        "min_amount": None,
+        "max_amount": None,
+        "sort": ("date", True),
+        "limit": None,
+        "fields": list(RANGE_FIELDS),
+    }
+    if options["type"] not in (None, "group", "personal"):
+        return None, ({"error": "type must be 'group' or 'personal'"}, 400)
+    try:
+        for key in ("min_amount", "max_amount"):
+            if params.get(key) is not None:
+                options[key] = float(params[key])
+        if params.get("limit") is not None:
+            options["limit"] = int(params["limit"])
+    except ValueError:
+        return None, ({"error": "min_amount and max_amount must be numbers and limit an integer"}, 400)
+    if options["min_amount"] is not None and options["max_amount"] is not None and options["min_amount"] > options["max_amount"]:
+        return None, ({"error": "min_amount must not be above max_amount"}, 400)
+    if options["limit"] is not None and not 1 <= options["limit"] <= Config.RANGE_QUERY_MAX_LIMIT:
+        return None, ({"error": f"limit must be between 1 and {Config.RANGE_QUERY_MAX_LIMIT}"}, 400)
+    if params.get("sort"):
+        key = params["sort"].strip()
+        desc = key.startswith("-")
+        if key.lstrip("-") not in RANGE_SORTS:
+            return None, ({"error": f"sort must be one of {', '.join(RANGE_SORTS)}, optionally prefixed with '-'"}, 400)
+        options["sort"] = (RANGE_SORTS[key.lstrip("-")], desc)
+    if params.get("fields"):
+        fields = [f.strip() for f in params["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in RANGE_FIELDS]
+        if unknown or not fields:
+            return None, ({"error": f"fields must be among {', '.join(RANGE_FIELDS)}"}, 400)
+        options["fields"] = [f for f in RANGE_FIELDS if f in fields]
+    return options, None
+
+def _range_row(item, fields):
+    row = {}
+    for field in fields:
+        if field == "id":
+            row["id"] = item["id"]
+        elif field == "title":
+            row["title"] = item.get("description", "Untitled")
+        elif field == "amount":
+            row["amount"] = float(item["amount"])
+        elif field == "category":
+            row["category"] = item.get("category", "Other")
+        elif field == "date":
+            row["date"] = item.get("date")
+        elif field == "type":
+            # Determine if it is a group or personal expense
+            row["type"] = "group" if item.get("group_id") else "personal"
+    return row
+
+def _fetch_range_rows(user_id, first, last, options=None):
+    """
+    The user's expenses on the inclusive UTC days [first, last] as
+    /expenses/range rows, newest first unless options (from _range_options)
+    say otherwise. Filters, sorting, the limit and the selected columns are
+    all part of the PostgREST query.
+    """
+    fields = options["fields"] if options else list(RANGE_FIELDS)
+    sort_column, sort_desc = options["sort"] if options else ("date", True)
+    limit = options["limit"] if options else None
+    page_size = limit or Config.RANGE_CACHE_PAGE_SIZE
+    expenses = []
+    offset = 0
+    while True:
+        query = (
             supabase.table("expenses")
-            .select("id, description, amount, category, date, group_id, created_at")
+            .select(", ".join(RANGE_FIELDS[f] for f in fields))
             .eq("payer_id", user_id)
-            .gte("date", start_date)
-            .lte("date", end_date)
-            .order("date", desc=True)
+            .gte("date", first.isoformat())
+            .lt("date", (last + timedelta(days=1)).isoformat())
+        )
+        if options:
+            if options["categories"]:
+                query = query.in_("category", options["categories"])
+            if options["type"] == "group":
+                query = query.not_.is_("group_id", "null")
+            elif options["type"] == "personal":
+                query = query.is_("group_id", "null")
+            if options["min_amount"] is not None:
+                query = query.gte("amount", options["min_amount"])
+            if options["max_amount"] is not None:
+                query = query.lte("amount", options["max_amount"])
+        response = (
+            query.order(sort_column, desc=sort_desc)
+            .order("id")
+            .range(offset, offset + page_size - 1)
             .execute()
         )
-
         if hasattr(response, "error") and response.error:
-            return {"error": str(response.error)}, 500
+            raise Exception(str(response.error))
 
-        expenses = []
-        for item in response.data:
-            # Determine if it is a group or personal expense
-            expense_type = "group" if item.get("group_id") else "personal"
-            
-            expenses.append({
-                "id": item["id"],
-                "title": item.get("description", "Untitled"),
-                "amount": float(item["amount"]),
-                "category": item.get("category", "Other"),
-                "date": item.get("date"),
-                "type": expense_type
-            })
+        expenses.extend(_range_row(item, fields) for item in response.data)
+        if limit or len(response.data) < page_size:
+            return expenses
+        offset += page_size
 
+def get_expenses_by_date_range(user_id, start_date, end_date, params=None):
+    """
+    The user's expenses on the UTC days from start_date to end_date
+    (inclusive), newest first. params holds the optional RANGE_QUERY_PARAMS;
+    without any the listing comes from the interval cache.
+    """
+    start, end, error = _day_range(start_date, end_date)
+    if error:
+        return error
+    options, error = _range_options(params)
+    if error:
+        return error
+    try:
+        if options:
+            expenses = _fetch_range_rows(user_id, start, end, options)
+        else:
+            expenses = expense_range_cache.get(
+                user_id, start, end, lambda first, last: _fetch_range_rows(user_id, first, last)
+            )
         return expenses, 200
 
     except Exception as e:
@@ -154,10 +315,93 @@ def get_monthly_donut_data(user_id, period):
             year, month = now.year, now.month
 
         month_start, month_end = _month_window(year, month)
+        start_day, end_day = month_start.date(), month_end.date()
 
-        rows = _fetch_expenses(supabase, user_id, month_start, month_end)
-        summary = _sum_by_category(rows)
+        # A month that has ended only changes through backdated writes, which invalidate it.
+        summary = period_cache.get(user_id, "donut", start_day, end_day)
+        if summary is not None:
+            return summary, 200
+        generation = period_cache.generation(user_id)
+
+        if Config.SPENDING_ROLLUPS:
+            totals = spending_rollups.category_totals(user_id, start_day, end_day)
+            summary = _summary({category: t["total"] for category, t in totals.items()})
+        else:
+            rows = _fetch_expenses(supabase, user_id, month_start, month_end)
+            summary = _sum_by_category(rows)
+        period_cache.put(user_id, "donut", start_day, end_day, summary, generation)
         return summary, 200
     except Exception as e:
         print(f"Error in expense_monthly_donut: {e}")
-        return {"error": "Failed to fetch data", "details": str(e)}, 500
\ No newline at end of file
+        return {"error": "Failed to fetch data", "details": str(e)}, 500
+
+def get_current_month_total(user_id):
+    """Everything the user paid from the first of this month on."""
+    try:
+        start_of_month = datetime.today().replace(day=1).date()
+        if Config.SPENDING_ROLLUPS:
+            total_amount = spending_rollups.total_since(user_id, start_of_month)
+        else:
+            response = supabase.table('expenses')\
+                .select('amount')\
+                .eq('payer_id', user_id)\
+                .gte('date', start_of_month.strftime('%Y-%m-%d'))\
+                .execute()
+            total_amount = sum(float(item['amount']) for item in response.data)
+        return {'total': round(total_amount, 2)}, 200
+    except Exception as e:
+        print(f"Error calculating monthly total: {e}")
+        return {'error': str(e)}, 500
+
+def get_daily_totals(user_id, start_date, end_date):
+    """Per-day totals and counts (UTC days with spending) between two dates, for the calendar."""
+    start, end, error = _day_range(start_date, end_date)
+    if error:
+        return error
+    try:
+        cached = period_cache.get(user_id, "daily", start, end)
+        if cached is not None:
+            return cached, 200
+        generation = period_cache.generation(user_id)
+
+        if Config.SPENDING_ROLLUPS:
+            totals = spending_rollups.daily_totals(user_id, start, end)
+        else:
+            window_start = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+            window_end = datetime(end.year, end.month, end.day, 23, 59, 59, tzinfo=timezone.utc)
+            totals = defaultdict(lambda: {"total": 0.0, "count": 0})
+            for row in _fetch_expenses(supabase, user_id, window_start, window_end):
+                day = spending_rollups.to_day(row["date"])
+                totals[day]["total"] += row["amount"]
+                totals[day]["count"] += 1
+        result = [
+            {"date": day.isoformat(), "total": round(t["total"], 2), "count": t["count"]}
+            for day, t in sorted(totals.items())
+        ]
+        period_cache.put(user_id, "daily", start, end, result, generation)
+        return result, 200
+    except Exception as e:
+        print(f"Error fetching daily totals: {e}")
+        return {"error": str(e)}, 500
+
+def get_range_total(user_id, start_date, end_date):
+    """What the user paid between two dates (inclusive UTC days): total, count and per-category breakdown."""
+    start, end, error = _day_range(start_date, end_date)
+    if error:
+        return error
+    try:
+        totals = range_index.totals(user_id, start, end)
+        categories = [
+            {"category": category, "total": round(t["total"], 2), "count": t["count"]}
+            for category, t in sorted(totals.items(), key=lambda kv: kv[1]["total"], reverse=True)
+        ]
+        return {
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "total": round(sum(t["total"] for t in totals.values()), 2),
+            "count": sum(t["count"] for t in totals.values()),
+            "categories": categories,
+        }, 200
+    except Exception as e:
+        print(f"Error calculating range total: {e}")
+        return {"error": str(e)}, 500
@@ -1,7 +1,14 @@
 from app.extensions import supabase
 import traceback
 import json
-from app.services.notification_service import log_notification
+from app.services.notification_service import log_notification, log_group_notification, create_raw_notification, create_raw_notifications_bulk, clear_group_notifications, group_filter_column
+from app.services.event_hub import event_hub, publish_to_group
+from app.services.user_directory import email_resolver, EmailLookupError, normalize_email
+from app.config import Config
+from app.services.expense_service import notify_expenses_changed
+from app.services.invite_links import sign_invite, verify_invite, invite_link_uses, InviteLinkError
+from datetime import datetime, timezone
+import time
 
 def get_user_groups(user_id):
     try:
@@ -64,6 +71,7 @@ def create_new_group(user_id, group_name):
             return {'error': f'Failed to add member to group: {getattr(member_result, "error", "Insert failed")}'}, 500
             
         print("Group and member created successfully")
+        event_hub.attach(user_id, f"group:{group['id']}")
             
         return {
             'group': {
@@ -86,7 +94,7 @@ def delete_group(group_id, user_id):
         print(f"User {user_id} attempting to delete group {group_id}")
         
         group_result = supabase.table('groups') \
-            .select('created_by') \
+            .select('created_by, name') \
             .eq('id', group_id) \
             .maybe_single() \
             .execute()
@@ -105,11 +113,16 @@ def delete_group(group_id, user_id):
         print(f"Permission granted. Deleting group {group_id} and related data...")
         
         expenses_result = supabase.table('expenses') \
-            .select('id') \
+            .select('id,payer_id,date') \
             .eq('group_id', group_id) \
             .execute()
         
+        # The payers' cached totals and ranges include these expenses.
+        payer_dates = {}
         if expenses_result and hasattr(expenses_result, 'data') and expenses_result.data:
+            for exp in expenses_result.data:
+                if exp.get('payer_id'):
+                    payer_dates.setdefault(str(exp['payer_id']), []).append(exp.get('date'))
             expense_ids = [exp['id'] for exp in expenses_result.data]
             if expense_ids:
                 supabase.table('expense_split') \
@@ -123,6 +136,9 @@ def delete_group(group_id, user_id):
             .eq('group_id', group_id) \
             .execute()
         print("Deleted all expenses")
+        for payer_id, dates in payer_dates.items():
+            # An expense without a date clears all of the payer's cached periods.
+            notify_expenses_changed(payer_id, dates if all(dates) else None)
         
         supabase.table('group_invitations') \
             .delete() \
@@ -132,14 +148,16 @@ def delete_group(group_id, user_id):
 
         supabase.table('notifications') \
             .delete() \
-            .eq('data->>group_id', group_id) \
+            .eq(group_filter_column(), group_id) \
             .execute()
         print("Deleted all group-related notifications")
         
-        supabase.table('group_members') \
+        members_result = supabase.table('group_members') \
             .delete() \
             .eq('group_id', group_id) \
             .execute()
+        # The delete returns the removed rows: the members to tell once the group is gone.
+        member_ids = [m['user_id'] for m in (getattr(members_result, 'data', None) or []) if m.get('user_id')]
         print("Deleted all group members")
         
         delete_result = supabase.table('groups') \
@@ -152,6 +170,8 @@ def delete_group(group_id, user_id):
             return {'error': 'Failed to delete group'}, 500
 
         print(f"Group {group_id} and all related data deleted successfully.")
+        log_group_notification(group_id, user_id, f"\"{group_data.get('name') or 'A group'}\" was deleted", member_ids=member_ids)
+        publish_to_group(group_id, 'group_deleted', {'group_id': group_id})
         return {'message': 'Group deleted successfully'}, 200
         
     except Exception as e:
@@ -179,51 +199,16 @@ def add_group_member(group_id, requesting_user, data):
 
         group = group_response.data.get('groups')
 
-        target_user_id = None
         target_user_email = data['email'].lower()
         target_user_name_from_input = data.get('name', '').strip()
 
-        user_response = supabase.table('users') \
-            .select('*') \
-            .eq('email', target_user_email) \
-            .maybe_single() \
-            .execute()
-
-        user_data = user_response.data if user_response and hasattr(user_response, 'data') else None
-
-        if user_data:
-            target_user_id = user_data['id']
-        else:
-            try:
-                rpc_response = supabase.rpc('get_user_by_email', {
-                    'user_email': target_user_email
-                }).execute()
-
-                if not rpc_response or not hasattr(rpc_response, 'data') or not rpc_response.data:
-                    return {'error': 'User with this email does not exist in the system'}, 404
-
-                auth_user_data = rpc_response.data[0]
-                target_user_id = auth_user_data['id']
-                target_user_metadata = auth_user_data.get('raw_user_meta_data', {}) or {}
-
-                public_user_name = (
-                    target_user_metadata.get('full_name') or
-                    target_user_name_from_input or
-                    target_user_email.split('@')[0]
-                )
-                new_user_record = {
-                    'id': target_user_id,
-                    'email': target_user_email,
-                    'name': public_user_name
-                }
-                upsert_resp = supabase.table('users').upsert(new_user_record).execute()
-                if not upsert_resp or (hasattr(upsert_resp, 'error') and upsert_resp.error):
-                    print(f"Error upserting user to public.users: {getattr(upsert_resp, 'error', 'Unknown')}")
-                    return {'error': 'Failed to create user profile'}, 500
+        try:
+            target_user_id = email_resolver.resolve(target_user_email, name_hint=target_user_name_from_input)
+        except EmailLookupError as e:
+            return {'error': str(e)}, 500
 
-            except Exception as e:
-                print(f"Error looking up user in auth.users: {str(e)}")
-                return {'error': 'Error looking up user information'}, 500
+        if not target_user_id:
+            return {'error': 'User with this email does not exist in the system'}, 404
 
         if str(target_user_id) == str(requesting_user.id):
             return {'error': 'You cannot invite yourself to the group'}, 400
@@ -277,11 +262,7 @@ def add_group_member(group_id, requesting_user, data):
             }
         }
 
-        notification_result = supabase.table('notifications').insert(notification_payload).execute()
-        if not notification_result or not hasattr(notification_result, 'data') or not notification_result.data:
-
-            supabase.table('group_invitations').delete().eq('id', new_invitation_id).execute()
-            return {'error': 'Failed to send notification'}, 500
+        create_raw_notification(notification_payload)
 
         return {'message': 'Invitation sent successfully'}, 201
 
@@ -290,6 +271,280 @@ def add_group_member(group_id, requesting_user, data):
         print(f"Error adding member: {str(e)}\n{error_trace}")
         return {'error': str(e), 'trace': error_trace}, 500
 
+def _insert_invitations(rows):
+    """
+    Inserts invitation rows in one statement. If that fails (a concurrent
+    request invited one of the users first, or one row is bad), inserts them
+    one at a time so the rest still go through. Returns ({invited_user_id:
+    invitation id}, {invited_user_id: result for the rows that failed}).
+    """
+    try:
+        response = supabase.table('group_invitations').insert(rows).execute()
+        return {str(row['invited_user_id']): row['id'] for row in (getattr(response, 'data', None) or [])}, {}
+    except Exception as e:
+        print(f"Batch invitation insert failed, inserting {len(rows)} rows one by one: {e}")
+
+    invitation_ids, errors = {}, {}
+    for row in rows:
+        user_id = str(row['invited_user_id'])
+        try:
+            response = supabase.table('group_invitations').insert([row]).execute()
+            for inserted in getattr(response, 'data', None) or []:
+                invitation_ids[user_id] = inserted['id']
+        except Exception as e:
+            if 'duplicate' in str(e).lower() or '23505' in str(e):
+                errors[user_id] = {'status': 'already_invited', 'error': 'User already has a pending invitation for this group'}
+            else:
+                print(f"Error inviting user {user_id}: {e}")
+                errors[user_id] = {'status': 'error', 'error': 'Failed to create invitation'}
+    return invitation_ids, errors
+
+def add_group_members_bulk(group_id, requesting_user, data):
+    """
+    Invites several people at once. data is {'emails': [...]} or
+    {'members': [{'email', 'name'}, ...]}. Users are resolved in one batch,
+    existing members and pending invitations are checked with one query
+    each, and all invitations and notifications are written together.
+    Returns one result per email.
+    """
+    try:
+        if not requesting_user:
+            return {'error': 'Invalid user token'}, 401
+
+        data = data or {}
+        entries = data.get('members') or [{'email': email} for email in (data.get('emails') or [])]
+        if not entries:
+            return {'error': 'A list of emails is required'}, 400
+        if len(entries) > Config.GROUP_BULK_INVITE_MAX:
+            return {'error': f'At most {Config.GROUP_BULK_INVITE_MAX} emails can be invited at once'}, 400
+
+        group_response = supabase.table('group_members') \
+            .select('groups(id, name)') \
+            .eq('group_id', group_id) \
+            .eq('user_id', requesting_user.id) \
+            .maybe_single() \
+            .execute()
+
+        if not group_response or not hasattr(group_response, 'data') or not group_response.data or not group_response.data.get('groups'):
+            return {'error': 'Group not found or access denied'}, 404
+
+        group = group_response.data.get('groups')
+
+        results = {}
+        name_hints = {}
+        for entry in entries:
+            email = normalize_email(entry.get('email') if isinstance(entry, dict) else entry)
+            if not email or '@' not in email:
+                results.setdefault(email or '', {'email': email, 'status': 'invalid', 'error': 'Invalid email'})
+                continue
+            results.setdefault(email, None)
+            if isinstance(entry, dict) and entry.get('name'):
+                name_hints[email] = entry['name'].strip()
+
+        emails = [email for email, result in results.items() if result is None]
+        resolved, lookup_errors = email_resolver.resolve_many(emails, name_hints)
+
+        user_ids = {}
+        for email in emails:
+            if email in lookup_errors:
+                results[email] = {'email': email, 'status': 'error', 'error': lookup_errors[email]}
+            elif not resolved.get(email):
+                results[email] = {'email': email, 'status': 'not_found', 'error': 'User with this email does not exist in the system'}
+            elif str(resolved[email]) == str(requesting_user.id):
+                results[email] = {'email': email, 'status': 'self', 'error': 'You cannot invite yourself to the group'}
+            elif str(resolved[email]) in user_ids.values():
+                results[email] = {'email': email, 'status': 'duplicate', 'error': 'Same user as another email in this request'}
+            else:
+                user_ids[email] = str(resolved[email])
+
+        if user_ids:
+            members_resp = supabase.table('group_members') \
+                .select('user_id') \
+                .eq('group_id', group_id) \
+                .in_('user_id', list(user_ids.values())) \
+                .execute()
+            member_ids = {str(m['user_id']) for m in (members_resp.data or [])}
+
+            pending_resp = supabase.table('group_invitations') \
+                .select('invited_user_id') \
+                .eq('group_id', group_id) \
+                .eq('status', 'pending') \
+                .in_('invited_user_id', list(user_ids.values())) \
+                .execute()
+            pending_ids = {str(i['invited_user_id']) for i in (pending_resp.data or [])}
+
+            for email, user_id in list(user_ids.items()):
+                if user_id in member_ids:
+                    results[email] = {'email': email, 'status': 'already_member', 'error': 'User is already a member of this group'}
+                    del user_ids[email]
+                elif user_id in pending_ids:
+                    results[email] = {'email': email, 'status': 'already_invited', 'error': 'User already has a pending invitation for this group'}
+                    del user_ids[email]
+
+        if user_ids:
+            invitation_ids, insert_errors = _insert_invitations([
+                {
+                    'group_id': group_id,
+                    'invited_by_id': requesting_user.id,
+                    'invited_user_id': user_id,
+                    'status': 'pending'
+                }
+                for user_id in user_ids.values()
+            ])
+
+            requesting_user_name = requesting_user.user_metadata.get('full_name', requesting_user.email)
+            notification_payloads = []
+            for email, user_id in user_ids.items():
+                invitation_id = invitation_ids.get(user_id)
+                if user_id in insert_errors:
+                    results[email] = dict(insert_errors[user_id], email=email)
+                    continue
+                if not invitation_id:
+                    results[email] = {'email': email, 'status': 'error', 'error': 'Failed to create invitation'}
+                    continue
+                results[email] = {'email': email, 'status': 'invited', 'invitation_id': invitation_id}
+                notification_payloads.append({
+                    'user_id': user_id,
+                    'actor_id': requesting_user.id,
+                    'type': 'group_invitation',
+                    'actionable': True,
+                    'message': f"{requesting_user_name} invited you to join \"{group['name']}\"",
+                    'data': {
+                        'invitation_id': invitation_id,
+                        'group_id': group_id,
+                        'group_name': group['name'],
+                        'inviter_name': requesting_user_name
+                    }
+                })
+
+            if notification_payloads:
+                create_raw_notifications_bulk(notification_payloads)
+
+        results = list(results.values())
+        invited = sum(1 for result in results if result['status'] == 'invited')
+        print(f"Bulk invite to group {group_id}: {invited} of {len(results)} invited")
+        return {'results': results, 'invited': invited}, 201 if invited else 200
+
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Error adding members: {str(e)}\n{error_trace}")
+        return {'error': str(e), 'trace': error_trace}, 500
+
+def create_invite_link(group_id, user_id, data):
+    """
+    Creates a shareable join link for a group. data may set expires_in_hours
+    and max_uses. The token is signed, so joining needs no lookup.
+    """
+    try:
+        data = data or {}
+        try:
+            hours = int(data.get('expires_in_hours', Config.INVITE_LINK_DEFAULT_HOURS))
+            max_uses = int(data.get('max_uses', Config.INVITE_LINK_DEFAULT_USES))
+        except (TypeError, ValueError):
+            return {'error': 'expires_in_hours and max_uses must be numbers'}, 400
+        if not 0 < hours <= Config.INVITE_LINK_MAX_HOURS:
+            return {'error': f'expires_in_hours must be between 1 and {Config.INVITE_LINK_MAX_HOURS}'}, 400
+        if not 0 < max_uses <= Config.INVITE_LINK_MAX_USES:
+            return {'error': f'max_uses must be between 1 and {Config.INVITE_LINK_MAX_USES}'}, 400
+
+        group_response = supabase.table('group_members') \
+            .select('groups(id, name)') \
+            .eq('group_id', group_id) \
+            .eq('user_id', user_id) \
+            .maybe_single() \
+            .execute()
+
+        if not group_response or not hasattr(group_response, 'data') or not group_response.data or not group_response.data.get('groups'):
+            return {'error': 'Group not found or access denied'}, 404
+
+        group = group_response.data.get('groups')
+        expires_at = int(time.time()) + hours * 3600
+        token = sign_invite(group_id, expires_at, max_uses, created_by=user_id, group_name=group.get('name'))
+        invite_link_uses.register(verify_invite(token), created_by=user_id)
+
+        return {
+            'token': token,
+            'url': f"{Config.INVITE_LINK_BASE_URL.rstrip('/')}/join/{token}",
+            'group': {'id': group_id, 'name': group.get('name')},
+            'expires_at': datetime.fromtimestamp(expires_at, tz=timezone.utc).isoformat(),
+            'max_uses': max_uses
+        }, 201
+
+    except InviteLinkError as e:
+        return {'error': str(e)}, e.status
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Error creating invite link: {str(e)}\n{error_trace}")
+        return {'error': 'Internal server error', 'details': str(e), 'trace': error_trace}, 500
+
+def revoke_invite_link(group_id, user_id, token):
+    """Revokes a group's invite link so nobody else can join with it. Any member may revoke."""
+    try:
+        claims = verify_invite(token)
+        if claims['g'] != str(group_id):
+            return {'error': 'Invite link not found'}, 404
+
+        member_check = supabase.table('group_members').select('user_id') \
+            .eq('group_id', group_id).eq('user_id', user_id).maybe_single().execute()
+        if not member_check or not member_check.data:
+            return {'error': 'Group not found or access denied'}, 404
+
+        if not invite_link_uses.revoke(claims):
+            return {'error': 'Invite link not found'}, 404
+        return {'message': 'Invite link revoked'}, 200
+
+    except InviteLinkError as e:
+        return {'error': str(e)}, e.status
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Error revoking invite link: {str(e)}\n{error_trace}")
+        return {'error': 'Internal server error', 'details': str(e)}, 500
+
+def join_group_with_link(token, user_id):
+    """
+    Joins a group through a signed invite link. The token's signature and
+    expiry are checked locally, then one use is taken from the link's
+    database count (which also refuses revoked links). Existing members are
+    found with a select until GROUP_MEMBERS_UNIQUE_INDEX confirms that
+    migrations/003 has run; after that, the unique (group_id, user_id)
+    index turns a repeated insert into a no-op.
+    """
+    try:
+        claims = verify_invite(token)
+    except InviteLinkError as e:
+        return {'error': str(e)}, e.status
+
+    group_id = claims['g']
+    group = {'id': group_id, 'name': claims.get('name')}
+    try:
+        if not Config.GROUP_MEMBERS_UNIQUE_INDEX:
+            member_check = supabase.table('group_members').select('user_id') \
+                .eq('group_id', group_id).eq('user_id', user_id).execute()
+            if member_check.data:
+                return {'message': 'You are already a member of this group', 'group': group}, 200
+        invite_link_uses.claim(claims)
+    except InviteLinkError as e:
+        return {'error': str(e)}, e.status
+    except Exception as e:
+        print(f"Error checking invite link for group {group_id}: {str(e)}")
+        return {'error': 'Failed to join group', 'details': str(e)}, 500
+
+    try:
+        supabase.table('group_members').insert({'group_id': group_id, 'user_id': user_id}).execute()
+    except Exception as e:
+        invite_link_uses.release(claims)
+        if getattr(e, 'code', None) == '23505' or 'duplicate key' in str(e):
+            return {'message': 'You are already a member of this group', 'group': group}, 200
+        error_trace = traceback.format_exc()
+        print(f"Error joining group {group_id} with invite link: {str(e)}\n{error_trace}")
+        return {'error': 'Failed to join group', 'details': str(e)}, 500
+
+    print(f"User {user_id} joined group {group_id} with an invite link")
+    event_hub.attach(user_id, f"group:{group_id}")
+    log_group_notification(group_id, user_id, f"A new member joined \"{group['name'] or 'the group'}\" with an invite link")
+    publish_to_group(group_id, 'members_changed', {'group_id': group_id, 'added_user_id': user_id})
+    return {'message': 'Joined group successfully', 'group': group}, 201
+
 # backend/app/services/group_service.py
 
 def get_group_detail(group_id, user_id):
@@ -511,12 +766,13 @@ def settle_group_balance(group_id, user_id, data):
                 related_expense_id=new_expense_id
             )
             
-        supabase.table('notifications') \
-                .delete() \
-                .eq('user_id', from_id) \
-                .eq('data->>group_id', group_id) \
-                .in_('type', ['expense_owed', 'reminder', 'settlement_request']) \
-                .execute()
+        clear_group_notifications(from_id, group_id, ['expense_owed', 'reminder', 'settlement_request'])
+
+        log_group_notification(group_id, from_id, f"{from_user_name} settled up with {to_user_name}",
+                               skip=[to_id], related_expense_id=new_expense_id)
+        publish_to_group(group_id, 'balances_changed', {'group_id': group_id, 'expense_id': new_expense_id})
+        notify_expenses_changed(from_id, [expense_payload['date']])
+        notify_expenses_changed(to_id, [expense_payload['date']])
 
         return {'message': 'Settlement recorded successfully'}, 201
 
@@ -624,11 +880,14 @@ def remove_group_member(group_id, requesting_user_id, member_to_remove_id):
             }
         }
         
-        notification_result = supabase.table('notifications').insert(notification_payload).execute()
-        if not notification_result or not hasattr(notification_result, 'data') or not notification_result.data:
-            print("Warning: Failed to create notification for removed member")
+        create_raw_notification(notification_payload)
         
         print(f"Successfully removed member {member_to_remove_id} from group {group_id}")
+        event_hub.detach(member_to_remove_id, f"group:{group_id}")
+        log_group_notification(group_id, requesting_user_id,
+                               f"{requesting_user_name} removed a member from \"{group_data['name']}\"",
+                               skip=[member_to_remove_id])
+        publish_to_group(group_id, 'members_changed', {'group_id': group_id, 'removed_user_id': member_to_remove_id})
         return {'message': 'Member removed successfully'}, 200
         
     except Exception as e:
@@ -1,108 +1,168 @@
 from app.extensions import supabase
+from app.config import Config
 from app.services import notification_service
+from app.services.event_hub import event_hub, publish_to_group
 from datetime import datetime
 import traceback
 
-def respond_to_invitation(user, invitation_id, action):
+STATUS_FOR_ACTION = {'accept': 'accepted', 'decline': 'declined'}
+
+def _respond_via_rpc(invitation_id, user_id, action):
+    """One round-trip: the respond_to_invitation function in migrations/002 does every step in a transaction."""
+    response = supabase.rpc('respond_to_invitation', {
+        'p_invitation_id': str(invitation_id),
+        'p_user_id': str(user_id),
+        'p_action': action
+    }).execute()
+    return response.data or {'outcome': 'not_found'}
+
+def _respond_locally(invitation_id, user_id, action):
     """
-    Handles a user accepting or declining a group invitation.
+    Stand-in for the respond_to_invitation RPC, used until the migration is
+    applied (and by the tests). Same steps and return value, one call each.
     """
-    if action not in ['accept', 'decline']:
-        return {'error': 'Invalid action. Must be "accept" or "decline"'}, 400
+    target_status = STATUS_FOR_ACTION[action]
+    invitation_resp = supabase.table('group_invitations') \
+        .select('*, groups(name)') \
+        .eq('id', invitation_id) \
+        .eq('status', 'pending') \
+        .maybe_single() \
+        .execute()
 
-    try:
-        invitation_resp = supabase.table('group_invitations') \
+    if not invitation_resp or not hasattr(invitation_resp, 'data') or not invitation_resp.data:
+        # A retry of a response that already went through replays its result.
+        answered = supabase.table('group_invitations') \
             .select('*, groups(name)') \
             .eq('id', invitation_id) \
-            .eq('status', 'pending') \
             .maybe_single() \
             .execute()
-        
-        if not invitation_resp or not hasattr(invitation_resp, 'data') or not invitation_resp.data:
-            return {'error': 'Invitation not found or has already been actioned'}, 404
-        
-        invitation = invitation_resp.data
-    
-        if str(invitation['invited_user_id']) != str(user.id):
-            return {'error': 'You are not authorized to respond to this invitation'}, 403
+        invitation = answered.data if answered and hasattr(answered, 'data') else None
+        if invitation and invitation.get('status') == target_status \
+                and str(invitation.get('invited_user_id')) == str(user_id):
+            return {
+                'outcome': target_status,
+                'replayed': True,
+                'group_id': invitation['group_id'],
+                'group_name': (invitation.get('groups') or {}).get('name'),
+                'invited_by_id': invitation['invited_by_id']
+            }
+        return {'outcome': 'not_found'}
 
-        user_name = user.user_metadata.get('full_name', user.email)
-        group_name = invitation.get('groups', {}).get('name', 'the group')
+    invitation = invitation_resp.data
 
-        notification_payload = None
-        status_payload = {}
+    if str(invitation['invited_user_id']) != str(user_id):
+        return {'outcome': 'forbidden'}
 
-        if action == 'accept':
-            # Check if user is already a member
-            existing_member = supabase.table('group_members') \
-                .select('user_id') \
-                .eq('group_id', invitation['group_id']) \
-                .eq('user_id', user.id) \
-                .maybe_single() \
-                .execute()
-            
-            # Only add as member if not already present
-            if not existing_member or not hasattr(existing_member, 'data') or not existing_member.data:
-                member_payload = {
-                    'group_id': invitation['group_id'],
-                    'user_id': user.id
-                }
-                member_result = supabase.table('group_members').insert(member_payload).execute()
-                
-                if hasattr(member_result, 'error') and member_result.error:
-                    raise Exception(f"Failed to add to group_members: {getattr(member_result, 'error', 'Unknown')}")
+    if action == 'accept':
+        # Check if user is already a member
+        existing_member = supabase.table('group_members') \
+            .select('user_id') \
+            .eq('group_id', invitation['group_id']) \
+            .eq('user_id', user_id) \
+            .maybe_single() \
+            .execute()
+        
+        # Only add as member if not already present
+        if not existing_member or not hasattr(existing_member, 'data') or not existing_member.data:
+            member_payload = {
+                'group_id': invitation['group_id'],
+                'user_id': user_id
+            }
+            member_result = supabase.table('group_members').insert(member_payload).execute()
             
-            # Check for existing accepted invitations and clean them up
-            existing_accepted = supabase.table('group_invitations') \
-                .select('id') \
+            if hasattr(member_result, 'error') and member_result.error:
+                raise Exception(f"Failed to add to group_members: {getattr(member_result, 'error', 'Unknown')}")
+        
+        # Check for existing accepted invitations and clean them up
+        existing_accepted = supabase.table('group_invitations') \
+            .select('id') \
+            .eq('group_id', invitation['group_id']) \
+            .eq('invited_user_id', user_id) \
+            .eq('status', 'accepted') \
+            .execute()
+        
+        if existing_accepted and existing_accepted.data:
+            print(f"Found {len(existing_accepted.data)} existing accepted invitations, cleaning up...")
+            # Delete existing accepted invitations to prevent constraint violation
+            supabase.table('group_invitations') \
+                .delete() \
                 .eq('group_id', invitation['group_id']) \
-                .eq('invited_user_id', user.id) \
+                .eq('invited_user_id', user_id) \
                 .eq('status', 'accepted') \
                 .execute()
-            
-            if existing_accepted and existing_accepted.data:
-                print(f"Found {len(existing_accepted.data)} existing accepted invitations, cleaning up...")
-                # Delete existing accepted invitations to prevent constraint violation
-                supabase.table('group_invitations') \
-                    .delete() \
-                    .eq('group_id', invitation['group_id']) \
-                    .eq('invited_user_id', user.id) \
-                    .eq('status', 'accepted') \
-                    .execute()
-            
-            status_payload = {'status': 'accepted', 'updated_at': datetime.now().isoformat()}
+
+    supabase.table('group_invitations') \
+        .update({'status': target_status, 'updated_at': datetime.now().isoformat()}) \
+        .eq('id', invitation_id) \
+        .execute()
+
+    return {
+        'outcome': target_status,
+        'replayed': False,
+        'group_id': invitation['group_id'],
+        'group_name': (invitation.get('groups') or {}).get('name'),
+        'invited_by_id': invitation['invited_by_id']
+    }
+
+def respond_to_invitation(user, invitation_id, action):
+    """
+    Handles a user accepting or declining a group invitation.
+    Retrying an accept or decline that already went through succeeds again
+    without repeating its side effects.
+    """
+    if action not in STATUS_FOR_ACTION:
+        return {'error': 'Invalid action. Must be "accept" or "decline"'}, 400
+
+    try:
+        respond = _respond_via_rpc if Config.INVITATION_RESPONSE_RPC else _respond_locally
+        result = respond(invitation_id, user.id, action)
+        outcome = result.get('outcome')
+
+        if outcome == 'not_found':
+            return {'error': 'Invitation not found or has already been actioned'}, 404
+        if outcome == 'forbidden':
+            return {'error': 'You are not authorized to respond to this invitation'}, 403
+        if outcome != STATUS_FOR_ACTION[action]:
+            raise Exception(f"Unexpected invitation response outcome: {outcome}")
+
+        if result.get('replayed'):
+            print(f"Invitation {invitation_id} was already {outcome}; nothing to do")
+            return {'message': f'Invitation {action}ed successfully'}, 200
+
+        user_name = user.user_metadata.get('full_name', user.email)
+        group_id = result['group_id']
+        group_name = result.get('group_name') or 'the group'
+
+        if action == 'accept':
             notification_payload = {
-                'user_id': invitation['invited_by_id'],
+                'user_id': result['invited_by_id'],
                 'actor_id': user.id,
                 'type': 'invitation_accepted',
                 'message': f"{user_name} accepted your invitation to join \"{group_name}\"",
-                'data': {'group_id': invitation['group_id'], 'group_name': group_name, 'accepted_user_id': user.id}
+                'data': {'group_id': group_id, 'group_name': group_name, 'accepted_user_id': user.id}
             }
-            
-        else: 
-            status_payload = {'status': 'declined', 'updated_at': datetime.now().isoformat()}
-            
+        else:
             notification_payload = {
-                'user_id': invitation['invited_by_id'],
+                'user_id': result['invited_by_id'],
                 'actor_id': user.id, 
                 'type': 'invitation_declined',
                 'message': f"{user_name} declined your invitation to join \"{group_name}\"",
-                'data': {'group_id': invitation['group_id'], 'group_name': group_name, 'declined_user_id': user.id}
+                'data': {'group_id': group_id, 'group_name': group_name, 'declined_user_id': user.id}
             }
-        
-        supabase.table('group_invitations') \
-            .update(status_payload) \
-            .eq('id', invitation_id) \
-            .execute()
-            
-        if notification_payload:
-            notification_service.create_raw_notification(notification_payload)
-            
+
+        notification_service.create_raw_notification(notification_payload)
         notification_service.delete_invitation_notification(invitation_id, user.id)
 
+        if action == 'accept':
+            event_hub.attach(user.id, f"group:{group_id}")
+            # The inviter already has the invitation_accepted notification.
+            notification_service.log_group_notification(group_id, user.id, f"{user_name} joined \"{group_name}\"",
+                                                         skip=[result['invited_by_id']])
+            publish_to_group(group_id, 'members_changed', {'group_id': group_id, 'added_user_id': user.id})
+
         return {'message': f'Invitation {action}ed successfully'}, 200
 
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"Error in respond_to_invitation: {str(e)}\n{error_trace}")
-        return {'error': str(e), 'trace': error_trace}, 500
\ No newline at end of file
+        return {'error': str(e), 'trace': error_trace}, 500
@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from datetime import datetime, timezone
+from app.extensions import supabase
+from app.config import Config
+
+
+class InviteLinkError(Exception):
+    """The token is malformed, forged, expired or used up. status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _signature(body):
+    secret = Config.INVITE_LINK_SECRET
+    if not secret:
+        raise InviteLinkError('Invite links are not configured', status=503)
+    return hmac.new(secret.encode('utf-8'), body.encode('ascii'), hashlib.sha256).digest()
+
+
+def sign_invite(group_id, expires_at, max_uses, created_by=None, group_name=None):
+    """Returns a URL-safe token carrying the group, expiry (unix time) and use limit."""
+    claims = {
+        'g': str(group_id),
+        'name': group_name,
+        'exp': int(expires_at),
+        'max': int(max_uses),
+        'by': str(created_by) if created_by is not None else None,
+        # Distinguishes links with otherwise identical claims, so each gets its own use count.
+        'n': secrets.token_urlsafe(8),
+    }
+    body = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{body}.{_b64encode(_signature(body))}"
+
+
+def verify_invite(token, now=None):
+    """Checks signature and expiry without touching the database. Returns the claims."""
+    try:
+        body, signature = token.split('.', 1)
+        signature = _b64decode(signature)
+    except (AttributeError, ValueError):
+        raise InviteLinkError('Invalid invite link')
+    if not hmac.compare_digest(signature, _signature(body)):
+        raise InviteLinkError('Invalid invite link')
+    try:
+        claims = json.loads(_b64decode(body))
+    except ValueError:
+        raise InviteLinkError('Invalid invite link')
+    if claims.get('exp', 0) < (now or time.time()):
+        raise InviteLinkError('This invite link has expired', status=410)
+    return claims
+
+
+# claim_invite_link (migrations/006) outcomes that refuse a join.
+CLAIM_ERRORS = {
+    'not_found': ('Invalid invite link', 400),
+    'revoked': ('This invite link has been revoked', 410),
+    'expired': ('This invite link has expired', 410),
+    'exhausted': ('This invite link has reached its member limit', 410),
+}
+
+
+class InviteLinkUses:
+    """
+    Join counts per link, kept in the invite_links table (migrations/006)
+    so every worker enforces the same max-uses and a link can be revoked.
+    A use is taken with one atomic RPC and given back if the join fails.
+    """
+
+    def register(self, claims, created_by=None):
+        """Records a newly signed link so its uses can be counted."""
+        supabase.table('invite_links').insert({
+            'nonce': claims['n'],
+            'group_id': claims['g'],
+            'created_by': created_by,
+            'max_uses': claims['max'],
+            'expires_at': datetime.fromtimestamp(claims['exp'], tz=timezone.utc).isoformat(),
+        }).execute()
+
+    def claim(self, claims):
+        """Reserves one use of the link; raises InviteLinkError if none are left or it was revoked."""
+        outcome = supabase.rpc('claim_invite_link', {'p_nonce': claims['n']}).execute().data
+        if outcome != 'ok':
+            message, status = CLAIM_ERRORS.get(outcome, CLAIM_ERRORS['not_found'])
+            raise InviteLinkError(message, status=status)
+
+    def release(self, claims):
+        """Gives a claimed use back, e.g. when the join did not go through."""
+        try:
+            supabase.rpc('release_invite_link', {'p_nonce': claims['n']}).execute()
+        except Exception as e:
+            print(f"Error releasing invite link use: {e}")
+
+    def revoke(self, claims):
+        """Stops the link from admitting anyone else. Returns False if the link is unknown."""
+        response = supabase.table('invite_links') \
+            .update({'revoked_at': datetime.now(timezone.utc).isoformat()}) \
+            .eq('nonce', claims['n']) \
+            .eq('group_id', claims['g']) \
+            .execute()
+        return bool(response.data)
+
+
+invite_link_uses = InviteLinkUses()
@@ -0,0 +1,164 @@
+import re
+from collections import defaultdict
+
+# Curated alias dictionary: canonical merchant -> spellings seen in descriptions.
+# The canonical name itself is always an alias. Brands that are also ordinary
+# words (apple, target, shell, ola, ...) are listed only under unambiguous
+# phrases, so "apple 1kg" or "coca cola" never resolve to a merchant.
+MERCHANT_ALIASES = {
+    'starbucks': ['starbucks coffee', 'sbux'],
+    'cafe coffee day': ['ccd', 'coffee day'],
+    'costa coffee': [],
+    'blue tokai': ['blue tokai coffee'],
+    "mcdonald's": ['mcdonalds', 'mc donalds', 'mcd', 'maccas'],
+    'kfc': ['kentucky fried chicken'],
+    "domino's": ['dominos', 'dominos pizza', "domino's pizza"],
+    'pizza hut': ['pizzahut'],
+    'subway restaurant': ['subway sandwich', 'subway sandwiches'],
+    'burger king': [],
+    'taco bell': ['tacobell'],
+    'chipotle': [],
+    'swiggy': ['swiggy instamart', 'instamart'],
+    'zomato': [],
+    'blinkit': [],
+    'uber eats': ['ubereats'],
+    'doordash': ['door dash'],
+    'uber': ['uber trip', 'uber ride', 'uber technologies'],
+    'ola cabs': ['olacabs', 'ola ride', 'ola auto'],
+    'rapido': [],
+    'lyft': [],
+    'irctc': ['indian railways'],
+    'indigo airlines': ['goindigo', 'indigo flight'],
+    'amazon': ['amazon.in', 'amazon.com', 'amzn', 'amazon pay'],
+    'flipkart': [],
+    'myntra': [],
+    'walmart': ['wal-mart', 'wal mart'],
+    'target store': ['target.com', 'target stores'],
+    'costco': [],
+    'dmart': ['d mart', 'd-mart', 'avenue supermarts'],
+    'big bazaar': ['bigbazaar'],
+    'reliance fresh': ['reliance smart', 'reliance retail'],
+    'bigbasket': ['big basket'],
+    'netflix': [],
+    'spotify': [],
+    'youtube premium': ['youtube music'],
+    'amazon prime': ['prime video'],
+    'disney+ hotstar': ['hotstar', 'disney hotstar', 'disney plus'],
+    'apple services': ['itunes', 'apple.com', 'app store', 'apple music', 'apple tv', 'icloud'],
+    'google play': ['google storage', 'google one'],
+    'airtel': ['bharti airtel'],
+    'jio': ['reliance jio'],
+    'vodafone idea': ['vodafone'],
+    'bookmyshow': ['book my show'],
+    'pvr': ['pvr cinemas', 'pvr inox', 'inox'],
+    'apollo pharmacy': ['apollo pharma'],
+    'pharmeasy': [],
+    'shell petrol': ['shell fuel', 'shell petrol pump'],
+    'indian oil': ['iocl', 'indianoil'],
+    'hp petrol': ['hpcl', 'hindustan petroleum'],
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9'&+.-]*")
+MAX_NGRAM = 3
+MIN_FUZZY_LENGTH = 6
+
+
+def _clean(text):
+    text = text.lower()
+    text = re.sub(r'#\s*\d+|\bstore\s*\d+|\b\d{3,}\b', ' ', text)
+    return [token.strip('.-') for token in TOKEN_PATTERN.findall(text) if token.strip('.-')]
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance, giving up early (returning limit + 1) once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        row_min = i
+        for j, char_b in enumerate(b, start=1):
+            cost = 0 if char_a == char_b else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current.append(value)
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class MerchantIndex:
+    """
+    Maps free-text descriptions to a canonical merchant name. Exact alias
+    lookups come first; misspellings are resolved through a trigram index
+    that proposes candidates, verified by bounded edit distance.
+    """
+
+    def __init__(self, aliases=None):
+        self.alias_to_merchant = {}
+        self.trigram_index = defaultdict(set)
+        for merchant, merchant_aliases in (aliases or MERCHANT_ALIASES).items():
+            for alias in [merchant] + list(merchant_aliases):
+                self.add_alias(alias, merchant)
+
+    def add_alias(self, alias, merchant):
+        key = ' '.join(_clean(alias))
+        if not key:
+            return
+        self.alias_to_merchant[key] = merchant
+        if len(key) >= MIN_FUZZY_LENGTH:
+            for gram in _trigrams(key):
+                self.trigram_index[gram].add(key)
+
+    def _ngrams(self, tokens):
+        # Longest phrases first so "uber eats" wins over "uber".
+        for size in range(min(MAX_NGRAM, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                yield ' '.join(tokens[start:start + size])
+
+    def _fuzzy_lookup(self, phrase):
+        limit = 1 if len(phrase) < 8 else 2
+        grams = _trigrams(phrase)
+        candidate_counts = defaultdict(int)
+        for gram in grams:
+            for alias in self.trigram_index.get(gram, ()):
+                candidate_counts[alias] += 1
+
+        best = None
+        needed = max(1, len(grams) // 2)
+        for alias, shared in candidate_counts.items():
+            # Typos rarely hit the first letter; requiring it keeps "costs" away from "costa".
+            if shared < needed or alias[0] != phrase[0]:
+                continue
+            distance = _edit_distance(phrase, alias, limit)
+            if distance <= limit and (best is None or distance < best[0]):
+                best = (distance, alias)
+        return self.alias_to_merchant[best[1]] if best else None
+
+    def canonicalize(self, description):
+        """Returns the canonical merchant mentioned in the description, or None."""
+        if not description:
+            return None
+        tokens = _clean(description)
+
+        for phrase in self._ngrams(tokens):
+            merchant = self.alias_to_merchant.get(phrase)
+            if merchant:
+                return merchant
+
+        # A typo can drop a letter, so phrases one shorter than the indexed aliases still qualify.
+        for phrase in self._ngrams(tokens):
+            if len(phrase) >= MIN_FUZZY_LENGTH - 1:
+                merchant = self._fuzzy_lookup(phrase)
+                if merchant:
+                    return merchant
+        return None
+
+
+merchant_index = MerchantIndex()
@@ -0,0 +1,97 @@
+import threading
+import time
+from cachetools import LRUCache
+from app.extensions import supabase
+from app.config import Config
+
+
+class UnreadCounters:
+    """
+    Per-user unread notification counts kept in memory. A user's count is
+    seeded with one COUNT query, then adjusted as the outbox inserts and
+    deletes rows and as notifications are marked read. Because the frontend
+    also writes to the table directly, counts older than
+    NOTIFICATION_COUNTER_RECONCILE_SECONDS are re-counted in the background.
+
+    Counts are per process and at most NOTIFICATION_COUNTER_MAX_USERS are
+    kept; an evicted user is simply counted again on their next read.
+    """
+
+    def __init__(self, max_users=None):
+        self.max_users = max_users
+        self._counts = None
+        self._refreshed_at = None
+        self.lock = threading.Lock()
+        self.reconciling = set()
+
+    def _caches(self):
+        # Sized on first use so that importing this module does not read Config.
+        if self._counts is None:
+            size = self.max_users or Config.NOTIFICATION_COUNTER_MAX_USERS
+            self._counts = LRUCache(maxsize=size)
+            self._refreshed_at = LRUCache(maxsize=size)
+        return self._counts, self._refreshed_at
+
+    @property
+    def counts(self):
+        return self._caches()[0]
+
+    @property
+    def refreshed_at(self):
+        return self._caches()[1]
+
+    def _count(self, user_id):
+        response = supabase.table('notifications') \
+            .select('id', count='exact', head=True) \
+            .eq('user_id', user_id) \
+            .eq('read', False) \
+            .execute()
+        return response.count or 0
+
+    def _reconcile(self, user_id):
+        try:
+            count = self._count(user_id)
+            with self.lock:
+                self.counts[user_id] = count
+                self.refreshed_at[user_id] = time.time()
+        except Exception as e:
+            print(f"Error reconciling unread count for user {user_id}: {e}")
+        finally:
+            with self.lock:
+                self.reconciling.discard(user_id)
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self.lock:
+            count = self.counts.get(user_id)
+            age = time.time() - self.refreshed_at.get(user_id, 0)
+            if count is not None and age > Config.NOTIFICATION_COUNTER_RECONCILE_SECONDS \
+                    and user_id not in self.reconciling:
+                self.reconciling.add(user_id)
+                threading.Thread(target=self._reconcile, args=(user_id,), daemon=True).start()
+        if count is None:
+            count = self._count(user_id)
+            with self.lock:
+                self.counts[user_id] = count
+                self.refreshed_at[user_id] = time.time()
+        return count
+
+    def adjust(self, user_id, delta):
+        """Applies a change to a seeded counter; unseeded users are counted on first read instead."""
+        user_id = str(user_id)
+        with self.lock:
+            if user_id in self.counts:
+                self.counts[user_id] = max(0, self.counts[user_id] + delta)
+
+    def record_inserted(self, payloads):
+        for payload in payloads:
+            if payload.get('user_id') and not payload.get('read'):
+                self.adjust(payload['user_id'], 1)
+
+    def record_deleted(self, rows):
+        for row in rows or []:
+            if row.get('user_id') and row.get('read') is False:
+                self.adjust(row['user_id'], -1)
+
+
+unread_counters = UnreadCounters()
@@ -0,0 +1,318 @@
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from app.extensions import supabase
+from app.config import Config
+from app.services.notification_counters import unread_counters
+from app.services.event_hub import publish_to_user
+
+
+def _merge_into(target, payload):
+    """Folds a newer notification into an existing one: latest message and actor, summed count."""
+    target['message'] = payload.get('message')
+    target['actor_id'] = payload.get('actor_id')
+    target['read'] = False
+    data = dict(target.get('data') or {})
+    data.update({k: v for k, v in (payload.get('data') or {}).items() if k != 'count'})
+    data['count'] = (target.get('data') or {}).get('count', 1) + (payload.get('data') or {}).get('count', 1)
+    target['data'] = data
+
+
+class NotificationOutbox:
+    """
+    Queue of pending writes to the notifications table. Services enqueue
+    inserts and deletes and return immediately; a background dispatcher
+    drains the queue, writing consecutive inserts as one multi-row insert
+    and merging deletes that differ only by user_id into one .in_() delete.
+    Failed batches are retried with exponential backoff, in enqueue order.
+
+    Inserts given a coalesce key (user, type, group) are merged: within a
+    batch into one row, and within NOTIFICATION_COALESCE_WINDOW_SECONDS into
+    the row already written, which gets the latest message and a data.count.
+    With NOTIFICATION_DIGEST_SECONDS set, such inserts are held back and
+    written once per interval instead.
+
+    The queue lives only in this process's memory. A graceful shutdown
+    (gunicorn's SIGTERM, interpreter exit) flushes it, digests included.
+    A hard kill loses what was not yet written. That is at most the last
+    NOTIFICATION_OUTBOX_FLUSH_INTERVAL of writes, any batch still being
+    retried, and digests held back. Digests are held for at most
+    NOTIFICATION_OUTBOX_MAX_DELAY_SECONDS whatever the digest interval.
+    Notifications are advisory, so this window is accepted rather than
+    paying for a durable queue table.
+    """
+
+    def __init__(self):
+        self.pending = deque()
+        self.condition = threading.Condition()
+        # Held while a batch is being written, so flush() waits for in-flight work.
+        self.dispatch_lock = threading.Lock()
+        self.thread = None
+        # coalesce key -> {'payload', 'due'}, for digest mode.
+        self.held = {}
+        # coalesce key -> {'id', 'count', 'expires'} for rows written recently. Dispatcher-only.
+        self.windows = {}
+
+    def _ensure_dispatcher(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name='notification-outbox', daemon=True)
+            self.thread.start()
+
+    def _enqueue(self, intent):
+        with self.condition:
+            self.pending.append(intent)
+            self._ensure_dispatcher()
+            if len(self.pending) >= Config.NOTIFICATION_OUTBOX_BATCH_SIZE:
+                self.condition.notify()
+
+    def enqueue_insert(self, payload, coalesce_key=None):
+        self.enqueue_inserts([(payload, coalesce_key)])
+
+    def enqueue_inserts(self, entries):
+        """
+        Queues (payload, coalesce_key) pairs in one go, so they stay adjacent
+        and the dispatcher writes them in as few multi-row inserts as the
+        batch size allows.
+        """
+        with self.condition:
+            for payload, coalesce_key in entries:
+                if coalesce_key is not None and Config.NOTIFICATION_DIGEST_SECONDS > 0:
+                    held = self.held.get(coalesce_key)
+                    if held:
+                        _merge_into(held['payload'], payload)
+                    else:
+                        delay = min(Config.NOTIFICATION_DIGEST_SECONDS, Config.NOTIFICATION_OUTBOX_MAX_DELAY_SECONDS)
+                        self.held[coalesce_key] = {'payload': payload, 'due': time.time() + delay}
+                else:
+                    self.pending.append(('insert', (payload, coalesce_key)))
+            self._ensure_dispatcher()
+            if len(self.pending) >= Config.NOTIFICATION_OUTBOX_BATCH_SIZE:
+                self.condition.notify()
+
+    def enqueue_delete(self, eq=None, in_=None):
+        """eq: {column: value}; in_: {column: [values]}. Filters are ANDed."""
+        self._enqueue(('delete', {'eq': dict(eq or {}), 'in': dict(in_ or {})}))
+
+    def _release_held(self, everything=False):
+        """Moves digest entries that are due (or all of them) onto the queue."""
+        now = time.time()
+        with self.condition:
+            for key in [k for k, held in self.held.items() if everything or held['due'] <= now]:
+                self.pending.append(('insert', (self.held.pop(key)['payload'], key)))
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait(timeout=Config.NOTIFICATION_OUTBOX_FLUSH_INTERVAL)
+            try:
+                self._release_held()
+                self.flush()
+            except Exception as e:
+                print(f"Notification outbox dispatcher error: {e}")
+
+    def _take_batch(self):
+        """Pops the next run of same-kind intents, up to the batch size."""
+        with self.condition:
+            if not self.pending:
+                return None, []
+            kind = self.pending[0][0]
+            batch = []
+            while self.pending and self.pending[0][0] == kind and len(batch) < Config.NOTIFICATION_OUTBOX_BATCH_SIZE:
+                batch.append(self.pending.popleft()[1])
+            return kind, batch
+
+    def flush(self, release_held=False):
+        """Writes everything queued so far. Called by the dispatcher, at exit, and by tests."""
+        if release_held:
+            self._release_held(everything=True)
+        with self.dispatch_lock:
+            while True:
+                kind, batch = self._take_batch()
+                if not batch:
+                    return
+                if kind == 'insert':
+                    self._write_inserts(batch)
+                else:
+                    self._write_deletes(batch)
+
+    def insert_now(self, payloads):
+        """
+        Writes payloads synchronously, in chunks of the batch size, after
+        anything already queued. Returns the inserted row (or None if it
+        could not be written) for each payload, in order.
+        """
+        self.flush()
+        size = Config.NOTIFICATION_OUTBOX_BATCH_SIZE
+        rows = []
+        with self.dispatch_lock:
+            for start in range(0, len(payloads), size):
+                rows.extend(self._insert_rows(payloads[start:start + size]))
+        return rows
+
+    def _with_retries(self, description, operation):
+        """Runs operation until it succeeds. Returns (True, response) or (False, None)."""
+        delay = Config.NOTIFICATION_OUTBOX_RETRY_DELAY
+        attempts = Config.NOTIFICATION_OUTBOX_MAX_ATTEMPTS
+        for attempt in range(1, attempts + 1):
+            try:
+                return True, operation()
+            except Exception as e:
+                print(f"Notification outbox: {description} failed (attempt {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    time.sleep(delay)
+                    delay *= 2
+        return False, None
+
+    def _write_inserts(self, entries):
+        # Merge same-key notifications within the batch into the first of them.
+        first_by_key = {}
+        merged = []
+        for payload, key in entries:
+            if key is not None and key in first_by_key:
+                _merge_into(first_by_key[key], payload)
+                continue
+            if key is not None:
+                first_by_key[key] = payload
+            merged.append((payload, key))
+
+        now = time.time()
+        self.windows = {k: w for k, w in self.windows.items() if w['expires'] > now}
+        inserts, updates = [], []
+        for payload, key in merged:
+            window = self.windows.get(key) if key is not None else None
+            if window is None:
+                inserts.append((payload, key))
+                continue
+            count = window['count'] + (payload.get('data') or {}).get('count', 1)
+            row = dict(payload, id=window['id'], read=False)
+            row['data'] = dict(payload.get('data') or {}, count=count)
+            window['count'] = count
+            updates.append((payload, key, row))
+
+        if inserts:
+            rows = self._insert_rows([payload for payload, _ in inserts])
+            for (payload, key), row in zip(inserts, rows):
+                if key is not None and row and row.get('id') is not None:
+                    count = (payload.get('data') or {}).get('count', 1)
+                    self.windows[key] = {'id': row['id'], 'count': count, 'expires': now + Config.NOTIFICATION_COALESCE_WINDOW_SECONDS}
+        if updates:
+            self._update_rows(updates)
+
+    def _update_rows(self, updates):
+        """
+        Folds (payload, key, row) updates into their existing rows. Each row
+        is updated in place, so a row the user deleted meanwhile is not
+        brought back; its payload is inserted as a new notification instead.
+        The row moves to the top (created_at is bumped), and a row that had
+        been read counts as unread again.
+        """
+        ids = [row['id'] for _, _, row in updates]
+        ok, response = self._with_retries(
+            f"read-state lookup of {len(ids)} coalesced notifications",
+            lambda: supabase.table('notifications').select('id').in_('id', ids).eq('read', True).execute()
+        )
+        was_read = {str(r['id']) for r in (getattr(response, 'data', None) or [])} if ok else set()
+
+        now = datetime.now(timezone.utc).isoformat()
+        updated, gone = 0, []
+        for payload, key, row in updates:
+            row = dict(row, created_at=now)
+            fields = {k: v for k, v in row.items() if k != 'id'}
+            ok, response = self._with_retries(
+                f"update of coalesced notification {row['id']}",
+                lambda: supabase.table('notifications').update(fields).eq('id', row['id']).execute()
+            )
+            if not ok:
+                print(f"Dropping coalesced notification update {row['id']}")
+                continue
+            if not getattr(response, 'data', None):
+                self.windows.pop(key, None)
+                gone.append((payload, key))
+                continue
+            if str(row['id']) in was_read:
+                unread_counters.adjust(row.get('user_id'), 1)
+            publish_to_user(row.get('user_id'), 'notification', row)
+            updated += 1
+        if updated:
+            print(f"Coalesced {updated} notifications into existing rows")
+        if gone:
+            rows = self._insert_rows([payload for payload, _ in gone])
+            for (payload, key), row in zip(gone, rows):
+                if row and row.get('id') is not None:
+                    count = (payload.get('data') or {}).get('count', 1)
+                    self.windows[key] = {'id': row['id'], 'count': count, 'expires': time.time() + Config.NOTIFICATION_COALESCE_WINDOW_SECONDS}
+
+    def _insert_rows(self, payloads):
+        """
+        Inserts payloads; returns, in order, the inserted row for each (the
+        payload itself if the response had no rows) or None if it was dropped.
+        """
+        ok, response = self._with_retries(
+            f"insert of {len(payloads)} notifications",
+            lambda: supabase.table('notifications').insert(payloads).execute()
+        )
+        if ok:
+            unread_counters.record_inserted(payloads)
+            # Prefer the inserted rows, which carry id and created_at.
+            data = getattr(response, 'data', None)
+            data = data if isinstance(data, list) and len(data) == len(payloads) else [None] * len(payloads)
+            rows = [row or payload for payload, row in zip(payloads, data)]
+            for row in rows:
+                publish_to_user(row.get('user_id'), 'notification', row)
+            print(f"Dispatched {len(payloads)} notifications")
+            return rows
+
+        rows = [None] * len(payloads)
+        if len(payloads) > 1:
+            # One bad row fails the whole insert; write the rest individually.
+            for i, payload in enumerate(payloads):
+                try:
+                    response = supabase.table('notifications').insert([payload]).execute()
+                    unread_counters.record_inserted([payload])
+                    data = getattr(response, 'data', None)
+                    rows[i] = data[0] if isinstance(data, list) and data else payload
+                except Exception as e:
+                    print(f"Dropping notification for user {payload.get('user_id')}: {e}")
+        else:
+            print(f"Dropping notification for user {payloads[0].get('user_id')}")
+        return rows
+
+    def _write_deletes(self, filters):
+        groups = {}
+        for f in filters:
+            eq = dict(f['eq'])
+            scoped = 'user_id' in eq
+            user_id = eq.pop('user_id', None)
+            key = (scoped, tuple(sorted(eq.items())), tuple(sorted((k, tuple(v)) for k, v in f['in'].items())))
+            groups.setdefault(key, []).append(user_id)
+
+            # A deleted row can no longer absorb later notifications.
+            for window_key in [k for k in self.windows if not scoped or k[0] == str(user_id)]:
+                self.windows.pop(window_key, None)
+
+        for (scoped, eq_items, in_items), user_ids in groups.items():
+            def delete(scoped=scoped, eq_items=eq_items, in_items=in_items, user_ids=user_ids):
+                query = supabase.table('notifications').delete()
+                for column, value in eq_items:
+                    query = query.eq(column, value)
+                for column, values in in_items:
+                    query = query.in_(column, list(values))
+                if scoped:
+                    distinct_users = list(dict.fromkeys(user_ids))
+                    if len(distinct_users) == 1:
+                        query = query.eq('user_id', distinct_users[0])
+                    else:
+                        query = query.in_('user_id', distinct_users)
+                return query.execute()
+
+            ok, response = self._with_retries(f"delete of notifications {dict(eq_items)}", delete)
+            if ok:
+                unread_counters.record_deleted(getattr(response, 'data', None))
+            else:
+                print(f"Dropping notification delete {dict(eq_items)} for {len(user_ids)} users")
+
+
+notification_outbox = NotificationOutbox()
+atexit.register(notification_outbox.flush, release_held=True)
@@ -0,0 +1,70 @@
+import time
+from datetime import datetime, timedelta, timezone
+from app.extensions import supabase
+from app.config import Config
+from app.services.notification_counters import unread_counters
+
+
+def table_size():
+    """
+    Size of the notifications table from the notifications_table_stats RPC
+    (migrations/001), falling back to an exact row count if it is missing.
+    """
+    try:
+        resp = supabase.rpc('notifications_table_stats').execute()
+        if resp.data:
+            return resp.data[0] if isinstance(resp.data, list) else resp.data
+    except Exception as e:
+        print(f"notifications_table_stats unavailable, counting rows instead: {e}")
+    resp = supabase.table('notifications').select('id', count='exact', head=True).execute()
+    return {'rows': resp.count}
+
+
+def prune_notifications(batch_size=None, max_batches=None, read_days=None, stale_days=None, pause=None):
+    """
+    Deletes read notifications older than read_days and any notification
+    older than stale_days, oldest first, batch_size rows per DELETE and at
+    most max_batches per run. Keeping each statement small and pausing
+    between them keeps locks and WAL bursts short on a live table.
+
+    Actionable notifications (invitations still waiting for an answer) are
+    never pruned. Unread rows that are deleted come off the users' unread
+    counters.
+    """
+    batch_size = batch_size or Config.NOTIFICATION_RETENTION_BATCH_SIZE
+    max_batches = max_batches or Config.NOTIFICATION_RETENTION_MAX_BATCHES
+    read_days = Config.NOTIFICATION_RETENTION_READ_DAYS if read_days is None else read_days
+    stale_days = Config.NOTIFICATION_RETENTION_STALE_DAYS if stale_days is None else stale_days
+    pause = Config.NOTIFICATION_RETENTION_PAUSE_SECONDS if pause is None else pause
+
+    now = datetime.now(timezone.utc)
+    read_cutoff = (now - timedelta(days=read_days)).isoformat()
+    stale_cutoff = (now - timedelta(days=stale_days)).isoformat()
+
+    size_before = table_size()
+    deleted = 0
+    batches = 0
+    while batches < max_batches:
+        resp = supabase.table('notifications') \
+            .select('id') \
+            .or_(f'and(read.is.true,actionable.not.is.true,created_at.lt."{read_cutoff}"),'
+                 f'and(actionable.not.is.true,created_at.lt."{stale_cutoff}")') \
+            .order('created_at') \
+            .limit(batch_size) \
+            .execute()
+        ids = [row['id'] for row in (resp.data or [])]
+        if not ids:
+            break
+
+        deleted_rows = supabase.table('notifications').delete().in_('id', ids).execute()
+        unread_counters.record_deleted(getattr(deleted_rows, 'data', None))
+        deleted += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    size_after = table_size() if deleted else size_before
+    print(f"Notification retention: deleted {deleted} rows in {batches} batches; size {size_before} -> {size_after}")
+    return {'deleted': deleted, 'batches': batches, 'size_before': size_before, 'size_after': size_after}
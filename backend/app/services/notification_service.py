@@ -1,14 +1,70 @@
 from app.extensions import supabase
+from app.services.notification_outbox import notification_outbox
+from app.services.notification_counters import unread_counters
+from app.config import Config
+import base64
 import traceback
 import json
 
+NOTIFICATION_COLUMNS = 'id, actor_id, type, message, read, actionable, data, created_at'
+
+def group_filter_column():
+    """Column to filter notifications by group: the promoted column once migrated, else the JSON path."""
+    return 'group_id' if Config.NOTIFICATIONS_PROMOTED_COLUMNS else 'data->>group_id'
+
+def invitation_filter_column():
+    return 'invitation_id' if Config.NOTIFICATIONS_PROMOTED_COLUMNS else 'data->>invitation_id'
+
+def _with_promoted_columns(payload):
+    """Dual-write: copies data.group_id / data.invitation_id to their own columns once migrated."""
+    if Config.NOTIFICATIONS_PROMOTED_COLUMNS:
+        data = payload.get('data') or {}
+        for column in ('group_id', 'invitation_id'):
+            if data.get(column) is not None and column not in payload:
+                payload[column] = data[column]
+    return payload
+
+def _dispatch(entries, wait=False):
+    """
+    The one write path for new notifications. entries are (payload,
+    coalesce_key) pairs; they are queued together on the outbox, or with
+    wait=True inserted right away in chunks of NOTIFICATION_OUTBOX_BATCH_SIZE
+    rows (no coalescing). Returns a status per entry: 'queued', 'sent' or
+    'failed'.
+    """
+    if not entries:
+        return []
+    entries = [(_with_promoted_columns(payload), key) for payload, key in entries]
+    if not wait:
+        notification_outbox.enqueue_inserts(entries)
+        return ['queued'] * len(entries)
+    rows = notification_outbox.insert_now([payload for payload, _ in entries])
+    return ['sent' if row is not None else 'failed' for row in rows]
+
 # --- Functions for your Notification API Routes ---
-def log_notification(user_id, actor_id, type, message, group_id, actionable=False, related_expense_id=None):
+def log_notifications_bulk(recipients, actor_id, type, message, group_id, actionable=False,
+                           related_expense_id=None, exclude_actor=False, wait=False):
     """
-    A standardized helper function to create new notifications.
-    This can be called by any other service.
+    Creates the same notification for every recipient, e.g. all members of
+    a group, in one multi-row insert instead of one request per user.
+    Returns {recipient: status}: 'queued' (or 'sent' with wait=True),
+    'failed', or 'skipped' for the actor when exclude_actor is set.
+    Repeated recipients get a single notification.
+    Types in NOTIFICATION_COALESCE_TYPES are merged per user and group:
+    the row keeps the latest message and counts events in data.count.
     """
-    try:
+    statuses = {}
+    seen = set()
+    to_send = []
+    entries = []
+    for user_id in recipients:
+        if str(user_id) in seen:
+            continue
+        seen.add(str(user_id))
+        if exclude_actor and str(user_id) == str(actor_id):
+            statuses[user_id] = 'skipped'
+            continue
+
         payload = {
             'user_id': user_id,
             'actor_id': actor_id,
@@ -21,14 +77,55 @@ def log_notification(user_id, actor_id, type, message, group_id, actionable=Fals
                 'related_expense_id': related_expense_id
             }
         }
-        
-        # Use the imported supabase client, NOT categorizer.supabase
-        supabase.table('notifications').insert(payload).execute()
-        print(f"Successfully logged notification for user {user_id}")
-        return True
+
+        coalesce_key = None
+        if type in Config.NOTIFICATION_COALESCE_TYPES:
+            coalesce_key = (str(user_id), type, str(group_id))
+            payload['data']['count'] = 1
+
+        to_send.append(user_id)
+        entries.append((payload, coalesce_key))
+
+    try:
+        results = _dispatch(entries, wait=wait)
+        print(f"{'Sent' if wait else 'Queued'} '{type}' notification for {len(entries)} users")
     except Exception as e:
-        print(f"ERROR logging notification for user {user_id}: {e}")
-        return False
+        print(f"ERROR logging '{type}' notification for {len(entries)} users: {e}")
+        results = ['failed'] * len(entries)
+    statuses.update(zip(to_send, results))
+    return statuses
+
+def log_group_notification(group_id, actor_id, message, member_ids=None, skip=(), related_expense_id=None):
+    """
+    Tells every member of a group about an event that concerns them all
+    (a member joining or leaving, a settlement, the group being deleted)
+    with one 'group' notification each, written together through
+    log_notifications_bulk. The actor and the users in skip, who are
+    notified separately, are left out. Pass member_ids when the members
+    have already been read, or will be gone by the time this runs.
+    Returns {recipient: status}.
+    """
+    try:
+        if member_ids is None:
+            resp = supabase.table('group_members').select('user_id').eq('group_id', group_id).execute()
+            member_ids = [m['user_id'] for m in (resp.data or [])]
+        skipped = {str(user_id) for user_id in skip}
+        recipients = [user_id for user_id in member_ids if str(user_id) not in skipped]
+        return log_notifications_bulk(recipients, actor_id, 'group', message, group_id,
+                                      related_expense_id=related_expense_id, exclude_actor=True)
+    except Exception as e:
+        print(f"ERROR notifying members of group {group_id}: {e}")
+        return {}
+
+def log_notification(user_id, actor_id, type, message, group_id, actionable=False, related_expense_id=None):
+    """
+    A standardized helper function to create new notifications.
+    This can be called by any other service. The insert is queued on the
+    outbox, so this returns as soon as the notification is enqueued.
+    """
+    statuses = log_notifications_bulk([user_id], actor_id, type, message, group_id,
+                                      actionable=actionable, related_expense_id=related_expense_id)
+    return statuses.get(user_id) == 'queued'
     
 def get_notifications(user_id):
     """Fetches all notifications for a user, newest first."""
@@ -63,6 +160,97 @@ def mark_as_read(user_id, notification_id):
         print(f"Error marking as read: {e}")
         return {'error': 'Internal server error'}, 500
 
+def _encode_cursor(row):
+    raw = json.dumps([row['created_at'], str(row['id'])])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    created_at, notification_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return created_at, notification_id
+
+def get_notifications_page(user_id, limit=None, cursor=None, types=None, unread_only=False):
+    """
+    One page of a user's notifications, newest first. Pagination is keyset
+    on (created_at, id): the cursor is the last row of the previous page, so
+    each page is an index range scan however deep the user scrolls.
+    """
+    limit = min(max(int(limit or Config.NOTIFICATIONS_PAGE_SIZE), 1), Config.NOTIFICATIONS_MAX_PAGE_SIZE)
+    try:
+        query = supabase.table('notifications') \
+            .select(NOTIFICATION_COLUMNS) \
+            .eq('user_id', user_id)
+
+        if types:
+            query = query.in_('type', list(types))
+        if unread_only:
+            query = query.eq('read', False)
+        if cursor:
+            try:
+                created_at, notification_id = _decode_cursor(cursor)
+            except (ValueError, TypeError):
+                return {'error': 'Invalid cursor'}, 400
+            # Values are quoted because timestamps contain PostgREST's reserved '.' and ':'.
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{notification_id}")'
+            )
+
+        # One extra row tells us whether another page exists.
+        resp = query \
+            .order('created_at', desc=True) \
+            .order('id', desc=True) \
+            .limit(limit + 1) \
+            .execute()
+
+        rows = resp.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]) if has_more and rows else None
+        return {'notifications': rows, 'next_cursor': next_cursor}, 200
+    except Exception as e:
+        print(f"Error getting notifications page: {e}")
+        return {'error': 'Failed to fetch notifications'}, 500
+
+def mark_notifications_read(user_id, notification_ids=None, mark_all=False):
+    """
+    Marks the given notifications (or all of the user's unread ones) as
+    read in a single UPDATE, and adjusts the user's unread counter.
+    """
+    if not mark_all and not notification_ids:
+        return {'error': 'Provide notification ids or set "all" to true'}, 400
+    if not mark_all and (not isinstance(notification_ids, list) or not all(
+            isinstance(i, (str, int)) and not isinstance(i, bool) for i in notification_ids)):
+        return {'error': 'ids must be a list of notification ids'}, 400
+    try:
+        query = supabase.table('notifications') \
+            .update({'read': True}) \
+            .eq('user_id', user_id) \
+            .eq('read', False)
+        if not mark_all:
+            query = query.in_('id', list(notification_ids))
+        resp = query.execute()
+
+        updated = len(resp.data or [])
+        unread_counters.adjust(user_id, -updated)
+        return {'message': 'Marked as read', 'updated': updated}, 200
+    except Exception as e:
+        print(f"Error marking notifications as read: {e}")
+        return {'error': 'Internal server error'}, 500
+
+def get_stream_topics(user_id):
+    """Event hub topics for a user's stream: their own channel plus one per group they belong to."""
+    resp = supabase.table('group_members') \
+        .select('group_id') \
+        .eq('user_id', user_id) \
+        .execute()
+    return [f"user:{user_id}"] + [f"group:{row['group_id']}" for row in (resp.data or [])]
+
+def get_unread_count(user_id):
+    try:
+        return {'unread': unread_counters.get(user_id)}, 200
+    except Exception as e:
+        print(f"Error getting unread count: {e}")
+        return {'error': 'Failed to fetch unread count'}, 500
+
 # --- Functions for OTHER Services to use ---
 
 def create_notification(user_id, message, link=None):
@@ -77,8 +265,8 @@ def create_notification(user_id, message, link=None):
             'link': link
             # You can add more default fields here
         }
-        supabase.table('notifications').insert(payload).execute()
-        print(f"Successfully created simple notification for {user_id}: {message}")
+        _dispatch([(payload, None)])
+        print(f"Queued simple notification for {user_id}: {message}")
         return True
     except Exception as e:
         print(f"Error creating simple notification: {e}")
@@ -91,27 +279,51 @@ def create_raw_notification(payload):
     'payload' should be a dictionary matching the 'notifications' table.
     """
     try:
-        supabase.table('notifications').insert(payload).execute()
-        print(f"Successfully created raw notification for {payload.get('user_id')}")
+        _dispatch([(payload, None)])
+        print(f"Queued raw notification for {payload.get('user_id')}")
         return True
     except Exception as e:
         print(f"Error creating raw notification: {e}")
         return False
 
+def create_raw_notifications_bulk(payloads):
+    """Queues several raw notifications at once; they are written as one multi-row insert."""
+    try:
+        _dispatch([(payload, None) for payload in payloads])
+        print(f"Queued {len(payloads)} raw notifications")
+        return True
+    except Exception as e:
+        print(f"Error creating raw notifications: {e}")
+        return False
+
 def delete_invitation_notification(invitation_id, user_id):
     """
     Deletes the original 'group_invitation' notification for the
     invitee after they have responded.
     """
     try:
-        supabase.table('notifications') \
-            .delete() \
-            .eq('data->>invitation_id', str(invitation_id)) \
-            .eq('type', 'group_invitation') \
-            .eq('user_id', user_id) \
-            .execute()
-        print(f"Cleaned up invitation notification for user {user_id}")
+        notification_outbox.enqueue_delete(eq={
+            invitation_filter_column(): str(invitation_id),
+            'type': 'group_invitation',
+            'user_id': user_id
+        })
+        print(f"Queued cleanup of invitation notification for user {user_id}")
         return True
     except Exception as e:
         print(f"Error deleting invitation notification: {e}")
+        return False
+
+def clear_group_notifications(user_id, group_id, types):
+    """
+    Deletes a user's notifications of the given types for a group, e.g.
+    the pending 'expense_owed' reminders once they have settled up.
+    """
+    try:
+        notification_outbox.enqueue_delete(
+            eq={'user_id': user_id, group_filter_column(): group_id},
+            in_={'type': list(types)}
+        )
+        return True
+    except Exception as e:
+        print(f"Error clearing group notifications: {e}")
         return False
\ No newline at end of file
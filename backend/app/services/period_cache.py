@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from cachetools import LRUCache
+from app.config import Config
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+class ClosedPeriodCache:
+    """
+    Analytics for periods that have ended (a previous month's donut, a past
+    month's daily totals) only change when someone backdates an expense into
+    them. Such results are cached per user with no TTL and dropped only by
+    invalidate() with a date inside their period, or for the whole user when
+    the date of a write is unknown. Results for a period that has not ended
+    (in UTC) are never stored.
+
+    Entries live in memory (PERIOD_CACHE_MAX_USERS users) and, unless
+    PERIOD_CACHE_DIR is empty, in one JSON file per user so they survive
+    restarts. A user's in-memory entries are trusted only while their file
+    is unchanged, so workers sharing the directory see each other's
+    invalidations. A per-user generation stops a computation that raced an
+    invalidation from storing its result.
+    """
+
+    def __init__(self, cache_dir=None, max_users=None, max_entries_per_user=None):
+        self.cache_dir = cache_dir
+        self.max_users = max_users
+        self.max_entries_per_user = max_entries_per_user
+        self.users = None
+        self.generations = {}
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def _users(self):
+        # Settings are read on first use so that importing this module does not read Config.
+        if self.users is None:
+            if self.cache_dir is None:
+                self.cache_dir = Config.PERIOD_CACHE_DIR
+            self.max_entries_per_user = self.max_entries_per_user or Config.PERIOD_CACHE_MAX_ENTRIES_PER_USER
+            self.users = LRUCache(maxsize=self.max_users or Config.PERIOD_CACHE_MAX_USERS)
+        return self.users
+
+    def _path(self, user_id):
+        return os.path.join(self.cache_dir, hashlib.sha256(user_id.encode('utf-8')).hexdigest() + '.json')
+
+    def _mtime(self, user_id):
+        try:
+            return os.stat(self._path(user_id)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self, user_id):
+        """The user's entries, re-read from disk when the file changed. Caller holds the lock."""
+        users = self._users()
+        cached = users.get(user_id)
+        if not self.cache_dir:
+            if cached is None:
+                cached = users[user_id] = {'entries': {}, 'mtime': None}
+            return cached['entries']
+
+        mtime = self._mtime(user_id)
+        if cached is not None and cached['mtime'] == mtime:
+            return cached['entries']
+        entries = {}
+        if mtime is not None:
+            try:
+                with open(self._path(user_id), 'r') as f:
+                    entries = json.load(f)['entries']
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error reading period cache for user {user_id}: {e}")
+        users[user_id] = {'entries': entries, 'mtime': mtime}
+        return entries
+
+    def _save(self, user_id, entries):
+        if not self.cache_dir:
+            self._users()[user_id] = {'entries': entries, 'mtime': None}
+            return
+        path = self._path(user_id)
+        try:
+            if entries:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({'user_id': user_id, 'entries': entries}, f)
+                os.replace(tmp_path, path)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            print(f"Error writing period cache for user {user_id}: {e}")
+        self._users()[user_id] = {'entries': entries, 'mtime': self._mtime(user_id)}
+
+        self.writes += 1
+        if self.writes % 100 == 0:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        try:
+            files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+            if len(files) <= Config.PERIOD_CACHE_DISK_USERS:
+                return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - Config.PERIOD_CACHE_DISK_USERS]:
+                os.remove(path)
+        except OSError as e:
+            print(f"Error evicting period cache files: {e}")
+
+    @staticmethod
+    def _key(kind, start, end):
+        return f"{kind}:{start.isoformat()}:{end.isoformat()}"
+
+    def generation(self, user_id):
+        """Pass to put(); taken before computing the value."""
+        with self.lock:
+            return self.generations.get(str(user_id), 0)
+
+    def get(self, user_id, kind, start, end):
+        """The cached value for the inclusive day range [start, end], or None."""
+        user_id = str(user_id)
+        with self.lock:
+            entry = self._load(user_id).get(self._key(kind, start, end))
+        return entry['value'] if entry else None
+
+    def put(self, user_id, kind, start, end, value, generation=None):
+        """Stores value if the period has ended and the user had no invalidation since generation."""
+        user_id = str(user_id)
+        if end >= _today():
+            return False
+        with self.lock:
+            if generation is not None and self.generations.get(user_id, 0) != generation:
+                return False
+            entries = dict(self._load(user_id))
+            entries[self._key(kind, start, end)] = {'start': start.isoformat(), 'end': end.isoformat(), 'value': value}
+            if len(entries) > self.max_entries_per_user:
+                # Keep the most recent periods.
+                for key in sorted(entries, key=lambda k: entries[k]['end'])[:len(entries) - self.max_entries_per_user]:
+                    del entries[key]
+            self._save(user_id, entries)
+        return True
+
+    def invalidate(self, user_id, days=None):
+        """Drops the user's entries whose period contains one of days (dates), or all of them if days is None."""
+        user_id = str(user_id)
+        with self.lock:
+            self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            entries = self._load(user_id)
+            if days is None:
+                kept = {}
+            else:
+                days = [day.isoformat() for day in days]
+                kept = {
+                    key: entry for key, entry in entries.items()
+                    if not any(entry['start'] <= day <= entry['end'] for day in days)
+                }
+            if len(kept) != len(entries):
+                self._save(user_id, kept)
+
+
+period_cache = ClosedPeriodCache()
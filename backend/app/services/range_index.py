@@ -0,0 +1,258 @@
+import threading
+import time
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from cachetools import LRUCache
+from app.extensions import supabase
+from app.config import Config
+from app.services.spending_rollups import ROLLUP_TABLE, to_day
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _to_cents(amount):
+    return int(round(float(amount or 0) * 100))
+
+
+class Fenwick:
+    """Binary indexed tree over integers: point add and prefix sum in O(log n)."""
+
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = array('q', [0]) + array('q', values)
+        # Linear build: every node passes its sum on to its parent once.
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index, delta):
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index):
+        """Sum of values[0..index] (0 when index < 0)."""
+        total = 0
+        i = min(index, self.size - 1) + 1
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def range_sum(self, first, last):
+        return self.prefix(last) - self.prefix(first - 1)
+
+
+def _pages(make_query):
+    page_size = Config.RANGE_INDEX_PAGE_SIZE
+    offset = 0
+    while True:
+        rows = make_query().range(offset, offset + page_size - 1).execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        offset += page_size
+
+
+def _day_cells(user_id, start=None, end=None):
+    """
+    {(day, category): [cents, count]} of what the user paid between start
+    and end (inclusive UTC days, None for unbounded), from the day rollups
+    when SPENDING_ROLLUPS is set and from the expenses otherwise.
+    """
+    cells = defaultdict(lambda: [0, 0])
+    if Config.SPENDING_ROLLUPS:
+        def make_query():
+            q = supabase.table(ROLLUP_TABLE).select('bucket,category,total,count') \
+                .eq('user_id', user_id).eq('granularity', 'day')
+            if start:
+                q = q.gte('bucket', start.isoformat())
+            if end:
+                q = q.lte('bucket', end.isoformat())
+            return q.order('bucket').order('category')
+
+        for row in _pages(make_query):
+            cell = cells[(to_day(row['bucket']), row['category'])]
+            cell[0] += _to_cents(row['total'])
+            cell[1] += int(row['count'] or 0)
+    else:
+        def make_query():
+            q = supabase.table('expenses').select('amount,date,category').eq('payer_id', user_id)
+            if start:
+                q = q.gte('date', start.isoformat())
+            if end:
+                q = q.lt('date', (end + timedelta(days=1)).isoformat())
+            return q.order('date').order('id')
+
+        for row in _pages(make_query):
+            if not row.get('date'):
+                continue
+            category = (row.get('category') or 'Uncategorized').strip() or 'Uncategorized'
+            cell = cells[(to_day(row['date']), category)]
+            cell[0] += _to_cents(row.get('amount'))
+            cell[1] += 1
+    return cells
+
+
+def _runs(days):
+    """Sorted days grouped into (first, last) runs of consecutive days."""
+    runs = []
+    for day in sorted(days):
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+class _UserIndex:
+    """One user's daily spending as a pair of Fenwick trees (cents, count) per category."""
+
+    def __init__(self, cells, today):
+        days = [day for day, _ in cells]
+        self.base = min(days, default=today)
+        last = max(days + [today]) + timedelta(days=Config.RANGE_INDEX_HEADROOM_DAYS)
+        self.size = (last - self.base).days + 1
+        self.cells = {}
+        dense = {}
+        for (day, category), (cents, count) in cells.items():
+            offset = (day - self.base).days
+            self.cells[(offset, category)] = (cents, count)
+            totals, counts = dense.setdefault(category, ([0] * self.size, [0] * self.size))
+            totals[offset] += cents
+            counts[offset] += count
+        self.trees = {category: (Fenwick(totals), Fenwick(counts)) for category, (totals, counts) in dense.items()}
+        self.dirty = set()
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def covers(self, day):
+        return 0 <= (day - self.base).days < self.size
+
+    def set_day(self, day, values):
+        """Replaces the day's {category: (cents, count)} and applies the differences to the trees."""
+        offset = (day - self.base).days
+        for category in set(self.trees) | set(values):
+            old = self.cells.pop((offset, category), (0, 0))
+            new = values.get(category, (0, 0))
+            if new != (0, 0):
+                self.cells[(offset, category)] = new
+            if new == old:
+                continue
+            if category not in self.trees:
+                self.trees[category] = (Fenwick([0] * self.size), Fenwick([0] * self.size))
+            totals, counts = self.trees[category]
+            totals.add(offset, new[0] - old[0])
+            counts.add(offset, new[1] - old[1])
+
+    def totals(self, start, end):
+        first = max((start - self.base).days, 0)
+        last = min((end - self.base).days, self.size - 1)
+        result = {}
+        if first > last:
+            return result
+        for category, (totals, counts) in self.trees.items():
+            count = counts.range_sum(first, last)
+            if count:
+                result[category] = {'total': totals.range_sum(first, last) / 100, 'count': count}
+        return result
+
+
+class RangeIndex:
+    """
+    Answers "how much did this user spend between two days, per category"
+    in O(categories * log days) from per-user Fenwick trees held in memory,
+    instead of reading every expense in the range.
+
+    An index is built from the user's whole history on first use. Writes
+    mark their days dirty through invalidate(); a dirty day is re-read (one
+    small query per run of days) the next time the index is used. A write
+    with unknown dates, or a dirty day outside the index's span, drops the
+    index so it is rebuilt. Indexes older than RANGE_INDEX_REBUILD_SECONDS
+    are rebuilt too, in case a write went unreported. A build that raced
+    an invalidation answers its own request but is not kept.
+
+    Indexes live in the process that built them. Under several gunicorn
+    workers, invalidate() reaches only the worker that served the write;
+    the others keep answering from their copy until it is rebuilt, so
+    RANGE_INDEX_REBUILD_SECONDS is also the bound on that staleness.
+    """
+
+    def __init__(self, max_users=None):
+        self.max_users = max_users
+        self.indexes = None
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def _indexes(self):
+        # Sized on first use so that importing this module does not read Config.
+        if self.indexes is None:
+            self.indexes = LRUCache(maxsize=self.max_users or Config.RANGE_INDEX_MAX_USERS)
+        return self.indexes
+
+    def invalidate(self, user_id, days=None):
+        """Marks days (dates) of the user's spending as changed; days=None drops the whole index."""
+        user_id = str(user_id)
+        with self.lock:
+            self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            if days is None:
+                self._indexes().pop(user_id, None)
+                return
+            index = self._indexes().get(user_id)
+            if index is not None:
+                index.dirty.update(days)
+
+    def _refresh(self, user_id, index):
+        """Re-reads the index's dirty days. Caller holds index.lock. False if a day is outside the index."""
+        with self.lock:
+            days, index.dirty = index.dirty, set()
+        if not all(index.covers(day) for day in days):
+            with self.lock:
+                if self._indexes().get(user_id) is index:
+                    del self._indexes()[user_id]
+            return False
+        try:
+            for first, last in _runs(days):
+                by_day = defaultdict(dict)
+                for (day, category), (cents, count) in _day_cells(user_id, first, last).items():
+                    by_day[day][category] = (cents, count)
+                day = first
+                while day <= last:
+                    index.set_day(day, by_day.get(day, {}))
+                    day += timedelta(days=1)
+        except Exception:
+            with self.lock:
+                index.dirty.update(days)
+            raise
+        return True
+
+    def _index(self, user_id):
+        with self.lock:
+            index = self._indexes().get(user_id)
+            generation = self.generations.get(user_id, 0)
+        if index is not None and time.monotonic() - index.built_at < Config.RANGE_INDEX_REBUILD_SECONDS:
+            with index.lock:
+                if not index.dirty or self._refresh(user_id, index):
+                    return index
+
+        started = time.perf_counter()
+        index = _UserIndex(_day_cells(user_id), _today())
+        with self.lock:
+            if self.generations.get(user_id, 0) == generation:
+                self._indexes()[user_id] = index
+        print(f"Range index: built {len(index.cells)} day/category cells for user {user_id} in {time.perf_counter() - started:.3f}s")
+        return index
+
+    def totals(self, user_id, start, end):
+        """{category: {'total', 'count'}} the user paid in the inclusive UTC day range."""
+        index = self._index(str(user_id))
+        with index.lock:
+            return index.totals(start, end)
+
+
+range_index = RangeIndex()
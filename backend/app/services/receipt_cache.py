@@ -0,0 +1,262 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from cachetools import LRUCache
+from PIL import Image
+from app.config import Config
+from app.services.receipt_preprocessor import run_in_pool
+
+# Every this many writes, the cache directory is trimmed of files the index does not know about.
+DISK_SWEEP_WRITES = 100
+
+
+def content_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _dhash(image):
+    pixels = list(image.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def image_fingerprint(image_source):
+    """
+    {'phash': 64-bit difference hash (dHash), 'size': [width, height]} of
+    the image (bytes or a seekable file), or None if it cannot be decoded.
+    Re-encoded or slightly recompressed copies of the same photo land within
+    a few bits of each other.
+    """
+    is_bytes = isinstance(image_source, (bytes, bytearray))
+    try:
+        image = Image.open(io.BytesIO(image_source) if is_bytes else image_source)
+        size = list(image.size)
+        # Image.open only read the header; refuse to decode anything preprocessing would refuse too.
+        if size[0] * size[1] > Config.RECEIPT_MAX_PIXELS:
+            return None
+        if image.format == 'JPEG':
+            image.draft('L', (64, 64))
+        return {'phash': _dhash(image), 'size': size}
+    except Exception:
+        return None
+    finally:
+        if not is_bytes:
+            image_source.seek(0)
+
+
+def perceptual_hash(image_source):
+    """The dHash part of image_fingerprint, or None."""
+    fingerprint = image_fingerprint(image_source)
+    return fingerprint['phash'] if fingerprint else None
+
+
+def _hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class ReceiptParseCache:
+    """
+    Caches parse_bill_image results per user, keyed by the SHA-256 of the
+    uploaded bytes. Entries live in a bounded in-memory LRU and a bounded
+    on-disk directory.
+
+    Each entry also keeps the image's fingerprint (dHash and dimensions).
+    A new photo whose fingerprint is close to a cached one is only reported
+    by near_duplicate(): receipts printed by the same till share a layout
+    and can hash alike, so their parsed totals are never served as a hit.
+    """
+
+    def __init__(self, cache_dir=None, memory_entries=None, disk_entries=None, max_distance=None):
+        self._cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self._disk_entries = disk_entries
+        self._max_distance = max_distance
+        self._memory = None
+        # (user_id, sha) -> image fingerprint, for every entry on disk or in memory, oldest write first.
+        self.phash_index = {}
+        self.lock = threading.Lock()
+        self._disk_loaded = False
+        self.writes = 0
+
+    # Settings are read on first use so that importing this module does not read Config.
+    @property
+    def cache_dir(self):
+        return self._cache_dir or Config.RECEIPT_CACHE_DIR
+
+    @property
+    def disk_entries(self):
+        return self._disk_entries or Config.RECEIPT_CACHE_DISK_ENTRIES
+
+    @property
+    def max_distance(self):
+        return Config.RECEIPT_CACHE_PHASH_DISTANCE if self._max_distance is None else self._max_distance
+
+    @property
+    def memory(self):
+        if self._memory is None:
+            self._memory = LRUCache(maxsize=self.memory_entries or Config.RECEIPT_CACHE_MEMORY_ENTRIES)
+        return self._memory
+
+    def _path(self, user_id, sha):
+        name = hashlib.sha256(f"{user_id}:{sha}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _load_disk_index(self):
+        if self._disk_loaded:
+            return
+        self._disk_loaded = True
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            names = os.listdir(self.cache_dir)
+        except OSError as e:
+            print(f"Error loading receipt cache index: {e}")
+            return
+        entries = []
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with open(path, 'r') as f:
+                    entry = json.load(f)
+                phash = entry.get('phash')
+                # Entries written before dimensions were recorded hold a bare hash; they only serve exact hits.
+                entries.append((os.path.getmtime(path), (entry['user_id'], entry['sha']), phash if isinstance(phash, dict) else None))
+            except OSError:
+                # Removed by another worker since the listing.
+                continue
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                print(f"Removing unreadable receipt cache entry {name}: {e}")
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        entries.sort(key=lambda item: item[0])
+        for _, key, phash in entries:
+            self.phash_index[key] = phash
+
+    def _read_disk(self, user_id, sha):
+        try:
+            with open(self._path(user_id, sha), 'r') as f:
+                return json.load(f)['parsed']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, user_id, sha, phash, parsed):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(user_id, sha)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'user_id': user_id, 'sha': sha, 'phash': phash, 'parsed': parsed}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing receipt cache entry: {e}")
+
+    def _remove_disk(self, keys):
+        for user_id, sha in keys:
+            try:
+                os.remove(self._path(user_id, sha))
+            except OSError:
+                pass
+
+    def _sweep_disk(self):
+        """
+        Trims the directory to disk_entries files, oldest first. The index
+        only knows the entries this process loaded or wrote; this also
+        catches files other workers wrote into the same directory.
+        """
+        try:
+            files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+            if len(files) <= self.disk_entries:
+                return
+            files.sort(key=os.path.getmtime)
+            removed = set()
+            for path in files[:len(files) - self.disk_entries]:
+                os.remove(path)
+                removed.add(path)
+        except OSError as e:
+            print(f"Error evicting receipt cache files: {e}")
+            return
+        with self.lock:
+            for key in [key for key in self.phash_index if self._path(*key) in removed]:
+                del self.phash_index[key]
+
+    def _lookup(self, user_id, sha):
+        parsed = self.memory.get((user_id, sha))
+        if parsed is None:
+            parsed = self._read_disk(user_id, sha)
+            if parsed is not None:
+                self.memory[(user_id, sha)] = parsed
+        return parsed
+
+    def get(self, user_id, image_source, sha=None):
+        """
+        Returns (parsed, sha, fingerprint); parsed is None unless these exact
+        bytes were parsed before. image_source may be bytes or a seekable
+        file, in which case sha must be given. The fingerprint is None for
+        data that is not a decodable image.
+        """
+        user_id = str(user_id)
+        sha = sha or content_hash(image_source)
+        with self.lock:
+            self._load_disk_index()
+            parsed = self._lookup(user_id, sha)
+        if parsed is not None:
+            return parsed, sha, self.phash_index.get((user_id, sha))
+        return None, sha, run_in_pool(image_fingerprint, image_source)
+
+    def near_duplicate(self, user_id, fingerprint):
+        """
+        The parsed result of the user's closest cached photo with the same
+        dimensions and a dHash within max_distance bits, or None. Only a
+        hint (e.g. "already uploaded?"): it may be a different receipt.
+        """
+        if not fingerprint:
+            return None
+        user_id = str(user_id)
+        with self.lock:
+            self._load_disk_index()
+            best = None
+            for (entry_user, entry_sha), entry in self.phash_index.items():
+                if entry_user != user_id or not entry or entry['size'] != fingerprint['size']:
+                    continue
+                distance = _hamming(fingerprint['phash'], entry['phash'])
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, entry_sha)
+            return self._lookup(user_id, best[1]) if best else None
+
+    def put(self, user_id, sha, fingerprint, parsed):
+        """
+        Caches the result. The index is kept oldest-first, so the entries
+        past disk_entries are evicted from it without listing the directory;
+        the file writes and removals happen outside the lock.
+        """
+        user_id = str(user_id)
+        key = (user_id, sha)
+        with self.lock:
+            self._load_disk_index()
+            self.memory[key] = parsed
+            self.phash_index.pop(key, None)
+            self.phash_index[key] = fingerprint
+            evicted = []
+            while len(self.phash_index) > self.disk_entries:
+                oldest = next(iter(self.phash_index))
+                del self.phash_index[oldest]
+                evicted.append(oldest)
+            self.writes += 1
+            sweep = self.writes % DISK_SWEEP_WRITES == 0
+        self._write_disk(user_id, sha, fingerprint, parsed)
+        self._remove_disk(evicted)
+        if sweep:
+            self._sweep_disk()
+
+
+receipt_cache = ReceiptParseCache()
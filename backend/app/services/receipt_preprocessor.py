@@ -0,0 +1,119 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from PIL import Image, ImageOps
+from app.config import Config
+
+OUTPUT_MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=Config.RECEIPT_PREPROCESS_WORKERS,
+            thread_name_prefix='receipt-preprocess'
+        )
+    return _executor
+
+
+def _source_size(image_source):
+    if isinstance(image_source, (bytes, bytearray)):
+        return len(image_source)
+    image_source.seek(0, io.SEEK_END)
+    size = image_source.tell()
+    image_source.seek(0)
+    return size
+
+
+def preprocess_receipt_image(image_source, mime_type):
+    """
+    Shrinks a receipt photo before it is sent to Gemini: applies EXIF
+    orientation, downscales to RECEIPT_MAX_DIMENSION, converts to grayscale
+    and re-encodes as JPEG/WebP. image_source may be bytes or a seekable
+    file. Returns (bytes, mime_type); the original source is returned
+    unchanged if it cannot be decoded or would not shrink.
+    """
+    if not image_source or not mime_type or not mime_type.startswith('image/'):
+        return image_source, mime_type
+
+    max_dimension = Config.RECEIPT_MAX_DIMENSION
+    output_format = Config.RECEIPT_OUTPUT_FORMAT
+
+    try:
+        original_size = _source_size(image_source)
+        stream = io.BytesIO(image_source) if isinstance(image_source, (bytes, bytearray)) else image_source
+        image = Image.open(stream)
+        width, height = image.size
+        if width * height > Config.RECEIPT_MAX_PIXELS:
+            raise ValueError(f"image is {width}x{height}, above the {Config.RECEIPT_MAX_PIXELS} pixel limit")
+
+        # Let the JPEG decoder skip straight to a reduced scale when possible,
+        # so the full-resolution bitmap is never materialized.
+        if image.format == 'JPEG':
+            image.draft('L' if Config.RECEIPT_GRAYSCALE else 'RGB', (max_dimension, max_dimension))
+
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        if Config.RECEIPT_GRAYSCALE:
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        output = io.BytesIO()
+        image.save(output, format=output_format, quality=Config.RECEIPT_IMAGE_QUALITY, optimize=True)
+        processed = output.getvalue()
+    except Exception as e:
+        print(f"Receipt preprocessing skipped: {e}")
+        return image_source, mime_type
+    finally:
+        if not isinstance(image_source, (bytes, bytearray)):
+            image_source.seek(0)
+
+    if len(processed) >= original_size:
+        return image_source, mime_type
+
+    return processed, OUTPUT_MIME_TYPES.get(output_format, mime_type)
+
+
+def preprocess_in_pool(image_source, mime_type):
+    """Runs preprocess_receipt_image on the shared worker pool and logs the saving."""
+    started = time.perf_counter()
+    future = _get_executor().submit(preprocess_receipt_image, image_source, mime_type)
+    try:
+        processed, processed_mime = future.result(timeout=Config.RECEIPT_PREPROCESS_TIMEOUT)
+    except Exception as e:
+        print(f"Receipt preprocessing failed, sending original image: {e}")
+        if not isinstance(image_source, (bytes, bytearray)):
+            # The worker may still hold the file; let it finish before the caller re-reads it.
+            wait([future])
+            image_source.seek(0)
+        return image_source, mime_type
+
+    if processed is not image_source:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"Preprocessed receipt to {len(processed)} bytes in {elapsed_ms:.0f} ms")
+    return processed, processed_mime
+
+
+def run_in_pool(fn, image_source, default=None):
+    """
+    fn(image_source) on the shared worker pool, so no more than
+    RECEIPT_PREPROCESS_WORKERS images are decoded at once. Returns default
+    if it fails or takes longer than RECEIPT_PREPROCESS_TIMEOUT.
+    """
+    future = _get_executor().submit(fn, image_source)
+    try:
+        return future.result(timeout=Config.RECEIPT_PREPROCESS_TIMEOUT)
+    except Exception as e:
+        print(f"Receipt image task {getattr(fn, '__name__', fn)} failed: {e}")
+        if not isinstance(image_source, (bytes, bytearray)):
+            wait([future])
+            image_source.seek(0)
+        return default
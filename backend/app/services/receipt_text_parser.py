@@ -0,0 +1,259 @@
+import re
+from datetime import date
+from app.config import Config
+
+# Fields the local parser must find before its result is trusted; anything
+# missing sends the document to Gemini instead.
+REQUIRED_FIELDS = ('total', 'issue_date')
+
+CURRENCY_SYMBOLS = {'₹': 'INR', '€': 'EUR', '£': 'GBP', '¥': 'JPY', '$': 'USD'}
+CURRENCY_CODES = {'rs': 'INR', 'inr': 'INR', 'usd': 'USD', 'eur': 'EUR', 'gbp': 'GBP', 'cad': 'CAD', 'aud': 'AUD'}
+
+PAYMENT_METHODS = [
+    ('upi', 'UPI'), ('gpay', 'UPI'), ('paytm', 'UPI'), ('phonepe', 'UPI'),
+    ('visa', 'Visa'), ('mastercard', 'Mastercard'), ('amex', 'American Express'),
+    ('american express', 'American Express'), ('rupay', 'RuPay'), ('paypal', 'PayPal'),
+    ('debit card', 'Debit Card'), ('credit card', 'Credit Card'), ('net banking', 'Net Banking'),
+    ('cash', 'Cash'),
+]
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+AMOUNT_PATTERN = re.compile(
+    r'(?P<currency>[$€£₹¥]|\b(?:rs|inr|usd|eur|gbp|cad|aud)\b\.?)?\s*'
+    r'(?P<number>-?\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|-?\d+\.\d{1,2}|-?\d+)(?![\d/-])',
+    re.IGNORECASE
+)
+
+DATE_PATTERNS = [
+    (re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b'), 'ymd'),
+    (re.compile(r'\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})\b'), 'numeric'),
+    (re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?[\s-]+([a-z]{3})[a-z]*\.?,?[\s-]+(\d{4})\b', re.IGNORECASE), 'd_mon_y'),
+    (re.compile(r'\b([a-z]{3})[a-z]*\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})\b', re.IGNORECASE), 'mon_d_y'),
+]
+
+# Checked in order, so "Sub Total" and "Total Tax" are claimed before the
+# generic total label.
+SUMMARY_LABELS = [
+    ('subtotal', re.compile(r'\b(sub[\s-]?total)\b', re.IGNORECASE)),
+    ('tax', re.compile(r'\b(tax|vat|gst|cgst|sgst|igst|hst)\b', re.IGNORECASE)),
+    ('tip', re.compile(r'\b(tip|gratuity|service\s+charge)\b', re.IGNORECASE)),
+    ('total', re.compile(r'\b(grand\s+total|amount\s+due|total\s+due|balance\s+due|amount\s+payable|net\s+payable|total\s+amount|total)\b', re.IGNORECASE)),
+]
+# "Total incl. GST 829.50" is a total, not a tax line.
+INCLUSIVE_TAX = re.compile(r'\b(?:incl(?:uding|usive)?|inc)\b\.?\s*(?:of\s+)?(?:all\s+)?(?:tax|taxes|vat|gst)\b', re.IGNORECASE)
+# "Total items: 2" counts things; it is not an amount.
+COUNT_WORDS = re.compile(r'\b(items?|qty|quantity|units?|pcs|pieces|count)\b', re.IGNORECASE)
+STRONG_TOTAL = re.compile(r'\b(grand\s+total|amount\s+due|total\s+due|balance\s+due|amount\s+payable|net\s+payable)\b', re.IGNORECASE)
+NON_ITEM_WORDS = re.compile(
+    r'\b(total|subtotal|tax|vat|gst|tip|change|cash|card|visa|mastercard|balance|due|date|invoice|receipt|'
+    r'order|phone|tel|gstin|upi|paid|payment|discount|round|qty|quantity|price|amount)\b',
+    re.IGNORECASE
+)
+ITEM_PATTERN = re.compile(
+    r'^(?:(?P<qty_prefix>\d+)\s*[x×]\s+)?(?P<name>[^\d].*?)\s+'
+    r'(?:(?P<qty>\d+)\s*(?:[x×@]|pcs?)\s*(?P<unit>\d+(?:\.\d{1,2})?)\s+)?'
+    r'(?P<total>\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?)$',
+    re.IGNORECASE
+)
+VENDOR_FROM_PATTERN = re.compile(r'\b(?:order|receipt|purchase|invoice)\s+from\s+([A-Za-z0-9][\w&\' .-]*?)\s*[!.,]?$', re.IGNORECASE)
+ADDRESS_PATTERN = re.compile(r'\d+.*\b(street|st|road|rd|avenue|ave|lane|ln|blvd|nagar|marg|sector|floor)\b', re.IGNORECASE)
+
+
+def extract_pdf_text(stream):
+    """Returns the text layer of a PDF, or None if it has none (scanned) or pypdf is unavailable."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        print("pypdf not installed; PDF bills will be sent to Gemini.")
+        return None
+
+    try:
+        reader = PdfReader(stream)
+        text = '\n'.join((page.extract_text() or '') for page in reader.pages[:Config.RECEIPT_PDF_MAX_PAGES])
+    except Exception as e:
+        print(f"Could not read PDF text layer: {e}")
+        return None
+    finally:
+        stream.seek(0)
+
+    return text if text.strip() else None
+
+
+def _to_float(number):
+    try:
+        return float(number.replace(',', ''))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _amounts(line):
+    """Amounts on a line, ignoring numbers that are part of a date."""
+    date_spans = [m.span() for pattern, _ in DATE_PATTERNS for m in pattern.finditer(line)]
+    return [
+        m for m in AMOUNT_PATTERN.finditer(line)
+        if not any(start <= m.start('number') < end for start, end in date_spans)
+    ]
+
+
+def _is_count(line, amount):
+    """True for a whole number beside a count word, e.g. the 2 in "Total items: 2"."""
+    return bool(COUNT_WORDS.search(line)) and not amount.group('currency') and '.' not in amount.group('number')
+
+
+def _build_date(year, month, day):
+    try:
+        if year < 100:
+            year += 2000
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _find_date(line):
+    for pattern, kind in DATE_PATTERNS:
+        match = pattern.search(line)
+        if not match:
+            continue
+        a, b, c = match.groups()
+        if kind == 'ymd':
+            return _build_date(int(a), int(b), int(c))
+        if kind == 'numeric':
+            first, second, year = int(a), int(b), int(c)
+            day_first = Config.RECEIPT_DATE_DAY_FIRST
+            if first > 12:
+                day_first = True
+            elif second > 12:
+                day_first = False
+            return _build_date(year, second, first) if day_first else _build_date(year, first, second)
+        if kind == 'd_mon_y' and a and b.lower()[:3] in MONTHS:
+            return _build_date(int(c), MONTHS[b.lower()[:3]], int(a))
+        if kind == 'mon_d_y' and a.lower()[:3] in MONTHS:
+            return _build_date(int(c), MONTHS[a.lower()[:3]], int(b))
+    return None
+
+
+def _find_currency(text):
+    lowered = text.lower()
+    for code in CURRENCY_CODES:
+        if re.search(rf'\b{code}\b', lowered):
+            return CURRENCY_CODES[code]
+    for symbol, code in CURRENCY_SYMBOLS.items():
+        if symbol in text:
+            return code
+    return None
+
+
+def _find_payment_method(text):
+    lowered = text.lower()
+    for needle, method in PAYMENT_METHODS:
+        if re.search(rf'\b{needle}\b', lowered):
+            return method
+    return None
+
+
+def _parse_line_item(line):
+    cleaned = re.sub(r'[$€£₹¥]|\b(?:rs|inr|usd|eur|gbp)\b\.?', '', line, flags=re.IGNORECASE)
+    cleaned = re.sub(r'\.{2,}|\s{2,}', ' ', cleaned).strip()
+    match = ITEM_PATTERN.match(cleaned)
+    if not match or NON_ITEM_WORDS.search(match.group('name')):
+        return None
+
+    name = match.group('name').strip(' :-')
+    if len(re.sub(r'[^a-z]', '', name.lower())) < 2:
+        return None
+
+    line_total = _to_float(match.group('total'))
+    quantity = match.group('qty') or match.group('qty_prefix')
+    quantity = float(quantity) if quantity else None
+    unit_price = _to_float(match.group('unit')) if match.group('unit') else None
+    if unit_price is None and quantity and line_total is not None:
+        unit_price = round(line_total / quantity, 2)
+
+    return {'name': name, 'quantity': quantity, 'unit_price': unit_price, 'line_total': line_total}
+
+
+def parse_receipt_text(text):
+    """
+    Rule-based parser for digital receipts (pasted e-mail text or a PDF text
+    layer). Returns the same schema as the Gemini parser, with None for
+    anything it cannot find.
+    """
+    lines = [re.sub(r'\s+', ' ', line).strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+
+    result = {
+        'vendor_name': None, 'issue_date': None, 'due_date': None,
+        'subtotal': None, 'tax': None, 'tip': None, 'total': None,
+        'currency': _find_currency(text), 'payment_method': _find_payment_method(text),
+        'address': None, 'category_guess': None, 'notes': None, 'line_items': [],
+    }
+
+    strong_total = None
+    tax_total = 0.0
+    tax_found = False
+
+    for line in lines:
+        line_date = _find_date(line)
+        if line_date:
+            lowered = line.lower()
+            if 'due' in lowered and not result['due_date']:
+                result['due_date'] = line_date
+            elif not result['issue_date']:
+                result['issue_date'] = line_date
+
+        if not result['address'] and ADDRESS_PATTERN.search(line):
+            result['address'] = line
+
+        label = next((name for name, pattern in SUMMARY_LABELS if pattern.search(line)), None)
+        if label == 'tax' and INCLUSIVE_TAX.search(line):
+            label = 'total' if SUMMARY_LABELS[-1][1].search(line) else None
+        amounts = _amounts(line)
+        if label == 'total' and amounts and _is_count(line, amounts[-1]):
+            continue
+        if label and amounts:
+            value = _to_float(amounts[-1].group('number'))
+            if label == 'total':
+                if STRONG_TOTAL.search(line):
+                    strong_total = value
+                else:
+                    result['total'] = value
+            elif label == 'subtotal':
+                result['subtotal'] = value
+            elif label == 'tax':
+                # Split taxes (CGST + SGST) are summed; a "tax %" column alone is not an amount.
+                if not re.search(r'\d\s*%\s*$', line):
+                    tax_total += value or 0.0
+                    tax_found = True
+            elif label == 'tip':
+                result['tip'] = value
+            continue
+
+        if not line_date:
+            item = _parse_line_item(line)
+            if item:
+                result['line_items'].append(item)
+
+    if strong_total is not None:
+        result['total'] = strong_total
+    if tax_found:
+        result['tax'] = round(tax_total, 2)
+
+    for line in lines[:5]:
+        from_match = VENDOR_FROM_PATTERN.search(line)
+        if from_match:
+            result['vendor_name'] = from_match.group(1)
+            break
+        if re.search(r'[a-z]', line, re.IGNORECASE) and not _find_date(line) and not _amounts(line) \
+                and not NON_ITEM_WORDS.search(line):
+            result['vendor_name'] = line
+            break
+
+    return result
+
+
+def has_required_fields(parsed):
+    return all(parsed.get(field) is not None for field in REQUIRED_FIELDS)
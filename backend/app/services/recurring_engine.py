@@ -0,0 +1,273 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from app.extensions import supabase
+from app.config import Config
+from app.services.cron_schedule import parse_schedule, CronError
+from app.services.response_cache import response_cache
+from app.services.period_cache import period_cache
+from app.services.range_index import range_index
+from app.services.expense_range_cache import expense_range_cache
+from app.services.suggestion_service import suggestion_index
+
+RULES_TABLE = 'recurring_expenses'
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _occurrence_payload(rule, occurs_at):
+    return {
+        'recurring_expense_id': rule['id'],
+        'user_id': rule['user_id'],
+        'description': rule['title'],
+        'amount': rule['amount'],
+        'category': rule.get('category'),
+        'occurs_at': occurs_at.isoformat(),
+    }
+
+
+class RecurringEngine:
+    """
+    In-memory scheduler for recurring expense rules. Each active rule's next
+    run time sits in a min-heap, so a tick only looks at the rules that are
+    due: an idle tick is one comparison, however many rules are loaded.
+    Rescheduling pushes a new heap entry and next_runs records the current
+    one; superseded entries are skipped when popped and compacted away.
+
+    Due occurrences are written with the materialize_recurring_expenses RPC
+    (migrations/004) in batches of RECURRING_INSERT_BATCH_SIZE. The RPC
+    ignores occurrences that already exist, so several worker processes can
+    run their own engine over the same rules. It also re-checks each rule,
+    dropping runs of rules another worker has since deleted, paused or
+    ended. Upcoming occurrences are answered from memory.
+    """
+
+    def __init__(self):
+        self.rules = {}
+        self.next_runs = {}
+        self.heap = []
+        self.by_user = {}
+        self.lock = threading.Lock()
+        self.loaded_at = None
+
+    # --- Scheduling ---
+
+    def _first_run(self, rule, schedule, now):
+        after = _parse_time(rule.get('last_run_at'))
+        if after is None:
+            starts_at = _parse_time(rule.get('starts_at')) or _parse_time(rule.get('created_at')) or now
+            # Include a run falling exactly on starts_at.
+            after = starts_at - timedelta(seconds=1)
+        # Occurrences missed for longer than the catch-up window are skipped, not backfilled.
+        after = max(after, now - timedelta(days=Config.RECURRING_CATCHUP_DAYS))
+        return schedule.next_after(after)
+
+    def _push(self, rule_id, run_at, ends_at):
+        if run_at is None or (ends_at and run_at > ends_at):
+            self.next_runs.pop(rule_id, None)
+            return
+        ts = run_at.timestamp()
+        self.next_runs[rule_id] = ts
+        heapq.heappush(self.heap, (ts, rule_id))
+
+    def _schedule(self, rule, now):
+        rule_id = str(rule['id'])
+        self._unschedule(rule_id)
+        if not rule.get('active', True):
+            return
+        try:
+            schedule = parse_schedule(rule['schedule'])
+        except CronError as e:
+            print(f"Skipping recurring expense {rule_id}: {e}")
+            return
+        rule = dict(rule, id=rule_id, user_id=str(rule['user_id']))
+        self.rules[rule_id] = rule
+        self.by_user.setdefault(rule['user_id'], set()).add(rule_id)
+        self._push(rule_id, self._first_run(rule, schedule, now), _parse_time(rule.get('ends_at')))
+
+    def _unschedule(self, rule_id):
+        rule = self.rules.pop(rule_id, None)
+        self.next_runs.pop(rule_id, None)
+        if rule:
+            user_rules = self.by_user.get(rule['user_id'])
+            if user_rules:
+                user_rules.discard(rule_id)
+                if not user_rules:
+                    del self.by_user[rule['user_id']]
+
+    def _compact(self):
+        # Superseded entries are normally dropped as they surface; rebuild if they pile up.
+        if len(self.heap) > 2 * len(self.next_runs) + 1024:
+            self.heap = [(ts, rule_id) for rule_id, ts in self.next_runs.items()]
+            heapq.heapify(self.heap)
+
+    def schedule(self, rule, now=None):
+        """Adds or replaces a rule (a recurring_expenses row). Inactive rules are just removed."""
+        with self.lock:
+            self._schedule(rule, now or datetime.now(timezone.utc))
+            self._compact()
+
+    def unschedule(self, rule_id):
+        with self.lock:
+            self._unschedule(str(rule_id))
+
+    def sync_user(self, user_id, rules, now=None):
+        """Replaces a user's rules with the given rows, e.g. just read from the database."""
+        now = now or datetime.now(timezone.utc)
+        with self.lock:
+            for rule_id in list(self.by_user.get(str(user_id), ())):
+                self._unschedule(rule_id)
+            for rule in rules:
+                self._schedule(rule, now)
+            self._compact()
+
+    def load(self, now=None):
+        """Replaces every rule with the active rows in the database, read a page at a time."""
+        now = now or datetime.now(timezone.utc)
+        page_size = Config.RECURRING_LOAD_PAGE_SIZE
+        rows = []
+        while True:
+            resp = supabase.table(RULES_TABLE) \
+                .select('*') \
+                .eq('active', True) \
+                .order('id') \
+                .range(len(rows), len(rows) + page_size - 1) \
+                .execute()
+            page = resp.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+
+        with self.lock:
+            self.rules, self.next_runs, self.heap, self.by_user = {}, {}, [], {}
+            for rule in rows:
+                self._schedule(rule, now)
+            self.loaded_at = time.time()
+        print(f"Recurring expenses: loaded {len(rows)} rules, {len(self.next_runs)} scheduled")
+        return len(rows)
+
+    # --- Running ---
+
+    def pop_due(self, now, limit=None):
+        """
+        Removes and returns up to limit (rule, occurs_at) pairs due at or
+        before now, earliest first, and schedules each rule's following run.
+        A rule that is several runs behind yields each of them.
+        """
+        limit = limit or Config.RECURRING_MAX_PER_TICK
+        now_ts = now.timestamp()
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now_ts and len(due) < limit:
+                ts, rule_id = heapq.heappop(self.heap)
+                if self.next_runs.get(rule_id) != ts:
+                    continue
+                rule = self.rules[rule_id]
+                occurs_at = datetime.fromtimestamp(ts, timezone.utc)
+                due.append((rule, occurs_at))
+                following = parse_schedule(rule['schedule']).next_after(occurs_at)
+                self._push(rule_id, following, _parse_time(rule.get('ends_at')))
+        return due
+
+    def _retry_later(self, occurrences):
+        # Put a failed rule back to its earliest unwritten run; later runs are recomputed from there.
+        with self.lock:
+            for rule, occurs_at in occurrences:
+                rule_id = rule['id']
+                if self.rules.get(rule_id) is not rule:
+                    continue
+                ts = occurs_at.timestamp()
+                current = self.next_runs.get(rule_id)
+                if current is None or ts < current:
+                    self.next_runs[rule_id] = ts
+                    heapq.heappush(self.heap, (ts, rule_id))
+
+    def materialize(self, occurrences):
+        """Writes occurrences as expenses in batched RPC calls. Returns the number of new expenses."""
+        created = 0
+        batch_size = Config.RECURRING_INSERT_BATCH_SIZE
+        for start in range(0, len(occurrences), batch_size):
+            batch = occurrences[start:start + batch_size]
+            try:
+                resp = supabase.rpc('materialize_recurring_expenses', {
+                    'p_occurrences': [_occurrence_payload(rule, occurs_at) for rule, occurs_at in batch]
+                }).execute()
+            except Exception as e:
+                print(f"Error materializing {len(batch)} recurring expenses: {e}")
+                self._retry_later(batch)
+                continue
+            if isinstance(resp.data, dict):
+                created += resp.data.get('inserted', 0)
+            days_by_user = {}
+            for rule, occurs_at in batch:
+                days_by_user.setdefault(rule['user_id'], set()).add(occurs_at.date())
+            for user_id, days in days_by_user.items():
+                response_cache.invalidate_user(user_id)
+                # A caught-up run can land in a month that has already closed.
+                period_cache.invalidate(user_id, days)
+                range_index.invalidate(user_id, days)
+                expense_range_cache.invalidate(user_id, days)
+                suggestion_index.invalidate(user_id)
+        return created
+
+    def run_due(self, now=None):
+        now = now or datetime.now(timezone.utc)
+        due = self.pop_due(now)
+        if not due:
+            return 0
+        created = self.materialize(due)
+        print(f"Recurring expenses: {len(due)} occurrences due, {created} expenses created")
+        return created
+
+    def tick(self, now=None):
+        """The background job: reloads rules every RECURRING_RELOAD_SECONDS, then writes what is due."""
+        if self.loaded_at is None or time.time() - self.loaded_at >= Config.RECURRING_RELOAD_SECONDS:
+            self.load(now)
+        return self.run_due(now)
+
+    # --- Reading ---
+
+    def upcoming(self, user_id, limit=10, until=None):
+        """The user's next occurrences up to until (default RECURRING_UPCOMING_DAYS ahead), soonest first."""
+        until = until or datetime.now(timezone.utc) + timedelta(days=Config.RECURRING_UPCOMING_DAYS)
+        with self.lock:
+            starts = [(self.rules[rule_id], self.next_runs[rule_id]) for rule_id in self.by_user.get(str(user_id), ()) if rule_id in self.next_runs]
+
+        def runs(rule, ts):
+            schedule = parse_schedule(rule['schedule'])
+            ends_at = _parse_time(rule.get('ends_at'))
+            run_at = datetime.fromtimestamp(ts, timezone.utc)
+            for _ in range(limit):
+                if run_at is None or run_at > until or (ends_at and run_at > ends_at):
+                    return
+                yield run_at, rule['id'], rule
+                run_at = schedule.next_after(run_at)
+
+        merged = heapq.merge(*(runs(rule, ts) for rule, ts in starts), key=lambda item: (item[0], item[1]))
+        return [
+            {
+                'recurring_expense_id': rule['id'],
+                'title': rule['title'],
+                'amount': float(rule['amount']),
+                'category': rule.get('category'),
+                'occurs_at': run_at.isoformat(),
+            }
+            for run_at, _, rule in islice(merged, limit)
+        ]
+
+    def next_run(self, rule_id):
+        ts = self.next_runs.get(str(rule_id))
+        return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts is not None else None
+
+
+recurring_engine = RecurringEngine()
@@ -0,0 +1,134 @@
+from datetime import datetime, timezone
+from app.extensions import supabase
+from app.config import Config
+from app.services.cron_schedule import parse_schedule, CronError
+from app.services.recurring_engine import recurring_engine, RULES_TABLE
+
+EDITABLE_FIELDS = ('title', 'amount', 'category', 'schedule', 'starts_at', 'ends_at', 'active')
+
+
+def _rule_response(rule):
+    return {
+        'id': str(rule['id']),
+        'title': rule['title'],
+        'amount': float(rule['amount']),
+        'category': rule.get('category'),
+        'schedule': rule['schedule'],
+        'starts_at': rule.get('starts_at'),
+        'ends_at': rule.get('ends_at'),
+        'active': rule.get('active', True),
+        'last_run_at': rule.get('last_run_at'),
+        'next_run_at': recurring_engine.next_run(rule['id']),
+    }
+
+
+def _validate(data, partial=False):
+    """Returns (fields, error message). With partial, only the given fields are checked."""
+    if not isinstance(data, dict):
+        return None, 'Request body must be a JSON object'
+    fields = {key: data[key] for key in EDITABLE_FIELDS if key in data}
+    if not partial:
+        for key in ('title', 'amount', 'schedule'):
+            if key not in fields:
+                return None, f'{key} is required'
+
+    if 'title' in fields:
+        title = str(fields['title'] or '').strip()
+        if not title or len(title) > 200:
+            return None, 'title must be 1-200 characters'
+        fields['title'] = title
+    if 'amount' in fields:
+        try:
+            amount = round(float(fields['amount']), 2)
+        except (TypeError, ValueError):
+            return None, 'amount must be a number'
+        if amount <= 0:
+            return None, 'amount must be positive'
+        fields['amount'] = amount
+    if 'schedule' in fields:
+        try:
+            fields['schedule'] = parse_schedule(fields['schedule']).expression
+        except CronError as e:
+            return None, f'Invalid schedule: {e}'
+    for key in ('starts_at', 'ends_at'):
+        if fields.get(key):
+            try:
+                moment = datetime.fromisoformat(str(fields[key]).replace('Z', '+00:00'))
+            except ValueError:
+                return None, f'{key} must be an ISO 8601 date-time'
+            fields[key] = (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).isoformat()
+    if 'active' in fields:
+        fields['active'] = bool(fields['active'])
+    return fields, None
+
+
+def list_recurring_expenses(user_id, upcoming_limit=10):
+    """
+    The user's rules and their next occurrences. The rows are re-read so that
+    rules changed through another worker show up at once; the upcoming
+    occurrences come from the engine.
+    """
+    try:
+        resp = supabase.table(RULES_TABLE).select('*').eq('user_id', user_id).order('created_at').execute()
+        rules = resp.data or []
+        recurring_engine.sync_user(user_id, rules)
+        return {
+            'recurring': [_rule_response(rule) for rule in rules],
+            'upcoming': recurring_engine.upcoming(user_id, limit=upcoming_limit),
+        }, 200
+    except Exception as e:
+        print(f"Error listing recurring expenses for user {user_id}: {e}")
+        return {'error': str(e)}, 500
+
+
+def create_recurring_expense(user_id, data):
+    fields, error = _validate(data)
+    if error:
+        return {'error': error}, 400
+    try:
+        count = supabase.table(RULES_TABLE).select('id', count='exact', head=True).eq('user_id', user_id).execute().count or 0
+        if count >= Config.RECURRING_MAX_RULES_PER_USER:
+            return {'error': f'At most {Config.RECURRING_MAX_RULES_PER_USER} recurring expenses are allowed'}, 400
+
+        fields.setdefault('starts_at', datetime.now(timezone.utc).isoformat())
+        resp = supabase.table(RULES_TABLE).insert({**fields, 'user_id': user_id}).execute()
+        if not resp.data:
+            return {'error': 'Failed to create recurring expense'}, 500
+        rule = resp.data[0]
+        recurring_engine.schedule(rule)
+        return {'recurring': _rule_response(rule)}, 201
+    except Exception as e:
+        print(f"Error creating recurring expense for user {user_id}: {e}")
+        return {'error': str(e)}, 500
+
+
+def update_recurring_expense(user_id, rule_id, data):
+    fields, error = _validate(data, partial=True)
+    if error:
+        return {'error': error}, 400
+    if not fields:
+        return {'error': 'Nothing to update'}, 400
+    try:
+        fields['updated_at'] = datetime.now(timezone.utc).isoformat()
+        resp = supabase.table(RULES_TABLE).update(fields).eq('id', rule_id).eq('user_id', user_id).execute()
+        if not resp.data:
+            return {'error': 'Recurring expense not found'}, 404
+        rule = resp.data[0]
+        recurring_engine.schedule(rule)
+        return {'recurring': _rule_response(rule)}, 200
+    except Exception as e:
+        print(f"Error updating recurring expense {rule_id}: {e}")
+        return {'error': str(e)}, 500
+
+
+def delete_recurring_expense(user_id, rule_id):
+    """Deletes the rule. Expenses it already created are kept."""
+    try:
+        resp = supabase.table(RULES_TABLE).delete().eq('id', rule_id).eq('user_id', user_id).execute()
+        if not resp.data:
+            return {'error': 'Recurring expense not found'}, 404
+        recurring_engine.unschedule(rule_id)
+        return {'message': 'Recurring expense deleted'}, 200
+    except Exception as e:
+        print(f"Error deleting recurring expense {rule_id}: {e}")
+        return {'error': str(e)}, 500
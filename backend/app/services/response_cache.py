@@ -0,0 +1,100 @@
+import threading
+import time
+from cachetools import LRUCache
+from app.config import Config
+
+
+class ResponseCache:
+    """
+    Per-user cache of proxied GET responses (status, headers, raw body).
+    Entries are fresh for RESPONSE_CACHE_TTL_SECONDS. For
+    RESPONSE_CACHE_STALE_SECONDS after that they are still served, while a
+    background thread refetches them (stale-while-revalidate). Older entries
+    are fetched again in the request.
+
+    Keys are chosen by the caller and must include the bearer token (or a
+    digest of it), so an entry is only served to the token that fetched it.
+    Each user's keys are indexed so that invalidate_user() can drop all of
+    them when that user's expenses change. A per-user generation counter
+    stops a refresh that was in flight during an invalidation from storing
+    its outdated result.
+    """
+
+    def __init__(self):
+        self.entries = None
+        self.by_user = {}
+        self.generations = {}
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    def _entries(self):
+        # Built on first use so that importing this module does not read Config.
+        if self.entries is None:
+            self.entries = LRUCache(maxsize=Config.RESPONSE_CACHE_MAX_ENTRIES)
+        return self.entries
+
+    def get(self, user_id, key, fetch):
+        """
+        Returns (status, headers, body, state) where state is 'hit', 'stale'
+        or 'miss'. fetch() is called on a miss, and in the background for a
+        stale entry; it must return (status, headers, body). Only 200s are stored.
+        """
+        user_id = str(user_id)
+        now = time.time()
+        with self.lock:
+            entry = self._entries().get(key)
+            generation = self.generations.get(user_id, 0)
+            if entry is not None:
+                age = now - entry['fetched_at']
+                if age <= Config.RESPONSE_CACHE_TTL_SECONDS:
+                    return entry['status'], entry['headers'], entry['body'], 'hit'
+                if age <= Config.RESPONSE_CACHE_TTL_SECONDS + Config.RESPONSE_CACHE_STALE_SECONDS:
+                    if key not in self.refreshing:
+                        self.refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(user_id, key, fetch, generation), daemon=True).start()
+                    return entry['status'], entry['headers'], entry['body'], 'stale'
+
+        status, headers, body = fetch()
+        self._store(user_id, key, status, headers, body, generation)
+        return status, headers, body, 'miss'
+
+    def _refresh(self, user_id, key, fetch, generation):
+        try:
+            status, headers, body = fetch()
+            if status == 200:
+                self._store(user_id, key, status, headers, body, generation)
+            else:
+                # e.g. the token behind the entry has expired; fetch again on the next request.
+                with self.lock:
+                    self._entries().pop(key, None)
+        except Exception as e:
+            print(f"Error refreshing cached response for user {user_id}: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def _store(self, user_id, key, status, headers, body, generation):
+        if status != 200:
+            return
+        with self.lock:
+            if self.generations.get(user_id, 0) != generation:
+                return
+            entries = self._entries()
+            entries[key] = {'status': status, 'headers': headers, 'body': body, 'fetched_at': time.time()}
+            keys = self.by_user.setdefault(user_id, set())
+            keys.add(key)
+            if len(keys) > 64:
+                # Forget keys the LRU has already evicted.
+                keys.intersection_update(k for k in keys if k in entries)
+
+    def invalidate_user(self, user_id):
+        """Drops every cached response of a user, e.g. after they add or change an expense."""
+        user_id = str(user_id)
+        with self.lock:
+            self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            entries = self._entries()
+            for key in self.by_user.pop(user_id, ()):
+                entries.pop(key, None)
+
+
+response_cache = ResponseCache()
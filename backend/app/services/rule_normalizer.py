@@ -0,0 +1,121 @@
+import re
+from functools import lru_cache
+
+# Words that never identify a merchant or category on their own.
+STOPWORDS = {
+    'a', 'an', 'and', 'at', 'by', 'for', 'from', 'in', 'into', 'is', 'my', 'of',
+    'on', 'or', 'our', 'paid', 'the', 'to', 'via', 'with', 'w', 'me', 'us', 'team',
+    'friends', 'family', 'today', 'yesterday', 'tonight', 'bill', 'payment',
+}
+
+# Words after which the merchant name usually follows ("dinner at olive garden").
+MERCHANT_MARKERS = {'at', 'from', '@', 'via'}
+
+MONTHS = (
+    'jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|'
+    'january|february|march|april|june|july|august|september|october|november|december'
+)
+
+DATE_PATTERNS = [
+    re.compile(r'\b\d{4}[-/.]\d{1,2}[-/.]\d{1,2}\b'),
+    re.compile(r'\b\d{1,2}[-/.]\d{1,2}(?:[-/.]\d{2,4})?\b'),
+    re.compile(rf'\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:{MONTHS})\b\.?(?:\s+\d{{2,4}})?'),
+    re.compile(rf'\b(?:{MONTHS})\b\.?\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{2,4}})?'),
+]
+
+AMOUNT_PATTERN = re.compile(
+    r'(?:[$€£₹¥]|\b(?:rs|inr|usd|eur|gbp)\.?)\s*\d[\d,]*(?:\.\d+)?'
+    r'|\b\d[\d,]*(?:\.\d+)?\s*(?:rs|inr|usd|eur|gbp|/-)?'
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z'&]*|@")
+
+MAX_KEYWORD_TOKENS = 3
+
+
+def _tokenize(description):
+    text = description.lower()
+    for pattern in DATE_PATTERNS:
+        text = pattern.sub(' ', text)
+    text = AMOUNT_PATTERN.sub(' ', text)
+    text = text.replace('#', ' ')
+    return TOKEN_PATTERN.findall(text)
+
+
+def _runs(tokens):
+    """Splits tokens into contiguous runs of non-stopwords, remembering if a merchant marker preceded the run."""
+    runs = []
+    current = []
+    after_marker = False
+    for token in tokens:
+        if token in STOPWORDS or token in MERCHANT_MARKERS:
+            if current:
+                runs.append((after_marker, current))
+                current = []
+            after_marker = token in MERCHANT_MARKERS
+            continue
+        if len(token) < 2:
+            continue
+        current.append(token)
+    if current:
+        runs.append((after_marker, current))
+    return runs
+
+
+def normalize_keyword(description):
+    """
+    Reduces a free-text description to a short merchant-like keyword.
+    "dinner with team at olive garden 12/3" -> "olive garden"
+    Falls back to the lowercased description when nothing survives.
+    """
+    lowered = description.lower().strip()
+    runs = _runs(_tokenize(lowered))
+    if not runs:
+        return lowered
+
+    merchant_runs = [run for after_marker, run in runs if after_marker]
+    chosen = merchant_runs[-1] if merchant_runs else runs[0][1]
+    return ' '.join(chosen[:MAX_KEYWORD_TOKENS])
+
+
+@lru_cache(maxsize=4096)
+def _keyword_pattern(keyword):
+    words = [re.escape(word) for word in keyword.lower().split()]
+    return re.compile(r'(?<![a-z0-9])' + r'\s+'.join(words) + r'(?![a-z0-9])')
+
+
+def keyword_matches(keyword, text):
+    """
+    True when keyword occurs in text as whole words: "rent" matches "rent
+    for march" but not "parent" or "current", "pizza hut" matches
+    "pizza hut #12" but not "pizza huts".
+    """
+    if not keyword or not keyword.strip():
+        return False
+    return _keyword_pattern(keyword.strip()).search(text.lower()) is not None
+
+
+def compact_keywords(keywords):
+    """
+    Normalizes a keyword list, drops duplicates and removes keywords that are
+    already covered by a shorter keyword. Rules match whole words
+    (keyword_matches), so "pizza hut" is redundant when "pizza" is present,
+    while "parent" stays next to "rent". Order is preserved.
+    """
+    normalized = []
+    seen = set()
+    for keyword in keywords or []:
+        if not keyword:
+            continue
+        key = normalize_keyword(keyword)
+        if key and key not in seen:
+            seen.add(key)
+            normalized.append(key)
+
+    by_length = sorted(normalized, key=len)
+    kept = set()
+    for key in by_length:
+        if not any(keyword_matches(shorter, key) for shorter in kept):
+            kept.add(key)
+
+    return [key for key in normalized if key in kept]
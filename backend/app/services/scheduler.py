@@ -0,0 +1,36 @@
+import threading
+
+_jobs = {}
+_lock = threading.Lock()
+
+
+def run_periodically(name, interval_seconds, job, initial_delay=None):
+    """
+    Runs job() every interval_seconds on a daemon thread. Each worker
+    process runs its own copy, so jobs must be safe to run concurrently.
+    Starting a job that is already running is a no-op. Returns the stop event.
+    """
+    with _lock:
+        if name in _jobs:
+            return _jobs[name]
+        stop = threading.Event()
+        _jobs[name] = stop
+
+    def loop():
+        delay = interval_seconds if initial_delay is None else initial_delay
+        while not stop.wait(delay):
+            try:
+                job()
+            except Exception as e:
+                print(f"Scheduled job {name} failed: {e}")
+            delay = interval_seconds
+
+    threading.Thread(target=loop, name=f"job-{name}", daemon=True).start()
+    return stop
+
+
+def stop_job(name):
+    with _lock:
+        stop = _jobs.pop(name, None)
+    if stop:
+        stop.set()
@@ -0,0 +1,151 @@
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from app.extensions import supabase
+from app.config import Config
+
+ROLLUP_TABLE = 'spending_rollups'
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def to_day(value):
+    """The UTC calendar day of a date, datetime or ISO 8601 string."""
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).date() if value.tzinfo else value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if len(text) > 10:
+        return to_day(datetime.fromisoformat(text.replace('Z', '+00:00')))
+    return date.fromisoformat(text)
+
+
+def bucket_start(day, granularity):
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity '{granularity}'")
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def cover(start, end):
+    """
+    Splits the inclusive day range [start, end] into the whole months inside
+    it and the leftover days at either end. Returns (month starts, [(first
+    day, last day)]), so a range is read as at most one month query and two
+    day queries.
+    """
+    month = start if start.day == 1 else _next_month(start)
+    months = []
+    while _next_month(month) - timedelta(days=1) <= end:
+        months.append(month)
+        month = _next_month(month)
+    if not months:
+        return [], [(start, end)] if start <= end else []
+
+    day_ranges = []
+    if start < months[0]:
+        day_ranges.append((start, months[0] - timedelta(days=1)))
+    tail = _next_month(months[-1])
+    if tail <= end:
+        day_ranges.append((tail, end))
+    return months, day_ranges
+
+
+def fetch_rollups(user_id, granularity, start, end):
+    """Rollup rows of one granularity with bucket between start and end (inclusive)."""
+    resp = supabase.table(ROLLUP_TABLE) \
+        .select('bucket,category,total,count') \
+        .eq('user_id', user_id) \
+        .eq('granularity', granularity) \
+        .gte('bucket', start.isoformat()) \
+        .lte('bucket', end.isoformat()) \
+        .execute()
+    return [
+        {'bucket': to_day(row['bucket']), 'category': row['category'], 'total': float(row['total'] or 0), 'count': int(row['count'] or 0)}
+        for row in (resp.data or [])
+    ]
+
+
+def category_totals(user_id, start, end):
+    """{category: {'total', 'count'}} over the inclusive day range, read from month and day rollups."""
+    months, day_ranges = cover(start, end)
+    rows = []
+    if months:
+        rows.extend(fetch_rollups(user_id, 'month', months[0], months[-1]))
+    for first, last in day_ranges:
+        rows.extend(fetch_rollups(user_id, 'day', first, last))
+
+    totals = defaultdict(lambda: {'total': 0.0, 'count': 0})
+    for row in rows:
+        totals[row['category']]['total'] += row['total']
+        totals[row['category']]['count'] += row['count']
+    return dict(totals)
+
+
+def daily_totals(user_id, start, end):
+    """{day: {'total', 'count'}} for days in the range that have spending, across categories."""
+    totals = defaultdict(lambda: {'total': 0.0, 'count': 0})
+    for row in fetch_rollups(user_id, 'day', start, end):
+        totals[row['bucket']]['total'] += row['total']
+        totals[row['bucket']]['count'] += row['count']
+    return dict(totals)
+
+
+def total_since(user_id, month_start):
+    """Total of every month bucket from month_start on."""
+    resp = supabase.table(ROLLUP_TABLE) \
+        .select('total') \
+        .eq('user_id', user_id) \
+        .eq('granularity', 'month') \
+        .gte('bucket', month_start.isoformat()) \
+        .execute()
+    return sum(float(row['total'] or 0) for row in (resp.data or []))
+
+
+def _user_id_pages(batch_size):
+    offset = 0
+    while True:
+        resp = supabase.table('users').select('id').order('id').range(offset, offset + batch_size - 1).execute()
+        ids = [row['id'] for row in (resp.data or [])]
+        if ids:
+            yield ids
+        if len(ids) < batch_size:
+            return
+        offset += batch_size
+
+
+def backfill_rollups(user_ids=None, batch_size=None, pause=None):
+    """
+    Rebuilds the rollups of the given users (default: every user) from
+    their expenses with the backfill_spending_rollups RPC (migrations/005),
+    batch_size users per call, pausing between calls. Safe to run while
+    expenses are being written: the RPC and the expenses trigger take the
+    same per-user lock.
+    """
+    batch_size = batch_size or Config.SPENDING_ROLLUP_BACKFILL_BATCH_SIZE
+    pause = Config.SPENDING_ROLLUP_BACKFILL_PAUSE_SECONDS if pause is None else pause
+
+    if user_ids is None:
+        batches = _user_id_pages(batch_size)
+    else:
+        user_ids = list(user_ids)
+        batches = (user_ids[i:i + batch_size] for i in range(0, len(user_ids), batch_size))
+
+    users = rows = calls = 0
+    for ids in batches:
+        if calls and pause:
+            time.sleep(pause)
+        resp = supabase.rpc('backfill_spending_rollups', {'p_user_ids': ids}).execute()
+        users += len(ids)
+        rows += int(resp.data or 0)
+        calls += 1
+
+    print(f"Spending rollups: rebuilt {rows} rows for {users} users in {calls} calls")
+    return {'users': users, 'rows': rows, 'calls': calls}
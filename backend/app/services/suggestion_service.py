@@ -0,0 +1,231 @@
+import re
+import threading
+import time
+from collections import Counter
+from statistics import median
+from cachetools import LRUCache
+from app.extensions import supabase
+from app.config import Config
+
+MAX_SUGGESTIONS = 8
+# Measured footprint of a trie node and of an entry, for sizing the cache.
+NODE_BYTES = 300
+ENTRY_BYTES = 500
+
+
+def _normalize(text):
+    return re.sub(r'\s+', ' ', (text or '').lower()).strip()
+
+
+class _Entry:
+    __slots__ = ('text', 'count', 'categories', 'amounts')
+
+    def __init__(self, text):
+        self.text = text
+        self.count = 0
+        self.categories = Counter()
+        self.amounts = []
+
+    def add(self, category, amount):
+        self.count += 1
+        if category:
+            self.categories[category] += 1
+        if amount is not None:
+            self.amounts.append(amount)
+            del self.amounts[:-50]
+
+    def as_suggestion(self):
+        category = self.categories.most_common(1)[0][0] if self.categories else None
+        return {
+            'description': self.text,
+            'category': category,
+            'typical_amount': round(median(self.amounts), 2) if self.amounts else None,
+            'count': self.count,
+        }
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class DescriptionTrie:
+    """
+    Prefix trie over one user's past expense descriptions. Word starts are
+    indexed, so "gard" finds "olive garden". Each node keeps its best
+    entries pre-sorted, so a lookup is a walk down the query's characters.
+
+    Only the first max_words word starts of a description are indexed, each
+    to max_depth characters, which bounds the nodes a description can add.
+    Longer queries scan the entries instead.
+    """
+
+    def __init__(self, top_k=MAX_SUGGESTIONS, max_depth=None, max_words=None):
+        self.root = _Node()
+        self.entries = {}
+        self.top_k = top_k
+        self.max_depth = max_depth or Config.SUGGEST_MAX_PREFIX_CHARS
+        self.max_words = max_words or Config.SUGGEST_MAX_INDEXED_WORDS
+        self.node_count = 1
+        self.built_at = time.time()
+
+    def approx_bytes(self):
+        return self.node_count * NODE_BYTES + len(self.entries) * ENTRY_BYTES
+
+    def _rank(self, key):
+        entry = self.entries[key]
+        return (-entry.count, len(key))
+
+    def _index(self, key):
+        starts = [0] + [m.end() for m in re.finditer(r'\s+', key)]
+        for start in starts[:self.max_words]:
+            node = self.root
+            for char in key[start:start + self.max_depth]:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                    self.node_count += 1
+                node = child
+                if key not in node.top:
+                    node.top.append(key)
+                node.top.sort(key=self._rank)
+                del node.top[self.top_k:]
+
+    def add(self, description, category=None, amount=None):
+        key = _normalize(description)
+        if not key:
+            return
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = _Entry(description.strip())
+        entry.add(category, amount)
+        self._index(key)
+
+    def _scan(self, query, limit):
+        word_start = re.compile(r'(?:^|\s)' + re.escape(query))
+        keys = sorted((key for key in self.entries if word_start.search(key)), key=self._rank)
+        return keys[:limit]
+
+    def suggest(self, query, limit=MAX_SUGGESTIONS):
+        query = _normalize(query)
+        node = self.root
+        for char in query[:self.max_depth]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if len(query) > self.max_depth:
+            keys = self._scan(query, limit)
+        else:
+            keys = node.top[:limit]
+        return [self.entries[key].as_suggestion() for key in keys]
+
+
+class SuggestionIndex:
+    """
+    Per-user tries, built once from the user's expenses and refreshed in the
+    background. The LRU is sized by the tries' estimated memory
+    (SUGGEST_CACHE_MAX_BYTES) rather than by user count, so a few users with
+    long histories cannot push it past its budget. Expense
+    writes reported through notify mark the user's trie stale, and it is
+    rebuilt in the background on its next use.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self._tries = None
+        self.lock = threading.Lock()
+        self.refreshing = set()
+
+    @property
+    def tries(self):
+        # Sized on first use so that importing this module does not read Config.
+        if self._tries is None:
+            self._tries = LRUCache(maxsize=self.max_bytes or Config.SUGGEST_CACHE_MAX_BYTES,
+                                   getsizeof=DescriptionTrie.approx_bytes)
+        return self._tries
+
+    def _store(self, user_id, trie):
+        """Caches the trie (re-inserting updates its size). Caller holds the lock."""
+        try:
+            self.tries[user_id] = trie
+        except ValueError:
+            # Larger than the whole cache: served, but not kept.
+            self.tries.pop(user_id, None)
+
+    def _load(self, user_id):
+        response = supabase.table('expenses') \
+            .select('description, amount, category') \
+            .eq('payer_id', user_id) \
+            .order('date', desc=True) \
+            .limit(Config.SUGGEST_MAX_DESCRIPTIONS) \
+            .execute()
+
+        trie = DescriptionTrie()
+        # Oldest first so the most recent spelling of a description is the one displayed.
+        for row in reversed(response.data or []):
+            if row.get('category') == 'Settlement':
+                continue
+            try:
+                amount = float(row['amount']) if row.get('amount') is not None else None
+            except (TypeError, ValueError):
+                amount = None
+            trie.add(row.get('description') or '', row.get('category'), amount)
+        return trie
+
+    def _refresh(self, user_id):
+        try:
+            trie = self._load(user_id)
+            with self.lock:
+                self._store(user_id, trie)
+        except Exception as e:
+            print(f"Error refreshing suggestions for user {user_id}: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(user_id)
+
+    def get_trie(self, user_id):
+        with self.lock:
+            trie = self.tries.get(user_id)
+            stale = trie is not None and time.time() - trie.built_at > Config.SUGGEST_REFRESH_SECONDS
+            if stale and user_id not in self.refreshing:
+                self.refreshing.add(user_id)
+                threading.Thread(target=self._refresh, args=(user_id,), daemon=True).start()
+        if trie is None:
+            # Cold start: the only request that waits on the database.
+            trie = self._load(user_id)
+            with self.lock:
+                self._store(user_id, trie)
+        return trie
+
+    def record(self, user_id, description, category=None, amount=None):
+        """Adds a description to an already-built trie (no-op if the user has none yet)."""
+        with self.lock:
+            trie = self.tries.get(user_id)
+            if trie is not None:
+                trie.add(description, category, amount)
+                self._store(user_id, trie)
+
+    def invalidate(self, user_id):
+        """Marks the user's trie stale after an expense write; the next lookup refreshes it in the background."""
+        with self.lock:
+            trie = self.tries.get(user_id)
+            if trie is not None:
+                trie.built_at = 0
+
+
+suggestion_index = SuggestionIndex()
+
+
+def get_suggestions(user_id, query, limit=MAX_SUGGESTIONS):
+    try:
+        query = (query or '').strip()
+        if not query:
+            return {'suggestions': []}, 200
+        trie = suggestion_index.get_trie(user_id)
+        return {'suggestions': trie.suggest(query, min(limit, MAX_SUGGESTIONS))}, 200
+    except Exception as e:
+        print(f"Error fetching suggestions: {e}")
+        return {'error': 'Failed to fetch suggestions', 'details': str(e)}, 500
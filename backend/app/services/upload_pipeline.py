@@ -0,0 +1,63 @@
+import hashlib
+from tempfile import SpooledTemporaryFile
+from flask import Request
+from app.config import Config
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadRequest(Request):
+    """
+    Request class that spools multipart file parts to disk once they exceed
+    UPLOAD_SPOOL_THRESHOLD, so receiving, hashing and preprocessing an upload
+    never hold it fully in memory. (Sending it on to Gemini still does: the
+    SDK only takes inline bytes.)
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=Config.UPLOAD_SPOOL_THRESHOLD, mode='rb+')
+
+
+class SpooledUpload:
+    """A received upload: a seekable stream plus its size and SHA-256, computed in one pass."""
+
+    def __init__(self, stream, size, sha256, mime_type):
+        self.stream = stream
+        self.size = size
+        self.sha256 = sha256
+        self.mime_type = mime_type
+
+    def open(self):
+        self.stream.seek(0)
+        return self.stream
+
+    def read_all(self):
+        return self.open().read()
+
+
+def receive_upload(file_storage, max_bytes=None, chunk_size=None):
+    """
+    Walks the uploaded file in chunks, enforcing max_bytes and hashing as it
+    goes. Raises UploadTooLarge without reading the rest once the limit is hit.
+    """
+    max_bytes = max_bytes or Config.MAX_RECEIPT_UPLOAD_BYTES
+    chunk_size = chunk_size or Config.UPLOAD_CHUNK_SIZE
+
+    stream = file_storage.stream
+    stream.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        digest.update(chunk)
+
+    stream.seek(0)
+    return SpooledUpload(stream, size, digest.hexdigest(), file_storage.mimetype or 'image/jpeg')
+
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Response
+from app.config import Config
+
+# Upstream response headers worth passing on to the browser.
+PASSTHROUGH_HEADERS = ('Content-Type', 'Content-Encoding', 'Content-Length', 'Cache-Control', 'ETag', 'Last-Modified')
+
+# Latency samples kept per upstream for percentiles, and the number of upstream names tracked.
+SAMPLES_PER_UPSTREAM = 500
+MAX_UPSTREAMS = 100
+
+
+class UpstreamError(Exception):
+    """The upstream could not be reached or timed out. status is the HTTP status to answer with."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class UpstreamProxy:
+    """
+    Forwards requests to the Supabase edge functions over one pooled
+    keep-alive requests.Session, with PROXY_CONNECT_TIMEOUT/PROXY_READ_TIMEOUT
+    on every call. Responses are streamed back as the raw upstream bytes
+    (still compressed, never decoded and re-encoded as JSON).
+
+    Latency to response headers is recorded per upstream name; stats()
+    reports count, errors and p50/p95/max over the recent samples.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.session_lock = threading.Lock()
+        self.metrics = {}
+        self.metrics_lock = threading.Lock()
+
+    def _get_session(self):
+        with self.session_lock:
+            if self.session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=Config.PROXY_POOL_SIZE, pool_maxsize=Config.PROXY_POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.session = session
+            return self.session
+
+    def request(self, upstream, method, url, headers=None, params=None, data=None):
+        """Sends the request and returns the streaming requests.Response. Raises UpstreamError."""
+        started = time.perf_counter()
+        try:
+            response = self._get_session().request(
+                method, url,
+                headers=headers, params=params, data=data,
+                stream=True,
+                timeout=(Config.PROXY_CONNECT_TIMEOUT, Config.PROXY_READ_TIMEOUT)
+            )
+        except requests.exceptions.Timeout as e:
+            self._record(upstream, time.perf_counter() - started, error=True)
+            print(f"Upstream {upstream} timed out: {e}")
+            raise UpstreamError('Upstream timed out', 504)
+        except requests.exceptions.RequestException as e:
+            self._record(upstream, time.perf_counter() - started, error=True)
+            print(f"Upstream {upstream} unreachable: {e}")
+            raise UpstreamError('Upstream unavailable', 502)
+        self._record(upstream, time.perf_counter() - started, error=response.status_code >= 500)
+        return response
+
+    def _record(self, upstream, seconds, error=False):
+        with self.metrics_lock:
+            if upstream not in self.metrics and len(self.metrics) >= MAX_UPSTREAMS:
+                upstream = 'other'
+            entry = self.metrics.get(upstream)
+            if entry is None:
+                entry = self.metrics[upstream] = {'count': 0, 'errors': 0, 'samples': deque(maxlen=SAMPLES_PER_UPSTREAM)}
+            entry['count'] += 1
+            entry['errors'] += int(error)
+            entry['samples'].append(seconds)
+
+    def stats(self):
+        with self.metrics_lock:
+            snapshot = {name: (entry['count'], entry['errors'], sorted(entry['samples'])) for name, entry in self.metrics.items()}
+        report = {}
+        for name, (count, errors, samples) in snapshot.items():
+            report[name] = {
+                'count': count,
+                'errors': errors,
+                'p50_ms': round(samples[len(samples) // 2] * 1000, 1) if samples else None,
+                'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1) if samples else None,
+                'max_ms': round(samples[-1] * 1000, 1) if samples else None,
+            }
+        return report
+
+
+def _passthrough_headers(upstream_response):
+    return {name: upstream_response.headers[name] for name in PASSTHROUGH_HEADERS if name in upstream_response.headers}
+
+
+def read_response(upstream_response):
+    """Reads a streaming upstream response whole, still encoded. Returns (status, headers, body)."""
+    try:
+        body = upstream_response.raw.read(decode_content=False)
+    finally:
+        upstream_response.close()
+    return upstream_response.status_code, _passthrough_headers(upstream_response), body
+
+
+def bytes_response(status, headers, body, cache_state=None):
+    response = Response(body, status=status, headers=headers)
+    if cache_state:
+        response.headers['X-Cache'] = cache_state.upper()
+    return response
+
+
+def stream_response(upstream_response):
+    """Wraps a streaming upstream response as a Flask response, passing the bytes through untouched."""
+    def generate():
+        try:
+            for chunk in upstream_response.raw.stream(Config.PROXY_CHUNK_SIZE, decode_content=False):
+                yield chunk
+        finally:
+            upstream_response.close()
+
+    return Response(generate(), status=upstream_response.status_code, headers=_passthrough_headers(upstream_response), direct_passthrough=True)
+
+
+upstream_proxy = UpstreamProxy()
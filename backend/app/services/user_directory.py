@@ -0,0 +1,160 @@
+import threading
+from cachetools import TTLCache
+from app.extensions import supabase
+from app.config import Config
+
+
+class EmailLookupError(Exception):
+    """An email could not be resolved for a reason other than 'no such user'."""
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+class EmailResolver:
+    """
+    Resolves invitee emails to user ids. Hits are cached for
+    EMAIL_RESOLVER_TTL_SECONDS, misses ("no such user") for the much shorter
+    EMAIL_RESOLVER_NEGATIVE_TTL_SECONDS, so repeated invites and typos do
+    not go back to the database each time.
+
+    Lookups go to public.users first, in one query for the whole batch. Only
+    the emails missing there fall back to the get_user_by_email RPC against
+    auth.users, and the profiles it finds are upserted in one request.
+
+    Signups happen in the frontend, so the backend never sees them directly.
+    A negative entry is dropped as soon as that email authenticates, and
+    entries are refreshed whenever the resolver upserts a profile.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.found = None
+        self.missing = None
+
+    def _caches(self):
+        # Built on first use so that importing this module does not read Config.
+        if self.found is None:
+            self.found = TTLCache(maxsize=Config.EMAIL_RESOLVER_MAX_ENTRIES, ttl=Config.EMAIL_RESOLVER_TTL_SECONDS)
+            self.missing = TTLCache(maxsize=Config.EMAIL_RESOLVER_MAX_ENTRIES, ttl=Config.EMAIL_RESOLVER_NEGATIVE_TTL_SECONDS)
+        return self.found, self.missing
+
+    def resolve(self, email, name_hint=None):
+        """Returns the user id for email, or None if there is no such user. Raises EmailLookupError."""
+        email = normalize_email(email)
+        resolved, errors = self.resolve_many([email], {email: name_hint})
+        if email in errors:
+            raise EmailLookupError(errors[email])
+        return resolved.get(email)
+
+    def resolve_many(self, emails, name_hints=None):
+        """
+        Resolves a list of emails. Returns (resolved, errors): resolved maps
+        each normalised email to its user id or None; errors maps the emails
+        that could not be looked up to a message.
+        """
+        name_hints = {normalize_email(k): v for k, v in (name_hints or {}).items()}
+        resolved, errors, pending = {}, {}, []
+        with self.lock:
+            found, missing = self._caches()
+            for email in dict.fromkeys(normalize_email(e) for e in emails):
+                if not email:
+                    continue
+                if email in found:
+                    resolved[email] = found[email]
+                elif email in missing:
+                    resolved[email] = None
+                else:
+                    pending.append(email)
+        if not pending:
+            return resolved, errors
+
+        ids = self._lookup_profiles(pending)
+
+        new_profiles = []
+        for email in pending:
+            if email in ids:
+                continue
+            try:
+                auth_user = self._lookup_auth_user(email)
+            except Exception as e:
+                print(f"Error looking up user in auth.users: {str(e)}")
+                errors[email] = 'Error looking up user information'
+                continue
+            if auth_user:
+                metadata = auth_user.get('raw_user_meta_data', {}) or {}
+                new_profiles.append({
+                    'id': auth_user['id'],
+                    'email': email,
+                    'name': metadata.get('full_name') or name_hints.get(email) or email.split('@')[0]
+                })
+
+        if new_profiles:
+            upsert_resp = supabase.table('users').upsert(new_profiles).execute()
+            if not upsert_resp or (hasattr(upsert_resp, 'error') and upsert_resp.error):
+                print(f"Error upserting user to public.users: {getattr(upsert_resp, 'error', 'Unknown')}")
+                for profile in new_profiles:
+                    errors[profile['email']] = 'Failed to create user profile'
+            else:
+                ids.update({profile['email']: profile['id'] for profile in new_profiles})
+
+        with self.lock:
+            found, missing = self._caches()
+            for email in pending:
+                if email in errors:
+                    continue
+                user_id = ids.get(email)
+                resolved[email] = user_id
+                if user_id is None:
+                    missing[email] = True
+                else:
+                    found[email] = user_id
+        return resolved, errors
+
+    def _lookup_profiles(self, emails):
+        if len(emails) == 1:
+            response = supabase.table('users') \
+                .select('id, email') \
+                .eq('email', emails[0]) \
+                .maybe_single() \
+                .execute()
+            data = response.data if response and hasattr(response, 'data') else None
+            return {emails[0]: data['id']} if data and data.get('id') else {}
+        else:
+            response = supabase.table('users') \
+                .select('id, email') \
+                .in_('email', emails) \
+                .execute()
+            rows = (response.data if response and hasattr(response, 'data') else None) or []
+            return {normalize_email(row.get('email')): row['id'] for row in rows if row.get('id')}
+
+    def _lookup_auth_user(self, email):
+        rpc_response = supabase.rpc('get_user_by_email', {
+            'user_email': email
+        }).execute()
+        if not rpc_response or not hasattr(rpc_response, 'data') or not rpc_response.data:
+            return None
+        return rpc_response.data[0]
+
+    def forget_missing(self, email):
+        """Drops a cached 'no such user' for email, e.g. once that address has signed up."""
+        email = normalize_email(email)
+        with self.lock:
+            if self.missing is not None:
+                self.missing.pop(email, None)
+
+    def invalidate(self, email):
+        email = normalize_email(email)
+        with self.lock:
+            if self.found is not None:
+                self.found.pop(email, None)
+                self.missing.pop(email, None)
+
+    def clear(self):
+        with self.lock:
+            self.found = None
+            self.missing = None
+
+
+email_resolver = EmailResolver()
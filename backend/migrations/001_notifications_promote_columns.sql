@@ -0,0 +1,80 @@
+-- Promote notifications.data->>'group_id' / 'invitation_id' to indexed columns,
+-- and add the indexes the notifications API and retention job rely on.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction: run this file
+-- with psql (autocommit) or statement by statement in the SQL editor.
+-- Once it has been applied, set NOTIFICATIONS_PROMOTED_COLUMNS=true so the
+-- backend writes and filters on the new columns.
+
+ALTER TABLE public.notifications ADD COLUMN IF NOT EXISTS group_id uuid;
+ALTER TABLE public.notifications ADD COLUMN IF NOT EXISTS invitation_id uuid;
+
+-- Keep the columns filled for writers that only set data (the frontend, triggers).
+CREATE OR REPLACE FUNCTION public.notifications_sync_promoted_columns()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.group_id IS NULL AND NEW.data->>'group_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$' THEN
+        NEW.group_id := (NEW.data->>'group_id')::uuid;
+    END IF;
+    IF NEW.invitation_id IS NULL AND NEW.data->>'invitation_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$' THEN
+        NEW.invitation_id := (NEW.data->>'invitation_id')::uuid;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS notifications_sync_promoted_columns ON public.notifications;
+CREATE TRIGGER notifications_sync_promoted_columns
+    BEFORE INSERT OR UPDATE OF data ON public.notifications
+    FOR EACH ROW EXECUTE FUNCTION public.notifications_sync_promoted_columns();
+
+-- Backfill existing rows in batches of 5000, committing after each so no
+-- single statement locks or rewrites the whole table. Re-runnable; each pass
+-- only touches rows still missing a value that the trigger can fill.
+DO $$
+DECLARE
+    updated integer;
+BEGIN
+    LOOP
+        UPDATE public.notifications
+        SET data = data
+        WHERE id IN (
+            SELECT id FROM public.notifications
+            WHERE (group_id IS NULL AND data->>'group_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+               OR (invitation_id IS NULL AND data->>'invitation_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+            LIMIT 5000
+        );
+        GET DIAGNOSTICS updated = ROW_COUNT;
+        EXIT WHEN updated = 0;
+        COMMIT;
+        PERFORM pg_sleep(0.1);
+    END LOOP;
+END;
+$$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notifications_user_group_idx
+    ON public.notifications (user_id, group_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notifications_invitation_idx
+    ON public.notifications (invitation_id) WHERE invitation_id IS NOT NULL;
+-- Keyset pagination: WHERE user_id = ? ORDER BY created_at DESC, id DESC.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notifications_user_created_idx
+    ON public.notifications (user_id, created_at DESC, id DESC);
+-- Retention: oldest read rows first.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notifications_read_created_idx
+    ON public.notifications (created_at) WHERE read;
+
+-- Size report used by the retention job (called through PostgREST RPC).
+CREATE OR REPLACE FUNCTION public.notifications_table_stats()
+RETURNS TABLE (total_bytes bigint, table_bytes bigint, index_bytes bigint, estimated_rows bigint)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT pg_total_relation_size('public.notifications'),
+           pg_relation_size('public.notifications'),
+           pg_indexes_size('public.notifications'),
+           (SELECT reltuples::bigint FROM pg_class WHERE oid = 'public.notifications'::regclass);
+$$;
@@ -0,0 +1,90 @@
+-- Accept or decline a group invitation in one transaction and one round-trip.
+--
+-- Replaces the sequence respond_to_invitation used to run from the backend
+-- (fetch invitation, check membership, insert member, clear older accepted
+-- invitations, update status). The invitation row is locked for the duration,
+-- so concurrent responses to the same invitation are serialised.
+--
+-- Idempotent: repeating the same action on an invitation that is already in
+-- the resulting state returns the same payload with replayed = true and
+-- changes nothing, so a client retrying after a timeout is safe.
+--
+-- Once applied, set INVITATION_RESPONSE_RPC=true so the backend calls it.
+
+CREATE OR REPLACE FUNCTION public.respond_to_invitation(
+    p_invitation_id uuid,
+    p_user_id uuid,
+    p_action text
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    inv public.group_invitations%ROWTYPE;
+    target_status text;
+    group_name text;
+BEGIN
+    IF p_action NOT IN ('accept', 'decline') THEN
+        RAISE EXCEPTION 'invalid action %', p_action USING ERRCODE = '22023';
+    END IF;
+    target_status := CASE p_action WHEN 'accept' THEN 'accepted' ELSE 'declined' END;
+
+    SELECT * INTO inv FROM public.group_invitations WHERE id = p_invitation_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('outcome', 'not_found');
+    END IF;
+    IF inv.invited_user_id <> p_user_id THEN
+        -- Only reveal the invitation exists while it is still actionable.
+        RETURN jsonb_build_object('outcome', CASE WHEN inv.status = 'pending' THEN 'forbidden' ELSE 'not_found' END);
+    END IF;
+
+    SELECT g.name INTO group_name FROM public.groups g WHERE g.id = inv.group_id;
+
+    IF inv.status = target_status THEN
+        RETURN jsonb_build_object(
+            'outcome', target_status,
+            'replayed', true,
+            'group_id', inv.group_id,
+            'group_name', group_name,
+            'invited_by_id', inv.invited_by_id
+        );
+    END IF;
+    IF inv.status <> 'pending' THEN
+        RETURN jsonb_build_object('outcome', 'not_found');
+    END IF;
+
+    IF p_action = 'accept' THEN
+        INSERT INTO public.group_members (group_id, user_id)
+        SELECT inv.group_id, p_user_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM public.group_members
+            WHERE group_id = inv.group_id AND user_id = p_user_id
+        );
+
+        -- Older accepted invitations for the same group would violate the
+        -- (group_id, invited_user_id, status) constraint.
+        DELETE FROM public.group_invitations
+        WHERE group_id = inv.group_id
+          AND invited_user_id = p_user_id
+          AND status = 'accepted'
+          AND id <> inv.id;
+    END IF;
+
+    UPDATE public.group_invitations
+    SET status = target_status, updated_at = now()
+    WHERE id = inv.id;
+
+    RETURN jsonb_build_object(
+        'outcome', target_status,
+        'replayed', false,
+        'group_id', inv.group_id,
+        'group_name', group_name,
+        'invited_by_id', inv.invited_by_id
+    );
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.respond_to_invitation(uuid, uuid, text) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.respond_to_invitation(uuid, uuid, text) TO service_role;
@@ -0,0 +1,19 @@
+-- One membership row per (group, user).
+--
+-- Joining through a signed invite link is a single INSERT into group_members;
+-- this index makes a repeated join fail with a unique violation (23505),
+-- which the backend reports as "already a member", instead of adding a
+-- duplicate row.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction: run this file
+-- with psql (autocommit) or statement by statement in the SQL editor.
+
+-- Remove any duplicates first, keeping the earliest row of each pair.
+DELETE FROM public.group_members a
+USING public.group_members b
+WHERE a.group_id = b.group_id
+  AND a.user_id = b.user_id
+  AND a.ctid > b.ctid;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS group_members_group_user_key
+    ON public.group_members (group_id, user_id);
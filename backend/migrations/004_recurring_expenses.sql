@@ -0,0 +1,99 @@
+-- Recurring expense rules, scheduled by the backend (app/services/recurring_engine.py)
+-- instead of the recurring-personal-expenses edge function.
+--
+-- A rule is a cron expression (minute hour day-of-month month day-of-week,
+-- UTC). Each run becomes a personal expense tagged with the rule id and the
+-- scheduled time. The unique index on that pair makes writing a run
+-- idempotent, so every worker process can run its own scheduler.
+
+CREATE TABLE IF NOT EXISTS public.recurring_expenses (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id uuid NOT NULL REFERENCES public.users (id) ON DELETE CASCADE,
+    title text NOT NULL,
+    amount numeric(12, 2) NOT NULL CHECK (amount > 0),
+    category text,
+    schedule text NOT NULL,
+    starts_at timestamptz NOT NULL DEFAULT now(),
+    ends_at timestamptz,
+    last_run_at timestamptz,
+    active boolean NOT NULL DEFAULT true,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS recurring_expenses_user_idx
+    ON public.recurring_expenses (user_id);
+
+ALTER TABLE public.recurring_expenses ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS recurring_expenses_owner_select ON public.recurring_expenses;
+CREATE POLICY recurring_expenses_owner_select ON public.recurring_expenses
+    FOR SELECT USING (auth.uid() = user_id);
+
+ALTER TABLE public.expenses
+    ADD COLUMN IF NOT EXISTS recurring_expense_id uuid REFERENCES public.recurring_expenses (id) ON DELETE SET NULL,
+    ADD COLUMN IF NOT EXISTS occurs_at timestamptz;
+
+CREATE UNIQUE INDEX IF NOT EXISTS expenses_recurring_occurrence_key
+    ON public.expenses (recurring_expense_id, occurs_at)
+    WHERE recurring_expense_id IS NOT NULL;
+
+
+-- Writes a batch of runs as expenses and advances each rule's last_run_at,
+-- in one transaction. Runs that were already written (by this or another
+-- worker) are skipped. p_occurrences is a JSON array of
+-- {recurring_expense_id, user_id, description, amount, category, occurs_at}.
+CREATE OR REPLACE FUNCTION public.materialize_recurring_expenses(p_occurrences jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    inserted integer;
+BEGIN
+    WITH occ AS (
+        SELECT *
+        FROM jsonb_to_recordset(p_occurrences) AS o(
+            recurring_expense_id uuid,
+            user_id uuid,
+            description text,
+            amount numeric,
+            category text,
+            occurs_at timestamptz
+        )
+    ),
+    -- Skip runs of rules deleted, paused or ended since the batch was built:
+    -- a worker only reloads its rules every RECURRING_RELOAD_SECONDS, so
+    -- another worker may have changed them in the meantime. The user check
+    -- keeps a run from being written for anyone but the rule's owner.
+    live AS (
+        SELECT occ.* FROM occ
+        JOIN public.recurring_expenses r
+            ON r.id = occ.recurring_expense_id
+           AND r.user_id = occ.user_id
+        WHERE r.active
+          AND (r.ends_at IS NULL OR occ.occurs_at <= r.ends_at)
+    )
+    INSERT INTO public.expenses (description, amount, category, payer_id, group_id, date, recurring_expense_id, occurs_at)
+    SELECT description, amount, category, user_id, NULL, occurs_at, recurring_expense_id, occurs_at
+    FROM live
+    ON CONFLICT (recurring_expense_id, occurs_at) WHERE recurring_expense_id IS NOT NULL DO NOTHING;
+
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+
+    UPDATE public.recurring_expenses r
+    SET last_run_at = GREATEST(COALESCE(r.last_run_at, '-infinity'), latest.occurs_at)
+    FROM (
+        SELECT (o ->> 'recurring_expense_id')::uuid AS id, max((o ->> 'occurs_at')::timestamptz) AS occurs_at
+        FROM jsonb_array_elements(p_occurrences) AS o
+        GROUP BY 1
+    ) AS latest
+    WHERE r.id = latest.id;
+
+    RETURN jsonb_build_object('inserted', inserted);
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.materialize_recurring_expenses(jsonb) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.materialize_recurring_expenses(jsonb) TO service_role;
@@ -0,0 +1,160 @@
+-- Pre-aggregated spending per (payer, granularity, bucket, category).
+--
+-- Buckets are UTC calendar days, ISO weeks (starting Monday) and months,
+-- each identified by its first day. A trigger on expenses keeps them up
+-- to date on every insert, update and delete, wherever the write comes
+-- from: the frontend, the settlement flow or recurring expenses.
+--
+-- After applying, build the rollups for existing expenses with
+--     python -m scripts.backfill_spending_rollups
+-- and then set SPENDING_ROLLUPS=true so the backend reads them.
+
+CREATE TABLE IF NOT EXISTS public.spending_rollups (
+    user_id uuid NOT NULL,
+    granularity text NOT NULL CHECK (granularity IN ('day', 'week', 'month')),
+    bucket date NOT NULL,
+    category text NOT NULL,
+    total numeric(14, 2) NOT NULL DEFAULT 0,
+    count integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, granularity, bucket, category)
+);
+
+ALTER TABLE public.spending_rollups ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS spending_rollups_owner_select ON public.spending_rollups;
+CREATE POLICY spending_rollups_owner_select ON public.spending_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+
+CREATE OR REPLACE FUNCTION public.spending_rollup_category(p_category text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT COALESCE(NULLIF(btrim(p_category), ''), 'Uncategorized');
+$$;
+
+
+-- Adds p_amount and p_count (negative to remove) to the day, week and month
+-- buckets of one expense, dropping buckets that become empty.
+CREATE OR REPLACE FUNCTION public.apply_spending_rollup(
+    p_user_id uuid,
+    p_date timestamptz,
+    p_category text,
+    p_amount numeric,
+    p_count integer
+)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_day date;
+    v_category text := public.spending_rollup_category(p_category);
+BEGIN
+    IF p_user_id IS NULL OR p_date IS NULL THEN
+        RETURN;
+    END IF;
+    v_day := (p_date AT TIME ZONE 'UTC')::date;
+
+    -- Shared with other writers of this user; the backfill takes it exclusively.
+    PERFORM pg_advisory_xact_lock_shared(hashtext('spending_rollups:' || p_user_id::text));
+
+    INSERT INTO public.spending_rollups AS r (user_id, granularity, bucket, category, total, count)
+    VALUES
+        (p_user_id, 'day', v_day, v_category, p_amount, p_count),
+        (p_user_id, 'week', date_trunc('week', v_day)::date, v_category, p_amount, p_count),
+        (p_user_id, 'month', date_trunc('month', v_day)::date, v_category, p_amount, p_count)
+    ON CONFLICT (user_id, granularity, bucket, category)
+    DO UPDATE SET total = r.total + EXCLUDED.total, count = r.count + EXCLUDED.count;
+
+    IF p_count < 0 THEN
+        DELETE FROM public.spending_rollups
+        WHERE user_id = p_user_id
+          AND category = v_category
+          AND count <= 0
+          AND (granularity, bucket) IN (
+              ('day', v_day),
+              ('week', date_trunc('week', v_day)::date),
+              ('month', date_trunc('month', v_day)::date)
+          );
+    END IF;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION public.expenses_spending_rollup_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.payer_id IS NOT DISTINCT FROM OLD.payer_id
+       AND NEW.date IS NOT DISTINCT FROM OLD.date
+       AND NEW.amount IS NOT DISTINCT FROM OLD.amount
+       AND public.spending_rollup_category(NEW.category) = public.spending_rollup_category(OLD.category) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.apply_spending_rollup(OLD.payer_id, OLD.date, OLD.category, -COALESCE(OLD.amount, 0), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.apply_spending_rollup(NEW.payer_id, NEW.date, NEW.category, COALESCE(NEW.amount, 0), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS expenses_spending_rollup ON public.expenses;
+CREATE TRIGGER expenses_spending_rollup
+    AFTER INSERT OR UPDATE OR DELETE ON public.expenses
+    FOR EACH ROW EXECUTE FUNCTION public.expenses_spending_rollup_trigger();
+
+
+-- Rebuilds the rollups of the given users from their expenses. Returns the
+-- number of rollup rows written.
+CREATE OR REPLACE FUNCTION public.backfill_spending_rollups(p_user_ids uuid[])
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    uid uuid;
+    written integer;
+BEGIN
+    -- Wait for in-flight expense writes of these users and hold off new ones.
+    FOR uid IN SELECT DISTINCT u FROM unnest(p_user_ids) AS u ORDER BY u LOOP
+        PERFORM pg_advisory_xact_lock(hashtext('spending_rollups:' || uid::text));
+    END LOOP;
+
+    DELETE FROM public.spending_rollups WHERE user_id = ANY (p_user_ids);
+
+    INSERT INTO public.spending_rollups (user_id, granularity, bucket, category, total, count)
+    SELECT e.payer_id, g.granularity, g.bucket, e.category, sum(e.amount), count(*)
+    FROM (
+        SELECT payer_id,
+               (date AT TIME ZONE 'UTC')::date AS day,
+               public.spending_rollup_category(category) AS category,
+               COALESCE(amount, 0) AS amount
+        FROM public.expenses
+        WHERE payer_id = ANY (p_user_ids) AND date IS NOT NULL
+    ) AS e
+    CROSS JOIN LATERAL (
+        VALUES ('day', e.day),
+               ('week', date_trunc('week', e.day)::date),
+               ('month', date_trunc('month', e.day)::date)
+    ) AS g (granularity, bucket)
+    GROUP BY e.payer_id, g.granularity, g.bucket, e.category;
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+    RETURN written;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.backfill_spending_rollups(uuid[]) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.backfill_spending_rollups(uuid[]) TO service_role;
+REVOKE ALL ON FUNCTION public.apply_spending_rollup(uuid, timestamptz, text, numeric, integer) FROM PUBLIC;
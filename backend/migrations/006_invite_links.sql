@@ -0,0 +1,65 @@
+-- Use counts and revocation for signed group invite links.
+--
+-- The link token still carries its own group, expiry and use limit; this
+-- table records each link's nonce so that every backend worker enforces the
+-- same use count and a link can be revoked before it expires. Claiming a
+-- use is one atomic UPDATE through claim_invite_link, so concurrent joins
+-- cannot exceed max_uses.
+
+CREATE TABLE IF NOT EXISTS public.invite_links (
+    nonce text PRIMARY KEY,
+    group_id uuid NOT NULL REFERENCES public.groups (id) ON DELETE CASCADE,
+    created_by uuid,
+    max_uses integer NOT NULL,
+    uses integer NOT NULL DEFAULT 0,
+    expires_at timestamptz NOT NULL,
+    revoked_at timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS invite_links_group_idx ON public.invite_links (group_id);
+
+-- Returns 'ok' after taking one use, or why no use was taken:
+-- 'not_found', 'revoked', 'expired' or 'exhausted'.
+CREATE OR REPLACE FUNCTION public.claim_invite_link(p_nonce text)
+RETURNS text
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    link public.invite_links%ROWTYPE;
+BEGIN
+    UPDATE public.invite_links
+    SET uses = uses + 1
+    WHERE nonce = p_nonce
+      AND revoked_at IS NULL
+      AND expires_at > now()
+      AND uses < max_uses;
+    IF FOUND THEN
+        RETURN 'ok';
+    END IF;
+
+    SELECT * INTO link FROM public.invite_links WHERE nonce = p_nonce;
+    IF NOT FOUND THEN
+        RETURN 'not_found';
+    ELSIF link.revoked_at IS NOT NULL THEN
+        RETURN 'revoked';
+    ELSIF link.expires_at <= now() THEN
+        RETURN 'expired';
+    END IF;
+    RETURN 'exhausted';
+END;
+$$;
+
+-- Gives back a use taken by claim_invite_link, e.g. when the join did not happen.
+CREATE OR REPLACE FUNCTION public.release_invite_link(p_nonce text)
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    UPDATE public.invite_links SET uses = greatest(uses - 1, 0) WHERE nonce = p_nonce;
+$$;
+
+-- Expired links are only needed until their tokens stop verifying.
+DELETE FROM public.invite_links WHERE expires_at < now() - interval '1 day';
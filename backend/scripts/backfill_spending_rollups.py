@@ -0,0 +1,26 @@
+"""
+Builds the spending_rollups table (migrations/005) from existing expenses.
+Run once after applying the migration, then set SPENDING_ROLLUPS=true.
+Re-running it rebuilds the rollups of the users given (or everyone).
+
+Usage (from backend/):  python -m scripts.backfill_spending_rollups [--user USER_ID ...] [--batch-size N]
+"""
+import argparse
+from app.services.spending_rollups import backfill_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild day/week/month spending rollups from expenses.")
+    parser.add_argument('--user', dest='user_ids', action='append', default=None, help="Only rebuild this user (repeatable).")
+    parser.add_argument('--batch-size', type=int, default=None, help="Users per backfill call.")
+    args = parser.parse_args()
+
+    stats = backfill_rollups(user_ids=args.user_ids, batch_size=args.batch_size)
+
+    print(f"Users:         {stats['users']}")
+    print(f"Rollup rows:   {stats['rows']}")
+    print(f"Calls:         {stats['calls']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Measures how often find_category resolves a description from the user's
+learned rules (no Gemini call) on a labelled sample, before and after
+merchant canonicalization.
+
+Rules are learned from one "training" description per merchant, the way
+learn_new_rule would store them; the variants are then categorized.
+
+Usage (from backend/):  python -m scripts.bench_merchant_hit_rate
+"""
+from collections import defaultdict
+from app.services.categorizer_service import ExpenseCategorizer
+
+TRAINING = [
+    ('Starbucks', 'Food & Dining'),
+    ("McDonald's", 'Food & Dining'),
+    ('Dominos pizza', 'Food & Dining'),
+    ('Swiggy', 'Food & Dining'),
+    ('Zomato order', 'Food & Dining'),
+    ('Uber', 'Transportation'),
+    ('Ola cabs', 'Transportation'),
+    ('Amazon', 'Shopping'),
+    ('Flipkart', 'Shopping'),
+    ('DMart groceries', 'Shopping'),
+    ('Netflix', 'Entertainment'),
+    ('Spotify', 'Entertainment'),
+    ('BookMyShow tickets', 'Entertainment'),
+    ('Airtel recharge', 'Bills & Utilities'),
+    ('Apollo Pharmacy', 'Health & Wellness'),
+]
+
+LABELLED_SAMPLE = [
+    ('Starbucks #1234', 'Food & Dining'),
+    ('STARBUCKS COFFEE', 'Food & Dining'),
+    ('starbuks', 'Food & Dining'),
+    ('sbux latte', 'Food & Dining'),
+    ('Mcdonalds', 'Food & Dining'),
+    ('mc donalds 4412', 'Food & Dining'),
+    ("Domino's Pizza", 'Food & Dining'),
+    ('dominoes pizza', 'Food & Dining'),
+    ('swigy dinner', 'Food & Dining'),
+    ('Swiggy Instamart', 'Food & Dining'),
+    ('zomatoo', 'Food & Dining'),
+    ('Uber trip 12/3', 'Transportation'),
+    ('UBER *TRIP', 'Transportation'),
+    ('olacabs ride', 'Transportation'),
+    ('Ola auto', 'Transportation'),
+    ('amzn mktp', 'Shopping'),
+    ('Amazon.in order', 'Shopping'),
+    ('flipkar', 'Shopping'),
+    ('D-Mart', 'Shopping'),
+    ('Groceries at DMart', 'Shopping'),
+    ('netflx subscription', 'Entertainment'),
+    ('Netflix.com', 'Entertainment'),
+    ('spotfy premium', 'Entertainment'),
+    ('book my show', 'Entertainment'),
+    ('Bharti Airtel postpaid', 'Bills & Utilities'),
+    ('airtell recharge', 'Bills & Utilities'),
+    ('apollo pharmcy', 'Health & Wellness'),
+    ('Apollo', 'Health & Wellness'),
+]
+
+
+def _legacy_rules():
+    """Rules as the old learn_new_rule stored them: the whole lowercased description."""
+    rules = defaultdict(list)
+    for description, category in TRAINING:
+        rules[category].append(description.lower())
+    return rules
+
+
+def _legacy_find(rules, description):
+    lower_desc = description.lower()
+    for category, keywords in rules.items():
+        if any(key in lower_desc for key in keywords):
+            return category
+    return None
+
+
+def main():
+    categorizer = ExpenseCategorizer()
+    categorizer.model = None
+
+    rules = defaultdict(list)
+    for description, category in TRAINING:
+        keyword = categorizer._merchant_key(description)
+        if keyword not in rules[category]:
+            rules[category].append(keyword)
+    categorizer._get_user_rules = lambda user_id: rules
+
+    legacy_rules = _legacy_rules()
+    legacy_hits = legacy_correct = hits = correct = 0
+    for description, expected in LABELLED_SAMPLE:
+        legacy = _legacy_find(legacy_rules, description)
+        legacy_hits += legacy is not None
+        legacy_correct += legacy == expected
+
+        result = categorizer.find_category('bench-user', description)
+        hit = result['source'] == 'user_dictionary'
+        hits += hit
+        correct += hit and result['category'] == expected
+        if not hit:
+            print(f"  still a miss: {description!r}")
+
+    total = len(LABELLED_SAMPLE)
+    print(f"Labelled descriptions: {total}")
+    print(f"Local hit rate before: {legacy_hits / total:.0%} ({legacy_correct} correct)")
+    print(f"Local hit rate after:  {hits / total:.0%} ({correct} correct)")
+
+
+if __name__ == '__main__':
+    main()
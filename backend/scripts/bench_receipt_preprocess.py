@@ -0,0 +1,104 @@
+"""
+Benchmarks receipt preprocessing on a folder of sample receipts.
+
+Reports original vs. processed size and preprocessing time per file. With
+--with-model it also times a Gemini parse of the original and processed
+image so the end-to-end latency change can be compared.
+
+Usage (from backend/):
+    python -m scripts.bench_receipt_preprocess path/to/receipts [--with-model]
+    python -m scripts.bench_receipt_preprocess --synthetic 5
+"""
+import argparse
+import base64
+import io
+import os
+import random
+import time
+from PIL import Image, ImageDraw
+from app.services.receipt_preprocessor import preprocess_receipt_image
+
+IMAGE_EXTENSIONS = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp'}
+
+
+def _synthetic_receipts(count):
+    """Phone-photo sized receipts: noisy colour background with printed lines."""
+    samples = []
+    for i in range(count):
+        image = Image.effect_noise((3024, 4032), 40).convert('RGB')
+        draw = ImageDraw.Draw(image)
+        draw.rectangle([700, 300, 2300, 3700], fill=(245, 242, 235))
+        for line in range(60):
+            y = 400 + line * 52
+            draw.text((760, y), f"ITEM {line:02d} ............ {random.uniform(1, 50):7.2f}", fill=(20, 20, 20))
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=92)
+        samples.append((f"synthetic_{i}.jpg", buffer.getvalue(), 'image/jpeg'))
+    return samples
+
+
+def _folder_receipts(path):
+    samples = []
+    for name in sorted(os.listdir(path)):
+        mime_type = IMAGE_EXTENSIONS.get(os.path.splitext(name)[1].lower())
+        if mime_type:
+            with open(os.path.join(path, name), 'rb') as f:
+                samples.append((name, f.read(), mime_type))
+    return samples
+
+
+def _time_model(image_bytes, mime_type):
+    from app.services.categorizer_service import categorizer
+    started = time.perf_counter()
+    try:
+        # Call the model directly so the timing excludes preprocessing.
+        categorizer.model.generate_content([
+            "Extract the total from this receipt as JSON.",
+            {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode('utf-8')},
+        ])
+    except Exception as e:
+        print(f"  model call failed: {e}")
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark receipt image preprocessing.")
+    parser.add_argument('path', nargs='?', help="Folder of receipt images.")
+    parser.add_argument('--synthetic', type=int, default=0, help="Generate N synthetic phone-sized receipts instead.")
+    parser.add_argument('--with-model', action='store_true', help="Also time Gemini on original vs processed images.")
+    args = parser.parse_args()
+
+    samples = _synthetic_receipts(args.synthetic) if args.synthetic else _folder_receipts(args.path or '.')
+    if not samples:
+        parser.error("No sample receipts found.")
+
+    total_before = total_after = 0
+    total_ms = model_before_ms = model_after_ms = 0.0
+
+    for name, image_bytes, mime_type in samples:
+        started = time.perf_counter()
+        processed, processed_mime = preprocess_receipt_image(image_bytes, mime_type)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        total_before += len(image_bytes)
+        total_after += len(processed)
+        total_ms += elapsed_ms
+        print(f"{name}: {len(image_bytes) / 1024:.0f} KB -> {len(processed) / 1024:.0f} KB ({processed_mime}) in {elapsed_ms:.0f} ms")
+
+        if args.with_model:
+            model_before_ms += _time_model(image_bytes, mime_type)
+            model_after_ms += _time_model(processed, processed_mime)
+
+    count = len(samples)
+    saved = total_before - total_after
+    print()
+    print(f"Receipts:              {count}")
+    print(f"Bytes before / after:  {total_before} / {total_after}")
+    print(f"Bytes saved:           {saved} ({saved / total_before * 100:.1f}%)")
+    print(f"Avg preprocessing:     {total_ms / count:.0f} ms")
+    if args.with_model:
+        print(f"Avg model latency:     {model_before_ms / count:.0f} ms -> {model_after_ms / count:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Memory benchmark for the /api/parse-bill upload path.
+
+Starts a throwaway server in a subprocess for each mode, fires concurrent
+multipart uploads at it and reports the server's peak RSS. The model call
+is skipped; the benchmark covers receiving, decoding and downscaling the
+upload and building the inline data the Gemini SDK is given.
+
+  legacy     image_file.read() + base64 of the raw bytes (old behaviour)
+  streaming  spooled upload + incremental decode/downscale + raw bytes
+
+Usage (from backend/):
+    python -m scripts.bench_upload_memory [--size-mb 10] [--concurrency 8] [--rounds 3]
+"""
+import argparse
+import base64
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import requests
+from PIL import Image
+
+PORT = 8765
+
+
+def _serve(mode):
+    from flask import Flask, request, jsonify
+    from werkzeug.serving import make_server
+    from app.services.upload_pipeline import UploadRequest, receive_upload
+    from app.services.receipt_preprocessor import preprocess_in_pool
+
+    app = Flask(__name__)
+    if mode == 'streaming':
+        app.request_class = UploadRequest
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        image_file = request.files['image']
+        if mode == 'legacy':
+            image_bytes = image_file.read()
+            encoded = base64.b64encode(image_bytes).decode('utf-8')
+        else:
+            spooled = receive_upload(image_file)
+            processed, _ = preprocess_in_pool(spooled.open(), spooled.mime_type)
+            encoded = processed if isinstance(processed, bytes) else spooled.read_all()
+        return jsonify({'encoded_bytes': len(encoded)})
+
+    @app.route('/rss', methods=['GET'])
+    def rss():
+        return jsonify({'max_rss_kb': _peak_rss_kb()})
+
+    make_server('127.0.0.1', PORT, app, threaded=True).serve_forever()
+
+
+def _peak_rss_kb():
+    # VmHWM is tracked per address space, so unlike ru_maxrss it is not
+    # inherited from the benchmark driver that spawned this process.
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _make_photo(size_mb):
+    # Noise compresses badly, so the JPEG size scales with the pixel count.
+    side = int((size_mb * 1024 * 1024 / 0.9) ** 0.5)
+    image = Image.effect_noise((side, side), 80).convert('RGB')
+    path = os.path.join(tempfile.gettempdir(), f"bench_receipt_{size_mb}mb.jpg")
+    image.save(path, format='JPEG', quality=90)
+    return path
+
+
+def _run_mode(mode, photo_path, concurrency, rounds):
+    server = subprocess.Popen([sys.executable, '-m', 'scripts.bench_upload_memory', '--serve', mode])
+    base_url = f"http://127.0.0.1:{PORT}"
+    try:
+        for _ in range(100):
+            try:
+                baseline = requests.get(f"{base_url}/rss", timeout=1).json()['max_rss_kb']
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("benchmark server did not start")
+
+        def worker():
+            for _ in range(rounds):
+                with open(photo_path, 'rb') as f:
+                    requests.post(f"{base_url}/upload", files={'image': ('receipt.jpg', f, 'image/jpeg')}, timeout=120)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        peak = requests.get(f"{base_url}/rss", timeout=5).json()['max_rss_kb']
+        return baseline, peak, elapsed
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of the receipt upload path.")
+    parser.add_argument('--size-mb', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--serve', choices=['legacy', 'streaming'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve)
+        return
+
+    photo_path = _make_photo(args.size_mb)
+    photo_kb = os.path.getsize(photo_path) // 1024
+    print(f"Upload: {photo_kb} KB JPEG, {args.concurrency} concurrent clients x {args.rounds} rounds")
+    for mode in ('legacy', 'streaming'):
+        baseline, peak, elapsed = _run_mode(mode, photo_path, args.concurrency, args.rounds)
+        growth = peak - baseline
+        print(f"{mode:>10}: peak RSS {peak / 1024:.0f} MB (+{growth / 1024:.0f} MB over idle, "
+              f"{growth / args.concurrency / 1024:.1f} MB per concurrent request) in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+One-off migration: compacts every user_categories row into normalized
+keywords and reports before/after rule counts.
+
+Usage (from backend/):  python -m scripts.compact_user_rules [--user USER_ID]
+"""
+import argparse
+from app.services.categorizer_service import categorizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact learned keyword rules in user_categories.")
+    parser.add_argument('--user', dest='user_id', default=None, help="Only compact rules for this user id.")
+    args = parser.parse_args()
+
+    stats = categorizer.compact_user_rules(args.user_id)
+
+    before = stats['keywords_before']
+    after = stats['keywords_after']
+    saved = before - after
+    percent = (saved / before * 100) if before else 0.0
+    print(f"Rows scanned:     {stats['rows']}")
+    print(f"Rows updated:     {stats['rows_updated']}")
+    print(f"Keywords before:  {before}")
+    print(f"Keywords after:   {after}")
+    print(f"Removed:          {saved} ({percent:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+Runs one notification retention pass and reports the table size before and
+after. The same job runs hourly inside the app (NOTIFICATION_RETENTION_*).
+
+Usage (from backend/):  python -m scripts.prune_notifications [--read-days N] [--stale-days N] [--max-batches N]
+"""
+import argparse
+from app.services.notification_retention import prune_notifications
+
+
+def _describe(size):
+    if 'total_bytes' in size:
+        return f"{size['total_bytes'] / (1024 * 1024):.1f} MB total, ~{size.get('estimated_rows')} rows"
+    return f"{size.get('rows')} rows"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete read and stale notifications in bounded batches.")
+    parser.add_argument('--read-days', type=int, default=None, help="Delete read notifications older than this.")
+    parser.add_argument('--stale-days', type=int, default=None, help="Delete any notification older than this.")
+    parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many DELETE batches.")
+    args = parser.parse_args()
+
+    stats = prune_notifications(max_batches=args.max_batches, read_days=args.read_days, stale_days=args.stale_days)
+
+    print(f"Deleted:      {stats['deleted']} rows in {stats['batches']} batches")
+    print(f"Size before:  {_describe(stats['size_before'])}")
+    print(f"Size after:   {_describe(stats['size_after'])}")
+
+
+if __name__ == '__main__':
+    main()